@@ -1,6 +1,15 @@
+import json
+
 from django import forms
 from django.contrib import admin
 from django.contrib.admin import widgets
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.forms.models import BaseInlineFormSet
+from django.http import Http404, HttpResponseNotAllowed, JsonResponse, QueryDict
+from django.template.response import TemplateResponse
+from django.urls import path
 
 from rejs.reports import generate_rejs_report
 
@@ -13,7 +22,9 @@ from .models import (
 	Wachta,
 	Wplata,
 	Zgloszenie,
+	ZgloszenieOczekujace,
 )
+from .serwisy.pulpit import serwis_pulpitu
 from .serwisy.wachty import serwis_wacht
 
 
@@ -57,15 +68,22 @@ class WachtaForm(forms.ModelForm):
 		model = Wachta
 		fields = "__all__"
 
-	def __init__(self, *args, **kwargs):
+	def __init__(self, *args, zgloszenia_rejsu=None, **kwargs):
 		super().__init__(*args, **kwargs)
 
 		if self.instance and self.instance.pk:
-			self.fields["czlonkowie"].queryset = Zgloszenie.objects.filter(
-				rejs=self.instance.rejs,
-				wachta=None,
+			# Do wyboru: nieprzypisani uczestnicy rejsu oraz obecni członkowie tej wachty
+			pole = self.fields["czlonkowie"]
+			pole.queryset = Zgloszenie.objects.filter(rejs_id=self.instance.rejs_id).filter(
+				Q(wachta=None) | Q(wachta=self.instance)
 			)
-			self.fields["czlonkowie"].initial = self.instance.czlonkowie.all()
+			if zgloszenia_rejsu is None:
+				pole.initial = self.instance.czlonkowie.all()
+			else:
+				# Wspólna lista uczestników z WachtyRejsuFormSet - bez zapytań w każdym formularzu
+				dostepni = [z for z in zgloszenia_rejsu if z.wachta_id in (None, self.instance.pk)]
+				pole.choices = [(z.pk, str(z)) for z in dostepni]
+				pole.initial = [z.pk for z in dostepni if z.wachta_id == self.instance.pk]
 		else:
 			rejs_initial = self.initial.get("rejs") or (self.data.get("rejs") if self.data else None)
 			if rejs_initial:
@@ -89,9 +107,54 @@ class WachtaAdmin(admin.ModelAdmin):
 	list_filter = ("rejs",)
 
 
+class WachtyRejsuFormSet(BaseInlineFormSet):
+	"""
+	Formularze wacht jednego rejsu.
+
+	Uczestnicy rejsu pobierani są raz dla całego formsetu i przekazywani do
+	każdego WachtaForm, więc liczba zapytań nie zależy od liczby wacht.
+	"""
+
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+		self._zgloszenia_rejsu = (
+			list(Zgloszenie.objects.filter(rejs=self.instance).order_by("pk")) if self.instance.pk else None
+		)
+
+	def get_form_kwargs(self, index):
+		kwargs = super().get_form_kwargs(index)
+		kwargs["zgloszenia_rejsu"] = self._zgloszenia_rejsu
+		return kwargs
+
+
+class StronicowanyInlineFormSet(BaseInlineFormSet):
+	"""Formset inline wyświetlający jedną stronę obiektów (numer strony ustawia inline z parametru GET)."""
+
+	na_strone = 25
+	numer_strony = 1
+	parametr_strony = "strona"
+	parametry = QueryDict()
+
+	def get_queryset(self):
+		if not hasattr(self, "_queryset"):
+			self.strona = Paginator(super().get_queryset(), self.na_strone).get_page(self.numer_strony)
+			self._queryset = self.strona.object_list
+		return self._queryset
+
+	def odnosniki_stron(self) -> list[tuple[int, str]]:
+		"""Numery stron z query stringiem - bieżące parametry GET (np. _changelist_filters) ze zmienionym numerem."""
+		odnosniki = []
+		for numer in self.strona.paginator.page_range:
+			parametry = self.parametry.copy()
+			parametry[self.parametr_strony] = numer
+			odnosniki.append((numer, parametry.urlencode()))
+		return odnosniki
+
+
 class WachtaInline(admin.TabularInline):
 	model = Wachta
 	form = WachtaForm
+	formset = WachtyRejsuFormSet
 	extra = 0
 	show_change_link = True
 
@@ -104,25 +167,164 @@ class WplataInline(admin.TabularInline):
 
 
 class ZgloszenieInline(admin.TabularInline):
+	"""
+	Podsumowanie zgłoszeń rejsu - tylko do odczytu i stronicowane.
+
+	Pełne formularze z listami wyboru dla każdego uczestnika generowały setki
+	zapytań przy dużych rejsach; edycja odbywa się na stronie zgłoszenia.
+	"""
+
 	model = Zgloszenie
+	formset = StronicowanyInlineFormSet
+	template = "admin/rejs/stronicowany_tabular.html"
+	fields = readonly_fields = (
+		"imie",
+		"nazwisko",
+		"email",
+		"telefon",
+		"status",
+		"lista_rezerwowa",
+		"wachta",
+		"do_zaplaty_display",
+	)
 	extra = 0
-	# readonly_fields = ["imie", "nazwisko", "email", "telefon"]
+	can_delete = False
 	show_change_link = True
+	parametr_strony = "zgloszenia_strona"
+
+	def has_add_permission(self, request, obj=None):
+		return False
+
+	def get_queryset(self, request):
+		return (
+			super()
+			.get_queryset(request)
+			.select_related("wachta__rejs")
+			.z_finansami()
+			.order_by("nazwisko", "imie", "pk")
+		)
+
+	def get_formset(self, request, obj=None, **kwargs):
+		formset = super().get_formset(request, obj, **kwargs)
+		formset.numer_strony = request.GET.get(self.parametr_strony, 1)
+		formset.parametr_strony = self.parametr_strony
+		formset.parametry = request.GET
+		return formset
+
+	@admin.display(description="Do zapłaty")
+	def do_zaplaty_display(self, obj):
+		return obj.do_zaplaty
+
+
+@admin.action(description="Rozdziel zakwalifikowanych uczestników na wachty")
+def rozdziel_na_wachty(modeladmin, request, queryset):
+	for rejs in queryset:
+		przypisane = serwis_wacht.rozdziel_automatycznie(rejs, powiadom=True)
+		if przypisane:
+			modeladmin.message_user(request, f"{rejs}: przypisano do wacht {przypisane} uczestników.")
+		elif not rejs.wachty.exists():
+			modeladmin.message_user(request, f"{rejs}: rejs nie ma wacht.", level="warning")
+		else:
+			modeladmin.message_user(request, f"{rejs}: brak zakwalifikowanych uczestników bez wachty.")
 
 
 @admin.register(Rejs)
 class RejsyAdmin(admin.ModelAdmin):
-	list_display = ["nazwa", "od", "do", "start", "koniec"]
-	actions = [generate_report]
+	list_display = ["nazwa", "od", "do", "start", "koniec", "miejsca_display"]
+	readonly_fields = ["zajete_miejsca"]
+	actions = [generate_report, rozdziel_na_wachty]
 	inlines = [ZgloszenieInline, WachtaInline, OgloszenieInline]
 
+	def get_urls(self):
+		pulpit = path("pulpit/", self.admin_site.admin_view(self.pulpit_view), name="rejs_rejs_pulpit")
+		wachty = path("<int:rejs_id>/wachty/", self.admin_site.admin_view(self.wachty_view), name="rejs_rejs_wachty")
+		return [pulpit, wachty, *super().get_urls()]
+
+	@admin.display(description="Miejsca", ordering="zajete_miejsca")
+	def miejsca_display(self, obj):
+		if obj.limit_miejsc is None:
+			return obj.zajete_miejsca
+		return f"{obj.zajete_miejsca}/{obj.limit_miejsc}"
+
+	def pulpit_view(self, request):
+		"""Pulpit rekrutacji - metryki nadchodzących rejsów (z cache, patrz SerwisPulpitu)."""
+		if not self.has_view_permission(request):
+			raise PermissionDenied
+		context = {
+			**self.admin_site.each_context(request),
+			"title": "Pulpit rekrutacji",
+			"opts": self.model._meta,
+			**serwis_pulpitu.metryki(),
+		}
+		return TemplateResponse(request, "admin/rejs/pulpit.html", context)
+
+	def wachty_view(self, request, rejs_id):
+		"""
+		Skład wacht rejsu w JSON - dla planszy przeciągania uczestników.
+
+		GET zwraca skład wacht. POST z treścią
+		{"przeniesienia": [{"zgloszenie": <id>, "wachta": <id> | null}, ...]}
+		zapisuje wszystkie przeniesienia w jednej transakcji (SerwisWacht.przenies_czlonkow)
+		i zwraca nowy skład.
+		"""
+		if request.method not in ("GET", "POST"):
+			return HttpResponseNotAllowed(["GET", "POST"])
+		rejs = self.get_object(request, str(rejs_id))
+		if rejs is None:
+			raise Http404
+		if request.method == "GET" and not self.has_view_permission(request, rejs):
+			raise PermissionDenied
+
+		if request.method == "POST":
+			if not self.has_change_permission(request, rejs):
+				raise PermissionDenied
+			try:
+				przeniesienia = {
+					int(p["zgloszenie"]): None if p["wachta"] is None else int(p["wachta"])
+					for p in json.loads(request.body)["przeniesienia"]
+				}
+			except (ValueError, KeyError, TypeError):
+				return JsonResponse({"blad": "Nieprawidłowy format przeniesień."}, status=400)
+			try:
+				serwis_wacht.przenies_czlonkow(rejs, przeniesienia)
+			except forms.ValidationError as e:
+				return JsonResponse({"blad": e.messages[0]}, status=400)
+
+		return JsonResponse(serwis_wacht.uklad_wacht(rejs))
+
+
+class PlatnoscFilter(admin.SimpleListFilter):
+	"""Filtr stanu rozliczenia - wymaga adnotacji z ZgloszenieQuerySet.z_finansami()."""
+
+	title = "płatności"
+	parameter_name = "platnosc"
+
+	def lookups(self, request, model_admin):
+		return (
+			("oplacone", "Opłacone w całości"),
+			("czesciowo", "Tylko zaliczka / częściowo"),
+			("brak", "Brak wpłat"),
+			("nadplata", "Nadpłata"),
+		)
+
+	def queryset(self, request, queryset):
+		warunki = {
+			"oplacone": {"_do_zaplaty": 0},
+			"czesciowo": {"_suma_wplat__gt": 0, "_do_zaplaty__gt": 0},
+			"brak": {"_suma_wplat__lte": 0},
+			"nadplata": {"_do_zaplaty__lt": 0},
+		}
+		if self.value() not in warunki:
+			return queryset
+		return queryset.filter(**warunki[self.value()])
+
 
 @admin.register(Zgloszenie)
 class ZgloszenieAdmin(admin.ModelAdmin):
-	list_display = ("id", "imie", "nazwisko", "rejs")
-	list_filter = ("rejs",)
+	list_display = ("id", "imie", "nazwisko", "rejs", "suma_wplat_display", "do_zaplaty_display")
+	list_filter = ("rejs", PlatnoscFilter, "lista_rezerwowa")
 	search_fields = ("imie", "nazwisko")
-	readonly_fields = ("rejs_cena", "do_zaplaty", "suma_wplat")
+	readonly_fields = ("lista_rezerwowa", "rejs_cena", "do_zaplaty", "suma_wplat")
 	inlines = [WplataInline]
 	fieldsets = (
 		(
@@ -134,6 +336,7 @@ class ZgloszenieAdmin(admin.ModelAdmin):
 					"email",
 					"telefon",
 					"status",
+					"lista_rezerwowa",
 					"wzrok",
 					"rejs",
 					"wachta",
@@ -146,6 +349,18 @@ class ZgloszenieAdmin(admin.ModelAdmin):
 		),
 	)
 
+	def get_queryset(self, request):
+		# Kolumny finansowe liczone w SQL - stała liczba zapytań niezależnie od rozmiaru strony
+		return super().get_queryset(request).z_finansami()
+
+	@admin.display(description="Suma wpłat", ordering="_suma_wplat")
+	def suma_wplat_display(self, obj):
+		return obj.suma_wplat
+
+	@admin.display(description="Do zapłaty", ordering="_do_zaplaty")
+	def do_zaplaty_display(self, obj):
+		return obj.do_zaplaty
+
 
 @admin.register(Dane_Dodatkowe)
 class Dane_DodatkoweAdmin(admin.ModelAdmin):
@@ -176,6 +391,25 @@ class Dane_DodatkoweAdmin(admin.ModelAdmin):
 		return super().change_view(request, object_id, form_url, extra_context)
 
 
+@admin.register(ZgloszenieOczekujace)
+class ZgloszenieOczekujaceAdmin(admin.ModelAdmin):
+	"""Podgląd kolejki trybu szczytowego - zgłoszenia tworzy komenda przetwarzaj_zgloszenia."""
+
+	list_display = ("__str__", "rejs", "data_zgloszenia", "token", "powod_odrzucenia")
+	list_filter = ("rejs",)
+	readonly_fields = ("rejs", "dane", "token", "klucz_idempotencji", "data_zgloszenia", "powod_odrzucenia")
+	ordering = ["pk"]
+
+	def has_add_permission(self, request):
+		return False
+
+	def has_change_permission(self, request, obj=None):
+		return False
+
+	def has_delete_permission(self, request, obj=None):
+		return request.user.is_superuser
+
+
 @admin.register(AuditLog)
 class AuditLogAdmin(admin.ModelAdmin):
 	list_display = (
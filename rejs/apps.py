@@ -6,4 +6,5 @@ class RejsConfig(AppConfig):
 	name = "rejs"
 
 	def ready(self):
+		import rejs.checks
 		import rejs.signals
@@ -36,8 +36,10 @@ def log_audit(
 	Returns:
 	    Utworzony obiekt AuditLog
 	"""
+	from .metryki import wpisy_audytu
 	from .models import AuditLog
 
+	wpisy_audytu.inc(akcja=akcja)
 	ip_address = None
 	user_agent = ""
 	uzytkownik = None
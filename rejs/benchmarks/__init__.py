@@ -0,0 +1,87 @@
+"""
+Benchmarki wydajności aplikacji.
+
+Zestawy:
+- szyfrowanie - przepustowość szyfrowania/odszyfrowania i rozmiar szyfrogramów
+- pola - zapis i odczyt modelu z polami EncryptedTextField przez bazę danych
+- walidatory - przepustowość validate_pesel
+- widoki - czas odpowiedzi index, zgloszenie_details i wysłania zgłoszenia
+- raport - RaportRejsuBuilder i ExcelExporter dla 1 tys. i 10 tys. uczestników
+- powiadomienia - powiadom_o_ogloszeniu z backendem email w pamięci
+- retencja - komenda usun_dane_wrazliwe
+- wachty - automatyczny przydział do wacht i aktualizuj_czlonkow_wachty
+- start - czas zimnego startu (django.setup() w świeżym procesie)
+- szablony - renderowanie stron publicznych i emaili: silnik Django a Jinja2
+
+Każdy zestaw to moduł z funkcją uruchom(rozmiar=None), zwracającą listę
+wyników w postaci słowników:
+    {"nazwa": ..., "wartosc": ..., "jednostka": ..., "lepiej": "wiecej" | "mniej"}
+
+Zestawy z atrybutem BAZA_DANYCH = True generują dane w bazie wewnątrz
+transakcji wycofywanej po pomiarze (dane_tymczasowe); komenda benchmark
+uruchamia je domyślnie na tymczasowej bazie testowej.
+
+Uruchamianie: python manage.py benchmark [zestaw ...]
+"""
+
+import statistics
+import time
+from contextlib import contextmanager
+from importlib import import_module
+
+from django.core import mail
+from django.db import transaction
+from django.test import override_settings
+
+ZESTAWY = {
+	"szyfrowanie": "rejs.benchmarks.szyfrowanie",
+	"pola": "rejs.benchmarks.pola",
+	"walidatory": "rejs.benchmarks.walidatory",
+	"widoki": "rejs.benchmarks.widoki",
+	"raport": "rejs.benchmarks.raport",
+	"powiadomienia": "rejs.benchmarks.powiadomienia",
+	"retencja": "rejs.benchmarks.retencja",
+	"wachty": "rejs.benchmarks.wachty",
+	"start": "rejs.benchmarks.start",
+	"szablony": "rejs.benchmarks.szablony",
+}
+
+
+def uruchom_zestaw(nazwa: str, rozmiar: int | None = None) -> list[dict]:
+	"""Uruchamia zestaw o podanej nazwie (moduły importowane dopiero przy użyciu)."""
+	return import_module(ZESTAWY[nazwa]).uruchom(rozmiar=rozmiar)
+
+
+def wymaga_bazy(nazwa: str) -> bool:
+	"""Czy zestaw zapisuje dane w bazie (BAZA_DANYCH w module zestawu)."""
+	return getattr(import_module(ZESTAWY[nazwa]), "BAZA_DANYCH", False)
+
+
+@contextmanager
+def dane_tymczasowe():
+	"""Transakcja wycofywana po pomiarze - wygenerowane dane nie zostają w bazie."""
+	with transaction.atomic():
+		yield
+		transaction.set_rollback(True)
+
+
+@contextmanager
+def skrzynka_tymczasowa():
+	"""Emaile trafiają do skrzynki w pamięci (locmem) i są z niej usuwane po pomiarze."""
+	with override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend"):
+		poczatek = len(getattr(mail, "outbox", []))
+		try:
+			yield
+		finally:
+			# Skrzynka locmem jest wspólna dla procesu (także dla testów)
+			del getattr(mail, "outbox", [])[poczatek:]
+
+
+def zmierz(funkcja, powtorzenia: int = 1) -> float:
+	"""Mediana czasu wykonania funkcji w sekundach (odporna na pojedyncze zakłócenia)."""
+	czasy = []
+	for _ in range(powtorzenia):
+		start = time.perf_counter()
+		funkcja()
+		czasy.append(time.perf_counter() - start)
+	return statistics.median(czasy)
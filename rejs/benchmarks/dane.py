@@ -0,0 +1,103 @@
+"""
+Generator danych benchmarków: rejs z zakwalifikowaną załogą.
+
+Wiersze zapisywane są przez bulk_create (bez sygnałów, więc bez emaili),
+dane dodatkowe szyfrowane kluczem danych rejsu - jak w load_sample_data --scale.
+Wywoływać wewnątrz dane_tymczasowe().
+"""
+
+from __future__ import annotations
+
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+
+from rejs.modele.pola import surowa_wartosc
+from rejs.modele.zgloszenie import indeks_peselu
+from rejs.models import Dane_Dodatkowe, KluczRejsu, Rejs, Wachta, Wplata, Zgloszenie
+
+NAZWY_WACHT = ("Alfa", "Beta", "Gamma", "Delta")
+
+
+def pesel(losowanie: random.Random) -> str:
+	"""Losowy numer z poprawną sumą kontrolną PESEL."""
+	cyfry = [losowanie.randrange(10) for _ in range(10)]
+	suma = sum(c * w for c, w in zip(cyfry, [1, 3, 7, 9, 1, 3, 7, 9, 1, 3]))
+	return "".join(map(str, cyfry)) + str((10 - suma % 10) % 10)
+
+
+def utworz_rejs(
+	liczba_zgloszen: int,
+	*,
+	zakonczony: bool = False,
+	z_wachtami: bool = True,
+	z_danymi: bool = True,
+	seed: int = 0,
+) -> Rejs:
+	"""
+	Tworzy rejs z zakwalifikowanymi uczestnikami, wachtami, wpłatami i danymi dodatkowymi.
+
+	Args:
+		liczba_zgloszen: Liczba uczestników
+		zakonczony: Rejs zakończony 50 dni temu (do testów retencji) zamiast nadchodzącego
+		z_wachtami: Uczestnicy przydzieleni po kolei do czterech wacht
+		z_danymi: Uczestnicy z zaszyfrowanymi danymi dodatkowymi
+		seed: Ziarno danych losowych
+	"""
+	losowanie = random.Random(seed)
+	dzis = timezone.localdate()
+	od = dzis - timedelta(days=60) if zakonczony else dzis + timedelta(days=60)
+	rejs = Rejs.objects.create(
+		nazwa=f"Benchmark {liczba_zgloszen}",
+		od=od,
+		do=od + timedelta(days=10),
+		start="Gdynia",
+		koniec="Gdynia",
+		cena=Decimal(3000),
+		zaliczka=Decimal(500),
+		aktywna_rekrutacja=not zakonczony,
+		# bulk_create pomija Zgloszenie.save() - licznik miejsc ustawiany od razu, jak w load_sample_data --scale
+		zajete_miejsca=liczba_zgloszen,
+	)
+	wachty = Wachta.objects.bulk_create([Wachta(rejs=rejs, nazwa=n) for n in NAZWY_WACHT])
+
+	zgloszenia = Zgloszenie.objects.bulk_create(
+		[
+			Zgloszenie(
+				imie="Jan",
+				nazwisko=f"Uczestnik{i}",
+				email=f"benchmark{i}@example.com",
+				telefon=f"5{losowanie.randrange(10**8):08d}",
+				data_urodzenia=date(losowanie.randint(1950, 2005), 1, 1) + timedelta(days=losowanie.randrange(365)),
+				adres=f"ul. Morska {losowanie.randint(1, 200)}",
+				kod_pocztowy=f"{losowanie.randint(10, 99)}-{losowanie.randint(100, 999)}",
+				miejscowosc="Gdynia",
+				obecnosc="tak",
+				rodo=True,
+				status=Zgloszenie.STATUS_ZAKWALIFIKOWANY,
+				wzrok=losowanie.choices(["NIEWIDOMY", "SLABO-WIDZACY", "WIDZI"], weights=[15, 25, 60])[0],
+				rejs=rejs,
+				wachta=wachty[i % len(wachty)] if z_wachtami else None,
+			)
+			for i in range(liczba_zgloszen)
+		],
+		batch_size=2000,
+	)
+	Wplata.objects.bulk_create([Wplata(kwota=rejs.zaliczka, zgloszenie=z) for z in zgloszenia], batch_size=2000)
+
+	if z_danymi:
+		klucz_id, szyfr = KluczRejsu.objects.do_szyfrowania(rejs.pk)
+		dane = []
+		for zgloszenie in zgloszenia:
+			numer = pesel(losowanie)
+			wartosci = (numer, "dowod-osobisty", f"ABC{losowanie.randrange(10**6):06d}")
+			poz1, poz2, poz3 = (surowa_wartosc(szyfr.szyfruj(w, klucz_id)) for w in wartosci)
+			dane.append(
+				Dane_Dodatkowe(
+					zgloszenie=zgloszenie, poz1=poz1, poz2=poz2, poz3=poz3, pesel_indeks=indeks_peselu(numer)
+				)
+			)
+		Dane_Dodatkowe.objects.bulk_create(dane, batch_size=2000)
+	return rejs
@@ -0,0 +1,48 @@
+"""
+Benchmark pól EncryptedTextField w obie strony przez bazę danych.
+
+Mierzy zapis modelu Dane_Dodatkowe (szyfrowanie kluczem danych rejsu przy
+save()), odczyt przez ORM (odszyfrowanie w from_db_value) i odczyt hurtowy
+szyfrogramów z odszyfruj_wiele(). Uzupełnia zestaw szyfrowanie, który mierzy
+samą kryptografię.
+"""
+
+from __future__ import annotations
+
+from rejs.benchmarks import dane_tymczasowe, zmierz
+from rejs.benchmarks.dane import utworz_rejs
+from rejs.modele.pola import odszyfruj_wiele, surowe
+from rejs.models import Dane_Dodatkowe
+
+BAZA_DANYCH = True
+
+DOMYSLNA_LICZBA_WIERSZY = 1000
+
+
+def uruchom(rozmiar: int | None = None) -> list[dict]:
+	liczba = rozmiar or DOMYSLNA_LICZBA_WIERSZY
+	with dane_tymczasowe():
+		rejs = utworz_rejs(liczba, z_danymi=False)
+		zgloszenia = list(rejs.zgloszenia.order_by("pk"))
+
+		def zapisz():
+			for zgloszenie in zgloszenia:
+				Dane_Dodatkowe(zgloszenie=zgloszenie, poz1="90021401380", poz2="paszport", poz3="ABC123456").save()
+
+		dane = Dane_Dodatkowe.objects.filter(zgloszenie__rejs=rejs)
+		czas_zapisu = zmierz(zapisz)
+		czas_odczytu = zmierz(lambda: list(dane.all()), 3)
+		czas_hurtowy = zmierz(
+			lambda: odszyfruj_wiele(t for w in dane.values_list(surowe("poz1"), surowe("poz3")) for t in w), 3
+		)
+
+	return [
+		{"nazwa": "zapis (save)", "wartosc": liczba / czas_zapisu, "jednostka": "wierszy/s", "lepiej": "wiecej"},
+		{"nazwa": "odczyt ORM", "wartosc": liczba / czas_odczytu, "jednostka": "wierszy/s", "lepiej": "wiecej"},
+		{
+			"nazwa": "odczyt hurtowy (odszyfruj_wiele, 2 pola)",
+			"wartosc": liczba / czas_hurtowy,
+			"jednostka": "wierszy/s",
+			"lepiej": "wiecej",
+		},
+	]
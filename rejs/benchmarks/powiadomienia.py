@@ -0,0 +1,31 @@
+"""
+Benchmark wysyłki ogłoszenia do załogi (SerwisNotyfikacji.powiadom_o_ogloszeniu).
+
+Renderuje i wysyła emaile do wszystkich uczestników rejsu przez backend
+w pamięci (locmem) - mierzy koszt aplikacji bez serwera SMTP.
+"""
+
+from __future__ import annotations
+
+from rejs.benchmarks import dane_tymczasowe, skrzynka_tymczasowa, zmierz
+from rejs.benchmarks.dane import utworz_rejs
+from rejs.models import Ogloszenie
+from rejs.serwisy.notyfikacje import serwis_notyfikacji
+
+BAZA_DANYCH = True
+
+DOMYSLNA_LICZBA_UCZESTNIKOW = 500
+
+
+def uruchom(rozmiar: int | None = None) -> list[dict]:
+	liczba = rozmiar or DOMYSLNA_LICZBA_UCZESTNIKOW
+	with dane_tymczasowe(), skrzynka_tymczasowa():
+		rejs = utworz_rejs(liczba, z_danymi=False)
+		# Niezapisane ogłoszenie - zapis wysłałby emaile sygnałem post_save
+		ogloszenie = Ogloszenie(rejs=rejs, tytul="Zbiorka", text="Zbiorka w porcie o 10:00.")
+		czas = zmierz(lambda: serwis_notyfikacji.powiadom_o_ogloszeniu(ogloszenie))
+
+	return [
+		{"nazwa": f"ogloszenie: {liczba} odbiorcow", "wartosc": czas * 1000, "jednostka": "ms", "lepiej": "mniej"},
+		{"nazwa": "ogloszenie: przepustowosc", "wartosc": liczba / czas, "jednostka": "emaili/s", "lepiej": "wiecej"},
+	]
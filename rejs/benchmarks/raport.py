@@ -0,0 +1,74 @@
+"""
+Benchmark raportu Excel rejsu (RaportRejsuBuilder i ExcelExporter).
+
+Dla rejsu z 1 tys. i 10 tys. uczestników (z wpłatami, wachtami i danymi
+wrażliwymi) mierzy osobno zbieranie danych z bazy i budowę skoroszytu.
+"""
+
+from __future__ import annotations
+
+import io
+
+from django.contrib.auth.models import User
+
+from rejs.benchmarks import dane_tymczasowe, zmierz
+from rejs.benchmarks.dane import utworz_rejs
+from rejs.reports.builder import RaportRejsuBuilder
+from rejs.reports.excel import ExcelExporter
+
+BAZA_DANYCH = True
+
+ROZMIARY = (1000, 10_000)
+
+
+def _excel(dane: tuple) -> None:
+	zaloga, wachty, wplaty, dane_wrazliwe = dane
+	exporter = ExcelExporter("raport.xlsx")
+	exporter.add_zaloga(zaloga)
+	exporter.add_wachty(wachty)
+	exporter.add_wplaty(wplaty)
+	exporter.add_dane_wrazliwe(dane_wrazliwe)
+	exporter.wb.save(io.BytesIO())
+
+
+def uruchom(rozmiar: int | None = None) -> list[dict]:
+	# Superużytkownik ma uprawnienie eksportu danych wrażliwych bez zapisu w bazie
+	uzytkownik = User(username="benchmark", is_superuser=True, is_active=True)
+	wyniki = []
+	for liczba in (rozmiar,) if rozmiar else ROZMIARY:
+		with dane_tymczasowe():
+			builder = RaportRejsuBuilder(utworz_rejs(liczba), uzytkownik)
+			dane = []
+
+			def zbierz():
+				dane[:] = [
+					builder.build_zaloga(),
+					builder.build_wachty(),
+					builder.build_wplaty(),
+					builder.build_dane_wrazliwe(),
+				]
+
+			czas_danych = zmierz(zbierz)
+			czas_excela = zmierz(lambda: _excel(dane))
+
+		wyniki += [
+			{
+				"nazwa": f"{liczba} uczestnikow: dane",
+				"wartosc": czas_danych * 1000,
+				"jednostka": "ms",
+				"lepiej": "mniej",
+			},
+			{
+				"nazwa": f"{liczba} uczestnikow: excel",
+				"wartosc": czas_excela * 1000,
+				"jednostka": "ms",
+				"lepiej": "mniej",
+			},
+			{
+				"nazwa": f"{liczba} uczestnikow: przepustowosc",
+				"wartosc": liczba / (czas_danych + czas_excela),
+				"jednostka": "wierszy/s",
+				"lepiej": "wiecej",
+			},
+		]
+	return wyniki
@@ -0,0 +1,47 @@
+"""
+Benchmark sprzątania danych wrażliwych (komenda usun_dane_wrazliwe).
+
+Dla zakończonego rejsu z danymi dodatkowymi uczestników mierzy zniszczenie
+klucza danych, usunięcie danych paczkami i zapis wpisów audytu.
+"""
+
+from __future__ import annotations
+
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+
+from rejs.benchmarks import dane_tymczasowe, zmierz
+from rejs.benchmarks.dane import utworz_rejs
+
+BAZA_DANYCH = True
+
+DOMYSLNA_LICZBA_WIERSZY = 5000
+
+
+def uruchom(rozmiar: int | None = None) -> list[dict]:
+	liczba = rozmiar or DOMYSLNA_LICZBA_WIERSZY
+	with dane_tymczasowe(), tempfile.TemporaryDirectory() as katalog:
+		utworz_rejs(liczba, zakonczony=True)
+		czas = zmierz(
+			lambda: call_command(
+				"usun_dane_wrazliwe", punkt_kontrolny=str(Path(katalog, "postep.json")), stdout=StringIO()
+			)
+		)
+
+	return [
+		{
+			"nazwa": f"usun_dane_wrazliwe: {liczba} wierszy",
+			"wartosc": czas * 1000,
+			"jednostka": "ms",
+			"lepiej": "mniej",
+		},
+		{
+			"nazwa": "usun_dane_wrazliwe: przepustowosc",
+			"wartosc": liczba / czas,
+			"jednostka": "wierszy/s",
+			"lepiej": "wiecej",
+		},
+	]
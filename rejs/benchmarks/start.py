@@ -0,0 +1,106 @@
+"""
+Benchmark startu procesu: czas django.setup() w świeżym interpreterze.
+
+Każdy pomiar uruchamia osobny proces Pythona z bieżącymi ustawieniami - moduły
+załadowane przez bieżący proces nie zaniżają wyniku (zimny start, tak jak
+proces roboczy gunicorna albo komenda manage.py). Moduł udostępnia też koszty
+importów z "-X importtime" dla komendy czas_startu.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+
+# Moduły, które nie mogą być ładowane przy starcie - importowane dopiero przy użyciu
+LENIWE_MODULY = ("openpyxl", "cryptography")
+
+POWTORZENIA = 3
+
+_KOD_POMIARU = f"""
+import json, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+czas = time.perf_counter() - start
+print(json.dumps({{
+	"czas_ms": czas * 1000,
+	"moduly": len(sys.modules),
+	"leniwe": [m for m in {LENIWE_MODULY!r} if m in sys.modules],
+}}))
+"""
+
+# Znacznik oddziela importy startu interpretera (site, encodings) od importów setup()
+_ZNACZNIK = "-- django.setup() --"
+_KOD_IMPORTOW = f"import sys; print({_ZNACZNIK!r}, file=sys.stderr); import django; django.setup()"
+
+
+def _uruchom_proces(kod: str, *opcje: str) -> subprocess.CompletedProcess:
+	srodowisko = {**os.environ, "DJANGO_SETTINGS_MODULE": settings.SETTINGS_MODULE}
+	srodowisko.pop("PYTHONPROFILEIMPORTTIME", None)
+	return subprocess.run(
+		[sys.executable, *opcje, "-c", kod],
+		cwd=settings.BASE_DIR,
+		env=srodowisko,
+		capture_output=True,
+		text=True,
+		check=True,
+	)
+
+
+def zmierz_start() -> dict:
+	"""
+	Jeden zimny start: czas django.setup() w ms, liczba załadowanych modułów
+	i moduły z LENIWE_MODULY załadowane mimo to.
+	"""
+	return json.loads(_uruchom_proces(_KOD_POMIARU).stdout.strip().splitlines()[-1])
+
+
+def koszty_importow() -> list[dict]:
+	"""
+	Importy wykonane przez django.setup() według "-X importtime".
+
+	Returns:
+		Lista słowników {"modul", "wlasny_ms", "skumulowany_ms", "poziom"} w kolejności
+		zakończenia importu; poziom 0 to importy wywołane bezpośrednio przez setup()
+		(ich czasy skumulowane sumują się do całego czasu importów)
+	"""
+	importy = []
+	_, _, wyjscie = _uruchom_proces(_KOD_IMPORTOW, "-X", "importtime").stderr.partition(_ZNACZNIK)
+	for linia in wyjscie.splitlines():
+		if not linia.startswith("import time:"):
+			continue
+		wlasny, skumulowany, nazwa = linia.removeprefix("import time:").split("|")
+		importy.append(
+			{
+				"modul": nazwa.strip(),
+				"wlasny_ms": int(wlasny) / 1000,
+				"skumulowany_ms": int(skumulowany) / 1000,
+				# Każdy poziom zagnieżdżenia to dwie spacje wcięcia po spacji oddzielającej
+				"poziom": (len(nazwa) - len(nazwa.lstrip()) - 1) // 2,
+			}
+		)
+	return importy
+
+
+def uruchom(rozmiar: int | None = None) -> list[dict]:
+	pomiary = [zmierz_start() for _ in range(rozmiar or POWTORZENIA)]
+	return [
+		{
+			"nazwa": "django.setup(): zimny start",
+			"wartosc": statistics.median(p["czas_ms"] for p in pomiary),
+			"jednostka": "ms",
+			"lepiej": "mniej",
+		},
+		{
+			"nazwa": "django.setup(): zaladowane moduly",
+			"wartosc": pomiary[-1]["moduly"],
+			"jednostka": "modulow",
+			"lepiej": "mniej",
+		},
+	]
@@ -0,0 +1,117 @@
+"""
+Benchmark renderowania szablonów: silnik Django a Jinja2 (rejs.szablony).
+
+Każdy szablon stron publicznych i emaili renderowany jest obydwoma silnikami
+z tym samym kontekstem. Dane pobierane są z wyprzedzeniem (select_related,
+prefetch_related, z_finansami), więc pomiar obejmuje samo renderowanie, nie
+zapytania. Rozmiar to liczba elementów list: rejsów na stronie głównej,
+członków wachty i ogłoszeń w szczegółach zgłoszenia.
+
+Bez zainstalowanego pakietu jinja2 mierzony jest tylko silnik Django.
+"""
+
+from __future__ import annotations
+
+from datetime import timedelta
+from importlib.util import find_spec
+
+from django.template import engines
+from django.test import RequestFactory
+
+from rejs.benchmarks import dane_tymczasowe, zmierz
+from rejs.benchmarks.dane import NAZWY_WACHT, utworz_rejs
+from rejs.forms import Dane_DodatkoweForm, ZgloszenieForm
+from rejs.models import Ogloszenie, Rejs, Wplata, Zgloszenie
+
+BAZA_DANYCH = True
+
+DOMYSLNY_ROZMIAR = 50
+POWTORZENIA = 20
+
+EMAILE = (
+	"zgloszenie_utworzone",
+	"zgloszenie_potwierdzone",
+	"zgloszenie_o",
+	"wachta_added",
+	"wplata",
+	"wplata_zwrot",
+	"lista_rezerwowa",
+	"lista_rezerwowa_przyjecie",
+	"zgloszenie_nie_zarejestrowane",
+)
+
+
+def _konteksty(rozmiar: int) -> dict[str, dict]:
+	rejs = utworz_rejs(rozmiar * len(NAZWY_WACHT), z_danymi=False)
+	Rejs.objects.bulk_create(
+		[
+			Rejs(
+				nazwa=f"Rejs {i}",
+				od=rejs.od + timedelta(days=i),
+				do=rejs.do + timedelta(days=i),
+				start="Gdynia",
+				koniec="Sztokholm",
+				opis="Opis rejsu\nw kilku liniach",
+			)
+			for i in range(rozmiar - 1)
+		]
+	)
+	Ogloszenie.objects.bulk_create(
+		[Ogloszenie(rejs=rejs, tytul=f"Ogłoszenie {i}", text="Treść\nogłoszenia") for i in range(rozmiar)]
+	)
+	zgl = (
+		Zgloszenie.objects.z_finansami()
+		.select_related("rejs", "wachta")
+		.prefetch_related("wachta__czlonkowie", "rejs__ogloszenia")
+		.filter(rejs=rejs)
+		.first()
+	)
+	link = zgl.get_absolute_url()
+	wplata = Wplata.objects.filter(zgloszenie=zgl).first()
+
+	konteksty = {
+		"rejs/index.html": {"rejsy": list(Rejs.objects.order_by("od"))},
+		"rejs/zgloszenie_details.html": {"zgloszenie": zgl},
+		"rejs/zgloszenie_form.html": {"form": ZgloszenieForm(initial={"rejs": rejs}), "rejs": rejs},
+		"rejs/dane_dodatkowe_form.html": {"form": Dane_DodatkoweForm(), "zgloszenie": zgl, "rejs": rejs},
+		"rejs/rodo_info.html": {},
+	}
+	kontekst_emaila = {"zgl": zgl, "rejs": rejs, "wachta": zgl.wachta, "wplata": wplata, "link": link}
+	for email in EMAILE:
+		for rozszerzenie in ("html", "txt"):
+			konteksty[f"emails/{email}.{rozszerzenie}"] = kontekst_emaila
+	ogloszenie = rejs.ogloszenia.first()
+	for rozszerzenie in ("html", "txt"):
+		konteksty[f"emails/ogloszenie.{rozszerzenie}"] = {**kontekst_emaila, "ogloszenie": ogloszenie}
+	return konteksty
+
+
+def _silniki() -> dict:
+	silniki = {"django": engines["django"]}
+	if find_spec("jinja2") is not None:
+		from rejs.szablony import silnik
+
+		silniki["jinja2"] = silnik(["rejs", "emails"], nazwa="jinja2-benchmark")
+	return silniki
+
+
+def uruchom(rozmiar: int | None = None) -> list[dict]:
+	rozmiar = rozmiar or DOMYSLNY_ROZMIAR
+	request = RequestFactory().get("/")
+	wyniki = []
+	with dane_tymczasowe():
+		konteksty = _konteksty(rozmiar)
+		silniki = _silniki()
+		for nazwa, kontekst in konteksty.items():
+			for nazwa_silnika, silnik in silniki.items():
+				szablon = silnik.get_template(nazwa)
+				szablon.render(kontekst, request)  # rozgrzewka (kompilacja, pamięć podręczna)
+				wyniki.append(
+					{
+						"nazwa": f"{nazwa}: {nazwa_silnika}",
+						"wartosc": zmierz(lambda: szablon.render(kontekst, request), POWTORZENIA) * 1000,
+						"jednostka": "ms",
+						"lepiej": "mniej",
+					}
+				)
+	return wyniki
@@ -0,0 +1,73 @@
+"""
+Benchmark szyfrowania pól EncryptedTextField.
+
+Dla każdego algorytmu (Fernet, AES-GCM) mierzy przepustowość szyfrowania
+i odszyfrowania typowego wiersza Dane_Dodatkowe (PESEL, typ i numer
+dokumentu) oraz rozmiar szyfrogramów w przeliczeniu na 10 tys. wierszy.
+Nie korzysta z bazy danych - mierzy wyłącznie koszt kryptografii.
+"""
+
+from __future__ import annotations
+
+import time
+
+from cryptography.fernet import Fernet
+
+from rejs.kryptografia import ALGORYTMY, Szyfr, odszyfruj_paczke
+
+DOMYSLNA_LICZBA_WIERSZY = 10_000
+
+# Wartości o długościach typowych dla danych wrażliwych uczestnika
+PRZYKLADOWY_WIERSZ = ("90021401380", "dowod-osobisty", "ABC123456")
+
+
+def _zmierz(funkcja) -> float:
+	start = time.perf_counter()
+	funkcja()
+	return time.perf_counter() - start
+
+
+def uruchom(rozmiar: int | None = None) -> list[dict]:
+	liczba_wierszy = rozmiar or DOMYSLNA_LICZBA_WIERSZY
+	jawne = [wartosc for _ in range(liczba_wierszy) for wartosc in PRZYKLADOWY_WIERSZ]
+	klucz = Fernet.generate_key().decode()
+	rozmiar_jawny = sum(len(w) for w in PRZYKLADOWY_WIERSZ)
+
+	wyniki = []
+	for nazwa, algorytm in ALGORYTMY.items():
+		# Klucz danych rejsu - koperta z identyfikatorem, jak dla nowych danych uczestników
+		szyfr = Szyfr([klucz], algorytm)
+		klucze_danych = {1: szyfr}
+		szyfrogramy = []
+
+		czas_szyfrowania = _zmierz(lambda: szyfrogramy.extend(szyfr.szyfruj(w, 1) for w in jawne))
+		czas_odszyfrowania = _zmierz(lambda: odszyfruj_paczke(szyfr, szyfrogramy, klucze_danych))
+
+		rozmiar_wiersza = sum(len(s) for s in szyfrogramy) / liczba_wierszy
+		wyniki += [
+			{
+				"nazwa": f"{nazwa}: szyfrowanie",
+				"wartosc": liczba_wierszy / czas_szyfrowania,
+				"jednostka": "wierszy/s",
+				"lepiej": "wiecej",
+			},
+			{
+				"nazwa": f"{nazwa}: odszyfrowanie",
+				"wartosc": liczba_wierszy / czas_odszyfrowania,
+				"jednostka": "wierszy/s",
+				"lepiej": "wiecej",
+			},
+			{
+				"nazwa": f"{nazwa}: rozmiar na 10 tys. wierszy",
+				"wartosc": rozmiar_wiersza * 10_000 / 1024,
+				"jednostka": "KiB",
+				"lepiej": "mniej",
+			},
+			{
+				"nazwa": f"{nazwa}: narzut rozmiaru",
+				"wartosc": rozmiar_wiersza / rozmiar_jawny,
+				"jednostka": "x",
+				"lepiej": "mniej",
+			},
+		]
+	return wyniki
@@ -0,0 +1,99 @@
+"""
+Benchmark automatycznego przydziału do wacht (SerwisWacht.zaplanuj_przydzial).
+
+Generuje syntetyczną załogę (domyślnie 500 osób: ok. 15% niewidomych,
+25% słabo widzących, po jednym oficerze na wachtę) i mierzy czas wyliczenia
+przydziału oraz jego jakość - największą różnicę liczebności grupy wzroku
+między wachtami. Samo wyliczenie nie korzysta z bazy danych - zapis to jeden
+UPDATE niezależnie od liczby osób.
+
+Osobno mierzy SerwisWacht.aktualizuj_czlonkow_wachty na bazie danych: wymianę
+połowy składu wachty (odpięcie dotychczasowych i przypięcie nowych członków).
+"""
+
+from __future__ import annotations
+
+import random
+import time
+from collections import Counter
+
+from rejs.benchmarks import dane_tymczasowe, zmierz
+from rejs.benchmarks.dane import utworz_rejs
+from rejs.serwisy.wachty import ROLA_OFICER, SerwisWacht
+
+BAZA_DANYCH = True
+
+DOMYSLNA_LICZBA_OSOB = 500
+LICZBA_WACHT = 4
+POWTORZENIA = 20
+
+
+def _zaloga(liczba_osob: int) -> list[tuple[int, str, str]]:
+	losowanie = random.Random(0)
+	zaloga = [(pk, "WIDZI", ROLA_OFICER) for pk in range(LICZBA_WACHT)]
+	for pk in range(LICZBA_WACHT, liczba_osob):
+		wzrok = losowanie.choices(("NIEWIDOMY", "SLABO-WIDZACY", "WIDZI"), weights=(15, 25, 60))[0]
+		zaloga.append((pk, wzrok, "ZALOGANT"))
+	losowanie.shuffle(zaloga)
+	return zaloga
+
+
+def uruchom(rozmiar: int | None = None) -> list[dict]:
+	liczba_osob = rozmiar or DOMYSLNA_LICZBA_OSOB
+	serwis = SerwisWacht()
+	wachty = list(range(1, LICZBA_WACHT + 1))
+	kandydaci = _zaloga(liczba_osob)
+
+	start = time.perf_counter()
+	for _ in range(POWTORZENIA):
+		przydzial = serwis.zaplanuj_przydzial(wachty, kandydaci)
+	czas = (time.perf_counter() - start) / POWTORZENIA
+
+	grupy = Counter((przydzial[pk], wzrok if rola != ROLA_OFICER else rola) for pk, wzrok, rola in kandydaci)
+	rozrzut = max(
+		max(grupy[w, grupa] for w in wachty) - min(grupy[w, grupa] for w in wachty)
+		for grupa in {grupa for _, grupa in grupy}
+	)
+	liczebnosc = Counter(przydzial.values())
+
+	with dane_tymczasowe():
+		rejs = utworz_rejs(liczba_osob, z_wachtami=False, z_danymi=False)
+		wachta = rejs.wachty.first()
+		zaloga = list(rejs.zgloszenia.order_by("pk"))
+		polowa = len(zaloga) // 2
+		serwis.aktualizuj_czlonkow_wachty(wachta, zaloga[:polowa])
+		# Druga połowa zastępuje pierwszą: odpięcie i przypięcie po połowie załogi
+		czas_aktualizacji = zmierz(lambda: serwis.aktualizuj_czlonkow_wachty(wachta, zaloga[polowa:]))
+
+	return [
+		{
+			"nazwa": f"przydzial: {liczba_osob} osob, {LICZBA_WACHT} wachty",
+			"wartosc": czas * 1000,
+			"jednostka": "ms",
+			"lepiej": "mniej",
+		},
+		{
+			"nazwa": "przydzial: przepustowosc",
+			"wartosc": liczba_osob / czas,
+			"jednostka": "osob/s",
+			"lepiej": "wiecej",
+		},
+		{
+			"nazwa": "przydzial: rozrzut grupy wzroku",
+			"wartosc": rozrzut,
+			"jednostka": "osob",
+			"lepiej": "mniej",
+		},
+		{
+			"nazwa": "przydzial: rozrzut liczebnosci wacht",
+			"wartosc": max(liczebnosc.values()) - min(liczebnosc.values()),
+			"jednostka": "osob",
+			"lepiej": "mniej",
+		},
+		{
+			"nazwa": f"aktualizuj_czlonkow_wachty: wymiana {polowa} osob",
+			"wartosc": czas_aktualizacji * 1000,
+			"jednostka": "ms",
+			"lepiej": "mniej",
+		},
+	]
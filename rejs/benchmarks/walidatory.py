@@ -0,0 +1,50 @@
+"""
+Benchmark walidatora numeru PESEL (validate_pesel).
+
+Mierzy przepustowość dla poprawnych numerów i dla mieszanki z błędną sumą
+kontrolną (wyjątek ValidationError). Nie korzysta z bazy danych.
+"""
+
+from __future__ import annotations
+
+import random
+
+from django.core.exceptions import ValidationError
+
+from rejs.benchmarks import zmierz
+from rejs.benchmarks.dane import pesel
+from rejs.walidatory.pesel import validate_pesel
+
+DOMYSLNA_LICZBA_NUMEROW = 20_000
+POWTORZENIA = 5
+
+
+def _waliduj(numery: list[str]) -> None:
+	for numer in numery:
+		try:
+			validate_pesel(numer)
+		except ValidationError:
+			pass
+
+
+def uruchom(rozmiar: int | None = None) -> list[dict]:
+	liczba = rozmiar or DOMYSLNA_LICZBA_NUMEROW
+	losowanie = random.Random(0)
+	poprawne = [pesel(losowanie) for _ in range(liczba)]
+	# Co druga pozycja z przekłamaną ostatnią cyfrą - ścieżka z wyjątkiem
+	mieszane = [n if i % 2 else n[:-1] + str((int(n[-1]) + 1) % 10) for i, n in enumerate(poprawne)]
+
+	return [
+		{
+			"nazwa": "validate_pesel: poprawne",
+			"wartosc": liczba / zmierz(lambda: _waliduj(poprawne), POWTORZENIA),
+			"jednostka": "numerow/s",
+			"lepiej": "wiecej",
+		},
+		{
+			"nazwa": "validate_pesel: 50% blednych",
+			"wartosc": liczba / zmierz(lambda: _waliduj(mieszane), POWTORZENIA),
+			"jednostka": "numerow/s",
+			"lepiej": "wiecej",
+		},
+	]
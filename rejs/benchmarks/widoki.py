@@ -0,0 +1,90 @@
+"""
+Benchmark widoków publicznych przez klienta testowego Django.
+
+Mierzy średni i 95. percentyl czasu odpowiedzi strony głównej, szczegółów
+zgłoszenia (z danymi dodatkowymi) i wysłania formularza zgłoszenia (z emailem
+potwierdzającym do skrzynki w pamięci) dla rejsu z 200 uczestnikami.
+"""
+
+from __future__ import annotations
+
+import statistics
+import time
+
+from django.conf import settings
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from rejs.benchmarks import dane_tymczasowe, skrzynka_tymczasowa
+from rejs.benchmarks.dane import utworz_rejs
+
+BAZA_DANYCH = True
+
+DOMYSLNA_LICZBA_ZADAN = 100
+LICZBA_UCZESTNIKOW = 200
+
+
+def _czasy(funkcja, liczba: int) -> list[float]:
+	czasy = []
+	for numer in range(liczba):
+		start = time.perf_counter()
+		odpowiedz = funkcja(numer)
+		czasy.append(time.perf_counter() - start)
+		if odpowiedz.status_code >= 400:
+			raise RuntimeError(f"Nieoczekiwany status odpowiedzi: {odpowiedz.status_code}")
+	return czasy
+
+
+def uruchom(rozmiar: int | None = None) -> list[dict]:
+	liczba = rozmiar or DOMYSLNA_LICZBA_ZADAN
+	with (
+		dane_tymczasowe(),
+		skrzynka_tymczasowa(),
+		override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]),
+	):
+		rejs = utworz_rejs(LICZBA_UCZESTNIKOW)
+		szczegoly = rejs.zgloszenia.first().get_absolute_url()
+		formularz = reverse("zgloszenie_utworz", kwargs={"rejs_id": rejs.pk})
+		klient = Client()
+
+		def zglos(numer):
+			return klient.post(
+				formularz,
+				{
+					"imie": "Nowy",
+					"nazwisko": f"Uczestnik{numer}",
+					"email": f"nowy{numer}@example.com",
+					"telefon": "500100200",
+					"data_urodzenia": "1990-01-01",
+					"adres": "ul. Morska 1",
+					"kod_pocztowy": "80-001",
+					"miejscowosc": "Gdynia",
+					"wzrok": "WIDZI",
+					"obecnosc": "tak",
+					"rodo": "on",
+				},
+			)
+
+		pomiary = {
+			"index": _czasy(lambda _: klient.get(reverse("index")), liczba),
+			"zgloszenie_details": _czasy(lambda _: klient.get(szczegoly), liczba),
+			"zgloszenie_utworz POST": _czasy(zglos, liczba),
+		}
+
+	wyniki = []
+	for widok, czasy in pomiary.items():
+		wyniki += [
+			{
+				"nazwa": f"{widok}: srednio",
+				"wartosc": statistics.mean(czasy) * 1000,
+				"jednostka": "ms",
+				"lepiej": "mniej",
+			},
+			{
+				"nazwa": f"{widok}: p95",
+				"wartosc": statistics.quantiles(czasy, n=20)[-1] * 1000,
+				"jednostka": "ms",
+				"lepiej": "mniej",
+			},
+		]
+	return wyniki
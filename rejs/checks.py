@@ -0,0 +1,21 @@
+"""
+Sprawdzenia konfiguracji aplikacji rejs (python manage.py check, start serwera i testów).
+"""
+
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+
+@register(Tags.security)
+def klucz_indeksu_slepego(app_configs, **kwargs):
+	"""Indeks PESEL wymaga własnego klucza - bez niego HMAC liczony byłby kluczem znanym z innego miejsca."""
+	if settings.FIELD_BLIND_INDEX_KEY:
+		return []
+	return [
+		Error(
+			"Brak klucza indeksu wyszukiwania PESEL (DJANGO_BLIND_INDEX_KEY).",
+			hint='Wygeneruj klucz: python -c "import secrets; print(secrets.token_urlsafe(32))" i ustaw go w .env. '
+			'Indeksy zbudowane wcześniej kluczem SECRET_KEY przelicz: "python manage.py indeksuj_pesel --od-nowa".',
+			id="rejs.E001",
+		)
+	]
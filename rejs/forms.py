@@ -1,3 +1,5 @@
+import uuid
+
 from django import forms
 
 from .models import Dane_Dodatkowe, Zgloszenie
@@ -21,6 +23,10 @@ class AccessibleFormMixin:
 
 
 class ZgloszenieForm(AccessibleFormMixin, forms.ModelForm):
+	# Nowy klucz przy każdym wyświetleniu formularza; ponowne wysłanie tego samego formularza
+	# zwraca zgłoszenie zapisane z tym kluczem (SerwisRejestracji.token_po_kluczu)
+	klucz_idempotencji = forms.CharField(required=False, initial=uuid.uuid4, widget=forms.HiddenInput)
+
 	class Meta:
 		model = Zgloszenie
 		fields = [
@@ -151,13 +157,29 @@ class ZgloszenieForm(AccessibleFormMixin, forms.ModelForm):
 				imie__iexact=imie,
 				nazwisko__iexact=nazwisko,
 				email__iexact=email,
-			).exists()
+			)
+			if cleaned.get("klucz_idempotencji"):
+				# Zgłoszenie z tym samym kluczem to równoległe wysłanie tego formularza, nie duplikat -
+				# zapis zgłosi naruszenie unikalności klucza i widok zwróci zapisane zgłoszenie
+				istnieje = istnieje.exclude(klucz_idempotencji=cleaned["klucz_idempotencji"])
+			istnieje = istnieje.exists()
 
 			if istnieje:
 				raise forms.ValidationError("Na ten rejs istnieje już zgłoszenie dla tej osoby.")
 
 		return cleaned
 
+	def clean_klucz_idempotencji(self):
+		"""Niepoprawny klucz (np. zmieniony ręcznie) jest pomijany - zgłoszenie zapisuje się bez niego."""
+		try:
+			return uuid.UUID(self.cleaned_data.get("klucz_idempotencji", ""))
+		except ValueError:
+			return None
+
+	def save(self, commit=True):
+		self.instance.klucz_idempotencji = self.cleaned_data.get("klucz_idempotencji")
+		return super().save(commit)
+
 	def clean_telefon(self):
 		telefon = self.cleaned_data.get("telefon", "")
 		# Usuń wszystkie znaki oprócz cyfr
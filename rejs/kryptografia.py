@@ -0,0 +1,203 @@
+"""
+Operacje kryptograficzne wykonywane poza modelami.
+
+Moduł celowo nie importuje Django - jest ładowany przez procesy robocze
+puli odszyfrowywania, które nie inicjalizują aplikacji.
+
+Format szyfrogramów zapisywanych w bazie (koperta z wersją algorytmu):
+    gAAAAA...           token Fernet zaszyfrowany kluczem głównym (format historyczny)
+    F<id>:gAAAAA...     token Fernet zaszyfrowany kluczem danych rejsu <id>
+    G:<base64>          AES-256-GCM, klucz główny
+    G<id>:<base64>      AES-256-GCM, klucz danych rejsu <id>
+
+Pierwszy znak koperty określa algorytm, liczba przed dwukropkiem - klucz danych
+(brak liczby oznacza klucz główny). Tokeny Fernet zaczynają się od "g", więc
+nie kolidują z prefiksami. Odczyt obsługuje wszystkie formaty niezależnie od
+algorytmu wybranego do szyfrowania.
+
+Dane AES-GCM to base64url (bez dopełnienia) z nonce (12 B), szyfrogramu
+i znacznika uwierzytelniającego (16 B) - prawie dwa razy krócej niż Fernet
+dla krótkich wartości (PESEL, numer dokumentu).
+
+Pakiet cryptography ładowany jest przy tworzeniu pierwszego szyfru, a nie przy
+imporcie modułu - procesy i komendy, które nie szyfrują, nie płacą za niego
+przy starcie.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+	from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+ALGORYTM_FERNET = "F"
+ALGORYTM_AES_GCM = "G"
+
+# Nazwy algorytmów w ustawieniu FIELD_ENCRYPTION_ALGORITHM
+ALGORYTMY = {"fernet": ALGORYTM_FERNET, "aes-gcm": ALGORYTM_AES_GCM}
+
+DLUGOSC_NONCE = 12
+
+_szyfr_procesu: Szyfr | None = None
+_klucze_danych_procesu: dict[int, Szyfr | None] = {}
+
+
+def _klucz_aes(klucz: str) -> AESGCM:
+	"""Wyprowadza klucz AES-256 z klucza Fernet (HKDF) - ten sam materiał nie jest używany przez dwa algorytmy."""
+	from cryptography.hazmat.primitives import hashes
+	from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+	from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+	material = base64.urlsafe_b64decode(klucz.encode())
+	return AESGCM(HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=b"rejs.aes-gcm").derive(material))
+
+
+def _b64(dane: bytes) -> str:
+	return base64.urlsafe_b64encode(dane).rstrip(b"=").decode()
+
+
+def _z_b64(dane: str) -> bytes:
+	return base64.urlsafe_b64decode(dane + "=" * (-len(dane) % 4))
+
+
+class Szyfr:
+	"""
+	Uporządkowany zestaw kluczy z wybranym algorytmem szyfrowania.
+
+	Pierwszy klucz szyfruje, wszystkie służą do odszyfrowania - dzięki temu
+	dane zaszyfrowane starym kluczem pozostają czytelne aż do rotacji.
+	"""
+
+	def __init__(self, klucze: list[str], algorytm: str = ALGORYTM_FERNET):
+		if algorytm not in ALGORYTMY.values():
+			raise ValueError(f"Nieznany algorytm szyfrowania: {algorytm}")
+		from cryptography.fernet import Fernet, MultiFernet
+
+		self.algorytm = algorytm
+		self.fernet = MultiFernet([Fernet(k.encode()) for k in klucze])
+		self._aes = [_klucz_aes(k) for k in klucze]
+
+	def szyfruj(self, tekst: str, klucz_id: int | None = None) -> str:
+		"""Szyfruje tekst pierwszym kluczem i zwraca gotową kopertę."""
+		if self.algorytm == ALGORYTM_AES_GCM:
+			nonce = os.urandom(DLUGOSC_NONCE)
+			dane = _b64(nonce + self._aes[0].encrypt(nonce, tekst.encode(), None))
+		else:
+			dane = self.fernet.encrypt(tekst.encode()).decode()
+		return zapakuj(self.algorytm, klucz_id, dane)
+
+	def odszyfruj(self, algorytm: str, dane: str) -> str:
+		"""Odszyfrowuje dane koperty (bez prefiksu), próbując kolejnych kluczy."""
+		from cryptography.exceptions import InvalidTag
+		from cryptography.fernet import InvalidToken
+
+		if algorytm != ALGORYTM_AES_GCM:
+			return self.fernet.decrypt(dane.encode()).decode()
+		try:
+			surowe = _z_b64(dane)
+		except (binascii.Error, ValueError) as e:
+			raise InvalidToken from e
+		nonce, szyfrogram = surowe[:DLUGOSC_NONCE], surowe[DLUGOSC_NONCE:]
+		for aes in self._aes:
+			try:
+				return aes.decrypt(nonce, szyfrogram, None).decode()
+			except InvalidTag:
+				continue
+		raise InvalidToken
+
+
+def zapakuj(algorytm: str, klucz_id: int | None, dane: str) -> str:
+	"""Oznacza dane algorytmem i identyfikatorem klucza, którym zostały zaszyfrowane."""
+	if algorytm == ALGORYTM_FERNET and klucz_id is None:
+		# Tokeny Fernet klucza głównego zapisujemy bez prefiksu - zgodnie z danymi historycznymi
+		return dane
+	return f"{algorytm}{'' if klucz_id is None else klucz_id}:{dane}"
+
+
+def rozpakuj(wartosc: str) -> tuple[str, int | None, str]:
+	"""
+	Rozdziela kopertę na algorytm, identyfikator klucza danych i dane.
+
+	Returns:
+		Krotka (algorytm, klucz_id, dane); klucz_id jest None dla klucza głównego
+	"""
+	if wartosc[:1] in (ALGORYTM_FERNET, ALGORYTM_AES_GCM):
+		klucz_id, _, dane = wartosc[1:].partition(":")
+		return wartosc[0], int(klucz_id) if klucz_id else None, dane
+	return ALGORYTM_FERNET, None, wartosc
+
+
+def odszyfruj(
+	szyfr: Szyfr,
+	wartosc: str,
+	klucze_danych: dict[int, Szyfr | None],
+) -> str | None:
+	"""
+	Odszyfrowuje pojedynczy szyfrogram kluczem głównym lub kluczem danych rejsu.
+
+	Zwraca None, gdy klucz danych rejsu został zniszczony (crypto-shredding).
+	"""
+	algorytm, klucz_id, dane = rozpakuj(wartosc)
+	if klucz_id is not None:
+		szyfr = klucze_danych.get(klucz_id)
+		if szyfr is None:
+			return None
+	return szyfr.odszyfruj(algorytm, dane)
+
+
+def _inicjalizuj_proces(klucze: list[str], klucze_danych: dict[int, str | None]) -> None:
+	"""Tworzy szyfry w procesie roboczym (raz na proces, nie na paczkę)."""
+	global _szyfr_procesu
+	_szyfr_procesu = Szyfr(klucze)
+	_klucze_danych_procesu.update({k: Szyfr([v]) if v else None for k, v in klucze_danych.items()})
+
+
+def _odszyfruj_paczke_w_procesie(tokeny: list[str | None]) -> list[str | None]:
+	return odszyfruj_paczke(_szyfr_procesu, tokeny, _klucze_danych_procesu)
+
+
+def odszyfruj_paczke(
+	szyfr: Szyfr,
+	tokeny: list[str | None],
+	klucze_danych: dict[int, Szyfr | None] | None = None,
+) -> list[str | None]:
+	"""Odszyfrowuje listę szyfrogramów, przepuszczając None."""
+	klucze_danych = klucze_danych or {}
+	return [None if t is None else odszyfruj(szyfr, t, klucze_danych) for t in tokeny]
+
+
+def odszyfruj_rownolegle(
+	tokeny: list[str | None],
+	klucze: list[str],
+	procesy: int,
+	rozmiar_paczki: int,
+	klucze_danych: dict[int, str | None] | None = None,
+) -> list[str | None]:
+	"""
+	Odszyfrowuje tokeny w puli procesów, zachowując kolejność.
+
+	Używa kontekstu "spawn" - fork procesu z otwartymi połączeniami DB
+	i wątkami serwera nie jest bezpieczny. Klucze danych rejsów przekazywane
+	są jawnie, bo procesy robocze nie mają dostępu do bazy.
+	"""
+	paczki = [tokeny[i : i + rozmiar_paczki] for i in range(0, len(tokeny), rozmiar_paczki)]
+	with ProcessPoolExecutor(
+		max_workers=min(procesy, len(paczki)),
+		mp_context=multiprocessing.get_context("spawn"),
+		initializer=_inicjalizuj_proces,
+		initargs=(klucze, klucze_danych or {}),
+	) as pula:
+		wyniki = list(pula.map(_odszyfruj_paczke_w_procesie, paczki))
+	return [wartosc for paczka in wyniki for wartosc in paczka]
+
+
+def odcisk_klucza(klucz: str) -> str:
+	"""Krótki, nieodwracalny identyfikator klucza (do logów i punktów kontrolnych)."""
+	return hashlib.sha256(klucz.encode()).hexdigest()[:8]
@@ -5,6 +5,9 @@ from django.core.mail import EmailMultiAlternatives, get_connection
 from django.template import TemplateDoesNotExist
 from django.template.loader import render_to_string
 
+from .metryki import emaile_bledy, emaile_wyslane
+from .middleware import mierz
+
 logger = logging.getLogger(__name__)
 
 FROM = getattr(settings, "DEFAULT_FROM_EMAIL", "noreply@zobaczyc.morze")
@@ -44,9 +47,12 @@ def send_simple_mail(subject, to_mail, template_base, context):
 		email.attach_alternative(html_content, "text/html")
 
 	try:
-		email.send(fail_silently=False)
+		with mierz("email"):
+			email.send(fail_silently=False)
+		emaile_wyslane.inc()
 		logger.info("Email wysłany do %s: %s", to_mail, subject)
 	except Exception:
+		emaile_bledy.inc()
 		logger.exception("Błąd wysyłania emaila do %s", to_mail)
 		raise
 
@@ -79,12 +85,15 @@ def send_mass_mail_html(messages):
 				)
 				if html_content:
 					email.attach_alternative(html_content, "text/html")
-				email.send()
+				with mierz("email"):
+					email.send()
 				sent_count += 1
+				emaile_wyslane.inc()
 				logger.debug("Email wysłany do %s: %s", recipient_list, subject)
 			except Exception as e:
 				logger.error("Błąd wysyłania do %s: %s", recipient_list, e)
 				failed_emails.append((recipient_list, str(e)))
+				emaile_bledy.inc()
 	finally:
 		connection.close()
 
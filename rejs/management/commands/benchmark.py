@@ -0,0 +1,132 @@
+"""
+Komenda Django uruchamiajaca benchmarki wydajnosci (pakiet rejs.benchmarks).
+
+Bez podanych zestawow uruchamia wszystkie. Zestawy korzystajace z bazy danych
+dzialaja na tymczasowej bazie testowej (tworzonej jak przez manage.py test),
+a z --biezaca-baza - na skonfigurowanej bazie, w transakcji wycofywanej po
+pomiarze.
+
+Wynik mozna zapisac jako JSON (--wyjscie) i porownac z zapisanym wczesniej
+wynikiem bazowym (--porownaj): pogorszenie ktoregokolwiek pomiaru o wiecej
+niz --prog procent konczy komende bledem.
+
+Uzycie:
+    python manage.py benchmark
+    python manage.py benchmark szyfrowanie --rozmiar 50000
+    python manage.py benchmark wachty --rozmiar 500
+    python manage.py benchmark --wyjscie benchmark-baza.json
+    python manage.py benchmark --porownaj benchmark-baza.json --prog 15
+    python manage.py benchmark raport widoki --json
+"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from rejs.benchmarks import ZESTAWY, uruchom_zestaw, wymaga_bazy
+
+DOMYSLNY_PROG = 20.0
+
+
+def porownaj(wynik: dict, bazowy: dict, prog: float) -> tuple[float, bool]:
+	"""
+	Zmiana wyniku względem wyniku bazowego w procentach i czy jest regresją.
+
+	Regresja to pogorszenie (wzrost dla "lepiej": "mniej", spadek dla "wiecej")
+	o więcej niż prog procent.
+	"""
+	zmiana = (wynik["wartosc"] - bazowy["wartosc"]) / bazowy["wartosc"] * 100
+	pogorszenie = zmiana if wynik["lepiej"] == "mniej" else -zmiana
+	return zmiana, pogorszenie > prog
+
+
+class Command(BaseCommand):
+	help = "Uruchamia benchmarki wydajnosci, wyswietla wyniki i porownuje je z wynikiem bazowym"
+
+	def add_arguments(self, parser):
+		parser.add_argument(
+			"zestawy",
+			nargs="*",
+			choices=sorted(ZESTAWY),
+			help="Zestawy do uruchomienia (domyslnie wszystkie)",
+		)
+		parser.add_argument(
+			"--rozmiar",
+			type=int,
+			default=None,
+			help="Rozmiar danych testowych (np. liczba wierszy); domyslnie wartosc wlasciwa dla zestawu",
+		)
+		parser.add_argument("--json", action="store_true", help="Wypisz wynik jako JSON zamiast tabeli")
+		parser.add_argument("--wyjscie", default=None, help="Zapisz wynik JSON do pliku (np. jako wynik bazowy)")
+		parser.add_argument("--porownaj", default=None, help="Plik JSON z wynikiem bazowym do porownania")
+		parser.add_argument(
+			"--prog",
+			type=float,
+			default=DOMYSLNY_PROG,
+			help=f"Dopuszczalne pogorszenie wzgledem wyniku bazowego w procentach (domyslnie: {DOMYSLNY_PROG:g})",
+		)
+		parser.add_argument(
+			"--biezaca-baza",
+			action="store_true",
+			help="Uruchom zestawy bazodanowe na skonfigurowanej bazie zamiast tymczasowej bazy testowej",
+		)
+
+	def handle(self, *args, **options):
+		zestawy = options["zestawy"] or list(ZESTAWY)
+		bazowe = {}
+		if options["porownaj"]:
+			try:
+				with open(options["porownaj"], encoding="utf-8") as plik:
+					bazowe = json.load(plik)["wyniki"]
+			except (OSError, ValueError, KeyError) as e:
+				raise CommandError(f"Nie mozna wczytac wyniku bazowego {options['porownaj']}: {e}") from e
+
+		stara_baza = None
+		if not options["biezaca_baza"] and any(wymaga_bazy(z) for z in zestawy):
+			stara_baza = connection.settings_dict["NAME"]
+			connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+		try:
+			wyniki, regresje = self._uruchom(zestawy, bazowe, options)
+		finally:
+			if stara_baza is not None:
+				connection.creation.destroy_test_db(stara_baza, verbosity=0)
+
+		raport = {"data": timezone.now().isoformat(), "rozmiar": options["rozmiar"], "wyniki": wyniki}
+		if options["porownaj"]:
+			raport["regresje"] = regresje
+		tekst = json.dumps(raport, indent=2, ensure_ascii=False)
+		if options["json"]:
+			self.stdout.write(tekst)
+		if options["wyjscie"]:
+			with open(options["wyjscie"], "w", encoding="utf-8") as plik:
+				plik.write(tekst + "\n")
+
+		if regresje:
+			raise CommandError(
+				f"Regresje wydajnosci (prog {options['prog']:g}%): "
+				+ ", ".join(f"{r['zestaw']}/{r['nazwa']} {r['zmiana_proc']:+.1f}%" for r in regresje)
+			)
+
+	def _uruchom(self, zestawy, bazowe, options):
+		wyniki = {}
+		regresje = []
+		for zestaw in zestawy:
+			if not options["json"]:
+				self.stdout.write(self.style.MIGRATE_HEADING(f"\n{zestaw}"))
+			wyniki[zestaw] = uruchom_zestaw(zestaw, rozmiar=options["rozmiar"])
+			bazowe_zestawu = {w["nazwa"]: w for w in bazowe.get(zestaw, [])}
+
+			for wynik in wyniki[zestaw]:
+				linia = f"  {wynik['nazwa']:<45} {wynik['wartosc']:>12.2f} {wynik['jednostka']:<10}"
+				bazowy = bazowe_zestawu.get(wynik["nazwa"])
+				if bazowy and bazowy["wartosc"]:
+					zmiana, regresja = porownaj(wynik, bazowy, options["prog"])
+					linia += f" {zmiana:+7.1f}%"
+					if regresja:
+						regresje.append({"zestaw": zestaw, "nazwa": wynik["nazwa"], "zmiana_proc": round(zmiana, 1)})
+						linia = self.style.ERROR(f"{linia}  REGRESJA")
+				if not options["json"]:
+					self.stdout.write(linia)
+		return wyniki, regresje
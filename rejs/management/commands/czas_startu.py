@@ -0,0 +1,81 @@
+"""
+Komenda Django mierzaca czas zimnego startu procesu (django.setup()).
+
+Uruchamia django.setup() w swiezych procesach Pythona i wyswietla mediane
+czasu, liczbe zaladowanych modulow oraz najdrozsze importy wedlug czasu
+skumulowanego z "-X importtime" (importy wywolane bezposrednio przez setup(),
+z --wszystkie - takze zagniezdzone). Konczy sie bledem, gdy mediana przekracza
+budzet (BUDZET_STARTU_MS) albo przy starcie zaladowano modul, ktory powinien
+byc importowany dopiero przy uzyciu (openpyxl, cryptography).
+
+Uzycie:
+    python manage.py czas_startu
+    python manage.py czas_startu --limit 30 --wszystkie
+    python manage.py czas_startu --budzet 800 --powtorzenia 5
+    python manage.py czas_startu --json
+"""
+
+import json
+import statistics
+import subprocess
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from rejs.benchmarks.start import koszty_importow, zmierz_start
+
+
+class Command(BaseCommand):
+	help = "Mierzy czas zimnego startu (django.setup()) i koszty importow, sprawdza budzet startu"
+
+	def add_arguments(self, parser):
+		parser.add_argument(
+			"--budzet",
+			type=float,
+			default=None,
+			help="Budzet zimnego startu w ms (domyslnie: BUDZET_STARTU_MS z ustawien)",
+		)
+		parser.add_argument(
+			"--powtorzenia", type=int, default=3, help="Liczba mierzonych startow, wynik to mediana (domyslnie: 3)"
+		)
+		parser.add_argument("--limit", type=int, default=15, help="Liczba najdrozszych importow (domyslnie: 15)")
+		parser.add_argument("--wszystkie", action="store_true", help="Uwzglednij importy zagniezdzone")
+		parser.add_argument("--json", action="store_true", help="Wypisz wynik jako JSON zamiast tabeli")
+
+	def handle(self, *args, **options):
+		budzet = options["budzet"] if options["budzet"] is not None else settings.BUDZET_STARTU_MS
+		try:
+			pomiary = [zmierz_start() for _ in range(max(options["powtorzenia"], 1))]
+			importy = koszty_importow()
+		except subprocess.CalledProcessError as e:
+			raise CommandError(f"Start procesu nie powiodl sie:\n{e.stderr}") from e
+
+		if not options["wszystkie"]:
+			importy = [i for i in importy if i["poziom"] == 0]
+		importy = sorted(importy, key=lambda i: i["skumulowany_ms"], reverse=True)[: options["limit"]]
+		wynik = {
+			"czas_ms": round(statistics.median(p["czas_ms"] for p in pomiary), 1),
+			"budzet_ms": budzet,
+			"moduly": pomiary[-1]["moduly"],
+			"leniwe_zaladowane": pomiary[-1]["leniwe"],
+			"importy": importy,
+		}
+
+		if options["json"]:
+			self.stdout.write(json.dumps(wynik, indent=2, ensure_ascii=False))
+		else:
+			self.stdout.write(
+				f"django.setup(): {wynik['czas_ms']:.1f} ms (budzet {budzet:g} ms), modulow: {wynik['moduly']}"
+			)
+			self.stdout.write(self.style.MIGRATE_HEADING(f"\n{'skumulowany ms':>15} {'wlasny ms':>10}  modul"))
+			for i in importy:
+				wciecie = "  " * i["poziom"]
+				self.stdout.write(f"{i['skumulowany_ms']:>15.1f} {i['wlasny_ms']:>10.1f}  {wciecie}{i['modul']}")
+
+		bledy = []
+		if wynik["czas_ms"] > budzet:
+			bledy.append(f"start trwa {wynik['czas_ms']:.1f} ms, budzet {budzet:g} ms")
+		if wynik["leniwe_zaladowane"]:
+			bledy.append(f"przy starcie zaladowano {', '.join(wynik['leniwe_zaladowane'])}")
+		if bledy:
+			raise CommandError("Przekroczono budzet startu: " + "; ".join(bledy))
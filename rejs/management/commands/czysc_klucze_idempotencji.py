@@ -0,0 +1,43 @@
+"""
+Komenda Django czyszczaca przeterminowane klucze idempotencji zgloszen.
+
+Klucz idempotencji (ukryte pole formularza zgloszenia) sprawia, ze ponowne
+wyslanie tego samego formularza przekierowuje do zapisanego zgloszenia zamiast
+tworzyc duplikat. Po IDEMPOTENCJA_WAZNOSC_GODZIN klucz jest usuwany - paczkami,
+kazda w osobnej krotkiej transakcji, zeby nie blokowac rejestracji.
+
+Uzycie:
+    python manage.py czysc_klucze_idempotencji
+    python manage.py czysc_klucze_idempotencji --godziny 48 --rozmiar-paczki 500
+
+Zalecane uruchamianie przez cron/scheduler raz dziennie.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from rejs.serwisy.rejestracja import serwis_rejestracji
+
+
+class Command(BaseCommand):
+	help = "Usuwa klucze idempotencji zgloszen starszych niz IDEMPOTENCJA_WAZNOSC_GODZIN"
+
+	def add_arguments(self, parser):
+		parser.add_argument(
+			"--godziny",
+			type=int,
+			default=None,
+			help="Waznosc klucza w godzinach (domyslnie: IDEMPOTENCJA_WAZNOSC_GODZIN z ustawien)",
+		)
+		parser.add_argument(
+			"--rozmiar-paczki", type=int, default=1000, help="Liczba zgloszen aktualizowanych jednym zapytaniem"
+		)
+
+	def handle(self, *args, **options):
+		godziny = options["godziny"] if options["godziny"] is not None else settings.IDEMPOTENCJA_WAZNOSC_GODZIN
+		wyczyszczone = serwis_rejestracji.wygas_klucze_idempotencji(
+			timedelta(hours=godziny), rozmiar_paczki=options["rozmiar_paczki"]
+		)
+		self.stdout.write(self.style.SUCCESS(f"Usunieto {wyczyszczone} kluczy idempotencji starszych niz {godziny} h"))
@@ -0,0 +1,39 @@
+"""
+Komenda Django generujaca statyczne migawki stron publicznych.
+
+Renderuje strone glowna i informacje RODO dla kazdego motywu i zapisuje je
+(z wariantami .gz i .br) do katalogu MIGAWKI_KATALOG, skad podaje je serwer
+WWW. Po zmianie rejsu migawki odswiezaja sie same (sygnaly); komenda uruchamiana
+codziennie po polnocy usuwa ze strony glownej rejsy, ktore juz sie rozpoczely.
+
+Uzycie:
+    python manage.py generuj_migawki
+    python manage.py generuj_migawki --katalog /var/www/zgloszenia/migawki
+
+Zalecane uruchamianie przez cron/scheduler raz dziennie, tuz po polnocy.
+"""
+
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rejs.serwisy.migawki import serwis_migawek
+
+
+class Command(BaseCommand):
+	help = "Generuje statyczne migawki strony glownej i informacji RODO (MIGAWKI_KATALOG)"
+
+	def add_arguments(self, parser):
+		parser.add_argument(
+			"--katalog", type=Path, default=None, help="Katalog docelowy (domyslnie: MIGAWKI_KATALOG z ustawien)"
+		)
+
+	def handle(self, *args, **options):
+		katalog = options["katalog"] or serwis_migawek.katalog()
+		if katalog is None:
+			raise CommandError("Nie ustawiono katalogu migawek (DJANGO_MIGAWKI_KATALOG lub --katalog)")
+
+		zapisane = serwis_migawek.generuj(katalog)
+		for plik in zapisane:
+			self.stdout.write(f"  {plik.relative_to(katalog)}")
+		self.stdout.write(self.style.SUCCESS(f"Zapisano {len(zapisane)} migawek w {katalog}"))
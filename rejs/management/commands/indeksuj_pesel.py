@@ -0,0 +1,96 @@
+"""
+Komenda Django do uzupelnienia indeksu wyszukiwania PESEL (pesel_indeks).
+
+Indeks jest utrzymywany przy zapisie modelu Dane_Dodatkowe. Komende trzeba
+uruchomic raz dla danych zapisanych przed jego wprowadzeniem oraz ponownie
+(z --od-nowa) po zmianie klucza DJANGO_BLIND_INDEX_KEY.
+
+Wiersze przetwarzane sa paczkami w osobnych transakcjach, a szyfrogramy
+kazdej paczki odszyfrowywane jednym wywolaniem odszyfruj_wiele().
+
+Uzycie:
+    python manage.py indeksuj_pesel
+    python manage.py indeksuj_pesel --rozmiar-paczki 2000
+    python manage.py indeksuj_pesel --od-nowa   # ignoruj zapisany postep
+
+Po przerwaniu ponowne uruchomienie kontynuuje od ostatniej zatwierdzonej paczki.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from rejs.kryptografia import odcisk_klucza
+from rejs.management.postep import PunktKontrolny, domyslna_sciezka
+from rejs.modele.pola import odszyfruj_wiele, surowe
+from rejs.modele.zgloszenie import indeks_peselu
+from rejs.models import Dane_Dodatkowe
+
+
+class Command(BaseCommand):
+	help = "Uzupelnia indeks wyszukiwania PESEL dla istniejacych danych (z mozliwoscia wznowienia)"
+
+	def add_arguments(self, parser):
+		parser.add_argument(
+			"--rozmiar-paczki",
+			type=int,
+			default=1000,
+			help="Liczba wierszy przetwarzanych w jednej transakcji (domyslnie: 1000)",
+		)
+		parser.add_argument(
+			"--punkt-kontrolny",
+			default=None,
+			help="Sciezka pliku z postepem (domyslnie: .postep/indeksuj_pesel.json)",
+		)
+		parser.add_argument(
+			"--od-nowa",
+			action="store_true",
+			help="Ignoruj zapisany postep i zacznij od poczatku",
+		)
+
+	def handle(self, *args, **options):
+		rozmiar = options["rozmiar_paczki"]
+		punkt = PunktKontrolny(options["punkt_kontrolny"] or domyslna_sciezka("indeksuj_pesel"))
+
+		klucz = odcisk_klucza(settings.FIELD_BLIND_INDEX_KEY)
+		stan = {} if options["od_nowa"] else punkt.wczytaj()
+		if stan.get("klucz") != klucz:
+			# Postęp zapisany dla innego klucza indeksu nie dotyczy tego przebiegu
+			stan = {"klucz": klucz, "ostatnie_pk": 0}
+		elif stan["ostatnie_pk"]:
+			self.stdout.write(f"Wznawianie od zapisanego postepu (pk > {stan['ostatnie_pk']})")
+
+		start = time.monotonic()
+		przetworzone = 0
+		while True:
+			with transaction.atomic():
+				wiersze = list(
+					Dane_Dodatkowe.objects.select_for_update()
+					.filter(pk__gt=stan["ostatnie_pk"])
+					.order_by("pk")
+					.values_list("pk", surowe("poz1"))[:rozmiar]
+				)
+				if not wiersze:
+					break
+
+				pesele = odszyfruj_wiele([szyfrogram for _, szyfrogram in wiersze])
+				obiekty = [
+					Dane_Dodatkowe(pk=pk, pesel_indeks=indeks_peselu(pesel)) for (pk, _), pesel in zip(wiersze, pesele)
+				]
+				Dane_Dodatkowe.objects.bulk_update(obiekty, ["pesel_indeks"])
+
+			stan["ostatnie_pk"] = wiersze[-1][0]
+			przetworzone += len(wiersze)
+			punkt.zapisz(stan)
+
+			tempo = przetworzone / max(time.monotonic() - start, 1e-9)
+			self.stdout.write(f"  {przetworzone} wierszy ({tempo:.0f} wierszy/s)")
+
+		punkt.usun()
+		self.stdout.write(
+			self.style.SUCCESS(
+				f"\nIndeks PESEL uzupelniony: {przetworzone} wierszy w {time.monotonic() - start:.1f} s."
+			)
+		)
@@ -0,0 +1,71 @@
+"""
+Komenda Django do konwersji zaszyfrowanych danych na algorytm z ustawien.
+
+Przepisuje wszystkie kolumny EncryptedTextField, ktorych szyfrogramy zapisano
+innym algorytmem niz DJANGO_FIELD_ENCRYPTION_ALGORITHM (np. Fernet -> AES-GCM),
+zachowujac klucz: dane klucza glownego szyfrowane sa aktualnym kluczem glownym,
+dane rejsow - kluczem danych swojego rejsu. Dane rejsow o zniszczonym kluczu
+pozostaja bez zmian.
+
+Odczyt obsluguje wszystkie formaty, wiec konwersje mozna wykonac na
+dzialajacym systemie, paczkami i z mozliwoscia wznowienia (jak rotuj_klucze).
+
+Procedura:
+    1. Ustaw DJANGO_FIELD_ENCRYPTION_ALGORITHM=aes-gcm i zrestartuj aplikacje
+    2. python manage.py konwertuj_szyfrogramy
+
+Uzycie:
+    python manage.py konwertuj_szyfrogramy
+    python manage.py konwertuj_szyfrogramy --rozmiar-paczki 200 --pauza 0.5
+    python manage.py konwertuj_szyfrogramy --od-nowa   # ignoruj zapisany postep
+"""
+
+from django.conf import settings
+
+from rejs.kryptografia import ALGORYTMY, Szyfr, odcisk_klucza, rozpakuj
+from rejs.management.commands import rotuj_klucze
+from rejs.modele import pola
+from rejs.models import KluczRejsu
+
+
+class Command(rotuj_klucze.Command):
+	help = "Konwertuje zaszyfrowane dane na algorytm z DJANGO_FIELD_ENCRYPTION_ALGORITHM (z mozliwoscia wznowienia)"
+
+	nazwa_postepu = "konwertuj_szyfrogramy"
+
+	def _nazwa_algorytmu(self) -> str:
+		return next(nazwa for nazwa, algorytm in ALGORYTMY.items() if algorytm == pola.szyfr_glowny().algorytm)
+
+	def identyfikator(self) -> str:
+		return f"{odcisk_klucza(settings.DJANGO_FIELD_ENCRYPTION_KEYS[0])}-{pola.szyfr_glowny().algorytm}"
+
+	def sprawdz_konfiguracje(self):
+		self.stdout.write(f"Docelowy algorytm: {self._nazwa_algorytmu()}")
+
+	def przeksztalc(self, szyfrogramy: list[str | None]) -> list[str | None]:
+		docelowy = pola.szyfr_glowny().algorytm
+		koperty = [None if s is None else rozpakuj(s) for s in szyfrogramy]
+
+		# Klucze danych potrzebne w paczce pobieramy jednym zapytaniem
+		ids = {k[1] for k in koperty if k is not None and k[0] != docelowy and k[1] is not None}
+		szyfry_danych = {
+			klucz_id: Szyfr([klucz], docelowy) if klucz else None
+			for klucz_id, klucz in KluczRejsu.objects.jawne(ids).items()
+		}
+
+		wynik = []
+		for szyfrogram, koperta in zip(szyfrogramy, koperty):
+			if koperta is None or koperta[0] == docelowy:
+				wynik.append(szyfrogram)
+				continue
+			algorytm, klucz_id, dane = koperta
+			szyfr = pola.szyfr_glowny() if klucz_id is None else szyfry_danych[klucz_id]
+			if szyfr is None:
+				# Klucz danych zniszczony - wartości nie da się (i nie trzeba) odczytać
+				wynik.append(szyfrogram)
+				continue
+			wynik.append(szyfr.szyfruj(szyfr.odszyfruj(algorytm, dane), klucz_id))
+		return wynik
+
+	def podsumowanie(self, razem, czas, identyfikator):
+		return f"\nKonwersja zakonczona: sprawdzono {razem} wierszy w {czas:.1f} s ({self._nazwa_algorytmu()})."
@@ -1,12 +1,38 @@
-"""Management command to generate sample data with dynamic dates."""
-
-from datetime import timedelta
+"""
+Management command to generate sample data with dynamic dates.
+
+Uzycie:
+    python manage.py load_sample_data
+    python manage.py load_sample_data --scale 40   # duzy zbior do testow wydajnosci
+    python manage.py load_sample_data --scale 40 --zgloszen-na-rejs 1500 --seed 7
+
+Tryb --scale generuje N rejsow z tysiacami zgloszen, wplatami, wachtami,
+ogloszeniami, zaszyfrowanymi danymi dodatkowymi i wpisami audytu. Wiersze
+zapisywane sa przez bulk_create (bez sygnalow post_save, wiec bez wysylki
+emaili), a dane losowane z ustalonym ziarnem - ten sam --scale i --seed
+daja zawsze ten sam zbior.
+"""
+
+import random
+import time
+from datetime import date, timedelta
 from decimal import Decimal
 
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from django.utils import timezone
 
-from rejs.models import Ogloszenie, Rejs, Wachta, Wplata, Zgloszenie
+from rejs.modele.pola import surowa_wartosc
+from rejs.modele.zgloszenie import indeks_peselu
+from rejs.models import AuditLog, Dane_Dodatkowe, KluczRejsu, Ogloszenie, Rejs, Wachta, Wplata, Zgloszenie
+
+# Znacznik wpisów audytu wygenerowanych w trybie --scale (usuwanych przy ponownym generowaniu)
+ZNACZNIK_AUDYTU = "load_sample_data --scale"
+
+IMIONA = ["Jan", "Anna", "Piotr", "Maria", "Tomasz", "Katarzyna", "Michal", "Agnieszka", "Robert", "Ewa"]
+NAZWISKA = ["Kowalski", "Nowak", "Wisniewski", "Wojcik", "Kaminski", "Lewandowski", "Zielinski", "Mazur"]
+PORTY = ["Gdynia", "Gdansk", "Swinoujscie", "Sztokholm", "Helsinki", "Tallinn", "Kopenhaga", "Bergen"]
+MIASTA = ["Gdynia", "Gdansk", "Warszawa", "Krakow", "Wroclaw", "Poznan", "Szczecin", "Lodz"]
 
 
 class Command(BaseCommand):
@@ -14,12 +40,42 @@ class Command(BaseCommand):
 
 	help = "Generuje dane testowe z datami relatywnymi do dzisiaj"
 
+	def add_arguments(self, parser):
+		parser.add_argument(
+			"--scale",
+			type=int,
+			default=None,
+			help="Wygeneruj duzy zbior danych z podana liczba rejsow (do testow wydajnosci)",
+		)
+		parser.add_argument(
+			"--zgloszen-na-rejs",
+			type=int,
+			default=1000,
+			help="Liczba zgloszen na rejs w trybie --scale (domyslnie: 1000)",
+		)
+		parser.add_argument(
+			"--seed",
+			type=int,
+			default=0,
+			help="Ziarno generatora liczb losowych w trybie --scale (domyslnie: 0)",
+		)
+		parser.add_argument(
+			"--rozmiar-paczki",
+			type=int,
+			default=2000,
+			help="Liczba wierszy w jednym INSERT w trybie --scale (domyslnie: 2000)",
+		)
+
 	def handle(self, *args, **options):
 		today = timezone.localdate()
 
 		# Clear existing data
 		self._clear_data()
 
+		if options["scale"]:
+			self._generate_scale(today, options)
+			return
+
 		# Generate trips
 		future_trips = self._create_future_trips(today)
 		past_trips = self._create_past_trips(today)
@@ -51,6 +107,9 @@ class Command(BaseCommand):
 		"""Usuwa istniejace dane testowe."""
 		Ogloszenie.objects.all().delete()
 		Wplata.objects.all().delete()
+		# only("pk") - usuwane dane dodatkowe nie sa odszyfrowywane przy wczytaniu
+		Dane_Dodatkowe.objects.only("pk").delete()
+		AuditLog.objects.filter(user_agent=ZNACZNIK_AUDYTU).delete()
 		Zgloszenie.objects.all().delete()
 		Wachta.objects.all().delete()
 		Rejs.objects.all().delete()
@@ -450,3 +509,136 @@ class Command(BaseCommand):
 						tytul=template["tytul"],
 						text=template["text"],
 					)
+
+	def _generate_scale(self, today, options):
+		"""Generuje duzy, powtarzalny zbior danych przez bulk_create."""
+		rng = random.Random(options["seed"])
+		batch_size = options["rozmiar_paczki"]
+		per_trip = options["zgloszen_na_rejs"]
+		start = time.monotonic()
+		counts = dict.fromkeys(["wachty", "zgloszenia", "wplaty", "ogloszenia", "dane", "audyt"], 0)
+
+		trips = []
+		for i in range(options["scale"]):
+			# Rejsy rozlozone od dwoch sezonow wstecz do roku naprzod
+			od = today + timedelta(days=rng.randint(-730, 365))
+			trips.append(
+				Rejs(
+					nazwa=f"Rejs {i + 1:03d}",
+					od=od,
+					do=od + timedelta(days=rng.choice([7, 10, 14])),
+					start=rng.choice(PORTY),
+					koniec=rng.choice(PORTY),
+					cena=Decimal(rng.randrange(1500, 6000, 100)),
+					zaliczka=Decimal(rng.randrange(300, 900, 100)),
+					opis=f"Rejs testowy nr {i + 1}.",
+					aktywna_rekrutacja=od > today,
+				)
+			)
+		trips = Rejs.objects.bulk_create(trips, batch_size=batch_size)
+
+		for number, trip in enumerate(trips, start=1):
+			# Kazdy rejs w osobnej transakcji - postep jest zapisywany na biezaco
+			with transaction.atomic():
+				self._generate_trip(trip, today, per_trip, rng, batch_size, counts)
+			self.stdout.write(f"  rejs {number}/{len(trips)}: {counts['zgloszenia']} zgloszen")
+
+		self.stdout.write("")
+		self.stdout.write(
+			self.style.SUCCESS(
+				f"Wygenerowano duzy zbior danych w {time.monotonic() - start:.1f} s (seed {options['seed']})."
+			)
+		)
+		self.stdout.write(f"  - {len(trips)} rejsow")
+		self.stdout.write(f"  - {counts['wachty']} wacht")
+		self.stdout.write(f"  - {counts['zgloszenia']} zgloszen")
+		self.stdout.write(f"  - {counts['dane']} danych dodatkowych")
+		self.stdout.write(f"  - {counts['wplaty']} wplat")
+		self.stdout.write(f"  - {counts['ogloszenia']} ogloszen")
+		self.stdout.write(f"  - {counts['audyt']} wpisow audytu")
+		self.stdout.write("")
+
+	def _generate_trip(self, trip, today, per_trip, rng, batch_size, counts):
+		"""Generuje wachty, zgloszenia i dane powiazane jednego rejsu."""
+		watches = Wachta.objects.bulk_create([Wachta(rejs=trip, nazwa=n) for n in ["Alfa", "Beta", "Gamma", "Delta"]])
+		counts["wachty"] += len(watches)
+		finished = trip.do < today
+
+		registrations = []
+		for i in range(per_trip):
+			status = rng.choices(
+				[Zgloszenie.STATUS_ZAKWALIFIKOWANY, Zgloszenie.STATUS_NIEZAKWALIFIKOWANY, Zgloszenie.STATUS_ODRZUCONE],
+				weights=[60, 30, 10],
+			)[0]
+			qualified = status == Zgloszenie.STATUS_ZAKWALIFIKOWANY
+			registrations.append(
+				Zgloszenie(
+					imie=rng.choice(IMIONA),
+					nazwisko=rng.choice(NAZWISKA),
+					email=f"uczestnik{trip.pk}_{i}@example.com",
+					telefon=f"5{rng.randrange(10**8):08d}",
+					data_urodzenia=date(rng.randint(1950, 2005), 1, 1) + timedelta(days=rng.randrange(365)),
+					adres=f"ul. Morska {rng.randint(1, 200)}",
+					kod_pocztowy=f"{rng.randint(10, 99)}-{rng.randint(100, 999)}",
+					miejscowosc=rng.choice(MIASTA),
+					obecnosc=rng.choice(["tak", "nie"]),
+					rodo=True,
+					status=status,
+					wzrok=rng.choices(["NIEWIDOMY", "SLABO-WIDZACY", "WIDZI"], weights=[15, 25, 60])[0],
+					rola="OFICER-WACHTY" if i < len(watches) else "ZALOGANT",
+					rejs=trip,
+					wachta=rng.choice(watches) if qualified and (finished or rng.random() < 0.5) else None,
+				)
+			)
+		registrations = Zgloszenie.objects.bulk_create(registrations, batch_size=batch_size)
+		counts["zgloszenia"] += len(registrations)
+		# bulk_create pomija sygnaly - licznik zajetych miejsc ustawiamy jednym zapytaniem
+		Rejs.objects.filter(pk=trip.pk).update(
+			zajete_miejsca=sum(r.status != Zgloszenie.STATUS_ODRZUCONE for r in registrations)
+		)
+		qualified = [r for r in registrations if r.status == Zgloszenie.STATUS_ZAKWALIFIKOWANY]
+
+		payments = []
+		for reg in qualified:
+			payments.append(Wplata(kwota=trip.zaliczka, zgloszenie=reg))
+			if rng.random() < 0.4:
+				payments.append(Wplata(kwota=trip.cena - trip.zaliczka, zgloszenie=reg))
+		for reg in registrations:
+			if reg.status == Zgloszenie.STATUS_ODRZUCONE and rng.random() < 0.3:
+				payments.append(Wplata(kwota=Decimal("100.00"), rodzaj=Wplata.RODZAJ_ZWROT, zgloszenie=reg))
+		counts["wplaty"] += len(Wplata.objects.bulk_create(payments, batch_size=batch_size))
+
+		counts["ogloszenia"] += len(
+			Ogloszenie.objects.bulk_create(
+				[Ogloszenie(rejs=trip, tytul=f"Ogloszenie {n}", text=f"Tresc ogloszenia {n}.") for n in range(1, 4)]
+			)
+		)
+
+		# Dane dodatkowe szyfrujemy kluczem danych rejsu raz pobranym dla calego rejsu;
+		# gotowe szyfrogramy (surowa_wartosc) omijaja ponowne szyfrowanie przy zapisie
+		klucz_id, szyfr = KluczRejsu.objects.do_szyfrowania(trip.pk)
+		details = []
+		for reg in qualified:
+			if not finished and rng.random() < 0.3:
+				continue
+			pesel = f"{rng.randrange(10**11):011d}"
+			values = [pesel, rng.choice(["dowod-osobisty", "paszport"]), f"ABC{rng.randrange(10**6):06d}"]
+			poz1, poz2, poz3 = (surowa_wartosc(szyfr.szyfruj(v, klucz_id)) for v in values)
+			details.append(
+				Dane_Dodatkowe(zgloszenie=reg, poz1=poz1, poz2=poz2, poz3=poz3, pesel_indeks=indeks_peselu(pesel))
+			)
+		details = Dane_Dodatkowe.objects.bulk_create(details, batch_size=batch_size)
+		counts["dane"] += len(details)
+
+		audit = [
+			AuditLog(
+				akcja=rng.choice(["odczyt", "modyfikacja"]),
+				model_name="Dane_Dodatkowe",
+				object_id=d.pk,
+				object_repr=f"Dane dodatkowe zgloszenia {d.zgloszenie_id}",
+				user_agent=ZNACZNIK_AUDYTU,
+			)
+			for d in details
+			if rng.random() < 0.5
+		]
+		counts["audyt"] += len(AuditLog.objects.bulk_create(audit, batch_size=batch_size))
@@ -0,0 +1,81 @@
+"""
+Komenda Django podsumowujaca profile zadan zapisane przez ProfilowanieMiddleware.
+
+Wyswietla najwolniejsze zarejestrowane zadania i dla kazdego najdrozsze funkcje
+(wedlug czasu skumulowanego z pliku .prof). Pliki .collapsed mozna otworzyc
+w speedscope lub przetworzyc skryptem flamegraph.pl.
+
+Uzycie:
+    python manage.py profile_zadan
+    python manage.py profile_zadan --limit 5 --funkcje 20
+    python manage.py profile_zadan --widok admin:rejs_rejs_changelist
+    python manage.py profile_zadan --katalog /tmp/profile
+"""
+
+import io
+import json
+import pstats
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+	help = "Wyswietla najwolniejsze profilowane zadania i ich najdrozsze funkcje"
+
+	def add_arguments(self, parser):
+		parser.add_argument(
+			"--katalog",
+			default=None,
+			help="Katalog z profilami (domyslnie: PROFILOWANIE_KATALOG z ustawien)",
+		)
+		parser.add_argument("--limit", type=int, default=10, help="Liczba najwolniejszych zadan (domyslnie: 10)")
+		parser.add_argument(
+			"--funkcje",
+			type=int,
+			default=10,
+			help="Liczba funkcji pokazywanych dla kazdego zadania, 0 - tylko lista zadan (domyslnie: 10)",
+		)
+		parser.add_argument("--widok", default=None, help="Tylko zadania obsluzone przez podany widok")
+
+	def handle(self, *args, **options):
+		katalog = options["katalog"] or getattr(settings, "PROFILOWANIE_KATALOG", "")
+		if not katalog:
+			raise CommandError("Nie ustawiono katalogu profili (--katalog lub DJANGO_PROFILOWANIE_KATALOG).")
+
+		zadania = []
+		for plik in Path(katalog).glob("*.json"):
+			try:
+				opis = json.loads(plik.read_text(encoding="utf-8"))
+			except (OSError, ValueError):
+				continue
+			if options["widok"] and opis.get("widok") != options["widok"]:
+				continue
+			zadania.append((opis, plik.with_suffix(".prof")))
+
+		if not zadania:
+			self.stdout.write("Brak zapisanych profili.")
+			return
+
+		zadania.sort(key=lambda z: z[0]["czas_ms"], reverse=True)
+		self.stdout.write(f"Profili: {len(zadania)}, najwolniejsze {min(options['limit'], len(zadania))}:")
+		for opis, profil in zadania[: options["limit"]]:
+			self.stdout.write(
+				self.style.MIGRATE_HEADING(
+					f"\n{opis['czas_ms']:>9.1f} ms  {opis['metoda']} {opis['sciezka']}  "
+					f"({opis['widok'] or '-'}, status {opis['status']}, {opis['data']})"
+				)
+			)
+			self.stdout.write(f"  {profil.with_suffix('')}.{{prof,collapsed}}")
+			if options["funkcje"] and profil.exists():
+				self.stdout.write(self._najdrozsze_funkcje(profil, options["funkcje"]))
+
+	def _najdrozsze_funkcje(self, profil: Path, liczba: int) -> str:
+		wyjscie = io.StringIO()
+		statystyki = pstats.Stats(str(profil), stream=wyjscie)
+		statystyki.strip_dirs().sort_stats(pstats.SortKey.CUMULATIVE).print_stats(liczba)
+		# Pomijamy nagłówek pstats (nazwa pliku, liczba wywołań) - zostaje tabela funkcji
+		linie = wyjscie.getvalue().splitlines()
+		poczatek = next((i for i, linia in enumerate(linie) if linia.lstrip().startswith("ncalls")), 0)
+		return "\n".join(linie[poczatek:]).rstrip()
@@ -0,0 +1,45 @@
+"""
+Komenda Django tworzaca zgloszenia z kolejki trybu szczytowego.
+
+W trybie szczytowym (DJANGO_TRYB_SZCZYTOWY) formularz zgloszenia zapisuje dane
+do kolejki (ZgloszenieOczekujace). Komenda tworzy z nich zgloszenia paczkami -
+jedna transakcja na paczke - i wysyla emaile z potwierdzeniem.
+
+Uzycie:
+    python manage.py przetwarzaj_zgloszenia
+    python manage.py przetwarzaj_zgloszenia --rozmiar-paczki 200
+    python manage.py przetwarzaj_zgloszenia --ciagle --interwal 2
+
+Na czas otwarcia rekrutacji uruchom z --ciagle jako osobny proces (np. usluga
+systemd); po wylaczeniu trybu szczytowego uruchom jeszcze raz, aby oproznic kolejke.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from rejs.serwisy.kolejka import serwis_kolejki_zgloszen
+
+
+class Command(BaseCommand):
+	help = "Tworzy zgloszenia z kolejki trybu szczytowego (DJANGO_TRYB_SZCZYTOWY) paczkami"
+
+	def add_arguments(self, parser):
+		parser.add_argument(
+			"--rozmiar-paczki", type=int, default=500, help="Liczba zgloszen z kolejki w jednej transakcji"
+		)
+		parser.add_argument("--ciagle", action="store_true", help="Przetwarzaj kolejke az do przerwania (Ctrl+C)")
+		parser.add_argument(
+			"--interwal", type=float, default=1.0, help="Przerwa w sekundach, gdy kolejka jest pusta (z --ciagle)"
+		)
+
+	def handle(self, *args, **options):
+		while True:
+			utworzone = serwis_kolejki_zgloszen.przetworz(options["rozmiar_paczki"])
+			if not options["ciagle"]:
+				self.stdout.write(self.style.SUCCESS(f"Utworzono {utworzone} zgloszen z kolejki"))
+				return
+			if utworzone:
+				self.stdout.write(f"Utworzono {utworzone} zgloszen z kolejki")
+			else:
+				time.sleep(options["interwal"])
@@ -0,0 +1,184 @@
+"""
+Komenda Django do rotacji klucza szyfrowania danych wrazliwych.
+
+Ponownie szyfruje wszystkie kolumny EncryptedTextField aktualnym (pierwszym)
+kluczem z DJANGO_FIELD_ENCRYPTION_KEY i algorytmem z DJANGO_FIELD_ENCRYPTION_ALGORITHM.
+Dane przetwarzane sa paczkami w osobnych transakcjach, wiec tabela nie jest
+blokowana na czas calej operacji i rotacje mozna uruchomic na dzialajacym systemie.
+
+Dane zaszyfrowane kluczami danych rejsow (koperty F<id>:/G<id>:) nie sa przepisywane -
+wystarczy ponownie zaszyfrowac same klucze danych (tabela KluczRejsu).
+
+Procedura rotacji:
+    1. Dopisz nowy klucz NA POCZATKU listy: DJANGO_FIELD_ENCRYPTION_KEY=nowy,stary
+    2. Zrestartuj aplikacje (nowe dane szyfrowane sa juz nowym kluczem)
+    3. python manage.py rotuj_klucze
+    4. Usun stary klucz z listy i zrestartuj aplikacje
+
+Uzycie:
+    python manage.py rotuj_klucze
+    python manage.py rotuj_klucze --rozmiar-paczki 200 --pauza 0.5
+    python manage.py rotuj_klucze --od-nowa   # ignoruj zapisany postep
+
+Po przerwaniu (Ctrl+C, restart serwera) ponowne uruchomienie kontynuuje
+od ostatniej zatwierdzonej paczki.
+"""
+
+import logging
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from rejs.kryptografia import odcisk_klucza, rozpakuj
+from rejs.management.postep import PunktKontrolny, domyslna_sciezka
+from rejs.modele import pola
+from rejs.modele.pola import EncryptedTextField, surowa_wartosc, surowe
+
+logger = logging.getLogger(__name__)
+
+
+def pola_szyfrowane():
+	"""Zwraca listę (model, [pola EncryptedTextField]) dla modeli aplikacji rejs."""
+	wynik = []
+	for model in apps.get_app_config("rejs").get_models():
+		szyfrowane = [f for f in model._meta.concrete_fields if isinstance(f, EncryptedTextField)]
+		if szyfrowane:
+			wynik.append((model, szyfrowane))
+	return wynik
+
+
+class Command(BaseCommand):
+	help = "Ponownie szyfruje dane wrazliwe aktualnym kluczem (rotacja kluczy, z mozliwoscia wznowienia)"
+
+	# Nazwa pliku postępu w katalogu .postep
+	nazwa_postepu = "rotuj_klucze"
+
+	def add_arguments(self, parser):
+		parser.add_argument(
+			"--rozmiar-paczki",
+			type=int,
+			default=500,
+			help="Liczba wierszy re-szyfrowanych w jednej transakcji (domyslnie: 500)",
+		)
+		parser.add_argument(
+			"--pauza",
+			type=float,
+			default=0.0,
+			help="Przerwa w sekundach miedzy paczkami, aby odciazyc baze na produkcji (domyslnie: 0)",
+		)
+		parser.add_argument(
+			"--punkt-kontrolny",
+			default=None,
+			help=f"Sciezka pliku z postepem (domyslnie: .postep/{self.nazwa_postepu}.json)",
+		)
+		parser.add_argument(
+			"--od-nowa",
+			action="store_true",
+			help="Ignoruj zapisany postep i zacznij od poczatku",
+		)
+
+	def identyfikator(self) -> str:
+		"""Identyfikuje cel operacji - postęp zapisany dla innego celu jest ignorowany."""
+		return odcisk_klucza(settings.DJANGO_FIELD_ENCRYPTION_KEYS[0])
+
+	def przeksztalc(self, szyfrogramy: list[str | None]) -> list[str | None]:
+		"""Zwraca szyfrogramy po re-szyfrowaniu (przekazywane są wszystkie wartości jednej paczki)."""
+		return [self._rotuj(s) for s in szyfrogramy]
+
+	def _rotuj(self, szyfrogram: str | None) -> str | None:
+		if szyfrogram is None:
+			return None
+		algorytm, klucz_id, dane = rozpakuj(szyfrogram)
+		if klucz_id is not None:
+			# Koperty kluczy danych rejsów pomijamy - rotacji podlega klucz danych (model KluczRejsu)
+			return szyfrogram
+		szyfr = pola.szyfr_glowny()
+		return szyfr.szyfruj(szyfr.odszyfruj(algorytm, dane))
+
+	def handle(self, *args, **options):
+		rozmiar = options["rozmiar_paczki"]
+		pauza = options["pauza"]
+		punkt = PunktKontrolny(options["punkt_kontrolny"] or domyslna_sciezka(self.nazwa_postepu))
+
+		klucz_glowny = self.identyfikator()
+		self.sprawdz_konfiguracje()
+
+		stan = {} if options["od_nowa"] else punkt.wczytaj()
+		if stan.get("klucz") != klucz_glowny:
+			# Postęp zapisany dla innego klucza głównego nie dotyczy tej rotacji
+			stan = {"klucz": klucz_glowny, "ostatnie_pk": {}}
+		elif stan["ostatnie_pk"]:
+			self.stdout.write(f"Wznawianie rotacji od zapisanego postepu: {stan['ostatnie_pk']}")
+
+		start = time.monotonic()
+		razem = 0
+		for model, pola_modelu in pola_szyfrowane():
+			razem += self._rotuj_model(model, pola_modelu, rozmiar, pauza, punkt, stan)
+
+		punkt.usun()
+		czas = time.monotonic() - start
+		self.stdout.write(self.style.SUCCESS(self.podsumowanie(razem, czas, klucz_glowny)))
+
+	def sprawdz_konfiguracje(self):
+		if len(settings.DJANGO_FIELD_ENCRYPTION_KEYS) == 1:
+			self.stdout.write(
+				self.style.WARNING("Skonfigurowano tylko jeden klucz - rotacja jedynie odswiezy szyfrogramy.")
+			)
+
+	def podsumowanie(self, razem, czas, identyfikator):
+		return (
+			f"\nRotacja zakonczona: {razem} wierszy w {czas:.1f} s (klucz {identyfikator}). "
+			"Mozna usunac stare klucze z DJANGO_FIELD_ENCRYPTION_KEY."
+		)
+
+	def _rotuj_model(self, model, pola_modelu, rozmiar, pauza, punkt, stan):
+		etykieta = model._meta.label
+		ostatnie_pk = stan["ostatnie_pk"].get(etykieta, 0)
+		nazwy = [f.name for f in pola_modelu]
+		menedzer = model._default_manager
+		przetworzone = 0
+		start = time.monotonic()
+
+		while True:
+			with transaction.atomic():
+				wiersze = list(
+					menedzer.select_for_update()
+					.filter(pk__gt=ostatnie_pk)
+					.order_by("pk")
+					.values_list("pk", *[surowe(n) for n in nazwy])[:rozmiar]
+				)
+				if not wiersze:
+					break
+
+				liczba_pol = len(nazwy)
+				przed = [szyfrogram for _, *szyfrogramy in wiersze for szyfrogram in szyfrogramy]
+				po = self.przeksztalc(przed)
+
+				obiekty = []
+				for i, (pk, *_) in enumerate(wiersze):
+					nowe = po[i * liczba_pol : (i + 1) * liczba_pol]
+					if nowe == przed[i * liczba_pol : (i + 1) * liczba_pol]:
+						continue
+					obj = model(pk=pk)
+					for pole, szyfrogram in zip(pola_modelu, nowe):
+						setattr(obj, pole.attname, surowa_wartosc(szyfrogram))
+					obiekty.append(obj)
+				if obiekty:
+					menedzer.bulk_update(obiekty, nazwy)
+
+			ostatnie_pk = wiersze[-1][0]
+			przetworzone += len(wiersze)
+			stan["ostatnie_pk"][etykieta] = ostatnie_pk
+			punkt.zapisz(stan)
+
+			tempo = przetworzone / max(time.monotonic() - start, 1e-9)
+			logger.info("Rotacja %s: %d wierszy (%.0f wierszy/s)", etykieta, przetworzone, tempo)
+			self.stdout.write(f"  {etykieta}: {przetworzone} wierszy ({tempo:.0f} wierszy/s)")
+
+			if pauza:
+				time.sleep(pauza)
+
+		return przetworzone
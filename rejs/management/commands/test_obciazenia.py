@@ -0,0 +1,247 @@
+"""
+Komenda Django do testu obciazeniowego sciezki rejestracji (w procesie).
+
+Kazdy watek przechodzi sciezke uczestnika klientem testowym Django (aplikacja
+WSGI wywolywana w tym samym procesie, bez serwera HTTP):
+    index -> GET/POST zgloszenie_utworz -> zgloszenie_details -> GET/POST dane_dodatkowe_form
+z unikalnymi danymi syntetycznymi. Wynik (przepustowosc, opoznienia p50/p95/p99,
+liczba bledow i konfliktow blokad dla kazdego endpointu) wypisywany jest jako
+JSON, do porownania miedzy przebiegami.
+
+Test dziala na skonfigurowanej bazie danych: tworzy rejs testowy i usuwa go
+(razem ze zgloszeniami i ich wpisami audytu) po zakonczeniu. Emaile trafiaja
+do skrzynki w pamieci, chyba ze podano --z-emailami.
+
+Uzycie:
+    python manage.py test_obciazenia
+    python manage.py test_obciazenia --watki 16 --przebiegi 500 --wyjscie wynik.json
+    python manage.py test_obciazenia --rejs 12 --zostaw-dane
+"""
+
+import json
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.db.models import Q
+from django.test import Client, override_settings
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from rejs.models import AuditLog, Dane_Dodatkowe, Rejs
+
+# Fragmenty komunikatów błędów baz danych oznaczające konflikt blokad
+KOMUNIKATY_BLOKAD = ("locked", "deadlock", "could not serialize", "lock timeout", "could not obtain lock")
+
+ENDPOINTY = ("index", "formularz", "zgloszenie", "szczegoly", "dane_formularz", "dane_zapis")
+
+
+def percentyl(wartosci: list[float], procent: float) -> float:
+	"""Percentyl metodą najbliższej rangi (wartości muszą być posortowane)."""
+	if not wartosci:
+		return 0.0
+	indeks = max(0, min(len(wartosci) - 1, round(procent / 100 * len(wartosci) + 0.5) - 1))
+	return wartosci[indeks]
+
+
+def pesel_testowy(losowanie: random.Random) -> str:
+	"""Losowy numer z poprawną sumą kontrolną PESEL."""
+	cyfry = [losowanie.randrange(10) for _ in range(10)]
+	suma = sum(c * w for c, w in zip(cyfry, [1, 3, 7, 9, 1, 3, 7, 9, 1, 3]))
+	return "".join(map(str, cyfry)) + str((10 - suma % 10) % 10)
+
+
+class Pomiary:
+	"""Czasy odpowiedzi, błędy i konflikty blokad zbierane z wielu wątków."""
+
+	def __init__(self):
+		self._blokada = threading.Lock()
+		self.czasy = defaultdict(list)
+		self.bledy = defaultdict(int)
+		self.blokady = defaultdict(int)
+
+	def zapisz(self, endpoint: str, czas: float, blad: bool = False, blokada: bool = False) -> None:
+		with self._blokada:
+			self.czasy[endpoint].append(czas)
+			self.bledy[endpoint] += blad
+			self.blokady[endpoint] += blokada
+
+	def raport(self, czas_calkowity: float) -> dict:
+		endpointy = {}
+		for endpoint in ENDPOINTY:
+			czasy = sorted(self.czasy[endpoint])
+			endpointy[endpoint] = {
+				"zadania": len(czasy),
+				"bledy": self.bledy[endpoint],
+				"blokady": self.blokady[endpoint],
+				"zadan_na_s": round(len(czasy) / czas_calkowity, 2),
+				"p50_ms": round(percentyl(czasy, 50) * 1000, 2),
+				"p95_ms": round(percentyl(czasy, 95) * 1000, 2),
+				"p99_ms": round(percentyl(czasy, 99) * 1000, 2),
+			}
+		zadania = sum(e["zadania"] for e in endpointy.values())
+		return {
+			"czas_s": round(czas_calkowity, 3),
+			"zadania": zadania,
+			"zadan_na_s": round(zadania / czas_calkowity, 2),
+			"bledy": sum(self.bledy.values()),
+			"blokady": sum(self.blokady.values()),
+			"endpointy": endpointy,
+		}
+
+
+class Command(BaseCommand):
+	help = "Test obciazeniowy sciezki rejestracji (wielowatkowo, w procesie) z raportem JSON"
+
+	def add_arguments(self, parser):
+		parser.add_argument("--watki", type=int, default=8, help="Liczba rownoleglych uczestnikow (domyslnie: 8)")
+		parser.add_argument(
+			"--przebiegi",
+			type=int,
+			default=100,
+			help="Liczba pelnych sciezek rejestracji (domyslnie: 100)",
+		)
+		parser.add_argument(
+			"--rejs",
+			type=int,
+			default=None,
+			help="Id istniejacego rejsu z otwarta rekrutacja (domyslnie: tworzony rejs testowy)",
+		)
+		parser.add_argument("--seed", type=int, default=0, help="Ziarno danych syntetycznych (domyslnie: 0)")
+		parser.add_argument("--wyjscie", default=None, help="Plik, do ktorego zapisac wynik JSON (domyslnie: stdout)")
+		parser.add_argument(
+			"--zostaw-dane",
+			action="store_true",
+			help="Nie usuwaj utworzonych zgloszen i rejsu testowego",
+		)
+		parser.add_argument(
+			"--z-emailami",
+			action="store_true",
+			help="Wysylaj emaile skonfigurowanym EMAIL_BACKEND (domyslnie: skrzynka w pamieci)",
+		)
+
+	def handle(self, *args, **options):
+		if options["rejs"]:
+			try:
+				rejs = Rejs.objects.get(pk=options["rejs"])
+			except Rejs.DoesNotExist as e:
+				raise CommandError(f"Rejs {options['rejs']} nie istnieje.") from e
+		else:
+			dzis = timezone.localdate()
+			rejs = Rejs.objects.create(
+				nazwa=f"Test obciazenia {uuid.uuid4().hex[:8]}",
+				od=dzis + timedelta(days=60),
+				do=dzis + timedelta(days=74),
+				start="Gdynia",
+				koniec="Gdynia",
+			)
+
+		# Znacznik przebiegu w adresach email - dane są unikalne także między przebiegami
+		przebieg = uuid.uuid4().hex[:8]
+		ustawienia = {"ALLOWED_HOSTS": [*settings.ALLOWED_HOSTS, "testserver"]}
+		if not options["z_emailami"]:
+			ustawienia["EMAIL_BACKEND"] = "django.core.mail.backends.locmem.EmailBackend"
+
+		pomiary = Pomiary()
+		self.stderr.write(f"Rejs: {rejs} (id {rejs.pk}), watki: {options['watki']}, przebiegi: {options['przebiegi']}")
+		with override_settings(**ustawienia):
+			start = time.perf_counter()
+			with ThreadPoolExecutor(max_workers=options["watki"]) as pula:
+				for numer in range(options["przebiegi"]):
+					pula.submit(self._sciezka, rejs.pk, f"{przebieg}-{numer}", options["seed"] + numer, pomiary)
+			czas = time.perf_counter() - start
+
+		wynik = {"watki": options["watki"], "przebiegi": options["przebiegi"], **pomiary.raport(czas)}
+
+		if not options["zostaw_dane"]:
+			self._sprzataj(rejs, przebieg, utworzony=not options["rejs"])
+
+		tekst = json.dumps(wynik, indent=2, ensure_ascii=False)
+		if options["wyjscie"]:
+			with open(options["wyjscie"], "w", encoding="utf-8") as plik:
+				plik.write(tekst + "\n")
+			self.stderr.write(f"Wynik zapisano w {options['wyjscie']}")
+		else:
+			self.stdout.write(tekst)
+
+	def _sciezka(self, rejs_id: int, identyfikator: str, seed: int, pomiary: Pomiary) -> None:
+		"""Jedna pełna ścieżka rejestracji; przerywana po pierwszym błędzie."""
+		losowanie = random.Random(seed)
+		klient = Client()
+		formularz = reverse("zgloszenie_utworz", kwargs={"rejs_id": rejs_id})
+		zgloszenie = {
+			"imie": "Test",
+			"nazwisko": f"Obciazenie{identyfikator}",
+			"email": f"obciazenie-{identyfikator}@example.com",
+			"telefon": f"5{losowanie.randrange(10**8):08d}",
+			"data_urodzenia": f"{losowanie.randint(1950, 2005)}-0{losowanie.randint(1, 9)}-1{losowanie.randint(0, 9)}",
+			"adres": f"ul. Morska {losowanie.randint(1, 200)}",
+			"kod_pocztowy": f"{losowanie.randint(10, 99)}-{losowanie.randint(100, 999)}",
+			"miejscowosc": "Gdynia",
+			"wzrok": losowanie.choice(["WIDZI", "NIEWIDOMY", "SLABO-WIDZACY"]),
+			"obecnosc": losowanie.choice(["tak", "nie"]),
+			"rodo": "on",
+		}
+		try:
+			if not self._zadanie(pomiary, "index", klient.get, reverse("index")):
+				return
+			if not self._zadanie(pomiary, "formularz", klient.get, formularz):
+				return
+			odpowiedz = self._zadanie(pomiary, "zgloszenie", klient.post, formularz, zgloszenie, oczekiwany=302)
+			if not odpowiedz:
+				return
+			szczegoly = odpowiedz.url
+			if not self._zadanie(pomiary, "szczegoly", klient.get, szczegoly):
+				return
+			dane = reverse("dane_dodatkowe_form", kwargs=resolve(szczegoly).kwargs)
+			if not self._zadanie(pomiary, "dane_formularz", klient.get, dane):
+				return
+			dane_dodatkowe = {
+				"poz1": pesel_testowy(losowanie),
+				"poz2": losowanie.choice(["paszport", "dowod-osobisty"]),
+				"poz3": f"ABC{losowanie.randrange(10**6):06d}",
+				"zgoda_dane_wrazliwe": "on",
+			}
+			self._zadanie(pomiary, "dane_zapis", klient.post, dane, dane_dodatkowe, oczekiwany=302)
+		finally:
+			# Każdy wątek puli ma własne połączenie z bazą - zamykamy je po ścieżce
+			connection.close()
+
+	def _zadanie(self, pomiary, endpoint, metoda, *args, oczekiwany=200):
+		"""Wykonuje żądanie i zapisuje pomiar; zwraca odpowiedź lub None przy błędzie."""
+		start = time.perf_counter()
+		try:
+			odpowiedz = metoda(*args)
+		except OperationalError as e:
+			blokada = any(komunikat in str(e).lower() for komunikat in KOMUNIKATY_BLOKAD)
+			pomiary.zapisz(endpoint, time.perf_counter() - start, blad=True, blokada=blokada)
+			return None
+		except Exception:
+			pomiary.zapisz(endpoint, time.perf_counter() - start, blad=True)
+			return None
+		poprawna = odpowiedz.status_code == oczekiwany
+		pomiary.zapisz(endpoint, time.perf_counter() - start, blad=not poprawna)
+		return odpowiedz if poprawna else None
+
+	def _sprzataj(self, rejs, przebieg, utworzony):
+		"""Usuwa dane przebiegu (lub cały rejs testowy)."""
+		zgloszenia = rejs.zgloszenia.filter(email__startswith=f"obciazenie-{przebieg}-")
+		dane = Dane_Dodatkowe.objects.filter(zgloszenie__in=zgloszenia)
+		# Wpisy audytu dotyczące danych przebiegu - przed usunięciem obiektów, do których się odnoszą
+		AuditLog.objects.filter(
+			Q(model_name="Zgloszenie", object_id__in=zgloszenia.values("pk"))
+			| Q(model_name="Dane_Dodatkowe", object_id__in=dane.values("pk"))
+		).delete()
+		# only("pk") - usuwane dane dodatkowe nie są odszyfrowywane przy wczytaniu
+		dane.only("pk").delete()
+		if utworzony:
+			rejs.delete()
+		else:
+			zgloszenia.delete()
@@ -4,20 +4,48 @@ Komenda Django do automatycznego usuwania danych wrazliwych po zakonczeniu rejsu
 Zgodnie z polityka retencji danych (RODO), dane wrazliwe (PESEL, dokumenty)
 sa usuwane 30 dni po zakonczeniu rejsu.
 
+Usuwanie przebiega w dwoch krokach:
+    1. Zniszczenie klucza danych kazdego zakonczonego rejsu (crypto-shredding) -
+       jeden wiersz na rejs, niezaleznie od liczby uczestnikow. Od tej chwili
+       dane rejsu sa nieodwracalne w bazie; kopie zapasowe sprzed zniszczenia
+       zawieraja tez klucz, wiec dane znikaja z nich dopiero po wygasnieciu
+       kopii (okres przechowywania kopii - patrz RODO.md).
+    2. Fizyczne usuniecie wierszy Dane_Dodatkowe paczkami (mozna pominac
+       opcja --bez-sprzatania i wykonac pozniej). Dane zaszyfrowane kluczem
+       glownym (sprzed wprowadzenia kluczy rejsow) usuwa dopiero ten krok.
+
+Niezaleznie od rejsow usuwane sa zgloszenia odrzucone z kolejki trybu
+szczytowego (ZgloszenieOczekujace z powodem odrzucenia) starsze niz
+--dni-odrzuconych - ich dane osobowe sa zapisane jawnie, a strona tokenu
+pokazuje powod odrzucenia tylko przez ten czas.
+
+Kazdy rejs (krok 1) i kazda paczka (krok 2) to osobna, krotka transakcja -
+zapisy do tabel nie sa blokowane na czas calego czyszczenia. Paczka pobiera
+tylko identyfikatory i nazwiska uczestnikow (bez odszyfrowywania danych),
+zapisuje wpisy audytu jednym bulk_create i usuwa wiersze. Po przerwaniu
+ponowne uruchomienie kontynuuje od ostatniej zatwierdzonej paczki.
+
 Uzycie:
     python manage.py usun_dane_wrazliwe
     python manage.py usun_dane_wrazliwe --dry-run  # tylko podglad
     python manage.py usun_dane_wrazliwe --dni 60   # zmiana okresu retencji
+    python manage.py usun_dane_wrazliwe --dni-odrzuconych 7  # retencja odrzuconych z kolejki
+    python manage.py usun_dane_wrazliwe --bez-sprzatania  # tylko niszczenie kluczy
+    python manage.py usun_dane_wrazliwe --rozmiar-paczki 200 --pauza 0.5
+    python manage.py usun_dane_wrazliwe --od-nowa  # ignoruj zapisany postep
 
 Zalecane uruchamianie przez cron/scheduler raz dziennie.
 """
 
+import time
 from datetime import timedelta
 
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from django.utils import timezone
 
-from rejs.models import AuditLog, Dane_Dodatkowe
+from rejs.management.postep import PunktKontrolny, domyslna_sciezka
+from rejs.models import AuditLog, Dane_Dodatkowe, KluczRejsu, ZgloszenieOczekujace
 
 
 class Command(BaseCommand):
@@ -35,6 +63,39 @@ class Command(BaseCommand):
 			default=30,
 			help="Liczba dni po zakonczeniu rejsu, po ktorych dane sa usuwane (domyslnie: 30)",
 		)
+		parser.add_argument(
+			"--dni-odrzuconych",
+			type=int,
+			default=14,
+			help="Liczba dni po zgloszeniu, po ktorych usuwane sa zgloszenia odrzucone z kolejki (domyslnie: 14)",
+		)
+		parser.add_argument(
+			"--bez-sprzatania",
+			action="store_true",
+			help="Tylko zniszcz klucze danych rejsow, bez fizycznego usuwania wierszy",
+		)
+		parser.add_argument(
+			"--rozmiar-paczki",
+			type=int,
+			default=500,
+			help="Liczba wierszy usuwanych w jednej transakcji (domyslnie: 500)",
+		)
+		parser.add_argument(
+			"--pauza",
+			type=float,
+			default=0.0,
+			help="Przerwa w sekundach miedzy paczkami, aby odciazyc baze na produkcji (domyslnie: 0)",
+		)
+		parser.add_argument(
+			"--punkt-kontrolny",
+			default=None,
+			help="Sciezka pliku z postepem (domyslnie: .postep/usun_dane_wrazliwe.json)",
+		)
+		parser.add_argument(
+			"--od-nowa",
+			action="store_true",
+			help="Ignoruj zapisany postep i zacznij od poczatku",
+		)
 
 	def handle(self, *args, **options):
 		dry_run = options["dry_run"]
@@ -42,26 +103,23 @@ class Command(BaseCommand):
 
 		data_graniczna = timezone.now().date() - timedelta(days=dni_retencji)
 
-		dane_do_usuniecia = Dane_Dodatkowe.objects.filter(zgloszenie__rejs__do__lt=data_graniczna).select_related(
-			"zgloszenie", "zgloszenie__rejs"
-		)
+		self._usun_odrzucone_z_kolejki(options["dni_odrzuconych"], dry_run)
 
+		klucze_do_zniszczenia = KluczRejsu.objects.filter(rejs__do__lt=data_graniczna, zniszczono__isnull=True)
+		klucze = list(klucze_do_zniszczenia.order_by("rejs__do").values_list("pk", "rejs__nazwa", "rejs__do"))
+		dane_do_usuniecia = Dane_Dodatkowe.objects.filter(zgloszenie__rejs__do__lt=data_graniczna)
 		liczba = dane_do_usuniecia.count()
 
-		if liczba == 0:
+		if not klucze and liczba == 0:
 			self.stdout.write(self.style.SUCCESS("Brak danych wrazliwych do usuniecia."))
 			return
 
 		self.stdout.write(
-			f"Znaleziono {liczba} rekordow danych wrazliwych do usuniecia (rejsy zakonczone przed {data_graniczna}):"
+			f"Znaleziono {len(klucze)} kluczy danych i {liczba} rekordow danych wrazliwych do usuniecia "
+			f"(rejsy zakonczone przed {data_graniczna}):"
 		)
-
-		for dane in dane_do_usuniecia:
-			zgloszenie = dane.zgloszenie
-			rejs = zgloszenie.rejs
-			self.stdout.write(
-				f"  - {zgloszenie.imie} {zgloszenie.nazwisko} (rejs: {rejs.nazwa}, zakonczony: {rejs.do})"
-			)
+		for _, rejs_nazwa, rejs_do in klucze:
+			self.stdout.write(f"  - klucz danych rejsu: {rejs_nazwa} (zakonczony: {rejs_do})")
 
 		if dry_run:
 			self.stdout.write(
@@ -69,18 +127,94 @@ class Command(BaseCommand):
 			)
 			return
 
-		for dane in dane_do_usuniecia:
-			zgloszenie = dane.zgloszenie
-			AuditLog.objects.create(
-				uzytkownik=None,
-				akcja="usuniecie",
-				model_name="Dane_Dodatkowe",
-				object_id=dane.pk,
-				object_repr=f"Dane dla: {zgloszenie.imie} {zgloszenie.nazwisko}",
-				szczegoly=f"Automatyczne usuniecie po {dni_retencji} dniach od zakonczenia rejsu. "
-				f"Rejs: {zgloszenie.rejs.nazwa}, zakonczony: {zgloszenie.rejs.do}",
-			)
-
-		usuniete, _ = dane_do_usuniecia.delete()
+		zniszczone = 0
+		for klucz_id, rejs_nazwa, rejs_do in klucze:
+			# Każdy rejs w osobnej transakcji - blokady trwają tyle, ile zmiana jednego rejsu
+			with transaction.atomic():
+				zniszczone += klucze_do_zniszczenia.filter(pk=klucz_id).zniszcz()
+				# Indeks PESEL pozwalałby nadal powiązać osoby - usuwamy go razem z kluczem
+				Dane_Dodatkowe.objects.filter(zgloszenie__rejs__klucz__pk=klucz_id).update(pesel_indeks="")
+				AuditLog.objects.create(
+					uzytkownik=None,
+					akcja="usuniecie",
+					model_name="KluczRejsu",
+					object_id=klucz_id,
+					object_repr=f"Klucz danych rejsu: {rejs_nazwa}",
+					szczegoly=f"Automatyczne zniszczenie klucza danych po {dni_retencji} dniach od zakonczenia "
+					f"rejsu (dane uczestnikow nieodwracalne). Rejs: {rejs_nazwa}, zakonczony: {rejs_do}",
+				)
+		self.stdout.write(self.style.SUCCESS(f"\nZniszczono {zniszczone} kluczy danych rejsow."))
+
+		if options["bez_sprzatania"] or liczba == 0:
+			return
 
-		self.stdout.write(self.style.SUCCESS(f"\nUsunieto {usuniete} rekordow danych wrazliwych."))
+		punkt = PunktKontrolny(options["punkt_kontrolny"] or domyslna_sciezka("usun_dane_wrazliwe"))
+		stan = {} if options["od_nowa"] else punkt.wczytaj()
+		if stan.get("data_graniczna") != data_graniczna.isoformat():
+			# Inna data graniczna obejmuje inne rejsy - zapisany postęp nie dotyczy tego przebiegu
+			stan = {"data_graniczna": data_graniczna.isoformat(), "ostatnie_pk": 0}
+		elif stan["ostatnie_pk"]:
+			self.stdout.write(f"Wznawianie od zapisanego postepu (pk > {stan['ostatnie_pk']})")
+
+		usuniete = self._sprzataj(dane_do_usuniecia, dni_retencji, options, punkt, stan)
+		punkt.usun()
+		self.stdout.write(self.style.SUCCESS(f"Usunieto {usuniete} rekordow danych wrazliwych."))
+
+	def _usun_odrzucone_z_kolejki(self, dni, dry_run):
+		"""Usuwa zgloszenia odrzucone z kolejki trybu szczytowego (jawne dane osobowe w JSON)."""
+		odrzucone = ZgloszenieOczekujace.objects.exclude(powod_odrzucenia="").filter(
+			data_zgloszenia__lt=timezone.now() - timedelta(days=dni)
+		)
+		if dry_run:
+			self.stdout.write(f"Zgloszenia odrzucone z kolejki do usuniecia: {odrzucone.count()}")
+			return
+		with transaction.atomic():
+			liczba, _ = odrzucone.delete()
+			if liczba:
+				AuditLog.objects.create(
+					uzytkownik=None,
+					akcja="usuniecie",
+					model_name="ZgloszenieOczekujace",
+					object_repr=f"Zgloszenia odrzucone z kolejki: {liczba}",
+					szczegoly=f"Automatyczne usuniecie zgloszen odrzuconych z kolejki po {dni} dniach od zgloszenia.",
+				)
+		if liczba:
+			self.stdout.write(self.style.SUCCESS(f"Usunieto {liczba} zgloszen odrzuconych z kolejki."))
+
+	def _sprzataj(self, dane_do_usuniecia, dni_retencji, options, punkt, stan):
+		"""Fizycznie usuwa wiersze paczkami, aby nie blokowac tabeli jedna duza transakcja."""
+		rozmiar = options["rozmiar_paczki"]
+		start = time.monotonic()
+		usuniete = 0
+		while True:
+			wiersze = list(
+				dane_do_usuniecia.filter(pk__gt=stan["ostatnie_pk"])
+				.order_by("pk")
+				.values_list("pk", "zgloszenie__imie", "zgloszenie__nazwisko", "zgloszenie__rejs__nazwa")[:rozmiar]
+			)
+			if not wiersze:
+				return usuniete
+
+			with transaction.atomic():
+				AuditLog.objects.bulk_create(
+					AuditLog(
+						uzytkownik=None,
+						akcja="usuniecie",
+						model_name="Dane_Dodatkowe",
+						object_id=pk,
+						object_repr=f"Dane wrazliwe: {imie} {nazwisko}",
+						szczegoly=f"Automatyczne usuniecie po {dni_retencji} dniach od zakonczenia rejsu {rejs_nazwa}.",
+					)
+					for pk, imie, nazwisko, rejs_nazwa in wiersze
+				)
+				# only("pk") - usuwane obiekty nie są odszyfrowywane przy wczytaniu
+				liczba, _ = Dane_Dodatkowe.objects.filter(pk__in=[w[0] for w in wiersze]).only("pk").delete()
+
+			usuniete += liczba
+			stan["ostatnie_pk"] = wiersze[-1][0]
+			punkt.zapisz(stan)
+
+			tempo = usuniete / max(time.monotonic() - start, 1e-9)
+			self.stdout.write(f"  {usuniete} rekordow ({tempo:.0f} rekordow/s)")
+			if options["pauza"]:
+				time.sleep(options["pauza"])
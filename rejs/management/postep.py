@@ -0,0 +1,49 @@
+"""
+Punkty kontrolne dla długotrwałych komend zarządzania.
+
+Komendy przetwarzające tabele paczkami zapisują po każdej zatwierdzonej
+paczce stan (np. ostatni przetworzony klucz główny), dzięki czemu po
+przerwaniu można je uruchomić ponownie i kontynuować od miejsca przerwania.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+
+from django.conf import settings
+
+
+def domyslna_sciezka(nazwa: str) -> Path:
+	"""Zwraca domyślną ścieżkę pliku postępu dla komendy o danej nazwie."""
+	return Path(settings.BASE_DIR) / ".postep" / f"{nazwa}.json"
+
+
+class PunktKontrolny:
+	"""
+	Plik JSON ze stanem operacji.
+
+	Zapis jest atomowy (plik tymczasowy + os.replace), więc przerwanie
+	procesu w trakcie zapisu nie zostawi uszkodzonego stanu.
+	"""
+
+	def __init__(self, sciezka: str | Path):
+		self.sciezka = Path(sciezka)
+
+	def wczytaj(self) -> dict:
+		"""Zwraca zapisany stan lub pusty słownik, gdy operacja nie była przerwana."""
+		try:
+			return json.loads(self.sciezka.read_text(encoding="utf-8"))
+		except FileNotFoundError:
+			return {}
+
+	def zapisz(self, stan: dict) -> None:
+		self.sciezka.parent.mkdir(parents=True, exist_ok=True)
+		tymczasowy = self.sciezka.with_suffix(".tmp")
+		tymczasowy.write_text(json.dumps(stan, default=str), encoding="utf-8")
+		os.replace(tymczasowy, self.sciezka)
+
+	def usun(self) -> None:
+		"""Usuwa plik po pomyślnym zakończeniu operacji."""
+		self.sciezka.unlink(missing_ok=True)
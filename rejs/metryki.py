@@ -0,0 +1,234 @@
+"""
+Metryki aplikacji: liczniki i histogramy w pamięci procesu.
+
+Wartości eksportowane są w formacie tekstowym Prometheusa (widok "metryki",
+tylko dla personelu). Przy kilku procesach roboczych (gunicorn) każdy proces
+zapisuje swoje wartości do pliku <pid>-<czas startu>.json w katalogu
+METRYKI_KATALOG (najwyżej raz na sekundę i przy zakończeniu procesu), a eksport
+sumuje wszystkie pliki - bez zewnętrznych usług. Bez ustawionego katalogu
+eksport obejmuje tylko bieżący proces.
+
+Pliki zakończonych procesów zostają (liczniki są narastające) - czas startu
+w nazwie sprawia, że proces z ponownie użytym pidem nie nadpisuje pliku
+poprzednika. Katalog należy czyścić przy każdym wdrożeniu, przed startem
+procesów roboczych.
+"""
+
+from __future__ import annotations
+
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+# Przedziały histogramów czasu w sekundach
+DOMYSLNE_PRZEDZIALY = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Co ile sekund proces zapisuje swoje wartości do katalogu metryk
+INTERWAL_ZAPISU = 1.0
+
+
+def _etykiety(etykiety: dict) -> str:
+	"""Etykiety w zapisie Prometheusa (posortowane - ten sam zestaw daje ten sam klucz)."""
+	return ",".join(f'{k}="{_cytuj(v)}"' for k, v in sorted(etykiety.items()))
+
+
+def _cytuj(wartosc) -> str:
+	return str(wartosc).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _przedzial(etykiety: str, granica) -> str:
+	return ",".join(filter(None, [etykiety, f'le="{granica}"']))
+
+
+class Licznik:
+	"""Narastający licznik zdarzeń."""
+
+	typ = "counter"
+
+	def __init__(self, rejestr: RejestrMetryk, nazwa: str, opis: str):
+		self.rejestr = rejestr
+		self.nazwa = nazwa
+		self.opis = opis
+
+	def inc(self, wartosc: float = 1, **etykiety) -> None:
+		self.rejestr._dodaj(self.nazwa, _etykiety(etykiety), wartosc)
+
+
+class Histogram:
+	"""Rozkład wartości (np. czasów) w przedziałach, z sumą i liczbą obserwacji."""
+
+	typ = "histogram"
+
+	def __init__(self, rejestr: RejestrMetryk, nazwa: str, opis: str, przedzialy=DOMYSLNE_PRZEDZIALY):
+		self.rejestr = rejestr
+		self.nazwa = nazwa
+		self.opis = opis
+		self.przedzialy = tuple(przedzialy)
+
+	def obserwuj(self, wartosc: float, **etykiety) -> None:
+		self.rejestr._obserwuj(self, _etykiety(etykiety), wartosc)
+
+	@contextmanager
+	def mierz(self, **etykiety):
+		"""Zapisuje czas wykonania bloku (także zakończonego wyjątkiem)."""
+		start = time.perf_counter()
+		try:
+			yield
+		finally:
+			self.obserwuj(time.perf_counter() - start, **etykiety)
+
+
+class RejestrMetryk:
+	"""
+	Rejestr metryk procesu.
+
+	Metody:
+		licznik, histogram - tworzą i rejestrują metrykę
+		zapisz - zapisuje wartości procesu do katalogu metryk
+		eksport - zwraca metryki wszystkich procesów w formacie tekstowym
+		wyczysc - zeruje wartości procesu (testy)
+	"""
+
+	def __init__(self):
+		self._blokada = threading.Lock()
+		self._metryki: dict[str, Licznik | Histogram] = {}
+		self._wartosci: dict[str, dict[str, float | list[float]]] = {}
+		self._ostatni_zapis = 0.0
+		# (pid, czas startu) procesu zapisującego - po fork() proces potomny zapisuje do własnego pliku
+		self._proces: tuple[int, int] | None = None
+
+	def licznik(self, nazwa: str, opis: str) -> Licznik:
+		return self._zarejestruj(Licznik(self, nazwa, opis))
+
+	def histogram(self, nazwa: str, opis: str, przedzialy=DOMYSLNE_PRZEDZIALY) -> Histogram:
+		return self._zarejestruj(Histogram(self, nazwa, opis, przedzialy))
+
+	def _zarejestruj(self, metryka):
+		self._metryki[metryka.nazwa] = metryka
+		self._wartosci.setdefault(metryka.nazwa, {})
+		return metryka
+
+	def _dodaj(self, nazwa: str, etykiety: str, wartosc: float) -> None:
+		with self._blokada:
+			wartosci = self._wartosci[nazwa]
+			wartosci[etykiety] = wartosci.get(etykiety, 0) + wartosc
+		self._zapisz_okresowo()
+
+	def _obserwuj(self, histogram: Histogram, etykiety: str, wartosc: float) -> None:
+		with self._blokada:
+			# Liczniki przedziałów (nie narastająco), następnie suma i liczba obserwacji
+			stan = self._wartosci[histogram.nazwa].setdefault(etykiety, [0] * (len(histogram.przedzialy) + 2))
+			for i, granica in enumerate(histogram.przedzialy):
+				if wartosc <= granica:
+					stan[i] += 1
+					break
+			stan[-2] += wartosc
+			stan[-1] += 1
+		self._zapisz_okresowo()
+
+	def _katalog(self) -> Path | None:
+		katalog = getattr(settings, "METRYKI_KATALOG", "")
+		return Path(katalog) if katalog else None
+
+	def _zapisz_okresowo(self) -> None:
+		if self._katalog() and time.monotonic() - self._ostatni_zapis >= INTERWAL_ZAPISU:
+			self.zapisz()
+
+	def zapisz(self) -> None:
+		"""Zapisuje wartości procesu do <katalog>/<pid>-<czas startu>.json (atomowo, przez plik tymczasowy)."""
+		katalog = self._katalog()
+		if katalog is None:
+			return
+		with self._blokada:
+			dane = json.dumps(self._wartosci)
+			self._ostatni_zapis = time.monotonic()
+			if self._proces is None or self._proces[0] != os.getpid():
+				self._proces = (os.getpid(), time.time_ns())
+			pid, start = self._proces
+		katalog.mkdir(parents=True, exist_ok=True)
+		plik = katalog / f"{pid}-{start}.json"
+		tymczasowy = plik.with_name(f"{plik.name}.{threading.get_ident()}.tmp")
+		tymczasowy.write_text(dane, encoding="utf-8")
+		os.replace(tymczasowy, plik)
+
+	def _zbierz(self) -> dict[str, dict[str, float | list[float]]]:
+		"""Sumuje wartości wszystkich procesów (lub tylko bieżącego bez katalogu metryk)."""
+		katalog = self._katalog()
+		if katalog is None:
+			with self._blokada:
+				return json.loads(json.dumps(self._wartosci))
+
+		self.zapisz()
+		suma: dict[str, dict] = {}
+		for plik in sorted(katalog.glob("*.json")):
+			try:
+				dane = json.loads(plik.read_text(encoding="utf-8"))
+			except (OSError, ValueError):
+				continue
+			for nazwa, wartosci in dane.items():
+				cel = suma.setdefault(nazwa, {})
+				for etykiety, wartosc in wartosci.items():
+					if isinstance(wartosc, list):
+						obecna = cel.setdefault(etykiety, [0] * len(wartosc))
+						cel[etykiety] = [a + b for a, b in zip(obecna, wartosc)]
+					else:
+						cel[etykiety] = cel.get(etykiety, 0) + wartosc
+		return suma
+
+	def eksport(self) -> str:
+		"""Metryki w formacie tekstowym Prometheusa (text/plain; version=0.0.4)."""
+		wartosci = self._zbierz()
+		linie = []
+		for nazwa, metryka in sorted(self._metryki.items()):
+			linie += [f"# HELP {nazwa} {metryka.opis}", f"# TYPE {nazwa} {metryka.typ}"]
+			for etykiety, wartosc in sorted(wartosci.get(nazwa, {}).items()):
+				if metryka.typ == "counter":
+					linie.append(f"{nazwa}{{{etykiety}}} {wartosc:g}" if etykiety else f"{nazwa} {wartosc:g}")
+					continue
+				narastajaco = 0
+				for granica, liczba in zip(metryka.przedzialy, wartosc[:-2]):
+					narastajaco += liczba
+					linie.append(f"{nazwa}_bucket{{{_przedzial(etykiety, granica)}}} {narastajaco:g}")
+				linie.append(f"{nazwa}_bucket{{{_przedzial(etykiety, '+Inf')}}} {wartosc[-1]:g}")
+				przyrostek = f"{{{etykiety}}}" if etykiety else ""
+				linie += [f"{nazwa}_sum{przyrostek} {wartosc[-2]:g}", f"{nazwa}_count{przyrostek} {wartosc[-1]:g}"]
+		return "\n".join(linie) + "\n"
+
+	def wyczysc(self) -> None:
+		with self._blokada:
+			for wartosci in self._wartosci.values():
+				wartosci.clear()
+
+
+# Domyślny rejestr aplikacji; zapis przy zakończeniu procesu (np. wymiana procesu roboczego
+# gunicorna po max_requests) nie gubi przyrostów z ostatniej sekundy
+rejestr = RejestrMetryk()
+atexit.register(rejestr.zapisz)
+
+zgloszenia = rejestr.licznik("rejs_zgloszenia_total", "Utworzone zgloszenia na rejsy")
+dane_dodatkowe = rejestr.licznik("rejs_dane_dodatkowe_total", "Zapisane formularze danych dodatkowych")
+powiadomienia = rejestr.licznik("rejs_powiadomienia_total", "Powiadomienia wyslane przez SerwisNotyfikacji")
+emaile_wyslane = rejestr.licznik("rejs_emaile_wyslane_total", "Wyslane emaile")
+emaile_bledy = rejestr.licznik("rejs_emaile_bledy_total", "Emaile, ktorych nie udalo sie wyslac")
+wpisy_audytu = rejestr.licznik("rejs_audyt_wpisy_total", "Wpisy w logu audytu")
+odszyfrowania = rejestr.licznik("rejs_odszyfrowania_total", "Odszyfrowane wartosci pol szyfrowanych")
+czas_raportu = rejestr.histogram("rejs_raport_sekundy", "Czas generowania raportu Excel rejsu")
+czas_widoku = rejestr.histogram("rejs_widok_sekundy", "Czas obslugi zadan przez widoki aplikacji")
+
+
+def mierzony(widok):
+	"""Dekorator widoku - zapisuje czas obsługi żądania w histogramie rejs_widok_sekundy."""
+
+	@functools.wraps(widok)
+	def opakowany(request, *args, **kwargs):
+		with czas_widoku.mierz(widok=widok.__name__):
+			return widok(request, *args, **kwargs)
+
+	return opakowany
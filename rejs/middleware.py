@@ -0,0 +1,257 @@
+"""
+Middleware pomiaru wydajności i profilowania żądań.
+
+PomiarZapytanMiddleware liczy zapytania SQL i mierzy czas spędzony w bazie
+danych, renderowaniu szablonów i wysyłce emaili. Wyniki trafiają do nagłówka
+Server-Timing (widoczne w narzędziach deweloperskich przeglądarki) i do logu
+"rejs.middleware" jako linia klucz=wartość.
+
+Budżety zapytań (ustawienie BUDZETY_ZAPYTAN, klucze to nazwy widoków z
+resolver_match.view_name) wykrywają regresje N+1: przekroczenie zgłasza
+wyjątek PrzekroczonoBudzetZapytan, gdy BUDZET_ZAPYTAN_WYJATEK jest włączone
+(środowisko deweloperskie, CI), a w pozostałych przypadkach ostrzeżenie w logu.
+
+ProfilowanieMiddleware uruchamia cProfile i próbkowanie stosu wokół widoku dla
+wybranych użytkowników personelu (PROFILOWANIE_UZYTKOWNICY) lub losowego
+odsetka żądań (PROFILOWANIE_PROCENT). Do katalogu PROFILOWANIE_KATALOG zapisuje
+plik .prof (pstats, snakeviz), .collapsed (stosy w formacie flamegraph.pl /
+speedscope) i .json z opisem żądania - podsumowuje je komenda profile_zadan.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+KATEGORIE = ("db", "szablony", "email")
+
+_biezacy_pomiar: ContextVar[PomiarZadania | None] = ContextVar("pomiar_zadania", default=None)
+_szablony_instrumentowane = False
+
+# Interwał próbkowania stosu w sekundach
+INTERWAL_PROBKOWANIA = 0.001
+
+# Tylko jeden profiler cProfile może być aktywny w procesie
+_blokada_profilera = threading.Lock()
+
+
+class PrzekroczonoBudzetZapytan(Exception):
+	"""Widok wykonał więcej zapytań SQL, niż pozwala jego budżet."""
+
+
+class PomiarZadania:
+	"""Liczba zapytań i czasy (w sekundach) zebrane podczas jednego żądania."""
+
+	def __init__(self):
+		self.zapytania = 0
+		self.czasy = defaultdict(float)
+
+	def __call__(self, execute, sql, params, many, context):
+		"""Wrapper connection.execute_wrapper - liczy i mierzy każde zapytanie."""
+		start = time.perf_counter()
+		try:
+			return execute(sql, params, many, context)
+		finally:
+			self.zapytania += 1
+			self.czasy["db"] += time.perf_counter() - start
+
+	def server_timing(self) -> str:
+		"""Wartość nagłówka Server-Timing (czasy w milisekundach)."""
+		metryki = [f'db;dur={self.czasy["db"] * 1000:.1f};desc="{self.zapytania} zapytan"']
+		metryki += [f"{k};dur={self.czasy[k] * 1000:.1f}" for k in (*KATEGORIE[1:], "calkowity")]
+		return ", ".join(metryki)
+
+
+@contextmanager
+def mierz(kategoria: str):
+	"""Dolicza czas bloku do kategorii pomiaru bieżącego żądania (poza żądaniem nic nie robi)."""
+	pomiar = _biezacy_pomiar.get()
+	if pomiar is None:
+		yield
+		return
+	start = time.perf_counter()
+	try:
+		yield
+	finally:
+		pomiar.czasy[kategoria] += time.perf_counter() - start
+
+
+def _instrumentuj_szablony() -> None:
+	"""Obejmuje pomiarem renderowanie szablonów silnika Django (raz na proces)."""
+	global _szablony_instrumentowane
+	if _szablony_instrumentowane:
+		return
+	from django.template.backends.django import Template
+
+	render = Template.render
+
+	def render_z_pomiarem(self, *args, **kwargs):
+		with mierz("szablony"):
+			return render(self, *args, **kwargs)
+
+	Template.render = render_z_pomiarem
+	_szablony_instrumentowane = True
+
+
+class PomiarZapytanMiddleware:
+	"""
+	Mierzy zapytania SQL i czasy żądania, dodaje nagłówek Server-Timing
+	i pilnuje budżetów zapytań widoków.
+
+	Włączane zmienną DJANGO_POMIAR_ZAPYTAN lub DJANGO_BUDZET_ZAPYTAN_WYJATEK.
+	"""
+
+	def __init__(self, get_response):
+		self.get_response = get_response
+		_instrumentuj_szablony()
+
+	def __call__(self, request):
+		pomiar = PomiarZadania()
+		token = _biezacy_pomiar.set(pomiar)
+		start = time.perf_counter()
+		try:
+			with connection.execute_wrapper(pomiar):
+				response = self.get_response(request)
+		finally:
+			_biezacy_pomiar.reset(token)
+		pomiar.czasy["calkowity"] = time.perf_counter() - start
+
+		widok = request.resolver_match.view_name if request.resolver_match else ""
+		response["Server-Timing"] = pomiar.server_timing()
+		logger.info(
+			"widok=%s metoda=%s status=%d zapytania=%d db_ms=%.1f szablony_ms=%.1f email_ms=%.1f calkowity_ms=%.1f",
+			widok or "-",
+			request.method,
+			response.status_code,
+			pomiar.zapytania,
+			*(pomiar.czasy[k] * 1000 for k in (*KATEGORIE, "calkowity")),
+		)
+		self._sprawdz_budzet(widok, request.method, pomiar.zapytania)
+		return response
+
+	def _sprawdz_budzet(self, widok: str, metoda: str, zapytania: int) -> None:
+		budzet = getattr(settings, "BUDZETY_ZAPYTAN", {}).get(widok)
+		if budzet is None or zapytania <= budzet:
+			return
+		komunikat = f"Widok {widok} ({metoda}) wykonał {zapytania} zapytań SQL, budżet: {budzet}"
+		if getattr(settings, "BUDZET_ZAPYTAN_WYJATEK", False):
+			raise PrzekroczonoBudzetZapytan(komunikat)
+		logger.warning(komunikat)
+
+
+class ProbkowanieStosu(threading.Thread):
+	"""
+	Wątek zapisujący co INTERWAL_PROBKOWANIA stos wskazanego wątku.
+
+	Wynik (stosy.items()) to gotowe linie formatu "collapsed": ramki od
+	najbardziej zewnętrznej, oddzielone średnikami, i liczba próbek.
+	"""
+
+	def __init__(self, watek_id: int, interwal: float = INTERWAL_PROBKOWANIA):
+		super().__init__(daemon=True)
+		self.watek_id = watek_id
+		self.interwal = interwal
+		self.stosy = Counter()
+		self._koniec = threading.Event()
+
+	def run(self):
+		while not self._koniec.wait(self.interwal):
+			ramka = sys._current_frames().get(self.watek_id)
+			ramki = []
+			while ramka is not None:
+				kod = ramka.f_code
+				ramki.append(f"{kod.co_name} ({os.path.basename(kod.co_filename)}:{kod.co_firstlineno})")
+				ramka = ramka.f_back
+			if ramki:
+				self.stosy[";".join(reversed(ramki))] += 1
+
+	def zatrzymaj(self) -> None:
+		self._koniec.set()
+		self.join()
+
+
+class ProfilowanieMiddleware:
+	"""
+	Profiluje wybrane żądania i zapisuje wyniki do PROFILOWANIE_KATALOG.
+
+	Umieszczane na końcu MIDDLEWARE - obejmuje widok i renderowanie odpowiedzi,
+	a użytkownik jest już uwierzytelniony. Bez ustawionego katalogu wyłączone.
+	"""
+
+	def __init__(self, get_response):
+		if not getattr(settings, "PROFILOWANIE_KATALOG", ""):
+			raise MiddlewareNotUsed
+		self.get_response = get_response
+		# Numer kolejny pliku - next() na itertools.count jest atomowe także przy serwerze wielowątkowym
+		self._licznik = itertools.count(1)
+
+	def _czy_profilowac(self, request) -> bool:
+		uzytkownik = getattr(request, "user", None)
+		if (
+			uzytkownik is not None
+			and uzytkownik.is_staff
+			and uzytkownik.get_username() in getattr(settings, "PROFILOWANIE_UZYTKOWNICY", ())
+		):
+			return True
+		return random.random() * 100 < getattr(settings, "PROFILOWANIE_PROCENT", 0)
+
+	def __call__(self, request):
+		# Równoległe żądania (serwer wielowątkowy) nie są profilowane - cProfile działa raz na proces
+		if not self._czy_profilowac(request) or not _blokada_profilera.acquire(blocking=False):
+			return self.get_response(request)
+		try:
+			profiler = cProfile.Profile()
+			probkowanie = ProbkowanieStosu(threading.get_ident())
+			probkowanie.start()
+			start = time.perf_counter()
+			profiler.enable()
+			try:
+				response = self.get_response(request)
+			finally:
+				profiler.disable()
+				czas = time.perf_counter() - start
+				probkowanie.zatrzymaj()
+		finally:
+			_blokada_profilera.release()
+
+		self._zapisz(request, response, czas, profiler, probkowanie.stosy)
+		return response
+
+	def _zapisz(self, request, response, czas, profiler, stosy) -> None:
+		katalog = settings.PROFILOWANIE_KATALOG
+		os.makedirs(katalog, exist_ok=True)
+		teraz = timezone.now()
+		nazwa = os.path.join(katalog, f"{teraz:%Y%m%d-%H%M%S}-{os.getpid()}-{next(self._licznik)}")
+
+		profiler.dump_stats(f"{nazwa}.prof")
+		with open(f"{nazwa}.collapsed", "w", encoding="utf-8") as plik:
+			plik.writelines(f"{stos} {liczba}\n" for stos, liczba in stosy.most_common())
+		opis = {
+			"data": teraz.isoformat(),
+			"sciezka": request.path,
+			"metoda": request.method,
+			"widok": request.resolver_match.view_name if request.resolver_match else "",
+			"status": response.status_code,
+			"czas_ms": round(czas * 1000, 1),
+			"uzytkownik": request.user.get_username() if getattr(request, "user", None) else "",
+		}
+		with open(f"{nazwa}.json", "w", encoding="utf-8") as plik:
+			json.dump(opis, plik, ensure_ascii=False)
+		logger.info("Zapisano profil żądania %s %s (%.1f ms): %s", request.method, request.path, czas * 1000, nazwa)
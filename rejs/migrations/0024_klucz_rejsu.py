@@ -0,0 +1,39 @@
+# Generated by Django 6.0 on 2026-10-19 09:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+import rejs.modele.pola
+
+
+class Migration(migrations.Migration):
+	dependencies = [
+		("rejs", "0023_fix_unknown_defaults"),
+	]
+
+	operations = [
+		migrations.CreateModel(
+			name="KluczRejsu",
+			fields=[
+				("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+				(
+					"klucz",
+					rejs.modele.pola.EncryptedTextField(
+						blank=True, null=True, verbose_name="Klucz danych (zaszyfrowany)"
+					),
+				),
+				("utworzono", models.DateTimeField(auto_now_add=True, verbose_name="Utworzono")),
+				("zniszczono", models.DateTimeField(blank=True, null=True, verbose_name="Zniszczono")),
+				(
+					"rejs",
+					models.OneToOneField(
+						on_delete=django.db.models.deletion.CASCADE, related_name="klucz", to="rejs.rejs"
+					),
+				),
+			],
+			options={
+				"verbose_name": "Klucz danych rejsu",
+				"verbose_name_plural": "Klucze danych rejsów",
+			},
+		),
+	]
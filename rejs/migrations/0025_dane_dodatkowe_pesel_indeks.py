@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-19 10:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+	dependencies = [
+		("rejs", "0024_klucz_rejsu"),
+	]
+
+	operations = [
+		migrations.AddField(
+			model_name="dane_dodatkowe",
+			name="pesel_indeks",
+			field=models.CharField(blank=True, db_index=True, default="", editable=False, max_length=64),
+		),
+	]
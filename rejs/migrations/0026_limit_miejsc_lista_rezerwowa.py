@@ -0,0 +1,55 @@
+# Generated by Django 6.0 on 2026-10-19 11:22
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def przelicz_zajete_miejsca(apps, schema_editor):
+	"""Licznik zajętych miejsc istniejących rejsów - wszystkie zgłoszenia poza odrzuconymi."""
+	Rejs = apps.get_model("rejs", "Rejs")
+	Zgloszenie = apps.get_model("rejs", "Zgloszenie")
+	liczba = (
+		Zgloszenie.objects.filter(rejs=OuterRef("pk"))
+		.exclude(status="Odrzucone")
+		.order_by()
+		.values("rejs")
+		.annotate(liczba=Count("pk"))
+		.values("liczba")
+	)
+	Rejs.objects.update(zajete_miejsca=Coalesce(Subquery(liczba), Value(0)))
+
+
+class Migration(migrations.Migration):
+	dependencies = [
+		("rejs", "0025_dane_dodatkowe_pesel_indeks"),
+	]
+
+	operations = [
+		migrations.AddField(
+			model_name="rejs",
+			name="limit_miejsc",
+			field=models.PositiveIntegerField(
+				blank=True,
+				help_text="Nowe zgłoszenia ponad limit trafiają na listę rezerwową. Puste - bez limitu.",
+				null=True,
+				verbose_name="Limit miejsc",
+			),
+		),
+		migrations.AddField(
+			model_name="rejs",
+			name="zajete_miejsca",
+			field=models.PositiveIntegerField(default=0, editable=False, verbose_name="Zajęte miejsca"),
+		),
+		migrations.AddField(
+			model_name="zgloszenie",
+			name="lista_rezerwowa",
+			field=models.BooleanField(
+				default=False,
+				editable=False,
+				help_text="Zgłoszenie czeka na zwolnienie miejsca na rejsie.",
+				verbose_name="Lista rezerwowa",
+			),
+		),
+		migrations.RunPython(przelicz_zajete_miejsca, migrations.RunPython.noop),
+	]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-19 11:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+	dependencies = [
+		("rejs", "0026_limit_miejsc_lista_rezerwowa"),
+	]
+
+	operations = [
+		migrations.AddField(
+			model_name="zgloszenie",
+			name="klucz_idempotencji",
+			field=models.UUIDField(blank=True, editable=False, null=True, unique=True),
+		),
+	]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0 on 2026-10-19 11:43
+
+import uuid
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+	dependencies = [
+		("rejs", "0027_zgloszenie_klucz_idempotencji"),
+	]
+
+	operations = [
+		migrations.CreateModel(
+			name="ZgloszenieOczekujace",
+			fields=[
+				("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+				("dane", models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+				("token", models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+				("klucz_idempotencji", models.UUIDField(blank=True, editable=False, null=True, unique=True)),
+				("data_zgloszenia", models.DateTimeField(auto_now_add=True)),
+				(
+					"rejs",
+					models.ForeignKey(
+						on_delete=django.db.models.deletion.CASCADE,
+						related_name="oczekujace_zgloszenia",
+						to="rejs.rejs",
+					),
+				),
+			],
+			options={
+				"verbose_name": "Zgłoszenie oczekujące",
+				"verbose_name_plural": "Zgłoszenia oczekujące",
+			},
+		),
+	]
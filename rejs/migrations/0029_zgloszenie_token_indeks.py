@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-19 12:04
+
+import uuid
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+	dependencies = [
+		("rejs", "0028_zgloszenieoczekujace"),
+	]
+
+	operations = [
+		migrations.AlterField(
+			model_name="zgloszenie",
+			name="token",
+			field=models.UUIDField(db_index=True, default=uuid.uuid4, editable=False, unique=True),
+		),
+	]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-19 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+	dependencies = [
+		("rejs", "0029_zgloszenie_token_indeks"),
+	]
+
+	operations = [
+		migrations.AddField(
+			model_name="zgloszenieoczekujace",
+			name="powod_odrzucenia",
+			field=models.CharField(blank=True, default="", editable=False, max_length=255),
+		),
+	]
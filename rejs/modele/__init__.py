@@ -6,18 +6,21 @@ Eksportuje wszystkie modele dla zachowania kompatybilności wstecznej.
 
 from rejs.modele.audyt import AuditLog
 from rejs.modele.finanse import Wplata
+from rejs.modele.klucze import KluczRejsu
 from rejs.modele.komunikacja import Ogloszenie
 from rejs.modele.pola import EncryptedTextField
 from rejs.modele.rejs import Rejs, Wachta
-from rejs.modele.zgloszenie import Dane_Dodatkowe, Zgloszenie
+from rejs.modele.zgloszenie import Dane_Dodatkowe, Zgloszenie, ZgloszenieOczekujace
 
 __all__ = [
 	"EncryptedTextField",
 	"Rejs",
 	"Wachta",
 	"Zgloszenie",
+	"ZgloszenieOczekujace",
 	"Dane_Dodatkowe",
 	"Wplata",
 	"Ogloszenie",
 	"AuditLog",
+	"KluczRejsu",
 ]
@@ -6,8 +6,10 @@ from django.contrib.auth import get_user_model
 from django.db import models
 from django.utils import timezone
 
+from rejs.modele.sledzenie import SledzenieZmianMixin
 
-class AuditLog(models.Model):
+
+class AuditLog(SledzenieZmianMixin, models.Model):
 	"""
 	Model przechowujący logi dostępu do danych wrażliwych.
 
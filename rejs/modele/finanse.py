@@ -4,10 +4,11 @@ Modele związane z finansami (wpłaty, zwroty).
 
 from django.db import models
 
+from rejs.modele.sledzenie import SledzenieZmianMixin
 from rejs.modele.zgloszenie import Zgloszenie
 
 
-class Wplata(models.Model):
+class Wplata(SledzenieZmianMixin, models.Model):
 	RODZAJ_WPLATA = "wplata"
 	RODZAJ_ZWROT = "zwrot"
 	rodzaje = [(RODZAJ_WPLATA, "Wpłata"), (RODZAJ_ZWROT, "Zwrot")]
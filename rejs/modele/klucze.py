@@ -0,0 +1,119 @@
+"""
+Model kluczy danych rejsów (szyfrowanie kopertowe).
+
+Dane wrażliwe uczestników rejsu szyfrowane są osobnym kluczem danych (DEK)
+przypisanym do rejsu. Sam klucz danych przechowywany jest zaszyfrowany kluczem
+głównym z DJANGO_FIELD_ENCRYPTION_KEY. Zniszczenie klucza danych sprawia, że
+wszystkie szyfrogramy rejsu stają się nieodwracalne (crypto-shredding) -
+niezależnie od liczby uczestników i bez przepisywania ich wierszy.
+"""
+
+from __future__ import annotations
+
+import time
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+from rejs.kryptografia import Szyfr
+from rejs.modele import pola
+from rejs.modele.pola import EncryptedTextField
+from rejs.modele.rejs import Rejs
+from rejs.modele.sledzenie import SledzenieZmianMixin
+
+# Jak długo proces może korzystać z odszyfrowanego klucza bez ponownego odczytu z bazy.
+# Ogranicza czas, przez jaki inne procesy widzą dane po zniszczeniu klucza.
+CZAS_PAMIECI_KLUCZY = getattr(settings, "FIELD_DATA_KEY_CACHE_SECONDS", 300)
+
+# id klucza -> (klucz w postaci jawnej lub None gdy zniszczony, Szyfr lub None, czas odczytu)
+_klucze_wg_id: dict[int, tuple[str | None, Szyfr | None, float]] = {}
+
+
+def _zapamietaj(klucz_id: int, klucz: str | None) -> None:
+	# Klucze danych szyfrują tym samym algorytmem co klucz główny
+	szyfr = Szyfr([klucz], pola.szyfr_glowny().algorytm) if klucz else None
+	_klucze_wg_id[klucz_id] = (klucz, szyfr, time.monotonic())
+
+
+def _aktualny(klucz_id: int) -> bool:
+	wpis = _klucze_wg_id.get(klucz_id)
+	return wpis is not None and time.monotonic() - wpis[2] < CZAS_PAMIECI_KLUCZY
+
+
+class KluczRejsuQuerySet(models.QuerySet):
+	def zniszcz(self) -> int:
+		"""
+		Niszczy klucze danych (crypto-shredding).
+
+		Szyfrogramy rejsów stają się nieodwracalne od razu; fizyczne usunięcie
+		wierszy z danymi może nastąpić później.
+
+		Returns:
+			Liczba zniszczonych kluczy
+		"""
+		ids = list(self.filter(zniszczono__isnull=True).values_list("pk", flat=True))
+		if not ids:
+			return 0
+		liczba = KluczRejsu.objects.filter(pk__in=ids).update(klucz=None, zniszczono=timezone.now())
+		for klucz_id in ids:
+			_zapamietaj(klucz_id, None)
+		return liczba
+
+
+class KluczRejsuManager(models.Manager.from_queryset(KluczRejsuQuerySet)):
+	def do_szyfrowania(self, rejs_id: int) -> tuple[int, Szyfr] | None:
+		"""
+		Zwraca (id klucza, Szyfr) klucza danych rejsu, tworząc klucz przy pierwszym użyciu.
+
+		Zwraca None, gdy klucz rejsu został już zniszczony - nowe dane szyfrowane
+		są wtedy kluczem głównym.
+		"""
+		# Bez pamięci podręcznej rejs -> klucz: id rejsów mogą zostać użyte ponownie po usunięciu,
+		# a szyfrowanie nieaktualnym kluczem oznaczałoby utratę danych. Zapis danych jest rzadki.
+		from cryptography.fernet import Fernet
+
+		# Równoległy pierwszy zapis danych rejsu: INSERT przegrywający na unikalnym rejs_id
+		# wycofuje get_or_create do punktu zapisu i odczytuje klucz utworzony przez drugi proces
+		klucz, _ = self.get_or_create(rejs_id=rejs_id, defaults={"klucz": Fernet.generate_key().decode()})
+		klucz_id = klucz.pk
+		_zapamietaj(klucz_id, klucz.klucz)
+
+		szyfr = _klucze_wg_id[klucz_id][1]
+		return None if szyfr is None else (klucz_id, szyfr)
+
+	def do_odszyfrowania(self, ids) -> dict[int, Szyfr | None]:
+		"""Zwraca szyfry kluczy danych o podanych id (None dla zniszczonych lub nieistniejących)."""
+		return {klucz_id: wpis[1] for klucz_id, wpis in self._pobierz(ids).items()}
+
+	def jawne(self, ids) -> dict[int, str | None]:
+		"""Zwraca klucze danych w postaci jawnej - do przekazania procesom roboczym puli odszyfrowywania."""
+		return {klucz_id: wpis[0] for klucz_id, wpis in self._pobierz(ids).items()}
+
+	def _pobierz(self, ids):
+		ids = set(ids)
+		brakujace = [klucz_id for klucz_id in ids if not _aktualny(klucz_id)]
+		if brakujace:
+			znalezione = dict(self.filter(pk__in=brakujace).values_list("pk", "klucz"))
+			for klucz_id in brakujace:
+				_zapamietaj(klucz_id, znalezione.get(klucz_id))
+		return {klucz_id: _klucze_wg_id[klucz_id] for klucz_id in ids}
+
+
+class KluczRejsu(SledzenieZmianMixin, models.Model):
+	rejs = models.OneToOneField(Rejs, on_delete=models.CASCADE, related_name="klucz")
+	# Klucz danych zaszyfrowany kluczem głównym; NULL po zniszczeniu
+	klucz = EncryptedTextField(null=True, blank=True, verbose_name="Klucz danych (zaszyfrowany)")
+	utworzono = models.DateTimeField(auto_now_add=True, verbose_name="Utworzono")
+	zniszczono = models.DateTimeField(null=True, blank=True, verbose_name="Zniszczono")
+
+	objects = KluczRejsuManager()
+
+	class Meta:
+		app_label = "rejs"
+		verbose_name = "Klucz danych rejsu"
+		verbose_name_plural = "Klucze danych rejsów"
+
+	def __str__(self) -> str:
+		stan = f"zniszczony {self.zniszczono:%Y-%m-%d}" if self.zniszczono else "aktywny"
+		return f"Klucz danych rejsu {self.rejs_id} ({stan})"
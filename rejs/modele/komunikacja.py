@@ -5,9 +5,10 @@ Modele związane z komunikacją (ogłoszenia).
 from django.db import models
 
 from rejs.modele.rejs import Rejs
+from rejs.modele.sledzenie import SledzenieZmianMixin
 
 
-class Ogloszenie(models.Model):
+class Ogloszenie(SledzenieZmianMixin, models.Model):
 	rejs = models.ForeignKey(Rejs, on_delete=models.CASCADE, related_name="ogloszenia")
 	data = models.DateTimeField(auto_now_add=True)
 	tytul = models.CharField(
@@ -2,22 +2,184 @@
 Niestandardowe pola modeli Django.
 """
 
-from cryptography.fernet import Fernet
+from __future__ import annotations
+
+import functools
+import os
+from collections import Counter
+from collections.abc import Iterable
+from concurrent.futures import BrokenExecutor
+
 from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Cast
+from django.utils.crypto import salted_hmac
+
+from rejs.kryptografia import (
+	ALGORYTMY,
+	Szyfr,
+	odszyfruj,
+	odszyfruj_paczke,
+	odszyfruj_rownolegle,
+	rozpakuj,
+)
+from rejs.metryki import odszyfrowania
+
+
+def algorytm_szyfrowania() -> str:
+	"""Algorytm nowych szyfrogramów z FIELD_ENCRYPTION_ALGORITHM (odczyt obsługuje wszystkie)."""
+	nazwa = getattr(settings, "FIELD_ENCRYPTION_ALGORITHM", "fernet")
+	if nazwa not in ALGORYTMY:
+		raise ImproperlyConfigured(
+			f"Nieznany FIELD_ENCRYPTION_ALGORITHM {nazwa!r}, dozwolone wartości: {', '.join(ALGORYTMY)}"
+		)
+	return ALGORYTMY[nazwa]
+
+
+# Sprawdzane przy imporcie - błędna konfiguracja zatrzymuje start, a nie pierwszy zapis
+ALGORYTM = algorytm_szyfrowania()
+
+# Etykiety metryki odszyfrowań
+_NAZWY_ALGORYTMOW = {v: k for k, v in ALGORYTMY.items()}
+
+# Poniżej tej liczby tokenów start puli procesów kosztuje więcej niż samo odszyfrowanie
+PROG_ODSZYFROWANIA_ROWNOLEGLEGO = getattr(settings, "FIELD_DECRYPT_PARALLEL_THRESHOLD", 5000)
+ROZMIAR_PACZKI_ODSZYFROWANIA = 1000
 
-fernet = Fernet(settings.DJANGO_FIELD_ENCRYPTION_KEY.encode())
+
+@functools.cache
+def szyfr_glowny() -> Szyfr:
+	"""
+	Szyfr kluczy głównych, tworzony przy pierwszym użyciu.
+
+	Import cryptography i wyprowadzenie kluczy AES nie obciążają startu procesów,
+	które nie dotykają pól szyfrowanych.
+	"""
+	return Szyfr(settings.DJANGO_FIELD_ENCRYPTION_KEYS, ALGORYTM)
+
+
+def _klucze_danych():
+	# Import wewnątrz funkcji - moduł klucze importuje to pole
+	from rejs.modele.klucze import KluczRejsu
+
+	return KluczRejsu.objects
 
 
 class EncryptedTextField(models.TextField):
-	"""Pole tekstowe z szyfrowaniem Fernet."""
+	"""
+	Pole tekstowe szyfrowane algorytmem z FIELD_ENCRYPTION_ALGORITHM (obsługa rotacji kluczy).
+
+	Jeśli model definiuje metodę klucz_danych(), zwracającą (id, Szyfr) klucza
+	danych, wartość szyfrowana jest tym kluczem i zapisywana w kopercie
+	z jego identyfikatorem (patrz rejs.kryptografia). W przeciwnym razie
+	używany jest klucz główny.
+	"""
 
 	def from_db_value(self, value, expression, connection):
 		if value is None:
 			return value
-		return fernet.decrypt(value.encode()).decode()
+		algorytm, klucz_id, _ = rozpakuj(value)
+		klucze = {} if klucz_id is None else _klucze_danych().do_odszyfrowania([klucz_id])
+		# Odczyt przez ORM liczony synchronicznie, wartość po wartości; odczyty hurtowe
+		# (odszyfruj_wiele) dodają jeden przyrost na algorytm
+		odszyfrowania.inc(algorytm=_NAZWY_ALGORYTMOW[algorytm])
+		return odszyfruj(szyfr_glowny(), value, klucze)
+
+	def pre_save(self, model_instance, add):
+		value = super().pre_save(model_instance, add)
+		klucz_danych = getattr(model_instance, "klucz_danych", None)
+		if not isinstance(value, str) or klucz_danych is None:
+			return value
+		klucz = klucz_danych()
+		if klucz is None:
+			return value
+		klucz_id, szyfr_danych = klucz
+		return surowa_wartosc(szyfr_danych.szyfruj(value, klucz_id))
 
 	def get_prep_value(self, value):
 		if value is None:
 			return value
-		return fernet.encrypt(value.encode()).decode()
+		return szyfr_glowny().szyfruj(value)
+
+
+def surowe(nazwa_pola: str) -> Cast:
+	"""
+	Wyrażenie zwracające szyfrogram pola bez odszyfrowania.
+
+	Użycie w values_list()/annotate() pozwala pobrać tokeny hurtowo
+	i odszyfrować je jednym wywołaniem odszyfruj_wiele().
+	"""
+	return Cast(nazwa_pola, output_field=models.TextField())
+
+
+def surowa_wartosc(szyfrogram: str | None) -> Value:
+	"""
+	Wyrażenie zapisujące gotowy szyfrogram bez ponownego szyfrowania.
+
+	Przypisane do atrybutu modelu przed bulk_update()/update() omija get_prep_value().
+	"""
+	return Value(szyfrogram, output_field=models.TextField())
+
+
+def odszyfruj_wiele(
+	tokeny: Iterable[str | None],
+	*,
+	prog: int | None = None,
+	procesy: int | None = None,
+) -> list[str | None]:
+	"""
+	Odszyfrowuje wiele szyfrogramów naraz, zachowując kolejność.
+
+	Małe zbiory odszyfrowywane są w bieżącym procesie. Powyżej progu tokeny
+	trafiają paczkami do puli procesów - HMAC i AES to czysta praca CPU,
+	więc wątki nie dałyby przyspieszenia.
+
+	Args:
+		tokeny: Szyfrogramy pobrane przez surowe(); None jest przepuszczane
+		prog: Minimalna liczba tokenów dla puli (domyślnie FIELD_DECRYPT_PARALLEL_THRESHOLD)
+		procesy: Liczba procesów roboczych (domyślnie liczba rdzeni)
+
+	Returns:
+		Lista odszyfrowanych wartości (None dla danych rejsów o zniszczonym kluczu)
+	"""
+	tokeny = list(tokeny)
+	prog = PROG_ODSZYFROWANIA_ROWNOLEGLEGO if prog is None else prog
+	procesy = procesy or os.cpu_count() or 1
+	koperty = [rozpakuj(t) for t in tokeny if t is not None]
+	klucze_ids = {klucz_id for _, klucz_id, _ in koperty if klucz_id is not None}
+	for algorytm, liczba in Counter(a for a, _, _ in koperty).items():
+		odszyfrowania.inc(liczba, algorytm=_NAZWY_ALGORYTMOW[algorytm])
+
+	if len(tokeny) < prog or procesy < 2:
+		return odszyfruj_paczke(szyfr_glowny(), tokeny, _klucze_danych().do_odszyfrowania(klucze_ids))
+
+	try:
+		return odszyfruj_rownolegle(
+			tokeny,
+			settings.DJANGO_FIELD_ENCRYPTION_KEYS,
+			procesy=procesy,
+			rozmiar_paczki=ROZMIAR_PACZKI_ODSZYFROWANIA,
+			klucze_danych=_klucze_danych().jawne(klucze_ids),
+		)
+	except (OSError, NotImplementedError, BrokenExecutor):
+		# Środowisko bez obsługi multiprocessing - wracamy do trybu sekwencyjnego
+		return odszyfruj_paczke(szyfr_glowny(), tokeny, _klucze_danych().do_odszyfrowania(klucze_ids))
+
+
+def indeks_slepy(wartosc: str | None, sol: str) -> str:
+	"""
+	Deterministyczny skrót HMAC wartości zaszyfrowanego pola (blind index).
+
+	Szyfrogramy Fernet są losowe, więc nie da się po nich wyszukiwać. Skrót
+	z kluczem FIELD_BLIND_INDEX_KEY pozwala porównywać wartości zapytaniem
+	po indeksie bazy, bez odszyfrowania i bez ujawniania samej wartości.
+	Sól rozdziela indeksy różnych pól.
+
+	Returns:
+		Skrót szesnastkowy lub pusty tekst dla braku wartości
+	"""
+	if not wartosc:
+		return ""
+	return salted_hmac(sol, wartosc, secret=settings.FIELD_BLIND_INDEX_KEY, algorithm="sha256").hexdigest()
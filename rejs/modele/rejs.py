@@ -5,8 +5,10 @@ Modele związane z rejsami i wachtami.
 from django.db import models
 from django.forms import ValidationError
 
+from rejs.modele.sledzenie import SledzenieZmianMixin
 
-class Rejs(models.Model):
+
+class Rejs(SledzenieZmianMixin, models.Model):
 	nazwa = models.CharField(max_length=200, null=False, blank=False)
 	od = models.DateField(null=False, blank=False, verbose_name="Data od")
 	do = models.DateField(null=False, blank=False, verbose_name="Data do")
@@ -16,10 +18,26 @@ class Rejs(models.Model):
 	zaliczka = models.DecimalField(default=500, max_digits=10, decimal_places=2)
 	opis = models.TextField(default="tutaj opis rejsu", blank=False, null=False)
 	aktywna_rekrutacja = models.BooleanField(default=True, verbose_name="Aktywna rekrutacja")
+	limit_miejsc = models.PositiveIntegerField(
+		null=True,
+		blank=True,
+		verbose_name="Limit miejsc",
+		help_text="Nowe zgłoszenia ponad limit trafiają na listę rezerwową. Puste - bez limitu.",
+	)
+	# Zgłoszenia zajmujące miejsce (poza listą rezerwową i odrzuconymi) - zmieniany tylko
+	# warunkowymi UPDATE z F() w SerwisRejestracji; save() go nie zapisuje, bo w obiekcie się nie zmienia
+	zajete_miejsca = models.PositiveIntegerField(default=0, editable=False, verbose_name="Zajęte miejsca")
 
 	def __str__(self) -> str:
 		return self.nazwa
 
+	@property
+	def wolne_miejsca(self) -> int | None:
+		"""Liczba wolnych miejsc (None - rejs bez limitu)."""
+		if self.limit_miejsc is None:
+			return None
+		return max(self.limit_miejsc - self.zajete_miejsca, 0)
+
 	@property
 	def reszta_do_zaplaty(self):
 		return self.cena - self.zaliczka
@@ -35,7 +53,7 @@ class Rejs(models.Model):
 		verbose_name_plural = "Rejsy"
 
 
-class Wachta(models.Model):
+class Wachta(SledzenieZmianMixin, models.Model):
 	rejs = models.ForeignKey(Rejs, on_delete=models.CASCADE, related_name="wachty")
 	nazwa = models.CharField(max_length=200)
 
@@ -0,0 +1,101 @@
+"""
+Śledzenie zmian pól modeli.
+
+Obiekt wczytany z bazy zapamiętuje wartości pól (słownik referencji, bez
+dodatkowych zapytań). save() istniejącego obiektu zapisuje tylko pola, które
+się od tego czasu zmieniły - krótsze UPDATE, bez ponownego szyfrowania
+niezmienionych pól EncryptedTextField i bez nadpisywania kolumn zmienianych
+równolegle zapytaniami update() (np. licznika miejsc rejsu). Zapis bez zmian
+nie wykonuje zapytania ani nie wysyła sygnałów.
+
+Sygnały post_save widzą wartości sprzed zapisu: has_changed() i
+wartosc_pierwotna() opisują właśnie zapisaną zmianę.
+"""
+
+from __future__ import annotations
+
+import copy
+
+from django.db import models
+
+
+class SledzenieZmianMixin:
+	"""
+	Domieszka modelu śledząca zmiany pól względem wartości wczytanych z bazy.
+
+	Metody:
+		has_changed - czy pole zmieniło się od wczytania (ostatniego zapisu)
+		wartosc_pierwotna - wartość pola wczytana z bazy
+		zmienione_pola - nazwy zmienionych pól (zapisywane przez save())
+	"""
+
+	# attname -> wartość z bazy; None - stan nieznany (nowy obiekt, obiekt z bulk_create)
+	_stan: dict | None = None
+
+	@classmethod
+	def from_db(cls, db, field_names, values):
+		instance = super().from_db(db, field_names, values)
+		instance._stan = {
+			nazwa: copy.deepcopy(wartosc) if isinstance(wartosc, (dict, list)) else wartosc
+			for nazwa, wartosc in zip(field_names, values)
+		}
+		return instance
+
+	def _zapamietaj(self, pola=None) -> None:
+		"""Zapamiętuje bieżące wartości wczytanych pól (wszystkich albo podanych nazw)."""
+		nazwy = None if pola is None else {self._meta.get_field(p).attname for p in pola}
+		stan = {} if nazwy is None or self._stan is None else self._stan
+		for pole in self._meta.concrete_fields:
+			if pole.attname in self.__dict__ and (nazwy is None or pole.attname in nazwy):
+				wartosc = self.__dict__[pole.attname]
+				stan[pole.attname] = copy.deepcopy(wartosc) if isinstance(wartosc, (dict, list)) else wartosc
+		self._stan = stan
+
+	def has_changed(self, pole: str) -> bool:
+		"""
+		Czy pole zmieniło się od wczytania z bazy (lub ostatniego zapisu).
+
+		Args:
+			pole: Nazwa pola (dla klucza obcego także attname, np. "wachta_id")
+
+		Returns:
+			True także dla obiektu o nieznanym stanie (nowy, z bulk_create)
+		"""
+		attname = self._meta.get_field(pole).attname
+		if self._stan is None:
+			return True
+		if attname not in self._stan:
+			# Pole odroczone (defer/only) - zmienione tylko, jeśli przypisano mu wartość
+			return attname in self.__dict__
+		return attname in self.__dict__ and self.__dict__[attname] != self._stan[attname]
+
+	def wartosc_pierwotna(self, pole: str):
+		"""Wartość pola wczytana z bazy (None, gdy stan obiektu jest nieznany lub pole nie było wczytane)."""
+		if self._stan is None:
+			return None
+		return self._stan.get(self._meta.get_field(pole).attname)
+
+	def zmienione_pola(self) -> set[str]:
+		"""Nazwy pól, które zmieniły się od wczytania z bazy (bez klucza głównego)."""
+		return {
+			pole.name for pole in self._meta.concrete_fields if not pole.primary_key and self.has_changed(pole.name)
+		}
+
+	def save(self, *args, **kwargs):
+		if (
+			not self._state.adding
+			and self._stan is not None
+			and kwargs.get("update_fields") is None
+			and not kwargs.get("force_insert")
+		):
+			# Pola auto_now ustawiane są przy każdym zapisie
+			auto_now = {
+				pole.name for pole in self._meta.concrete_fields if isinstance(pole, models.DateField) and pole.auto_now
+			}
+			kwargs["update_fields"] = self.zmienione_pola() | auto_now
+		super().save(*args, **kwargs)
+		self._zapamietaj(kwargs.get("update_fields"))
+
+	def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+		super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+		self._zapamietaj(fields)
@@ -8,13 +8,16 @@ import uuid
 from decimal import Decimal
 from typing import TYPE_CHECKING
 
-from django.db import models
-from django.db.models import Case, Sum, When
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.db.models import Case, DecimalField, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
 from django.forms import ValidationError
 from django.urls import reverse
 
-from rejs.modele.pola import EncryptedTextField
+from rejs.modele.pola import EncryptedTextField, indeks_slepy
 from rejs.modele.rejs import Rejs, Wachta
+from rejs.modele.sledzenie import SledzenieZmianMixin
 
 if TYPE_CHECKING:
 	from django.db.models.manager import RelatedManager
@@ -22,7 +25,38 @@ if TYPE_CHECKING:
 	from rejs.modele.finanse import Wplata
 
 
-class Zgloszenie(models.Model):
+class ZgloszenieQuerySet(models.QuerySet):
+	def z_finansami(self) -> ZgloszenieQuerySet:
+		"""
+		Dodaje adnotacje _suma_wplat i _do_zaplaty liczone w SQL.
+
+		Z adnotacjami właściwości suma_wplat i do_zaplaty nie wykonują osobnego
+		zapytania dla każdego zgłoszenia, a wartości można sortować i filtrować.
+		Suma liczona jest podzapytaniem, więc inne złączenia jej nie zawyżają.
+		"""
+		from rejs.modele.finanse import Wplata
+
+		suma = (
+			Wplata.objects.filter(zgloszenie=OuterRef("pk"))
+			.order_by()
+			.values("zgloszenie")
+			.annotate(
+				suma=Sum(
+					Case(
+						When(rodzaj=Wplata.RODZAJ_ZWROT, then=-F("kwota")),
+						default=F("kwota"),
+					)
+				)
+			)
+			.values("suma")
+		)
+		kwota = DecimalField(max_digits=10, decimal_places=2)
+		return self.annotate(
+			_suma_wplat=Coalesce(Subquery(suma, output_field=kwota), Value(Decimal("0")), output_field=kwota),
+		).annotate(_do_zaplaty=models.ExpressionWrapper(F("rejs__cena") - F("_suma_wplat"), output_field=kwota))
+
+
+class Zgloszenie(SledzenieZmianMixin, models.Model):
 	STATUS_ZAKWALIFIKOWANY = "Zakwalifikowany"
 	STATUS_NIEZAKWALIFIKOWANY = "Niezakwalifikowany"
 	STATUS_ODRZUCONE = "Odrzucone"
@@ -72,36 +106,30 @@ class Zgloszenie(models.Model):
 		null=True,
 		blank=True,
 	)
+	lista_rezerwowa = models.BooleanField(
+		default=False,
+		verbose_name="Lista rezerwowa",
+		editable=False,
+		help_text="Zgłoszenie czeka na zwolnienie miejsca na rejsie.",
+	)
 	token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False, db_index=True)
+	# Klucz z ukrytego pola formularza - ponowne wysłanie formularza zwraca to samo zgłoszenie.
+	# Wygasa po IDEMPOTENCJA_WAZNOSC_GODZIN (czyszczony komendą czysc_klucze_idempotencji)
+	klucz_idempotencji = models.UUIDField(null=True, blank=True, unique=True, editable=False)
 	data_zgloszenia = models.DateTimeField(auto_now_add=True, editable=False)
 
+	objects = ZgloszenieQuerySet.as_manager()
+
 	if TYPE_CHECKING:
 		wplaty: RelatedManager[Wplata]
 
-	def __init__(self, *args, **kwargs):
-		super().__init__(*args, **kwargs)
-		# Śledź oryginalne wartości po załadowaniu z bazy danych
-		# Używane przez sygnały do wykrywania zmian bez dodatkowego zapytania DB
-		self._original_status = self.status if self.pk else None
-		self._original_wachta_id = self.wachta_id if self.pk else None
-
-	def save(self, *args, **kwargs):
-		super().save(*args, **kwargs)
-		# Po zapisie aktualizuj oryginalne wartości dla kolejnych zmian
-		self._original_status = self.status
-		self._original_wachta_id = self.wachta_id
-
-	@classmethod
-	def from_db(cls, db, field_names, values):
-		"""Nadpisuje from_db aby śledzić oryginalne wartości przy ładowaniu z DB."""
-		instance = super().from_db(db, field_names, values)
-		instance._original_status = instance.status
-		instance._original_wachta_id = instance.wachta_id
-		return instance
-
 	@property
 	def suma_wplat(self) -> Decimal:
 		"""Oblicza sumę wpłat minus zwroty (zoptymalizowane - jedno zapytanie SQL)."""
+		if hasattr(self, "_suma_wplat"):
+			# Wartość z adnotacji ZgloszenieQuerySet.z_finansami()
+			return self._suma_wplat
+
 		from rejs.modele.finanse import Wplata
 
 		result = self.wplaty.aggregate(
@@ -128,11 +156,25 @@ class Zgloszenie(models.Model):
 
 	@property
 	def do_zaplaty(self):
+		if hasattr(self, "_do_zaplaty"):
+			return self._do_zaplaty
 		return self.rejs.cena - self.suma_wplat
 
 	def __str__(self):
 		return f"{self.imie} {self.nazwisko}"
 
+	def save(self, *args, **kwargs):
+		from rejs.serwisy.rejestracja import serwis_rejestracji
+
+		# Miejsca na rejsie zmieniane są w transakcji zapisu - nieudany zapis (np. naruszenie
+		# unique_zgloszenie_na_rejs_dla_osoby) wycofuje też zmianę licznika miejsc
+		with transaction.atomic(savepoint=False):
+			update_fields = kwargs.get("update_fields")
+			serwis_rejestracji.przed_zapisem(self, update_fields)
+			if update_fields is not None and self.has_changed("lista_rezerwowa"):
+				kwargs["update_fields"] = {*update_fields, "lista_rezerwowa"}
+			super().save(*args, **kwargs)
+
 	def clean(self):
 		if self.wachta and self.wachta.rejs_id != self.rejs_id:
 			raise ValidationError("Wachta musi należeć do tego samego rejsu co zgłoszenie.")
@@ -152,7 +194,65 @@ class Zgloszenie(models.Model):
 		]
 
 
-class Dane_Dodatkowe(models.Model):
+SOL_INDEKSU_PESEL = "rejs.Dane_Dodatkowe.poz1"
+
+
+def indeks_peselu(pesel: str | None) -> str:
+	"""Indeks wyszukiwania PESEL - normalizuje zapis tak jak walidator (bez spacji i myślników)."""
+	if pesel is None:
+		return ""
+	return indeks_slepy(pesel.strip().replace(" ", "").replace("-", ""), SOL_INDEKSU_PESEL)
+
+
+class ZgloszenieOczekujace(SledzenieZmianMixin, models.Model):
+	"""
+	Zgłoszenie przyjęte w trybie szczytowym (TRYB_SZCZYTOWY), czekające na zapis jako Zgloszenie.
+
+	Widok zapisuje zwalidowane pola formularza jednym krótkim INSERT-em, bez zajmowania
+	miejsca i wysyłki emaila. Komenda przetwarzaj_zgloszenia tworzy z nich zgłoszenia
+	paczkami (SerwisKolejkiZgloszen) - z tym samym tokenem, więc link ze strony
+	potwierdzenia prowadzi po przetworzeniu do szczegółów zgłoszenia.
+
+	Zgłoszenie, którego nie udało się zarejestrować (duplikat, dane odrzucone przez
+	bazę), zostaje w tabeli z powodem odrzucenia - strona tokenu pokazuje powód.
+	"""
+
+	rejs = models.ForeignKey(Rejs, on_delete=models.CASCADE, related_name="oczekujace_zgloszenia")
+	dane = models.JSONField(encoder=DjangoJSONEncoder)
+	token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+	klucz_idempotencji = models.UUIDField(null=True, blank=True, unique=True, editable=False)
+	data_zgloszenia = models.DateTimeField(auto_now_add=True, editable=False)
+	powod_odrzucenia = models.CharField(max_length=255, blank=True, default="", editable=False)
+
+	def __str__(self):
+		return f"{self.dane.get('imie', '')} {self.dane.get('nazwisko', '')}"
+
+	class Meta:
+		app_label = "rejs"
+		verbose_name = "Zgłoszenie oczekujące"
+		verbose_name_plural = "Zgłoszenia oczekujące"
+
+
+class DaneDodatkoweQuerySet(models.QuerySet):
+	def po_peselu(self, pesel: str) -> DaneDodatkoweQuerySet:
+		"""Dane o podanym numerze PESEL - zapytanie po indeksie, bez odszyfrowywania wierszy."""
+		indeks = indeks_peselu(pesel)
+		if not indeks:
+			return self.none()
+		return self.filter(pesel_indeks=indeks)
+
+	def zduplikowane_pesele(self) -> models.QuerySet:
+		"""Indeksy PESEL występujące w więcej niż jednym wierszu (wartości pesel_indeks i liczba)."""
+		return (
+			self.exclude(pesel_indeks="")
+			.values("pesel_indeks")
+			.annotate(liczba=models.Count("pk"))
+			.filter(liczba__gt=1)
+			.order_by()
+		)
+
+
+class Dane_Dodatkowe(SledzenieZmianMixin, models.Model):
 	typ_dokumentu = [("paszport", "paszport"), ("dowod-osobisty", "dowód osobisty")]
 
 	zgloszenie = models.OneToOneField(Zgloszenie, on_delete=models.CASCADE, related_name="dane_dodatkowe")
@@ -170,6 +270,8 @@ class Dane_Dodatkowe(models.Model):
 		verbose_name="Typ dokumentu",
 	)
 	poz3 = EncryptedTextField(blank=False, null=False, default="ABC123", verbose_name="Numer dokumentu")
+	# HMAC numeru PESEL (patrz indeks_peselu) - wyszukiwanie bez odszyfrowania, utrzymywany w save()
+	pesel_indeks = models.CharField(max_length=64, blank=True, default="", db_index=True, editable=False)
 	zgoda_dane_wrazliwe = models.BooleanField(
 		default=False,
 		verbose_name="Zgoda na przetwarzanie danych wrażliwych",
@@ -178,6 +280,8 @@ class Dane_Dodatkowe(models.Model):
 		"Dane zostaną usunięte w ciągu 30 dni po zakończeniu rejsu.",
 	)
 
+	objects = DaneDodatkoweQuerySet.as_manager()
+
 	class Meta:
 		app_label = "rejs"
 		verbose_name = "Dane dodatkowe"
@@ -189,9 +293,35 @@ class Dane_Dodatkowe(models.Model):
 	def __str__(self) -> str:
 		return f"dane dodatkowe dla zgłoszenia: {self.zgloszenie_id}"
 
+	def save(self, *args, **kwargs):
+		self.pesel_indeks = indeks_peselu(self.poz1)
+		update_fields = kwargs.get("update_fields")
+		if update_fields is not None and "poz1" in update_fields:
+			kwargs["update_fields"] = {*update_fields, "pesel_indeks"}
+		try:
+			super().save(*args, **kwargs)
+		finally:
+			# Klucz danych wyznaczany jest raz na zapis - kolejny zapis odczytuje go ponownie
+			self.__dict__.pop("_klucz_zapisu", None)
+
+	def klucz_danych(self):
+		"""
+		Klucz danych rejsu, którym szyfrowane są pola poz1-poz3 (używany przez EncryptedTextField).
+
+		Wyznaczany raz na zapis, wspólnie dla wszystkich szyfrowanych pól.
+		"""
+		from rejs.modele.klucze import KluczRejsu
+
+		if "_klucz_zapisu" not in self.__dict__:
+			self._klucz_zapisu = KluczRejsu.objects.do_szyfrowania(self.zgloszenie.rejs_id)
+		return self._klucz_zapisu
+
 	@staticmethod
-	def _mask_value(value: str, prefix_len: int, suffix_len: int) -> str:
+	def _mask_value(value: str | None, prefix_len: int, suffix_len: int) -> str:
 		"""Maskuje wartość, pozostawiając widoczny prefix i suffix."""
+		if value is None:
+			# Klucz danych rejsu zniszczony - wartość jest nieodwracalna
+			return ""
 		if len(value) <= prefix_len + suffix_len:
 			return "*" * len(value)
 		masked_len = len(value) - prefix_len - suffix_len
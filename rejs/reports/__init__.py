@@ -1,11 +1,17 @@
 from django.http import HttpResponse
 from django.utils.timezone import now
 
+from ..metryki import czas_raportu
 from .builder import RaportRejsuBuilder
 from .excel import ExcelExporter
 
 
 def generate_rejs_report(rejs, user):
+	with czas_raportu.mierz():
+		return _generuj_raport(rejs, user)
+
+
+def _generuj_raport(rejs, user):
 	builder = RaportRejsuBuilder(rejs, user)
 
 	filename = f"raport_rejsu_{rejs.nazwa}_{now().date()}.xlsx"
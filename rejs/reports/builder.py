@@ -3,6 +3,7 @@ from decimal import Decimal
 from django.db.models import Case, F, Sum, When
 from django.utils.timezone import localtime
 
+from rejs.modele.pola import odszyfruj_wiele, surowe
 from rejs.models import Dane_Dodatkowe, Wachta, Wplata, Zgloszenie
 
 
@@ -103,16 +104,24 @@ class RaportRejsuBuilder:
 		if not self.can_export_sensitive():
 			return None
 
+		# Szyfrogramy pobieramy surowo i odszyfrowujemy hurtowo zamiast przez from_db_value wiersz po wierszu
+		wiersze = list(
+			Dane_Dodatkowe.objects.filter(zgloszenie__rejs=self.rejs)
+			.order_by("pk")
+			.values_list("zgloszenie__imie", "zgloszenie__nazwisko", surowe("poz1"), surowe("poz2"), surowe("poz3"))
+		)
+		odszyfrowane = odszyfruj_wiele(token for w in wiersze for token in w[2:])
+
 		rows = []
-		for d in Dane_Dodatkowe.objects.filter(zgloszenie__rejs=self.rejs).select_related("zgloszenie"):
-			z = d.zgloszenie
+		for i, (imie, nazwisko, *_) in enumerate(wiersze):
+			pesel, typ_dokumentu, dokument = odszyfrowane[3 * i : 3 * i + 3]
 			rows.append(
 				{
-					"imie": z.imie,
-					"nazwisko": z.nazwisko,
-					"pesel": d.poz1,
-					"typ_dokumentu": d.poz2,
-					"dokument": d.poz3,
+					"imie": imie,
+					"nazwisko": nazwisko,
+					"pesel": pesel,
+					"typ_dokumentu": typ_dokumentu,
+					"dokument": dokument,
 				}
 			)
 		return rows
@@ -1,9 +1,8 @@
-from openpyxl import Workbook
-from openpyxl.styles import Font
-
-
 class ExcelExporter:
 	def __init__(self, filename):
+		# openpyxl ładuje się ok. 0,1 s - import dopiero przy eksporcie, nie przy starcie procesu
+		from openpyxl import Workbook
+
 		self.wb = Workbook()
 		self.filename = filename
 
@@ -15,6 +14,8 @@ class ExcelExporter:
 		if not rows:
 			return
 
+		from openpyxl.styles import Font
+
 		headers = rows[0].keys()
 		ws.append(list(headers))
 
@@ -2,17 +2,23 @@
 Moduł serwisów dla aplikacji rejs.
 
 Zawiera serwisy biznesowe:
+- SerwisMigawek - statyczne kopie publicznych stron dla serwera WWW
 - SerwisNotyfikacji - obsługa powiadomień email
+- SerwisPulpitu - metryki pulpitu rekrutacji w panelu administracyjnym
 - SerwisRejestracji - logika rejestracji na rejs
 - SerwisWacht - zarządzanie wachtami
 """
 
+from .migawki import SerwisMigawek
 from .notyfikacje import SerwisNotyfikacji
+from .pulpit import SerwisPulpitu
 from .rejestracja import SerwisRejestracji
 from .wachty import SerwisWacht
 
 __all__ = [
+	"SerwisMigawek",
 	"SerwisNotyfikacji",
+	"SerwisPulpitu",
 	"SerwisRejestracji",
 	"SerwisWacht",
 ]
@@ -0,0 +1,211 @@
+"""
+Serwis kolejki zgłoszeń trybu szczytowego.
+
+W chwili otwarcia rekrutacji każde zgłoszenie to osobna transakcja zapisu (licznik
+miejsc, INSERT) i email wysyłany w trakcie żądania - na SQLite wszystkie czekają
+na jedną blokadę zapisu bazy. W trybie szczytowym (TRYB_SZCZYTOWY) widok zapisuje
+zwalidowany formularz jednym INSERT-em do ZgloszenieOczekujace i od razu
+przekierowuje na stronę z tokenem zgłoszenia. Komenda przetwarzaj_zgloszenia
+tworzy z kolejki zgłoszenia paczkami: jedna transakcja na paczkę (jeden zapis
+licznika miejsc na rejs, bulk_create) i emaile jednym połączeniem SMTP po
+zatwierdzeniu.
+
+Zgłoszenie osoby, która ma już zgłoszenie na ten rejs (także wcześniejsze w tej
+samej paczce), jest odrzucane - jak w walidacji formularza. Wiersz, którego baza
+nie przyjmuje, odrzucany jest bez wycofania reszty paczki: paczka zapisywana jest
+wtedy ponownie, zgłoszenie po zgłoszeniu. Odrzucone zgłoszenia zostają w kolejce
+z powodem odrzucenia (widocznym na stronie tokenu) i dostają email.
+"""
+
+from __future__ import annotations
+
+import logging
+from itertools import groupby
+from typing import TYPE_CHECKING
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import DataError, IntegrityError, transaction
+from django.db.models.functions import Lower
+from django.forms.models import model_to_dict
+
+from rejs import metryki
+from rejs.serwisy.notyfikacje import serwis_notyfikacji
+from rejs.serwisy.pulpit import serwis_pulpitu
+from rejs.serwisy.rejestracja import serwis_rejestracji
+
+if TYPE_CHECKING:
+	import uuid
+
+	from rejs.forms import ZgloszenieForm
+	from rejs.models import Rejs, Zgloszenie, ZgloszenieOczekujace
+
+logger = logging.getLogger(__name__)
+
+
+POWOD_DUPLIKAT = "Na ten rejs jest już zgłoszenie osoby o tym imieniu, nazwisku i adresie e-mail."
+POWOD_BLAD_ZAPISU = "Nie udało się zapisać danych zgłoszenia - prosimy o ponowne wypełnienie formularza."
+
+
+def _osoba(rejs_id: int, imie: str, nazwisko: str, email: str) -> tuple:
+	"""Klucz osoby na rejsie - bez rozróżniania wielkości liter, jak sprawdzanie duplikatów w formularzu."""
+	return rejs_id, imie.casefold(), nazwisko.casefold(), email.casefold()
+
+
+class SerwisKolejkiZgloszen:
+	"""
+	Serwis kolejki zgłoszeń przyjmowanych w trybie szczytowym.
+
+	Metody:
+		wlaczona - czy formularz zgłoszenia zapisuje do kolejki (TRYB_SZCZYTOWY)
+		przyjmij - zapisuje zwalidowany formularz w kolejce i zwraca token zgłoszenia
+		oczekujace - zgłoszenie czekające w kolejce (lub z niej odrzucone) o danym tokenie
+		przetworz - tworzy zgłoszenia z kolejki paczkami, odrzucając duplikaty i błędne wiersze
+	"""
+
+	def wlaczona(self) -> bool:
+		return settings.TRYB_SZCZYTOWY
+
+	def przyjmij(self, rejs: Rejs, form: ZgloszenieForm) -> uuid.UUID:
+		"""
+		Zapisuje zwalidowany formularz zgłoszenia w kolejce (jeden INSERT, bez emaila).
+
+		Args:
+			rejs: Rejs, na który wysłano formularz
+			form: Poprawny ZgloszenieForm
+
+		Returns:
+			Token, pod którym zgłoszenie będzie dostępne po przetworzeniu
+		"""
+		from rejs.models import ZgloszenieOczekujace
+
+		oczekujace = ZgloszenieOczekujace.objects.create(
+			rejs=rejs,
+			dane=model_to_dict(form.instance, fields=form._meta.fields),
+			klucz_idempotencji=form.cleaned_data.get("klucz_idempotencji"),
+		)
+		return oczekujace.token
+
+	def oczekujace(self, token) -> ZgloszenieOczekujace | None:
+		"""Zgłoszenie czekające w kolejce lub z niej odrzucone (strona szczegółów przed przetworzeniem) albo None."""
+		from rejs.models import ZgloszenieOczekujace
+
+		return ZgloszenieOczekujace.objects.select_related("rejs").filter(token=token).first()
+
+	def przetworz(self, rozmiar_paczki: int = 500) -> int:
+		"""
+		Tworzy zgłoszenia z kolejki paczkami, w kolejności przyjęcia.
+
+		Args:
+			rozmiar_paczki: Liczba zgłoszeń z kolejki w jednej transakcji
+
+		Returns:
+			Liczba utworzonych zgłoszeń
+		"""
+		from rejs.models import ZgloszenieOczekujace
+
+		oczekujace = ZgloszenieOczekujace.objects.filter(powod_odrzucenia="").select_related("rejs").order_by("pk")
+		utworzone = 0
+		while paczka := list(oczekujace[:rozmiar_paczki]):
+			utworzone += len(self._przetworz_paczke(paczka))
+		return utworzone
+
+	def _przetworz_paczke(self, paczka: list[ZgloszenieOczekujace]) -> list[Zgloszenie]:
+		from rejs.models import Zgloszenie, ZgloszenieOczekujace
+
+		with transaction.atomic():
+			# Zapis wierszy paczki jako pierwsza instrukcja - blokada zapisu przed sprawdzeniem duplikatów;
+			# błąd zapisu wycofuje transakcję i paczka zostaje w kolejce
+			ZgloszenieOczekujace.objects.filter(pk__in=[o.pk for o in paczka]).update(powod_odrzucenia="")
+
+			# Tylko zgłoszenia z adresami z paczki - koszt nie rośnie z liczbą zgłoszeń na rejsie
+			istniejace = {
+				_osoba(*wiersz)
+				for wiersz in Zgloszenie.objects.alias(email_male=Lower("email"))
+				.filter(
+					rejs_id__in={o.rejs_id for o in paczka},
+					email_male__in={str(o.dane.get("email", "")).lower() for o in paczka},
+				)
+				.values_list("rejs_id", "imie", "nazwisko", "email")
+			}
+			zgloszenia = {}
+			odrzucone = []
+			for oczekujace in paczka:
+				try:
+					zgl = Zgloszenie(
+						rejs=oczekujace.rejs,
+						token=oczekujace.token,
+						klucz_idempotencji=oczekujace.klucz_idempotencji,
+						data_zgloszenia=oczekujace.data_zgloszenia,
+						**{
+							nazwa: Zgloszenie._meta.get_field(nazwa).to_python(wartosc)
+							for nazwa, wartosc in oczekujace.dane.items()
+						},
+					)
+				except (ValidationError, TypeError, ValueError):
+					logger.exception("Odrzucono zgłoszenie %s z kolejki - niepoprawne dane", oczekujace.token)
+					oczekujace.powod_odrzucenia = POWOD_BLAD_ZAPISU
+					odrzucone.append(oczekujace)
+					continue
+				osoba = _osoba(zgl.rejs_id, zgl.imie, zgl.nazwisko, zgl.email)
+				if osoba in istniejace:
+					logger.warning("Odrzucono zgłoszenie %s z kolejki - duplikat zgłoszenia tej osoby", zgl.token)
+					oczekujace.powod_odrzucenia = POWOD_DUPLIKAT
+					odrzucone.append(oczekujace)
+					continue
+				istniejace.add(osoba)
+				zgloszenia[oczekujace.pk] = zgl
+
+			try:
+				with transaction.atomic():
+					self._zapisz(list(zgloszenia.values()))
+			except (IntegrityError, DataError):
+				# Wiersz odrzucony przez bazę wycofał zapis paczki - zapis pojedynczo, bez tego wiersza
+				for oczekujace in paczka:
+					zgl = zgloszenia.get(oczekujace.pk)
+					if zgl is None:
+						continue
+					try:
+						with transaction.atomic():
+							self._zapisz([zgl])
+					except (IntegrityError, DataError):
+						logger.exception("Odrzucono zgłoszenie %s z kolejki - błąd zapisu", zgl.token)
+						del zgloszenia[oczekujace.pk]
+						oczekujace.powod_odrzucenia = POWOD_BLAD_ZAPISU
+						odrzucone.append(oczekujace)
+
+			ZgloszenieOczekujace.objects.filter(pk__in=list(zgloszenia)).delete()
+			ZgloszenieOczekujace.objects.bulk_update(odrzucone, ["powod_odrzucenia"])
+
+			utworzone = list(zgloszenia.values())
+			transaction.on_commit(lambda: serwis_notyfikacji.powiadom_o_utworzeniu_zgloszen(utworzone))
+			transaction.on_commit(lambda: serwis_notyfikacji.powiadom_o_odrzuceniu_z_kolejki(odrzucone))
+
+		serwis_pulpitu.uniewaznij()
+		metryki.zgloszenia.inc(len(utworzone))
+		logger.info(
+			"Przetworzono paczkę kolejki zgłoszeń: %d z %d (odrzucone: %d)", len(utworzone), len(paczka), len(odrzucone)
+		)
+		return utworzone
+
+	def _zapisz(self, zgloszenia: list[Zgloszenie]) -> None:
+		"""Zajmuje miejsca i zapisuje zgłoszenia z datą przyjęcia do kolejki (w bieżącej transakcji)."""
+		from rejs.models import Zgloszenie
+
+		# bulk_create nie wywołuje Zgloszenie.save() - miejsca zajmowane są jednym zapisem licznika na rejs
+		for rejs_id, grupa in groupby(sorted(zgloszenia, key=lambda z: z.rejs_id), key=lambda z: z.rejs_id):
+			grupa = list(grupa)
+			przydzielone = serwis_rejestracji.zajmij_miejsca(rejs_id, len(grupa))
+			for i, zgl in enumerate(grupa):
+				zgl.lista_rezerwowa = i >= przydzielone
+		daty = [zgl.data_zgloszenia for zgl in zgloszenia]
+		Zgloszenie.objects.bulk_create(zgloszenia)
+		# auto_now_add nadpisuje datę przy INSERT - przywracamy czas przyjęcia do kolejki,
+		# według którego ustalana jest kolejność listy rezerwowej
+		for zgl, data in zip(zgloszenia, daty):
+			zgl.data_zgloszenia = data
+		Zgloszenie.objects.bulk_update(zgloszenia, ["data_zgloszenia"])
+
+
+# Domyślna instancja serwisu
+serwis_kolejki_zgloszen = SerwisKolejkiZgloszen()
@@ -0,0 +1,139 @@
+"""
+Serwis migawek - statycznych kopii publicznych stron.
+
+Strona główna i informacja RODO są takie same dla wszystkich anonimowych
+użytkowników i zmieniają się tylko po edycji rejsu albo o północy (lista
+nadchodzących rejsów). Serwis zapisuje ich wyrenderowany HTML (z wariantami
+.gz i .br) do katalogu MIGAWKI_KATALOG, skąd serwer WWW podaje je bez udziału
+Django:
+
+    <katalog>/<motyw>/index.html        strona główna ("/")
+    <katalog>/<motyw>/rodo/index.html   informacja RODO ("/rodo/")
+
+Motyw "domyslny" to szablony aplikacji, pozostałe - katalogi w themes/.
+Migawki odświeżane są po zapisie i usunięciu rejsu (sygnały) oraz komendą
+generuj_migawki uruchamianą codziennie po północy.
+"""
+
+from __future__ import annotations
+
+import gzip
+import logging
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpRequest
+from django.template.backends.django import DjangoTemplates
+from django.urls import reverse
+
+from .rejestracja import serwis_rejestracji
+
+logger = logging.getLogger(__name__)
+
+MOTYW_DOMYSLNY = "domyslny"
+
+# Strona: (nazwa widoku, szablon, funkcja zwracająca kontekst - jeden odczyt dla wszystkich motywów)
+STRONY = {
+	"index": ("index", "rejs/index.html", lambda: {"rejsy": list(serwis_rejestracji.rejsy_otwarte())}),
+	"rodo_info": ("rodo_info", "rejs/rodo_info.html", dict),
+}
+
+
+def _zapisz_atomowo(plik: Path, dane: bytes) -> None:
+	"""Zapis przez plik tymczasowy - serwer WWW nigdy nie poda częściowo zapisanej strony."""
+	plik.parent.mkdir(parents=True, exist_ok=True)
+	tymczasowy = plik.with_name(f".{plik.name}.{os.getpid()}.tmp")
+	tymczasowy.write_bytes(dane)
+	os.replace(tymczasowy, plik)
+
+
+def _brotli(dane: bytes) -> bytes | None:
+	"""Wariant brotli - tylko z zainstalowanym pakietem brotli (opcjonalny)."""
+	try:
+		import brotli
+	except ImportError:
+		return None
+	return brotli.compress(dane, quality=11)
+
+
+class SerwisMigawek:
+	"""
+	Serwis generujący statyczne migawki publicznych stron.
+
+	Metody:
+		katalog - katalog migawek z ustawień (None - migawki wyłączone)
+		motywy - nazwy motywów, dla których generowane są migawki
+		generuj - renderuje i zapisuje migawki wszystkich stron i motywów
+		odswiez - generuje migawki po zatwierdzeniu zmiany rejsu, błędy tylko loguje
+	"""
+
+	def katalog(self) -> Path | None:
+		katalog = getattr(settings, "MIGAWKI_KATALOG", "")
+		return Path(katalog) if katalog else None
+
+	def motywy(self) -> list[str]:
+		katalog_motywow = Path(settings.BASE_DIR) / "themes"
+		dodatkowe = sorted(p.name for p in katalog_motywow.iterdir() if p.is_dir()) if katalog_motywow.is_dir() else []
+		return [MOTYW_DOMYSLNY, *dodatkowe]
+
+	def _silnik(self, motyw: str) -> DjangoTemplates:
+		ustawienia = next(t for t in settings.TEMPLATES if t["BACKEND"].endswith(".DjangoTemplates"))
+		dirs = [] if motyw == MOTYW_DOMYSLNY else [Path(settings.BASE_DIR) / "themes" / motyw]
+		parametry = {k: v for k, v in ustawienia.items() if k != "BACKEND"}
+		return DjangoTemplates({**parametry, "NAME": f"migawki-{motyw}", "DIRS": dirs})
+
+	def generuj(self, katalog: Path | None = None) -> list[Path]:
+		"""
+		Renderuje strony dla każdego motywu i zapisuje je z wariantami skompresowanymi.
+
+		Args:
+			katalog: Katalog docelowy (domyślnie MIGAWKI_KATALOG)
+
+		Returns:
+			Lista zapisanych plików HTML (bez wariantów .gz/.br); pusta bez katalogu
+		"""
+		katalog = katalog or self.katalog()
+		if katalog is None:
+			return []
+
+		konteksty = {nazwa: kontekst() for nazwa, (_, _, kontekst) in STRONY.items()}
+		zapisane = []
+		for motyw in self.motywy():
+			silnik = self._silnik(motyw)
+			for nazwa, (widok, szablon, _) in STRONY.items():
+				sciezka = reverse(widok)
+				request = HttpRequest()
+				request.method = "GET"
+				request.path = request.path_info = sciezka
+				request.user = AnonymousUser()
+				html = silnik.get_template(szablon).render(konteksty[nazwa], request).encode()
+
+				plik = katalog / motyw / sciezka.strip("/") / "index.html"
+				_zapisz_atomowo(plik, html)
+				_zapisz_atomowo(plik.with_name("index.html.gz"), gzip.compress(html, compresslevel=9, mtime=0))
+				skompresowany = _brotli(html)
+				if skompresowany is not None:
+					_zapisz_atomowo(plik.with_name("index.html.br"), skompresowany)
+				zapisane.append(plik)
+
+		logger.info("Zapisano migawki stron: %d plików w %s", len(zapisane), katalog)
+		return zapisane
+
+	def odswiez(self) -> None:
+		"""
+		Generuje migawki po zatwierdzeniu zmiany rejsu (transaction.on_commit w żądaniu panelu).
+
+		Zmiana jest już zapisana - błąd generowania (np. zapisu na dysk) nie może zakończyć
+		żądania błędem 500. Jest logowany, a nieaktualne migawki odświeży kolejna zmiana
+		rejsu albo komenda generuj_migawki.
+		"""
+		try:
+			self.generuj()
+		except Exception:
+			logger.exception("Nie udało się odświeżyć migawek stron")
+
+
+# Domyślna instancja serwisu
+serwis_migawek = SerwisMigawek()
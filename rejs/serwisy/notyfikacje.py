@@ -14,10 +14,11 @@ from django.urls import reverse
 from django.template.loader import render_to_string
 
 from rejs.mailers import FROM, send_mass_mail_html, send_simple_mail
+from rejs.metryki import powiadomienia
 from rejs.modele.zgloszenie import Zgloszenie
 
 if TYPE_CHECKING:
-	from rejs.models import Ogloszenie, Wplata
+	from rejs.models import Ogloszenie, Wplata, ZgloszenieOczekujace
 
 
 class SerwisNotyfikacji:
@@ -25,32 +26,107 @@ class SerwisNotyfikacji:
 	Serwis obsługujący powiadomienia email.
 
 	Metody:
-		powiadom_o_utworzeniu_zgloszenia - email po utworzeniu zgłoszenia
+		powiadom_o_utworzeniu_zgloszenia - email po utworzeniu zgłoszenia (lub zapisie na listę rezerwową)
+		powiadom_o_utworzeniu_zgloszen - emaile po utworzeniu paczki zgłoszeń z kolejki trybu szczytowego
+		powiadom_o_odrzuceniu_z_kolejki - emaile o zgłoszeniach z kolejki, których nie zarejestrowano
+		powiadom_o_przyjeciu_z_listy_rezerwowej - emaile po przyjęciu z listy rezerwowej
 		powiadom_o_zmianie_statusu - email po zmianie statusu zgłoszenia
 		powiadom_o_przypisaniu_wachty - email po przypisaniu do wachty
+		powiadom_o_przypisaniu_wachty_zbiorczo - emaile po zbiorczym przypisaniu do wachty
 		powiadom_o_wplacie - email po zarejestrowaniu wpłaty
 		powiadom_o_zwrocie - email po zarejestrowaniu zwrotu
 		powiadom_o_ogloszeniu - email z nowym ogłoszeniem
 	"""
 
-	def _zbuduj_link(self, zgloszenie: Zgloszenie) -> str:
+	def _zbuduj_link(self, zgloszenie: Zgloszenie | ZgloszenieOczekujace) -> str:
 		"""Buduje pełny URL do szczegółów zgłoszenia."""
 		return settings.SITE_URL + reverse("zgloszenie_details", kwargs={"token": zgloszenie.token})
 
 	def powiadom_o_utworzeniu_zgloszenia(self, zgloszenie: Zgloszenie) -> None:
 		"""
-		Wysyła email potwierdzający utworzenie zgłoszenia.
+		Wysyła email potwierdzający utworzenie zgłoszenia albo zapis na listę rezerwową.
 
 		Args:
 			zgloszenie: Nowo utworzone zgłoszenie
 		"""
-		subject = f"Potwierdzenie zgłoszenia na rejs: {zgloszenie.rejs.nazwa}"
 		context = {
 			"zgl": zgloszenie,
 			"rejs": zgloszenie.rejs,
 			"link": zgloszenie.get_absolute_url() if hasattr(zgloszenie, "get_absolute_url") else None,
 		}
-		send_simple_mail(subject, zgloszenie.email, "emails/zgloszenie_utworzone", context)
+		if zgloszenie.lista_rezerwowa:
+			subject = f"Zapis na listę rezerwową rejsu: {zgloszenie.rejs.nazwa}"
+			send_simple_mail(subject, zgloszenie.email, "emails/lista_rezerwowa", context)
+		else:
+			subject = f"Potwierdzenie zgłoszenia na rejs: {zgloszenie.rejs.nazwa}"
+			send_simple_mail(subject, zgloszenie.email, "emails/zgloszenie_utworzone", context)
+		powiadomienia.inc(rodzaj="utworzenie_zgloszenia")
+
+	def powiadom_o_utworzeniu_zgloszen(self, zgloszenia: list[Zgloszenie]) -> None:
+		"""
+		Wysyła emaile potwierdzające utworzenie zgłoszeń (lub zapis na listę rezerwową) jednym połączeniem SMTP.
+
+		Args:
+			zgloszenia: Zgłoszenia utworzone z kolejki trybu szczytowego
+		"""
+		messages = []
+		for zgl in zgloszenia:
+			context = {"zgl": zgl, "rejs": zgl.rejs, "link": zgl.get_absolute_url()}
+			if zgl.lista_rezerwowa:
+				subject = f"Zapis na listę rezerwową rejsu: {zgl.rejs.nazwa}"
+				szablon = "emails/lista_rezerwowa"
+			else:
+				subject = f"Potwierdzenie zgłoszenia na rejs: {zgl.rejs.nazwa}"
+				szablon = "emails/zgloszenie_utworzone"
+			txt_content = render_to_string(f"{szablon}.txt", context)
+			html_content = render_to_string(f"{szablon}.html", context)
+			messages.append((subject, txt_content, html_content, FROM, [zgl.email]))
+
+		if messages:
+			send_mass_mail_html(messages)
+			powiadomienia.inc(len(messages), rodzaj="utworzenie_zgloszenia")
+
+	def powiadom_o_odrzuceniu_z_kolejki(self, odrzucone: list[ZgloszenieOczekujace]) -> None:
+		"""
+		Wysyła emaile z powodem odrzucenia zgłoszeń z kolejki trybu szczytowego (jedno połączenie SMTP).
+
+		Args:
+			odrzucone: Zgłoszenia z kolejki z ustawionym powodem odrzucenia
+		"""
+		messages = []
+		for oczekujace in odrzucone:
+			context = {
+				"rejs": oczekujace.rejs,
+				"powod": oczekujace.powod_odrzucenia,
+				"link": self._zbuduj_link(oczekujace),
+			}
+			subject = f"Zgłoszenie na rejs {oczekujace.rejs.nazwa} nie zostało zarejestrowane"
+			txt_content = render_to_string("emails/zgloszenie_nie_zarejestrowane.txt", context)
+			html_content = render_to_string("emails/zgloszenie_nie_zarejestrowane.html", context)
+			messages.append((subject, txt_content, html_content, FROM, [oczekujace.dane.get("email", "")]))
+
+		if messages:
+			send_mass_mail_html(messages)
+			powiadomienia.inc(len(messages), rodzaj="odrzucenie_z_kolejki")
+
+	def powiadom_o_przyjeciu_z_listy_rezerwowej(self, zgloszenia: list[Zgloszenie]) -> None:
+		"""
+		Wysyła emaile o zwolnionym miejscu osobom przyjętym z listy rezerwowej (jedno połączenie SMTP).
+
+		Args:
+			zgloszenia: Zgłoszenia przyjęte z listy rezerwowej
+		"""
+		messages = []
+		for zgl in zgloszenia:
+			context = {"zgl": zgl, "rejs": zgl.rejs, "link": self._zbuduj_link(zgl)}
+			subject = f"Zwolniło się miejsce na rejsie {zgl.rejs.nazwa}"
+			txt_content = render_to_string("emails/lista_rezerwowa_przyjecie.txt", context)
+			html_content = render_to_string("emails/lista_rezerwowa_przyjecie.html", context)
+			messages.append((subject, txt_content, html_content, FROM, [zgl.email]))
+
+		if messages:
+			send_mass_mail_html(messages)
+			powiadomienia.inc(len(messages), rodzaj="przyjecie_z_listy_rezerwowej")
 
 	def powiadom_o_zmianie_statusu(self, zgloszenie: Zgloszenie, stary_status: str) -> None:
 		"""
@@ -74,9 +150,11 @@ class SerwisNotyfikacji:
 		if zgloszenie.status == Zgloszenie.STATUS_ZAKWALIFIKOWANY:
 			subject = f"Potwierdzamy zakwalifikowanie na rejs {zgloszenie.rejs.nazwa}"
 			send_simple_mail(subject, zgloszenie.email, "emails/zgloszenie_potwierdzone", context)
+			powiadomienia.inc(rodzaj="zmiana_statusu")
 		elif zgloszenie.status == Zgloszenie.STATUS_ODRZUCONE:
 			subject = f"Odrzucone zgłoszenie na rejs {zgloszenie.rejs.nazwa}"
 			send_simple_mail(subject, zgloszenie.email, "emails/zgloszenie_o", context)
+			powiadomienia.inc(rodzaj="zmiana_statusu")
 
 	def powiadom_o_przypisaniu_wachty(self, zgloszenie: Zgloszenie) -> None:
 		"""
@@ -96,6 +174,33 @@ class SerwisNotyfikacji:
 			"link": link,
 		}
 		send_simple_mail(subject, zgloszenie.email, "emails/wachta_added", context)
+		powiadomienia.inc(rodzaj="przypisanie_wachty")
+
+	def powiadom_o_przypisaniu_wachty_zbiorczo(self, zgloszenia: list[Zgloszenie]) -> None:
+		"""
+		Wysyła emaile o przypisaniu do wachty wielu uczestnikom naraz.
+		Używa batch sending dla wydajności (jedno połączenie SMTP).
+
+		Args:
+			zgloszenia: Zgłoszenia przypisane do wacht (z ustawionym polem wachta)
+		"""
+		messages = []
+		for zgl in zgloszenia:
+			if not zgl.wachta:
+				continue
+			context = {
+				"zgl": zgl,
+				"wachta": zgl.wachta,
+				"link": self._zbuduj_link(zgl),
+			}
+			subject = f"Dodano do wachty {zgl.wachta.nazwa}"
+			txt_content = render_to_string("emails/wachta_added.txt", context)
+			html_content = render_to_string("emails/wachta_added.html", context)
+			messages.append((subject, txt_content, html_content, FROM, [zgl.email]))
+
+		if messages:
+			send_mass_mail_html(messages)
+			powiadomienia.inc(len(messages), rodzaj="przypisanie_wachty")
 
 	def powiadom_o_wplacie(self, wplata: Wplata) -> None:
 		"""
@@ -113,6 +218,7 @@ class SerwisNotyfikacji:
 		}
 		subject = f"Zarejestrowaliśmy nową wpłatę {zgl.imie} {zgl.nazwisko}"
 		send_simple_mail(subject, zgl.email, "emails/wplata", context)
+		powiadomienia.inc(rodzaj="wplata")
 
 	def powiadom_o_zwrocie(self, wplata: Wplata) -> None:
 		"""
@@ -130,6 +236,7 @@ class SerwisNotyfikacji:
 		}
 		subject = f"Zwrot wpłaconych środków {zgl.imie} {zgl.nazwisko}"
 		send_simple_mail(subject, zgl.email, "emails/wplata_zwrot", context)
+		powiadomienia.inc(rodzaj="zwrot")
 
 	def powiadom_o_ogloszeniu(self, ogloszenie: Ogloszenie) -> None:
 		"""
@@ -163,6 +270,7 @@ class SerwisNotyfikacji:
 
 		# Wyślij wszystkie w jednym połączeniu SMTP
 		send_mass_mail_html(messages)
+		powiadomienia.inc(len(messages), rodzaj="ogloszenie")
 
 
 # Domyślna instancja serwisu
@@ -0,0 +1,138 @@
+"""
+Serwis pulpitu rekrutacji w panelu administracyjnym.
+
+Liczy zbiorcze metryki nadchodzących rejsów kilkoma zapytaniami GROUP BY
+i przechowuje wynik w cache do czasu zmiany danych. Unieważnienie dociera do
+wszystkich procesów roboczych tylko przy współdzielonym cache (DJANGO_CACHE_KATALOG);
+z domyślnym cache w pamięci procesu pozostałe procesy pokazują metryki
+sprzed zmiany najwyżej przez CZAS_CACHE.
+"""
+
+from __future__ import annotations
+
+import datetime
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+KLUCZ_CACHE = "rejs:pulpit"
+
+# Zabezpieczenie na wypadek zmian pomijających sygnały (np. QuerySet.update w innym procesie)
+CZAS_CACHE = 300
+
+
+class SerwisPulpitu:
+	"""
+	Serwis obsługujący pulpit rekrutacji.
+
+	Metody:
+		metryki - zwraca metryki nadchodzących rejsów (z cache)
+		oblicz_metryki - liczy metryki z bazy danych
+		uniewaznij - usuwa metryki z cache po zmianie danych
+	"""
+
+	def _klucz(self) -> str:
+		# Data w kluczu - o północy zmienia się zbiór nadchodzących rejsów
+		return f"{KLUCZ_CACHE}:{timezone.localdate().isoformat()}"
+
+	def metryki(self) -> dict:
+		"""
+		Zwraca metryki nadchodzących rejsów, licząc je tylko przy pustym cache.
+
+		Returns:
+			Słownik {"rejsy": lista metryk rejsów, "obliczono": czas obliczenia}
+		"""
+		klucz = self._klucz()
+		wynik = cache.get(klucz)
+		if wynik is None:
+			wynik = {"rejsy": self.oblicz_metryki(), "obliczono": timezone.now()}
+			cache.set(klucz, wynik, CZAS_CACHE)
+		return wynik
+
+	def uniewaznij(self) -> None:
+		"""Usuwa metryki z cache - następne wyświetlenie pulpitu policzy je od nowa."""
+		cache.delete(self._klucz())
+
+	def oblicz_metryki(self, od: datetime.date | None = None) -> list[dict]:
+		"""
+		Liczy metryki rejsów rozpoczynających się od podanej daty trzema zapytaniami.
+
+		Zgłoszenia grupowane są po rejsie, statusie, wzroku i roli (liczby osób
+		bez wachty i bez danych dodatkowych jako agregaty warunkowe), wpłaty -
+		po rejsie i rodzaju. Należność i wpłaty liczone są dla tych samych,
+		zakwalifikowanych uczestników. Liczba zapytań nie zależy od liczby rejsów.
+
+		Args:
+			od: Data początkowa (domyślnie dzisiaj)
+
+		Returns:
+			Lista słowników z metrykami, posortowana według daty rejsu
+		"""
+		from rejs.models import Rejs, Wplata, Zgloszenie
+
+		od = od or timezone.localdate()
+		rejsy = {
+			r["pk"]: {
+				**r,
+				"zgloszenia": 0,
+				"statusy": dict.fromkeys(dict(Zgloszenie.statusy), 0),
+				"wzrok": dict.fromkeys(dict(Zgloszenie.wzrok_statusy), 0),
+				"role": dict.fromkeys(dict(Zgloszenie.role_pola), 0),
+				"bez_wachty": 0,
+				"bez_danych": 0,
+				"wplacono": Decimal(0),
+			}
+			for r in Rejs.objects.filter(od__gte=od).order_by("od", "pk").values("pk", "nazwa", "od", "do", "cena")
+		}
+		if not rejsy:
+			return []
+
+		grupy = (
+			Zgloszenie.objects.filter(rejs_id__in=rejsy)
+			.values_list("rejs_id", "status", "wzrok", "rola")
+			.annotate(
+				liczba=Count("pk"),
+				bez_wachty=Count("pk", filter=Q(wachta=None)),
+				bez_danych=Count("pk", filter=Q(dane_dodatkowe=None)),
+			)
+			.order_by()
+		)
+		for rejs_id, status, wzrok, rola, liczba, bez_wachty, bez_danych in grupy:
+			metryki = rejsy[rejs_id]
+			metryki["zgloszenia"] += liczba
+			metryki["statusy"][status] = metryki["statusy"].get(status, 0) + liczba
+			if status != Zgloszenie.STATUS_ZAKWALIFIKOWANY:
+				continue
+			# Skład załogi i braki liczymy tylko dla zakwalifikowanych uczestników
+			metryki["wzrok"][wzrok] = metryki["wzrok"].get(wzrok, 0) + liczba
+			metryki["role"][rola] = metryki["role"].get(rola, 0) + liczba
+			metryki["bez_wachty"] += bez_wachty
+			metryki["bez_danych"] += bez_danych
+
+		wplaty = (
+			Wplata.objects.filter(zgloszenie__rejs_id__in=rejsy, zgloszenie__status=Zgloszenie.STATUS_ZAKWALIFIKOWANY)
+			.values_list("zgloszenie__rejs_id", "rodzaj")
+			.annotate(suma=Sum("kwota"))
+			.order_by()
+		)
+		for rejs_id, rodzaj, suma in wplaty:
+			rejsy[rejs_id]["wplacono"] += -suma if rodzaj == Wplata.RODZAJ_ZWROT else suma
+
+		for metryki in rejsy.values():
+			# Płaskie klucze dla szablonu (klucze choices zawierają myślniki)
+			metryki["zakwalifikowani"] = metryki["statusy"][Zgloszenie.STATUS_ZAKWALIFIKOWANY]
+			metryki["niezakwalifikowani"] = metryki["statusy"][Zgloszenie.STATUS_NIEZAKWALIFIKOWANY]
+			metryki["odrzucone"] = metryki["statusy"][Zgloszenie.STATUS_ODRZUCONE]
+			metryki["niewidomi"] = metryki["wzrok"]["NIEWIDOMY"]
+			metryki["slabo_widzacy"] = metryki["wzrok"]["SLABO-WIDZACY"]
+			metryki["widzacy"] = metryki["wzrok"]["WIDZI"]
+			metryki["oficerowie"] = metryki["role"]["OFICER-WACHTY"]
+			metryki["naleznosc"] = metryki["cena"] * metryki["zakwalifikowani"]
+			metryki["pozostalo"] = metryki["naleznosc"] - metryki["wplacono"]
+		return list(rejsy.values())
+
+
+# Domyślna instancja serwisu
+serwis_pulpitu = SerwisPulpitu()
@@ -2,15 +2,33 @@
 Serwis rejestracji na rejs.
 
 Odpowiada za logikę biznesową związaną z rejestracją uczestników.
+
+Miejsca na rejsie: Rejs.zajete_miejsca liczy zgłoszenia zajmujące miejsce (poza
+listą rezerwową i odrzuconymi). Licznik zmieniany jest wyłącznie warunkowymi
+UPDATE z F() w transakcji zapisu zgłoszenia - baza danych sprawdza limit
+i zwiększa licznik jedną instrukcją, więc równoległe rejestracje nie przekroczą
+limitu miejsc. Pierwsza instrukcja każdej operacji na miejscach to zapis wiersza
+rejsu: na PostgreSQL blokuje wiersz do końca transakcji, na SQLite zajmuje blokadę
+zapisu bazy - operacje na miejscach jednego rejsu wykonują się po kolei.
 """
 
 from __future__ import annotations
 
+import uuid
+from datetime import timedelta
 from typing import TYPE_CHECKING
 
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
 from django.utils.timezone import localdate
 
+from rejs.serwisy.notyfikacje import serwis_notyfikacji
+
 if TYPE_CHECKING:
+	from django.db.models import QuerySet
+
 	from rejs.models import Dane_Dodatkowe, Rejs, Zgloszenie
 
 
@@ -19,11 +37,28 @@ class SerwisRejestracji:
 	Serwis obsługujący logikę rejestracji na rejs.
 
 	Metody:
+		rejsy_otwarte - nadchodzące rejsy z aktywną rekrutacją
 		czy_mozna_rejestrowac - sprawdza czy rejestracja jest możliwa
 		czy_duplikat - sprawdza czy zgłoszenie już istnieje
 		czy_wymaga_danych_dodatkowych - sprawdza czy potrzebne są dane dodatkowe
+		przed_zapisem - aktualizuje miejsca w transakcji zapisu zgłoszenia (Zgloszenie.save())
+		zajmij_miejsce - zajmuje miejsce dla nowego zgłoszenia albo kieruje je na listę rezerwową
+		zajmij_miejsca - zajmuje wolne miejsca dla paczki nowych zgłoszeń
+		zarejestruj - zapisuje zgłoszenie na wolne miejsce albo na listę rezerwową
+		token_po_kluczu - token zgłoszenia zapisanego wcześniej z danym kluczem idempotencji
+		wygas_klucze_idempotencji - usuwa przeterminowane klucze idempotencji paczkami
+		zwolnij_miejsce - zwalnia miejsce i przyjmuje kolejną osobę z listy rezerwowej
+		przyjmij_z_listy_rezerwowej - obsadza wolne miejsca osobami z listy rezerwowej
+		po_usunieciu - zwalnia miejsce usuniętego zgłoszenia
+		przelicz_miejsca - odtwarza licznik zajętych miejsc z danych zgłoszeń
 	"""
 
+	def rejsy_otwarte(self) -> QuerySet[Rejs]:
+		"""Nadchodzące rejsy z aktywną rekrutacją, w kolejności terminu (strona główna)."""
+		from rejs.models import Rejs
+
+		return Rejs.objects.filter(aktywna_rekrutacja=True, od__gte=localdate()).order_by("od")
+
 	def czy_mozna_rejestrowac(self, rejs: Rejs) -> tuple[bool, str]:
 		"""
 		Sprawdza czy można zarejestrować się na dany rejs.
@@ -81,6 +116,240 @@ class SerwisRejestracji:
 
 		return not hasattr(zgloszenie, "dane_dodatkowe")
 
+	def _zajmij_miejsce(self, rejs_id: int) -> bool:
+		"""Zwiększa licznik zajętych miejsc, jeśli rejs ma wolne miejsce (w bieżącej transakcji)."""
+		from rejs.models import Rejs
+
+		wolne = Q(limit_miejsc__isnull=True) | Q(zajete_miejsca__lt=F("limit_miejsc"))
+		if Rejs.objects.filter(wolne, pk=rejs_id).update(zajete_miejsca=F("zajete_miejsca") + 1):
+			return True
+		if not connection.features.has_select_for_update:
+			# SQLite: UPDATE zajął blokadę zapisu bazy, odczytany stan jest aktualny
+			return False
+		# PostgreSQL nie czeka na blokadę wiersza, którego wersja zatwierdzona nie spełnia warunku -
+		# czekamy na trwające zwolnienie miejsca i sprawdzamy ponownie
+		list(Rejs.objects.select_for_update().filter(pk=rejs_id).values_list("pk"))
+		return bool(Rejs.objects.filter(wolne, pk=rejs_id).update(zajete_miejsca=F("zajete_miejsca") + 1))
+
+	def przed_zapisem(self, zgloszenie: Zgloszenie, pola=None) -> None:
+		"""
+		Aktualizuje miejsca na rejsie przed zapisem zgłoszenia, w transakcji zapisu (Zgloszenie.save()).
+
+		Nowe zgłoszenie zajmuje miejsce albo trafia na listę rezerwową. Przeniesienie na inny
+		rejs zwalnia miejsce na poprzednim rejsie i zajmuje miejsce (albo listę rezerwową)
+		na nowym. Odrzucenie zgłoszenia zajmującego miejsce zwalnia je dla listy rezerwowej,
+		a przywrócone zgłoszenie zajmuje miejsce, gdy rejs jest pełny - trafia na listę rezerwową.
+
+		Args:
+			zgloszenie: Zapisywane zgłoszenie (lista_rezerwowa ustawiana na instancji)
+			pola: update_fields zapisu (None - wszystkie pola)
+		"""
+		from rejs.models import Zgloszenie as ZgloszenieModel
+
+		if zgloszenie._state.adding:
+			self.zajmij_miejsce(zgloszenie)
+			return
+		stary_rejs_id = zgloszenie.wartosc_pierwotna("rejs")
+		stary_status = zgloszenie.wartosc_pierwotna("status")
+		if stary_rejs_id is None or stary_status is None:
+			# Stan sprzed zapisu nieznany (np. obiekt z bulk_create) - miejsca bez zmian
+			return
+		nowy_rejs_id = zgloszenie.rejs_id if pola is None or {"rejs", "rejs_id"} & set(pola) else stary_rejs_id
+		nowy_status = zgloszenie.status if pola is None or "status" in pola else stary_status
+
+		odrzucone = ZgloszenieModel.STATUS_ODRZUCONE
+		if nowy_rejs_id == stary_rejs_id and (
+			zgloszenie.lista_rezerwowa or (stary_status == odrzucone) == (nowy_status == odrzucone)
+		):
+			return
+		if not zgloszenie.lista_rezerwowa and stary_status != odrzucone:
+			self.zwolnij_miejsce(stary_rejs_id)
+		zgloszenie.lista_rezerwowa = nowy_status != odrzucone and not self._zajmij_miejsce(nowy_rejs_id)
+
+	def zajmij_miejsce(self, zgloszenie: Zgloszenie) -> bool:
+		"""
+		Zajmuje miejsce dla nowego zgłoszenia albo kieruje je na listę rezerwową.
+
+		Wywoływane przez przed_zapisem w transakcji zapisu nowego zgłoszenia - nieudany
+		INSERT wycofuje też zajęcie miejsca.
+
+		Args:
+			zgloszenie: Niezapisane zgłoszenie z ustawionym rejsem
+
+		Returns:
+			True jeśli zgłoszenie zajęło miejsce, False jeśli trafiło na listę rezerwową
+		"""
+		from rejs.models import Zgloszenie as ZgloszenieModel
+
+		if zgloszenie.status == ZgloszenieModel.STATUS_ODRZUCONE:
+			return False
+		zgloszenie.lista_rezerwowa = not self._zajmij_miejsce(zgloszenie.rejs_id)
+		return not zgloszenie.lista_rezerwowa
+
+	def zajmij_miejsca(self, rejs_id: int, ile: int) -> int:
+		"""
+		Zajmuje wolne miejsca dla paczki nowych zgłoszeń jednym zapisem licznika (w bieżącej transakcji).
+
+		Args:
+			rejs_id: Id rejsu
+			ile: Liczba zgłoszeń w paczce
+
+		Returns:
+			Liczba zajętych miejsc - pozostałe zgłoszenia paczki trafiają na listę rezerwową
+		"""
+		from rejs.models import Rejs
+
+		rejs = Rejs.objects.filter(pk=rejs_id)
+		# Zapis jako pierwsza instrukcja - blokada rejsu przed odczytem wolnych miejsc
+		rejs.update(zajete_miejsca=F("zajete_miejsca"))
+		limit, zajete = rejs.values_list("limit_miejsc", "zajete_miejsca").get()
+		przydzielone = ile if limit is None else max(0, min(ile, limit - zajete))
+		if przydzielone:
+			rejs.update(zajete_miejsca=F("zajete_miejsca") + przydzielone)
+		return przydzielone
+
+	def zarejestruj(self, zgloszenie: Zgloszenie) -> Zgloszenie:
+		"""
+		Zapisuje nowe zgłoszenie - na wolne miejsce, a gdy rejs jest pełny, na listę rezerwową.
+
+		Args:
+			zgloszenie: Niezapisane zgłoszenie z ustawionym rejsem
+
+		Returns:
+			Zapisane zgłoszenie (lista_rezerwowa=True, jeśli zabrakło miejsc)
+		"""
+		with transaction.atomic():
+			zgloszenie.save()
+		return zgloszenie
+
+	def token_po_kluczu(self, rejs: Rejs, klucz: str | None) -> str | None:
+		"""
+		Token zgłoszenia zapisanego wcześniej z tym samym kluczem idempotencji (ponowne wysłanie formularza).
+
+		W trybie szczytowym (TRYB_SZCZYTOWY) sprawdzane są też zgłoszenia czekające w kolejce.
+
+		Args:
+			rejs: Rejs, na który wysłano formularz
+			klucz: Wartość ukrytego pola klucz_idempotencji (może być pusta lub niepoprawna)
+
+		Returns:
+			Token zapisanego zgłoszenia albo None
+		"""
+		from rejs.models import Zgloszenie, ZgloszenieOczekujace
+
+		try:
+			klucz = uuid.UUID(klucz or "")
+		except ValueError:
+			return None
+		token = Zgloszenie.objects.filter(rejs=rejs, klucz_idempotencji=klucz).values_list("token", flat=True).first()
+		if token is None and settings.TRYB_SZCZYTOWY:
+			oczekujace = ZgloszenieOczekujace.objects.filter(rejs=rejs, klucz_idempotencji=klucz)
+			token = oczekujace.values_list("token", flat=True).first()
+		return token
+
+	def wygas_klucze_idempotencji(self, starsze_niz: timedelta, rozmiar_paczki: int = 1000) -> int:
+		"""
+		Usuwa klucze idempotencji zgłoszeń starszych niż podany wiek.
+
+		Każda paczka to osobna, krótka transakcja - rejestracje nie czekają na całe czyszczenie.
+
+		Args:
+			starsze_niz: Wiek zgłoszenia, po którym klucz wygasa
+			rozmiar_paczki: Liczba zgłoszeń aktualizowanych jednym zapytaniem
+
+		Returns:
+			Liczba wyczyszczonych kluczy
+		"""
+		from rejs.models import Zgloszenie
+
+		przeterminowane = Zgloszenie.objects.filter(
+			klucz_idempotencji__isnull=False, data_zgloszenia__lt=timezone.now() - starsze_niz
+		)
+		wyczyszczone = 0
+		while paczka := list(przeterminowane.values_list("pk", flat=True)[:rozmiar_paczki]):
+			wyczyszczone += Zgloszenie.objects.filter(pk__in=paczka).update(klucz_idempotencji=None)
+		return wyczyszczone
+
+	def przyjmij_z_listy_rezerwowej(self, rejs_id: int) -> list[Zgloszenie]:
+		"""
+		Obsadza wolne miejsca rejsu osobami z listy rezerwowej, w kolejności zgłoszeń.
+
+		Przyjęci dostają email po zatwierdzeniu transakcji.
+
+		Args:
+			rejs_id: Id rejsu
+
+		Returns:
+			Lista zgłoszeń przyjętych z listy rezerwowej
+		"""
+		from rejs.models import Zgloszenie
+
+		kolejka = (
+			Zgloszenie.objects.filter(rejs_id=rejs_id, lista_rezerwowa=True)
+			.exclude(status=Zgloszenie.STATUS_ODRZUCONE)
+			.order_by("data_zgloszenia", "pk")
+		)
+		przyjete = []
+		with transaction.atomic():
+			while (nastepne := kolejka.first()) is not None and self._zajmij_miejsce(rejs_id):
+				Zgloszenie.objects.filter(pk=nastepne.pk).update(lista_rezerwowa=False)
+				nastepne.lista_rezerwowa = False
+				przyjete.append(nastepne)
+			if przyjete:
+				transaction.on_commit(lambda: serwis_notyfikacji.powiadom_o_przyjeciu_z_listy_rezerwowej(przyjete))
+		return przyjete
+
+	def zwolnij_miejsce(self, rejs_id: int) -> list[Zgloszenie]:
+		"""
+		Zwalnia miejsce na rejsie i przyjmuje na nie kolejną osobę z listy rezerwowej.
+
+		Args:
+			rejs_id: Id rejsu
+
+		Returns:
+			Lista zgłoszeń przyjętych z listy rezerwowej (najwyżej jedno)
+		"""
+		from rejs.models import Rejs
+
+		with transaction.atomic():
+			Rejs.objects.filter(pk=rejs_id, zajete_miejsca__gt=0).update(zajete_miejsca=F("zajete_miejsca") - 1)
+			return self.przyjmij_z_listy_rezerwowej(rejs_id)
+
+	def po_usunieciu(self, zgloszenie: Zgloszenie) -> None:
+		"""
+		Zwalnia miejsce usuniętego zgłoszenia, jeśli je zajmowało.
+
+		Args:
+			zgloszenie: Usunięte zgłoszenie
+		"""
+		from rejs.models import Zgloszenie as ZgloszenieModel
+
+		if not zgloszenie.lista_rezerwowa and zgloszenie.status != ZgloszenieModel.STATUS_ODRZUCONE:
+			self.zwolnij_miejsce(zgloszenie.rejs_id)
+
+	def przelicz_miejsca(self, rejs_id: int) -> int:
+		"""
+		Odtwarza licznik zajętych miejsc z danych zgłoszeń (np. po imporcie przez bulk_create).
+
+		Args:
+			rejs_id: Id rejsu
+
+		Returns:
+			Liczba zajętych miejsc
+		"""
+		from rejs.models import Rejs, Zgloszenie
+
+		with transaction.atomic():
+			# Zapis jako pierwsza instrukcja - blokada rejsu przed policzeniem zgłoszeń
+			Rejs.objects.filter(pk=rejs_id).update(zajete_miejsca=0)
+			zajete = (
+				Zgloszenie.objects.filter(rejs_id=rejs_id, lista_rezerwowa=False)
+				.exclude(status=Zgloszenie.STATUS_ODRZUCONE)
+				.count()
+			)
+			Rejs.objects.filter(pk=rejs_id).update(zajete_miejsca=zajete)
+		return zajete
+
 
 # Domyślna instancja serwisu
 serwis_rejestracji = SerwisRejestracji()
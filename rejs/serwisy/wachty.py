@@ -6,9 +6,15 @@ Odpowiada za logikę biznesową związaną z przypisywaniem członków do wacht.
 
 from __future__ import annotations
 
+from collections import Counter
 from typing import TYPE_CHECKING
 
 from django import forms
+from django.db import transaction
+from django.db.models import Case, Count, IntegerField, Value, When
+
+from rejs.serwisy.notyfikacje import serwis_notyfikacji
+from rejs.serwisy.pulpit import serwis_pulpitu
 
 if TYPE_CHECKING:
 	from django.db.models import QuerySet
@@ -16,6 +22,12 @@ if TYPE_CHECKING:
 	from rejs.models import Rejs, Wachta, Zgloszenie
 
 
+ROLA_OFICER = "OFICER-WACHTY"
+
+# Kolejność rozdzielania: najpierw osoby, które najtrudniej zrównoważyć
+KOLEJNOSC_WZROKU = ("NIEWIDOMY", "SLABO-WIDZACY", "WIDZI")
+
+
 class SerwisWacht:
 	"""
 	Serwis obsługujący zarządzanie wachtami.
@@ -24,6 +36,11 @@ class SerwisWacht:
 		przypisz_czlonka - przypisuje zgłoszenie do wachty
 		usun_czlonka - usuwa zgłoszenie z wachty
 		pobierz_dostepnych_czlonkow - zwraca zgłoszenia bez wachty
+		aktualizuj_czlonkow_wachty - ustawia skład wachty zbiorczo
+		zaplanuj_przydzial - wylicza zrównoważony przydział (bez bazy danych)
+		rozdziel_automatycznie - przydziela zakwalifikowanych uczestników do wacht rejsu
+		przenies_czlonkow - przenosi uczestników między wachtami rejsu
+		uklad_wacht - zwraca skład wacht rejsu (dla planszy wacht)
 	"""
 
 	def przypisz_czlonka(self, wachta: Wachta, zgloszenie: Zgloszenie) -> None:
@@ -67,38 +84,239 @@ class SerwisWacht:
 
 		return Zgloszenie.objects.filter(rejs=rejs, wachta=None)
 
-	def aktualizuj_czlonkow_wachty(self, wachta: Wachta, nowi_czlonkowie: list[Zgloszenie]) -> None:
+	def aktualizuj_czlonkow_wachty(
+		self,
+		wachta: Wachta,
+		nowi_czlonkowie: list[Zgloszenie],
+		powiadom: bool = False,
+	) -> tuple[int, int]:
 		"""
-		Aktualizuje listę członków wachty używając bulk_update dla wydajności.
+		Ustawia skład wachty dwoma zbiorczymi UPDATE ... WHERE id IN (...).
 
-		Usuwa członków którzy nie są na nowej liście i dodaje nowych.
-		Używa bulk_update zamiast pojedynczych save() - nie wywołuje sygnałów,
-		co jest pożądane przy operacjach zbiorczych w adminie.
+		Nie pobiera obecnych członków ani nie buduje instancji modelu - usuwa
+		z wachty zgłoszenia spoza nowej listy i przypisuje pozostałe. Oba
+		zapytania są zawężone do rejsu wachty, więc zgłoszenie z innego rejsu
+		nie zostanie przypisane nawet przy nieaktualnych danych formularza.
+		UPDATE omija sygnały - emaile o przypisaniu wysyłane są tylko na
+		żądanie (powiadom=True), jedną wysyłką po zatwierdzeniu transakcji.
 
 		Args:
 			wachta: Wachta do aktualizacji
 			nowi_czlonkowie: Lista zgłoszeń które mają być członkami wachty
+			powiadom: Czy wysłać email do nowo przypisanych członków
+
+		Returns:
+			Krotka (liczba dodanych, liczba usuniętych)
+
+		Raises:
+			forms.ValidationError: Gdy zgłoszenie nie należy do rejsu wachty
+		"""
+		from rejs.models import Zgloszenie
+
+		for zgloszenie in nowi_czlonkowie:
+			if zgloszenie.rejs_id != wachta.rejs_id:
+				raise forms.ValidationError(f"Zgłoszenie {zgloszenie} nie należy do rejsu {wachta.rejs}")
+
+		nowe_ids = {zgloszenie.pk for zgloszenie in nowi_czlonkowie}
+		rejsu = Zgloszenie.objects.filter(rejs_id=wachta.rejs_id)
+
+		with transaction.atomic():
+			usuniete = rejsu.filter(wachta=wachta).exclude(pk__in=nowe_ids).update(wachta=None)
+
+			do_dodania = rejsu.filter(pk__in=nowe_ids).exclude(wachta=wachta)
+			if powiadom:
+				# Zapamiętujemy dodawanych przed UPDATE - potem nie da się ich odróżnić od obecnych
+				dodani = list(do_dodania)
+				dodane = rejsu.filter(pk__in=[z.pk for z in dodani]).update(wachta=wachta)
+				for zgloszenie in dodani:
+					zgloszenie.wachta = wachta
+				transaction.on_commit(lambda: serwis_notyfikacji.powiadom_o_przypisaniu_wachty_zbiorczo(dodani))
+			else:
+				dodane = do_dodania.update(wachta=wachta)
+
+		# UPDATE omija sygnały, więc metryki pulpitu unieważniamy jawnie
+		serwis_pulpitu.uniewaznij()
+		return dodane, usuniete
+
+	def zaplanuj_przydzial(
+		self,
+		wachty_ids: list[int],
+		kandydaci: list[tuple[int, str, str]],
+		obsada: list[tuple[int, str, str, int]] | None = None,
+	) -> dict[int, int]:
+		"""
+		Wylicza zrównoważony przydział kandydatów do wacht (zachłannie, w jednym przebiegu).
+
+		Najpierw oficerowie wachty - każdy trafia do wachty z najmniejszą
+		liczbą oficerów. Następnie załoganci według statusu wzroku (niewidomi,
+		słabo widzący, widzący) - do wachty z najmniejszą liczbą osób danej
+		grupy, a przy remisie do najmniej licznej. Obecna obsada wacht jest
+		uwzględniana w licznikach, więc istniejące przypisania nie są zmieniane.
+
+		Args:
+			wachty_ids: Identyfikatory wacht rejsu
+			kandydaci: Krotki (pk, wzrok, rola) uczestników do przydzielenia
+			obsada: Krotki (wachta_id, wzrok, rola, liczba) opisujące obecną obsadę
+
+		Returns:
+			Słownik pk zgłoszenia -> id wachty
+		"""
+		if not wachty_ids:
+			return {}
+
+		oficerowie = Counter()
+		wzrok = Counter()
+		razem = Counter()
+		for wachta_id, wzrok_czlonka, rola, liczba in obsada or []:
+			razem[wachta_id] += liczba
+			if rola == ROLA_OFICER:
+				oficerowie[wachta_id] += liczba
+			else:
+				wzrok[wachta_id, wzrok_czlonka] += liczba
+
+		przydzial = {}
+		for pk, _, rola in kandydaci:
+			if rola == ROLA_OFICER:
+				wachta_id = min(wachty_ids, key=lambda w: (oficerowie[w], razem[w]))
+				oficerowie[wachta_id] += 1
+				razem[wachta_id] += 1
+				przydzial[pk] = wachta_id
+
+		kolejnosc = {grupa: i for i, grupa in enumerate(KOLEJNOSC_WZROKU)}
+		zaloganci = sorted(
+			(k for k in kandydaci if k[2] != ROLA_OFICER),
+			key=lambda k: kolejnosc.get(k[1], len(kolejnosc)),
+		)
+		for pk, wzrok_kandydata, _ in zaloganci:
+			wachta_id = min(wachty_ids, key=lambda w: (wzrok[w, wzrok_kandydata], razem[w]))
+			wzrok[wachta_id, wzrok_kandydata] += 1
+			razem[wachta_id] += 1
+			przydzial[pk] = wachta_id
+		return przydzial
+
+	def rozdziel_automatycznie(self, rejs: Rejs, powiadom: bool = False) -> int:
+		"""
+		Przydziela zakwalifikowanych, nieprzypisanych uczestników rejsu do jego wacht.
+
+		Obsada wacht i kandydaci pobierani są dwoma zapytaniami, przydział
+		liczony jest w pamięci (zaplanuj_przydzial), a zapisywany jednym
+		UPDATE z CASE po wachtach. UPDATE dotyczy tylko zgłoszeń nadal bez
+		wachty - przypisania zrobione w międzyczasie ręcznie nie są nadpisywane.
+
+		Args:
+			rejs: Rejs, którego uczestników rozdzielamy
+			powiadom: Czy wysłać email do przypisanych uczestników
+
+		Returns:
+			Liczba przypisanych uczestników
+		"""
+		from rejs.models import Zgloszenie
+
+		wachty_ids = list(rejs.wachty.order_by("pk").values_list("pk", flat=True))
+		if not wachty_ids:
+			return 0
+
+		zgloszenia = Zgloszenie.objects.filter(rejs=rejs)
+		obsada = list(
+			zgloszenia.filter(wachta__isnull=False)
+			.values_list("wachta_id", "wzrok", "rola")
+			.annotate(liczba=Count("pk"))
+			.order_by()
+		)
+		kandydaci = list(
+			zgloszenia.filter(wachta=None, status=Zgloszenie.STATUS_ZAKWALIFIKOWANY)
+			.order_by("pk")
+			.values_list("pk", "wzrok", "rola")
+		)
+		przydzial = self.zaplanuj_przydzial(wachty_ids, kandydaci, obsada)
+		if not przydzial:
+			return 0
+
+		with transaction.atomic():
+			przypisane = self._zapisz_przydzial(zgloszenia.filter(wachta=None), przydzial)
+			if powiadom:
+				dodani = [
+					z
+					for z in zgloszenia.filter(pk__in=przydzial).select_related("wachta")
+					if z.wachta_id == przydzial[z.pk]
+				]
+				transaction.on_commit(lambda: serwis_notyfikacji.powiadom_o_przypisaniu_wachty_zbiorczo(dodani))
+
+		serwis_pulpitu.uniewaznij()
+		return przypisane
+
+	def _zapisz_przydzial(self, zgloszenia: QuerySet[Zgloszenie], przydzial: dict[int, int | None]) -> int:
+		"""Zapisuje przydział pk -> id wachty (lub None) jednym UPDATE z CASE po wachtach."""
+		wedlug_wacht = {}
+		for pk, wachta_id in przydzial.items():
+			wedlug_wacht.setdefault(wachta_id, []).append(pk)
+		return zgloszenia.filter(pk__in=przydzial).update(
+			wachta=Case(
+				*(When(pk__in=pks, then=Value(wachta_id)) for wachta_id, pks in wedlug_wacht.items()),
+				output_field=IntegerField(),
+			)
+		)
+
+	def przenies_czlonkow(self, rejs: Rejs, przeniesienia: dict[int, int | None]) -> int:
+		"""
+		Przenosi uczestników między wachtami rejsu w jednej transakcji.
+
+		Przynależność wacht i zgłoszeń do rejsu sprawdzana jest w SQL:
+		wachty docelowe jednym zapytaniem, zgłoszenia - przez warunek rejs_id
+		w UPDATE. Gdy któreś zgłoszenie nie należy do rejsu, żadna zmiana
+		nie zostaje zapisana.
+
+		Args:
+			rejs: Rejs, którego wachty są planowane
+			przeniesienia: Słownik pk zgłoszenia -> id wachty docelowej (None - bez wachty)
+
+		Returns:
+			Liczba przeniesionych zgłoszeń
+
+		Raises:
+			forms.ValidationError: Gdy wachta lub zgłoszenie nie należy do rejsu
+		"""
+		from rejs.models import Zgloszenie
+
+		if not przeniesienia:
+			return 0
+
+		docelowe = {wachta_id for wachta_id in przeniesienia.values() if wachta_id is not None}
+		with transaction.atomic():
+			if rejs.wachty.filter(pk__in=docelowe).count() != len(docelowe):
+				raise forms.ValidationError(f"Wachta nie należy do rejsu {rejs}")
+			przeniesione = self._zapisz_przydzial(Zgloszenie.objects.filter(rejs=rejs), przeniesienia)
+			if przeniesione != len(przeniesienia):
+				raise forms.ValidationError(f"Zgłoszenie nie należy do rejsu {rejs}")
+
+		serwis_pulpitu.uniewaznij()
+		return przeniesione
+
+	def uklad_wacht(self, rejs: Rejs) -> dict:
+		"""
+		Zwraca skład wacht rejsu w postaci gotowej do serializacji JSON (dwa zapytania).
+
+		Returns:
+			Słownik {"wachty": [{"id", "nazwa", "czlonkowie"}], "bez_wachty": [...]}
+			z uczestnikami jako słownikami pól id, imie, nazwisko, wzrok, rola, status
 		"""
 		from rejs.models import Zgloszenie
 
-		obecni = set(wachta.czlonkowie.all())
-		nowi = set(nowi_czlonkowie)
-
-		# Usuń tych którzy nie są na nowej liście (bulk_update)
-		do_usuniecia = obecni - nowi
-		if do_usuniecia:
-			for zgloszenie in do_usuniecia:
-				zgloszenie.wachta = None
-			Zgloszenie.objects.bulk_update(list(do_usuniecia), ["wachta"])
-
-		# Dodaj nowych (z walidacją, potem bulk_update)
-		do_dodania = nowi - obecni
-		if do_dodania:
-			for zgloszenie in do_dodania:
-				if zgloszenie.rejs_id != wachta.rejs_id:
-					raise forms.ValidationError(f"Zgłoszenie {zgloszenie} nie należy do rejsu {wachta.rejs}")
-				zgloszenie.wachta = wachta
-			Zgloszenie.objects.bulk_update(list(do_dodania), ["wachta"])
+		wachty = {
+			pk: {"id": pk, "nazwa": nazwa, "czlonkowie": []}
+			for pk, nazwa in rejs.wachty.order_by("pk").values_list("pk", "nazwa")
+		}
+		bez_wachty = []
+		uczestnicy = (
+			Zgloszenie.objects.filter(rejs=rejs)
+			.exclude(status=Zgloszenie.STATUS_ODRZUCONE)
+			.order_by("nazwisko", "imie", "pk")
+			.values("id", "imie", "nazwisko", "wzrok", "rola", "status", "wachta_id")
+		)
+		for uczestnik in uczestnicy:
+			wachta_id = uczestnik.pop("wachta_id")
+			(wachty[wachta_id]["czlonkowie"] if wachta_id else bez_wachty).append(uczestnik)
+		return {"wachty": list(wachty.values()), "bez_wachty": bez_wachty}
 
 
 # Domyślna instancja serwisu
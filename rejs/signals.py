@@ -1,15 +1,23 @@
 """
 Sygnały Django dla aplikacji rejs.
 
-Obsługuje zdarzenia post_save i pre_save dla modeli,
+Obsługuje zdarzenia post_save i post_delete dla modeli,
 delegując logikę powiadomień do SerwisNotyfikacji.
+Zmiany danych rejsów unieważniają metryki pulpitu (SerwisPulpitu) i odświeżają
+migawki publicznych stron (SerwisMigawek). Usunięte zgłoszenia i zmiany rejsu
+aktualizują miejsca i listę rezerwową (SerwisRejestracji); miejsca zapisywanych
+zgłoszeń aktualizuje Zgloszenie.save() w transakcji zapisu.
 """
 
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
-from .models import Ogloszenie, Wplata, Zgloszenie
+from .models import Dane_Dodatkowe, Ogloszenie, Rejs, Wplata, Zgloszenie
+from .serwisy.migawki import serwis_migawek
 from .serwisy.notyfikacje import serwis_notyfikacji
+from .serwisy.pulpit import serwis_pulpitu
+from .serwisy.rejestracja import serwis_rejestracji
 
 
 @receiver(post_save, sender=Zgloszenie)
@@ -23,17 +31,35 @@ def zgloszenie_post_save(sender, instance, created, raw=False, **kwargs):
 		serwis_notyfikacji.powiadom_o_utworzeniu_zgloszenia(instance)
 		return
 
-	# Sprawdzenie zmiany statusu (używamy _original_* z __init__ modelu - bez dodatkowego zapytania DB)
-	original_status = getattr(instance, "_original_status", None)
-	if original_status is not None and original_status != instance.status:
+	# Wartości sprzed zapisu ze śledzenia zmian modelu (SledzenieZmianMixin) - bez dodatkowego zapytania DB
+	original_status = instance.wartosc_pierwotna("status")
+	if original_status is not None and instance.has_changed("status"):
 		serwis_notyfikacji.powiadom_o_zmianie_statusu(instance, original_status)
 
 	# Sprawdzenie przypisania do wachty
-	original_wachta_id = getattr(instance, "_original_wachta_id", None)
-	if original_wachta_id is None and instance.wachta_id is not None:
+	if instance.wartosc_pierwotna("wachta") is None and instance.wachta_id is not None:
 		serwis_notyfikacji.powiadom_o_przypisaniu_wachty(instance)
 
 
+@receiver(post_delete, sender=Zgloszenie)
+def zgloszenie_post_delete(sender, instance, origin=None, **kwargs):
+	"""Zwalnia miejsce usuniętego zgłoszenia (poza usuwaniem całego rejsu)."""
+	# origin to usuwany obiekt albo QuerySet (akcja admina, Rejs.objects.filter(...).delete())
+	if getattr(origin, "model", type(origin)) is Rejs:
+		return
+
+	serwis_rejestracji.po_usunieciu(instance)
+
+
+@receiver(post_save, sender=Rejs)
+def rejs_post_save(sender, instance, created, raw=False, **kwargs):
+	"""Po zmianie rejsu (np. zwiększeniu limitu miejsc) przyjmuje osoby z listy rezerwowej."""
+	if raw or created:
+		return
+
+	serwis_rejestracji.przyjmij_z_listy_rezerwowej(instance.pk)
+
+
 @receiver(post_save, sender=Wplata)
 def wplata_post_save(sender, instance, created, raw=False, **kwargs):
 	"""Wysyła powiadomienie po utworzeniu wpłaty lub zwrotu."""
@@ -55,3 +81,20 @@ def ogloszenie_post_save(sender, instance, created, raw=False, **kwargs):
 		return
 
 	serwis_notyfikacji.powiadom_o_ogloszeniu(instance)
+
+
+@receiver([post_save, post_delete], sender=Rejs)
+@receiver([post_save, post_delete], sender=Zgloszenie)
+@receiver([post_save, post_delete], sender=Wplata)
+@receiver([post_save, post_delete], sender=Dane_Dodatkowe)
+def uniewaznij_pulpit(sender, **kwargs):
+	"""Unieważnia metryki pulpitu rekrutacji po zmianie danych, z których są liczone."""
+	serwis_pulpitu.uniewaznij()
+
+
+@receiver([post_save, post_delete], sender=Rejs)
+def odswiez_migawki(sender, raw=False, **kwargs):
+	"""Odświeża migawki publicznych stron po zatwierdzeniu zmiany rejsu (gdy migawki są włączone)."""
+	if raw or serwis_migawek.katalog() is None:
+		return
+	transaction.on_commit(serwis_migawek.odswiez)
@@ -0,0 +1,85 @@
+"""
+Opcjonalny silnik szablonów Jinja2 dla stron publicznych i emaili.
+
+Szablony Jinja2 leżą w rejs/jinja2/ (motywy: themes/<motyw>/jinja2/) pod tymi
+samymi nazwami co szablony Django. Silnik obsługuje tylko wybrane katalogi
+szablonów (SZABLONY_JINJA2, np. ["rejs", "emails"]) - pozostałe nazwy, w tym
+szablony panelu administracyjnego, zgłaszają TemplateDoesNotExist i trafiają
+do silnika Django.
+
+Środowisko odtwarza zachowanie szablonów Django, na którym polegają szablony:
+- wartości wypisywane są po lokalizacji (daty, kwoty z przecinkiem dziesiętnym),
+- brakujące atrybuty dają pusty tekst zamiast wyjątku,
+- filtry date i linebreaks oraz funkcje url, static i now,
+- autoescape tylko dla .html - w odróżnieniu od silnika Django emaile .txt
+  nie są escapowane (apostrof w nazwisku nie staje się &#x27;).
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+
+from django.conf import settings
+from django.template import TemplateDoesNotExist
+from django.template.backends.jinja2 import Jinja2
+from django.template.defaultfilters import date, linebreaks_filter
+from django.templatetags.static import static
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.formats import localize
+from django.utils.timezone import template_localtime
+from jinja2 import ChainableUndefined, Environment, select_autoescape
+
+
+def _url(nazwa: str, *args, **kwargs) -> str:
+	return reverse(nazwa, args=args or None, kwargs=kwargs or None)
+
+
+def _linebreaks(wartosc) -> str:
+	return linebreaks_filter(wartosc, autoescape=True)
+
+
+def _wartosc(wartosc):
+	"""Wypisanie wartości jak w szablonach Django: czas lokalny i format zależny od języka."""
+	return localize(template_localtime(wartosc))
+
+
+def srodowisko(**opcje) -> Environment:
+	"""Środowisko Jinja2 z filtrami i funkcjami używanymi przez szablony aplikacji."""
+	# Backend Django ustawia własne autoescape i undefined (DebugUndefined przy DEBUG) - nadpisujemy
+	opcje["autoescape"] = select_autoescape(["html"], default_for_string=True)
+	opcje["undefined"] = ChainableUndefined
+	opcje.setdefault("finalize", _wartosc)
+	env = Environment(**opcje)
+	env.filters.update(date=date, linebreaks=_linebreaks)
+	env.globals.update(url=_url, static=static, now=timezone.now)
+	return env
+
+
+class Jinja2Katalogi(Jinja2):
+	"""Backend Jinja2 ograniczony do wybranych katalogów szablonów (opcja "katalogi")."""
+
+	def __init__(self, params):
+		params = params.copy()
+		opcje = params["OPTIONS"] = params.get("OPTIONS", {}).copy()
+		self.katalogi = frozenset(opcje.pop("katalogi", ()))
+		opcje.setdefault("environment", "rejs.szablony.srodowisko")
+		super().__init__(params)
+
+	def get_template(self, template_name):
+		if template_name.partition("/")[0] not in self.katalogi:
+			raise TemplateDoesNotExist(template_name, backend=self)
+		return super().get_template(template_name)
+
+
+def silnik(katalogi: Iterable[str], nazwa: str = "jinja2") -> Jinja2Katalogi:
+	"""Silnik skonfigurowany jak w ustawieniach (z motywem DJANGO_THEME), także poza TEMPLATES."""
+	motyw = getattr(settings, "DJANGO_THEME", "")
+	return Jinja2Katalogi(
+		{
+			"NAME": nazwa,
+			"DIRS": [settings.BASE_DIR / "themes" / motyw / "jinja2"] if motyw else [],
+			"APP_DIRS": True,
+			"OPTIONS": {"katalogi": list(katalogi)},
+		}
+	)
@@ -3,10 +3,13 @@ from decimal import Decimal
 
 from django.contrib.admin.sites import AdminSite
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
 from django.test import Client, RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
 
-from rejs.admin import Dane_DodatkoweAdmin, RejsyAdmin, ZgloszenieAdmin, generate_report
-from rejs.models import AuditLog, Dane_Dodatkowe, Rejs, Zgloszenie
+from rejs.admin import Dane_DodatkoweAdmin, RejsyAdmin, ZgloszenieAdmin, generate_report, rozdziel_na_wachty
+from rejs.models import AuditLog, Dane_Dodatkowe, Rejs, Wachta, Wplata, Zgloszenie
 
 
 # Helper to get future dates for tests
@@ -77,6 +80,282 @@ class AdminTest(TestCase):
 		self.assertIn("suma_wplat", admin.readonly_fields)
 
 
+class ZgloszenieAdminFinanseTest(TestCase):
+	"""Testy kolumn finansowych i filtra płatności w adminie zgłoszeń."""
+
+	def setUp(self):
+		self.admin_user = User.objects.create_superuser(
+			username="admin", email="admin@example.com", password="adminpass123"
+		)
+		self.client.login(username="admin", password="adminpass123")
+		self.rejs = Rejs.objects.create(
+			nazwa="Rejs testowy",
+			od=future_date(30),
+			do=future_date(44),
+			start="Gdynia",
+			koniec="Sztokholm",
+			cena=Decimal("1500"),
+		)
+		# imię -> lista (kwota, rodzaj)
+		self.zgloszenia = {}
+		for imie, wplaty in {
+			"Oplacony": [("1500", "wplata")],
+			"Zaliczka": [("500", "wplata")],
+			"Brak": [],
+			"Nadplata": [("1500", "wplata"), ("200", "wplata")],
+			"Zwrot": [("1500", "wplata"), ("1500", "zwrot")],
+		}.items():
+			zgloszenie = self._zgloszenie(imie)
+			for kwota, rodzaj in wplaty:
+				Wplata.objects.create(zgloszenie=zgloszenie, kwota=Decimal(kwota), rodzaj=rodzaj)
+			self.zgloszenia[imie] = zgloszenie
+
+	def _zgloszenie(self, imie):
+		return Zgloszenie.objects.create(
+			imie=imie,
+			nazwisko="Kowalski",
+			email=f"{imie.lower()}@example.com",
+			telefon="123456789",
+			data_urodzenia=datetime.date(1990, 1, 1),
+			rejs=self.rejs,
+			rodo=True,
+			obecnosc="tak",
+		)
+
+	def _imiona(self, **parametry):
+		response = self.client.get("/admin/rejs/zgloszenie/", parametry)
+		self.assertEqual(response.status_code, 200)
+		return [z.imie for z in response.context["cl"].result_list]
+
+	def test_adnotacje_zgodne_z_wlasciwosciami(self):
+		"""Wartości liczone w SQL są równe wartościom z właściwości modelu."""
+		for zgloszenie in Zgloszenie.objects.z_finansami():
+			swiezy = Zgloszenie.objects.get(pk=zgloszenie.pk)
+			self.assertEqual(zgloszenie.suma_wplat, swiezy.suma_wplat)
+			self.assertEqual(zgloszenie.do_zaplaty, swiezy.do_zaplaty)
+
+	def test_filtr_platnosci(self):
+		"""Każda kategoria filtra zwraca właściwe zgłoszenia."""
+		self.assertEqual(self._imiona(platnosc="oplacone"), ["Oplacony"])
+		self.assertEqual(self._imiona(platnosc="czesciowo"), ["Zaliczka"])
+		self.assertEqual(sorted(self._imiona(platnosc="brak")), ["Brak", "Zwrot"])
+		self.assertEqual(self._imiona(platnosc="nadplata"), ["Nadplata"])
+
+	def test_sortowanie_po_kwocie_do_zaplaty(self):
+		"""Kolumnę do zapłaty można sortować."""
+		kolumna = ZgloszenieAdmin.list_display.index("do_zaplaty_display")
+		imiona = self._imiona(o=str(kolumna + 1))
+		self.assertEqual(imiona[:3], ["Nadplata", "Oplacony", "Zaliczka"])
+
+	def test_stala_liczba_zapytan(self):
+		"""Liczba zapytań listy nie zależy od liczby zgłoszeń."""
+		self.client.get("/admin/rejs/zgloszenie/")
+		with CaptureQueriesContext(connection) as przed:
+			self.client.get("/admin/rejs/zgloszenie/")
+		for i in range(10):
+			Wplata.objects.create(zgloszenie=self._zgloszenie(f"Nowy{i}"), kwota=Decimal("100"))
+		with CaptureQueriesContext(connection) as po:
+			self.client.get("/admin/rejs/zgloszenie/")
+		self.assertEqual(len(po), len(przed))
+
+
+class RejsyAdminChangePageTest(TestCase):
+	"""Testy strony edycji rejsu z inline zgłoszeń i wacht."""
+
+	def setUp(self):
+		User.objects.create_superuser(username="admin", email="admin@example.com", password="adminpass123")
+		self.client.login(username="admin", password="adminpass123")
+		self.rejs = Rejs.objects.create(
+			nazwa="Rejs testowy",
+			od=future_date(30),
+			do=future_date(44),
+			start="Gdynia",
+			koniec="Sztokholm",
+		)
+		self.wachty = [Wachta.objects.create(rejs=self.rejs, nazwa=f"W{i}") for i in range(3)]
+		self.url = f"/admin/rejs/rejs/{self.rejs.pk}/change/"
+		self._dodaj_zgloszenia(5)
+
+	def _dodaj_zgloszenia(self, liczba):
+		start = Zgloszenie.objects.count()
+		for i in range(start, start + liczba):
+			Zgloszenie.objects.create(
+				imie=f"Jan{i}",
+				nazwisko="Kowalski",
+				email=f"jan{i}@example.com",
+				telefon="123456789",
+				data_urodzenia=datetime.date(1990, 1, 1),
+				rejs=self.rejs,
+				rodo=True,
+				obecnosc="tak",
+				wachta=self.wachty[i % 3],
+			)
+
+	def _liczba_zapytan(self):
+		with CaptureQueriesContext(connection) as zapytania:
+			response = self.client.get(self.url)
+		self.assertEqual(response.status_code, 200)
+		return len(zapytania)
+
+	def test_stala_liczba_zapytan(self):
+		"""Liczba zapytań strony rejsu nie zależy od liczby zgłoszeń."""
+		self.client.get(self.url)
+		przed = self._liczba_zapytan()
+		self._dodaj_zgloszenia(60)
+		self.assertEqual(self._liczba_zapytan(), przed)
+
+	def test_stronicowanie_zgloszen(self):
+		"""Inline zgłoszeń pokazuje jedną stronę i linki do kolejnych."""
+		self._dodaj_zgloszenia(30)
+		response = self.client.get(self.url)
+		formset = next(f for f in response.context["inline_admin_formsets"] if f.opts.model is Zgloszenie)
+		self.assertEqual(len(formset.formset.forms), 25)
+		self.assertContains(response, "?zgloszenia_strona=2")
+
+		response = self.client.get(self.url, {"zgloszenia_strona": 2})
+		formset = next(f for f in response.context["inline_admin_formsets"] if f.opts.model is Zgloszenie)
+		self.assertEqual(len(formset.formset.forms), 10)
+
+	def test_stronicowanie_zachowuje_parametry(self):
+		"""Linki stron zachowują pozostałe parametry GET (filtry listy zmian) i zmieniają tylko numer strony."""
+		self._dodaj_zgloszenia(30)
+		response = self.client.get(self.url, {"_changelist_filters": "od__gte=2030-01-01", "zgloszenia_strona": 2})
+		self.assertContains(response, "?_changelist_filters=od__gte%3D2030-01-01&amp;zgloszenia_strona=1")
+		self.assertNotContains(response, "zgloszenia_strona=2&amp;")
+
+	def test_czlonkowie_wachty_na_liscie_wyboru(self):
+		"""Obecni członkowie wachty są zaznaczeni na liście wyboru."""
+		response = self.client.get(self.url)
+		formset = next(f for f in response.context["inline_admin_formsets"] if f.opts.model is Wachta)
+		for form in formset.formset.forms:
+			wybrane = set(form.initial.get("czlonkowie") or form.fields["czlonkowie"].initial)
+			self.assertEqual(wybrane, set(form.instance.czlonkowie.values_list("pk", flat=True)))
+			self.assertTrue(wybrane <= {pk for pk, _ in form.fields["czlonkowie"].choices})
+
+
+class PulpitRekrutacjiTest(TestCase):
+	"""Testy pulpitu rekrutacji w panelu administracyjnym."""
+
+	def setUp(self):
+		cache.clear()
+		User.objects.create_superuser(username="admin", email="admin@example.com", password="adminpass123")
+		self.rejs = Rejs.objects.create(
+			nazwa="Rejs testowy",
+			od=future_date(30),
+			do=future_date(44),
+			start="Gdynia",
+			koniec="Sztokholm",
+		)
+
+	def test_pulpit(self):
+		"""Pulpit pokazuje nadchodzące rejsy i jest podlinkowany z listy rejsów."""
+		self.client.login(username="admin", password="adminpass123")
+
+		response = self.client.get("/admin/rejs/rejs/pulpit/")
+
+		self.assertEqual(response.status_code, 200)
+		self.assertContains(response, "Rejs testowy")
+		self.assertContains(self.client.get("/admin/rejs/rejs/"), "/admin/rejs/rejs/pulpit/")
+
+	def test_pulpit_wymaga_uprawnien(self):
+		"""Pracownik bez uprawnień do rejsów nie widzi pulpitu."""
+		User.objects.create_user(username="staff", password="staffpass123", is_staff=True)
+		self.client.login(username="staff", password="staffpass123")
+
+		self.assertEqual(self.client.get("/admin/rejs/rejs/pulpit/").status_code, 403)
+
+
+class PlanszaWachtTest(TestCase):
+	"""Testy endpointu JSON do przenoszenia uczestników między wachtami."""
+
+	def setUp(self):
+		User.objects.create_superuser(username="admin", email="admin@example.com", password="adminpass123")
+		self.client.login(username="admin", password="adminpass123")
+		self.rejs = Rejs.objects.create(
+			nazwa="Rejs testowy",
+			od=future_date(30),
+			do=future_date(44),
+			start="Gdynia",
+			koniec="Sztokholm",
+		)
+		self.wachty = [Wachta.objects.create(rejs=self.rejs, nazwa=f"W{i}") for i in range(3)]
+		self.zgloszenia = [
+			Zgloszenie.objects.create(
+				imie=f"Jan{i}",
+				nazwisko="Kowalski",
+				email=f"jan{i}@example.com",
+				telefon="123456789",
+				data_urodzenia=datetime.date(1990, 1, 1),
+				rejs=self.rejs,
+				rodo=True,
+				obecnosc="tak",
+			)
+			for i in range(60)
+		]
+		self.url = f"/admin/rejs/rejs/{self.rejs.pk}/wachty/"
+
+	def _przenies(self, przeniesienia):
+		return self.client.post(self.url, {"przeniesienia": przeniesienia}, content_type="application/json")
+
+	def test_uklad(self):
+		"""GET zwraca wachty i uczestników bez wachty."""
+		response = self.client.get(self.url)
+
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual([w["nazwa"] for w in response.json()["wachty"]], ["W0", "W1", "W2"])
+		self.assertEqual(len(response.json()["bez_wachty"]), 60)
+
+	def test_przeniesienie_calej_zalogi(self):
+		"""Przeniesienie 60 osób to stała liczba zapytań i nowy skład w odpowiedzi."""
+		przeniesienia = [{"zgloszenie": z.pk, "wachta": self.wachty[i % 3].pk} for i, z in enumerate(self.zgloszenia)]
+
+		with CaptureQueriesContext(connection) as zapytania:
+			response = self._przenies(przeniesienia)
+
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual([len(w["czlonkowie"]) for w in response.json()["wachty"]], [20, 20, 20])
+		self.assertEqual(response.json()["bez_wachty"], [])
+		self.assertEqual(len([q for q in zapytania.captured_queries if q["sql"].startswith("UPDATE")]), 1)
+		self.assertLess(len(zapytania), 15)
+
+	def test_zgloszenie_z_innego_rejsu(self):
+		"""Zgłoszenie spoza rejsu daje błąd 400 i nic nie zostaje zapisane."""
+		inny = Rejs.objects.create(nazwa="Inny", od=future_date(60), do=future_date(70), start="A", koniec="B")
+		obcy = Zgloszenie.objects.create(
+			imie="Anna",
+			nazwisko="Nowak",
+			email="anna@example.com",
+			telefon="123456789",
+			data_urodzenia=datetime.date(1990, 1, 1),
+			rejs=inny,
+			rodo=True,
+			obecnosc="tak",
+		)
+
+		response = self._przenies(
+			[
+				{"zgloszenie": self.zgloszenia[0].pk, "wachta": self.wachty[0].pk},
+				{"zgloszenie": obcy.pk, "wachta": self.wachty[0].pk},
+			]
+		)
+
+		self.assertEqual(response.status_code, 400)
+		self.assertIn("blad", response.json())
+		self.assertFalse(Zgloszenie.objects.filter(wachta__isnull=False).exists())
+
+	def test_nieprawidlowe_dane(self):
+		"""Nieprawidłowy JSON daje błąd 400."""
+		response = self.client.post(self.url, "nie-json", content_type="application/json")
+		self.assertEqual(response.status_code, 400)
+
+	def test_wymaga_uprawnien(self):
+		"""Pracownik bez uprawnień do rejsów nie może przenosić uczestników."""
+		User.objects.create_user(username="staff", password="staffpass123", is_staff=True)
+		self.client.login(username="staff", password="staffpass123")
+
+		self.assertEqual(self._przenies([]).status_code, 403)
+
+
 class GenerateReportActionTest(TestCase):
 	"""Testy akcji generowania raportu Excel."""
 
@@ -157,6 +436,49 @@ class GenerateReportActionTest(TestCase):
 		self.assertIsNone(result)
 
 
+class RozdzielNaWachtyActionTest(TestCase):
+	"""Testy akcji automatycznego przydziału do wacht."""
+
+	def setUp(self):
+		self.rejs = Rejs.objects.create(
+			nazwa="Rejs testowy",
+			od=future_date(30),
+			do=future_date(44),
+			start="Gdynia",
+			koniec="Sztokholm",
+		)
+		self.modeladmin = RejsyAdmin(Rejs, AdminSite())
+		self.request = RequestFactory().post("/admin/rejs/rejs/")
+		self.request._messages = MockMessages()
+
+	def test_przydziela_uczestnikow(self):
+		"""Akcja przydziela zakwalifikowanych uczestników i informuje o liczbie."""
+		wachta = Wachta.objects.create(rejs=self.rejs, nazwa="Alfa")
+		zgloszenie = Zgloszenie.objects.create(
+			imie="Jan",
+			nazwisko="Kowalski",
+			email="jan@example.com",
+			telefon="123456789",
+			data_urodzenia="1990-01-01",
+			rejs=self.rejs,
+			rodo=True,
+			obecnosc="tak",
+			status=Zgloszenie.STATUS_ZAKWALIFIKOWANY,
+		)
+
+		rozdziel_na_wachty(self.modeladmin, self.request, Rejs.objects.filter(pk=self.rejs.pk))
+
+		zgloszenie.refresh_from_db()
+		self.assertEqual(zgloszenie.wachta, wachta)
+		self.assertIn("przypisano do wacht 1", self.request._messages.messages[0][1])
+
+	def test_rejs_bez_wacht(self):
+		"""Akcja ostrzega, gdy rejs nie ma wacht."""
+		rozdziel_na_wachty(self.modeladmin, self.request, Rejs.objects.filter(pk=self.rejs.pk))
+
+		self.assertIn("nie ma wacht", self.request._messages.messages[0][1])
+
+
 class MockMessages:
 	"""Mock dla systemu wiadomości Django."""
 
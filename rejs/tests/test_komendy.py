@@ -0,0 +1,689 @@
+import datetime
+import json
+import tempfile
+import uuid
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from cryptography.fernet import Fernet, InvalidToken
+from django.conf import settings
+from django.core import mail
+from django.core.management import CommandError, call_command
+from django.db.models.signals import post_save
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from rejs.audyt import log_audit
+from rejs.benchmarks.dane import utworz_rejs
+from rejs.kryptografia import ALGORYTM_AES_GCM, Szyfr, odcisk_klucza
+from rejs.management.commands.benchmark import porownaj
+from rejs.management.postep import PunktKontrolny
+from rejs.modele.pola import surowe
+from rejs.models import (
+	AuditLog,
+	Dane_Dodatkowe,
+	KluczRejsu,
+	Ogloszenie,
+	Rejs,
+	Wachta,
+	Wplata,
+	Zgloszenie,
+	ZgloszenieOczekujace,
+)
+from rejs.serwisy.rejestracja import serwis_rejestracji
+
+
+# Helper to get future dates for tests
+def future_date(days_from_now: int) -> str:
+	"""Return a date string N days from today."""
+	return (datetime.date.today() + datetime.timedelta(days=days_from_now)).isoformat()
+
+
+class RotujKluczeCommandTest(TestCase):
+	"""Testy komendy rotuj_klucze."""
+
+	def setUp(self):
+		rejs = Rejs.objects.create(
+			nazwa="Rejs testowy",
+			od=future_date(30),
+			do=future_date(44),
+			start="Gdynia",
+			koniec="Sztokholm",
+		)
+		self.rejs = rejs
+		self.dane = []
+		# Dane sprzed wprowadzenia kluczy danych rejsów - zaszyfrowane kluczem głównym
+		with mock.patch.object(Dane_Dodatkowe, "klucz_danych", return_value=None):
+			self._utworz_dane(rejs)
+
+		self.stary_klucz = settings.DJANGO_FIELD_ENCRYPTION_KEYS[0]
+		self.nowy_klucz = Fernet.generate_key().decode()
+		self.klucze = [self.nowy_klucz, self.stary_klucz]
+		self.katalog = tempfile.TemporaryDirectory()
+		self.sciezka = Path(self.katalog.name) / "rotacja.json"
+
+	def _utworz_dane(self, rejs):
+		for i in range(5):
+			zgloszenie = Zgloszenie.objects.create(
+				imie=f"Jan{i}",
+				nazwisko="Kowalski",
+				email=f"jan{i}@example.com",
+				telefon="123456789",
+				data_urodzenia=datetime.date(1990, 1, 1),
+				rejs=rejs,
+				rodo=True,
+				obecnosc="tak",
+			)
+			self.dane.append(
+				Dane_Dodatkowe.objects.create(zgloszenie=zgloszenie, poz1=f"9002140138{i}", poz3=f"DOK{i}")
+			)
+
+	def tearDown(self):
+		self.katalog.cleanup()
+
+	def _rotuj(self, **opcje):
+		with (
+			override_settings(DJANGO_FIELD_ENCRYPTION_KEYS=self.klucze),
+			mock.patch("rejs.modele.pola.szyfr_glowny", return_value=Szyfr(self.klucze)),
+		):
+			call_command("rotuj_klucze", punkt_kontrolny=str(self.sciezka), stdout=StringIO(), **opcje)
+
+	def _szyfrogramy(self):
+		return list(Dane_Dodatkowe.objects.order_by("pk").values_list(surowe("poz1"), flat=True))
+
+	def test_rotacja_szyfruje_nowym_kluczem(self):
+		"""Po rotacji dane dają się odszyfrować samym nowym kluczem."""
+		self._rotuj(rozmiar_paczki=2)
+
+		nowy = Fernet(self.nowy_klucz.encode())
+		odszyfrowane = [nowy.decrypt(t.encode()).decode() for t in self._szyfrogramy()]
+		self.assertEqual(odszyfrowane, [f"9002140138{i}" for i in range(5)])
+
+	def test_rotacja_usuwa_punkt_kontrolny_po_zakonczeniu(self):
+		"""Po udanej rotacji plik postępu jest usuwany."""
+		self._rotuj()
+		self.assertFalse(self.sciezka.exists())
+
+	def test_wznowienie_od_punktu_kontrolnego(self):
+		"""Wiersze sprzed zapisanego postępu nie są ponownie przetwarzane."""
+		ostatni = self.dane[2].pk
+		PunktKontrolny(self.sciezka).zapisz(
+			{"klucz": odcisk_klucza(self.nowy_klucz), "ostatnie_pk": {"rejs.Dane_Dodatkowe": ostatni}}
+		)
+
+		self._rotuj()
+
+		nowy = Fernet(self.nowy_klucz.encode())
+		szyfrogramy = self._szyfrogramy()
+		for token in szyfrogramy[:3]:
+			with self.assertRaises(InvalidToken):
+				nowy.decrypt(token.encode())
+		for token in szyfrogramy[3:]:
+			nowy.decrypt(token.encode())
+
+	def test_punkt_kontrolny_innego_klucza_ignorowany(self):
+		"""Postęp zapisany dla innego klucza głównego nie powoduje pominięcia wierszy."""
+		PunktKontrolny(self.sciezka).zapisz({"klucz": "innyklucz", "ostatnie_pk": {"rejs.Dane_Dodatkowe": 10**9}})
+
+		self._rotuj()
+
+		nowy = Fernet(self.nowy_klucz.encode())
+		for token in self._szyfrogramy():
+			nowy.decrypt(token.encode())
+
+	def test_odczyt_danych_po_rotacji(self):
+		"""Model odczytuje dane po rotacji bez zmian w wartościach."""
+		self._rotuj()
+
+		with mock.patch("rejs.modele.pola.szyfr_glowny", return_value=Szyfr(self.klucze)):
+			dane = Dane_Dodatkowe.objects.get(pk=self.dane[0].pk)
+		self.assertEqual(dane.poz1, "90021401380")
+		self.assertEqual(dane.poz3, "DOK0")
+
+	def test_koperty_kluczy_danych_nie_sa_przepisywane(self):
+		"""Dane zaszyfrowane kluczem danych rejsu zostają bez zmian, rotowany jest sam klucz danych."""
+		drugi_rejs = Rejs.objects.create(
+			nazwa="Rejs z kluczem danych",
+			od=future_date(60),
+			do=future_date(70),
+			start="Gdynia",
+			koniec="Visby",
+		)
+		self._utworz_dane(drugi_rejs)
+		koperty = list(
+			Dane_Dodatkowe.objects.filter(zgloszenie__rejs=drugi_rejs)
+			.order_by("pk")
+			.values_list(surowe("poz1"), flat=True)
+		)
+
+		self._rotuj()
+
+		po_rotacji = list(
+			Dane_Dodatkowe.objects.filter(zgloszenie__rejs=drugi_rejs)
+			.order_by("pk")
+			.values_list(surowe("poz1"), flat=True)
+		)
+		self.assertEqual(po_rotacji, koperty)
+		nowy = Fernet(self.nowy_klucz.encode())
+		nowy.decrypt(KluczRejsu.objects.filter(rejs=drugi_rejs).values_list(surowe("klucz"), flat=True)[0].encode())
+
+
+class UsunDaneWrazliweCommandTest(TestCase):
+	"""Testy komendy usun_dane_wrazliwe."""
+
+	def setUp(self):
+		self.rejs = Rejs.objects.create(
+			nazwa="Rejs zakonczony",
+			od=datetime.date.today() - datetime.timedelta(days=60),
+			do=datetime.date.today() - datetime.timedelta(days=45),
+			start="Gdynia",
+			koniec="Sztokholm",
+		)
+		for i in range(3):
+			zgloszenie = Zgloszenie.objects.create(
+				imie=f"Anna{i}",
+				nazwisko="Nowak",
+				email=f"anna{i}@example.com",
+				telefon="123456789",
+				data_urodzenia=datetime.date(1990, 1, 1),
+				rejs=self.rejs,
+				rodo=True,
+				obecnosc="tak",
+			)
+			Dane_Dodatkowe.objects.create(zgloszenie=zgloszenie, poz1=f"9002140138{i}")
+		self.katalog = tempfile.TemporaryDirectory()
+		self.sciezka = Path(self.katalog.name) / "retencja.json"
+
+	def tearDown(self):
+		self.katalog.cleanup()
+
+	def test_niszczy_klucz_danych_rejsu(self):
+		"""Bez sprzątania dane pozostają w bazie, ale są już nieodwracalne."""
+		call_command("usun_dane_wrazliwe", bez_sprzatania=True, stdout=StringIO())
+
+		klucz = KluczRejsu.objects.get(rejs=self.rejs)
+		self.assertIsNotNone(klucz.zniszczono)
+		self.assertIsNone(klucz.klucz)
+		self.assertEqual(Dane_Dodatkowe.objects.count(), 3)
+		self.assertEqual(set(Dane_Dodatkowe.objects.values_list("poz1", flat=True)), {None})
+		self.assertEqual(AuditLog.objects.filter(model_name="KluczRejsu").count(), 1)
+
+	def test_usuwa_stare_odrzucone_z_kolejki(self):
+		"""Zgłoszenia odrzucone z kolejki są usuwane po okresie retencji; oczekujące i świeże zostają."""
+		dane = {"imie": "Jan", "nazwisko": "Kowalski", "email": "jan@example.com"}
+		stare = ZgloszenieOczekujace.objects.create(rejs=self.rejs, dane=dane, powod_odrzucenia="Duplikat")
+		swieze = ZgloszenieOczekujace.objects.create(rejs=self.rejs, dane=dane, powod_odrzucenia="Duplikat")
+		oczekujace = ZgloszenieOczekujace.objects.create(rejs=self.rejs, dane=dane)
+		ZgloszenieOczekujace.objects.filter(pk__in=[stare.pk, oczekujace.pk]).update(
+			data_zgloszenia=timezone.now() - datetime.timedelta(days=15)
+		)
+
+		call_command("usun_dane_wrazliwe", bez_sprzatania=True, stdout=StringIO())
+
+		self.assertEqual(set(ZgloszenieOczekujace.objects.all()), {swieze, oczekujace})
+		self.assertEqual(AuditLog.objects.filter(model_name="ZgloszenieOczekujace").count(), 1)
+
+	def test_sprzata_wiersze_paczkami(self):
+		"""Domyślnie wiersze są też fizycznie usuwane, z wpisem audytu dla każdego."""
+		call_command("usun_dane_wrazliwe", rozmiar_paczki=2, punkt_kontrolny=str(self.sciezka), stdout=StringIO())
+
+		self.assertFalse(Dane_Dodatkowe.objects.exists())
+		self.assertEqual(
+			sorted(AuditLog.objects.filter(model_name="Dane_Dodatkowe").values_list("object_repr", flat=True)),
+			["Dane wrazliwe: Anna0 Nowak", "Dane wrazliwe: Anna1 Nowak", "Dane wrazliwe: Anna2 Nowak"],
+		)
+		self.assertFalse(self.sciezka.exists())
+
+	def test_sprzatanie_bez_odszyfrowania(self):
+		"""Paczki pobierają tylko identyfikatory - szyfrogramy nie są odszyfrowywane."""
+		# Dane sprzed kluczy rejsów (klucz główny) - ich wczytanie wymagałoby odszyfrowania
+		Dane_Dodatkowe.objects.update(poz1="90021401380")
+
+		with mock.patch.object(Szyfr, "odszyfruj") as odszyfruj:
+			call_command("usun_dane_wrazliwe", punkt_kontrolny=str(self.sciezka), stdout=StringIO())
+
+		odszyfruj.assert_not_called()
+		self.assertFalse(Dane_Dodatkowe.objects.exists())
+
+	def test_wznowienie_od_punktu_kontrolnego(self):
+		"""Wiersze sprzed zapisanego postępu są pomijane."""
+		pierwszy = Dane_Dodatkowe.objects.order_by("pk").first()
+		data_graniczna = datetime.date.today() - datetime.timedelta(days=30)
+		PunktKontrolny(self.sciezka).zapisz({"data_graniczna": data_graniczna.isoformat(), "ostatnie_pk": pierwszy.pk})
+
+		call_command("usun_dane_wrazliwe", punkt_kontrolny=str(self.sciezka), stdout=StringIO())
+
+		self.assertEqual(Dane_Dodatkowe.objects.get(), pierwszy)
+
+	def test_usuwa_indeks_peselu(self):
+		"""Po zniszczeniu klucza dane rejsu nie są już wyszukiwalne po PESEL."""
+		call_command("usun_dane_wrazliwe", bez_sprzatania=True, stdout=StringIO())
+		self.assertFalse(Dane_Dodatkowe.objects.po_peselu("90021401380").exists())
+
+	def test_dry_run_niczego_nie_zmienia(self):
+		"""Tryb podglądu nie niszczy kluczy ani danych."""
+		call_command("usun_dane_wrazliwe", dry_run=True, stdout=StringIO())
+
+		self.assertIsNone(KluczRejsu.objects.get(rejs=self.rejs).zniszczono)
+		self.assertEqual(Dane_Dodatkowe.objects.get(zgloszenie__imie="Anna0").poz1, "90021401380")
+
+
+class IndeksujPeselCommandTest(TestCase):
+	"""Testy komendy indeksuj_pesel."""
+
+	def setUp(self):
+		rejs = Rejs.objects.create(
+			nazwa="Rejs testowy",
+			od=future_date(30),
+			do=future_date(44),
+			start="Gdynia",
+			koniec="Sztokholm",
+		)
+		for i in range(5):
+			zgloszenie = Zgloszenie.objects.create(
+				imie=f"Jan{i}",
+				nazwisko="Kowalski",
+				email=f"jan{i}@example.com",
+				telefon="123456789",
+				data_urodzenia=datetime.date(1990, 1, 1),
+				rejs=rejs,
+				rodo=True,
+				obecnosc="tak",
+			)
+			Dane_Dodatkowe.objects.create(zgloszenie=zgloszenie, poz1=f"9002140138{i}")
+		# Dane sprzed wprowadzenia indeksu
+		Dane_Dodatkowe.objects.update(pesel_indeks="")
+		self.katalog = tempfile.TemporaryDirectory()
+		self.sciezka = Path(self.katalog.name) / "indeks.json"
+
+	def tearDown(self):
+		self.katalog.cleanup()
+
+	def test_uzupelnia_indeks(self):
+		"""Po uzupełnieniu wszystkie wiersze są wyszukiwalne po PESEL."""
+		call_command("indeksuj_pesel", rozmiar_paczki=2, punkt_kontrolny=str(self.sciezka), stdout=StringIO())
+
+		for i in range(5):
+			self.assertEqual(Dane_Dodatkowe.objects.po_peselu(f"9002140138{i}").get().zgloszenie.imie, f"Jan{i}")
+		self.assertFalse(self.sciezka.exists())
+
+	def test_wznowienie_od_punktu_kontrolnego(self):
+		"""Wiersze sprzed zapisanego postępu są pomijane."""
+		pierwszy = Dane_Dodatkowe.objects.order_by("pk").first()
+		PunktKontrolny(self.sciezka).zapisz(
+			{"klucz": odcisk_klucza(settings.FIELD_BLIND_INDEX_KEY), "ostatnie_pk": pierwszy.pk}
+		)
+
+		call_command("indeksuj_pesel", punkt_kontrolny=str(self.sciezka), stdout=StringIO())
+
+		self.assertEqual(Dane_Dodatkowe.objects.filter(pesel_indeks="").get(), pierwszy)
+
+
+class KonwertujSzyfrogramyCommandTest(TestCase):
+	"""Testy komendy konwertuj_szyfrogramy."""
+
+	def setUp(self):
+		rejs = Rejs.objects.create(
+			nazwa="Rejs testowy",
+			od=future_date(30),
+			do=future_date(44),
+			start="Gdynia",
+			koniec="Sztokholm",
+		)
+		for i in range(3):
+			zgloszenie = Zgloszenie.objects.create(
+				imie=f"Jan{i}",
+				nazwisko="Kowalski",
+				email=f"jan{i}@example.com",
+				telefon="123456789",
+				data_urodzenia=datetime.date(1990, 1, 1),
+				rejs=rejs,
+				rodo=True,
+				obecnosc="tak",
+			)
+			# Pierwszy wiersz sprzed wprowadzenia kluczy danych rejsów
+			if i == 0:
+				with mock.patch.object(Dane_Dodatkowe, "klucz_danych", return_value=None):
+					Dane_Dodatkowe.objects.create(zgloszenie=zgloszenie, poz1=f"9002140138{i}")
+			else:
+				Dane_Dodatkowe.objects.create(zgloszenie=zgloszenie, poz1=f"9002140138{i}")
+		self.szyfr = Szyfr(settings.DJANGO_FIELD_ENCRYPTION_KEYS, ALGORYTM_AES_GCM)
+		self.katalog = tempfile.TemporaryDirectory()
+		self.sciezka = Path(self.katalog.name) / "konwersja.json"
+
+	def tearDown(self):
+		self.katalog.cleanup()
+
+	def _konwertuj(self):
+		with mock.patch("rejs.modele.pola.szyfr_glowny", return_value=self.szyfr):
+			call_command("konwertuj_szyfrogramy", punkt_kontrolny=str(self.sciezka), stdout=StringIO())
+
+	def test_konwersja_na_aes_gcm(self):
+		"""Wszystkie szyfrogramy, również kluczy danych, są przepisane na AES-GCM z zachowaniem wartości."""
+		self._konwertuj()
+
+		szyfrogramy = list(Dane_Dodatkowe.objects.order_by("pk").values_list(surowe("poz1"), flat=True))
+		self.assertTrue(szyfrogramy[0].startswith("G:"))
+		self.assertTrue(all(s.startswith("G") and not s.startswith("G:") for s in szyfrogramy[1:]))
+		self.assertTrue(KluczRejsu.objects.values_list(surowe("klucz"), flat=True)[0].startswith("G:"))
+		self.assertEqual(
+			list(Dane_Dodatkowe.objects.order_by("pk").values_list("poz1", flat=True)),
+			["90021401380", "90021401381", "90021401382"],
+		)
+
+	def test_pomija_zniszczone_klucze(self):
+		"""Dane rejsu o zniszczonym kluczu pozostają bez zmian."""
+		KluczRejsu.objects.all().zniszcz()
+		przed = list(Dane_Dodatkowe.objects.order_by("pk").values_list(surowe("poz1"), flat=True))
+
+		self._konwertuj()
+
+		po = list(Dane_Dodatkowe.objects.order_by("pk").values_list(surowe("poz1"), flat=True))
+		self.assertEqual(po[1:], przed[1:])
+
+
+class LoadSampleDataScaleTest(TestCase):
+	"""Testy trybu --scale komendy load_sample_data."""
+
+	def _generuj(self, **opcje):
+		call_command("load_sample_data", scale=3, zgloszen_na_rejs=20, stdout=StringIO(), **opcje)
+		return list(Zgloszenie.objects.order_by("rejs__nazwa", "pk").values_list("imie", "nazwisko", "status", "wzrok"))
+
+	def test_generuje_dane_bez_emaili(self):
+		"""Generuje wszystkie rodzaje danych bez wysyłki powiadomień."""
+		self._generuj()
+
+		self.assertEqual(Rejs.objects.count(), 3)
+		self.assertEqual(Zgloszenie.objects.count(), 60)
+		self.assertEqual(Wachta.objects.count(), 12)
+		self.assertTrue(Wplata.objects.exists())
+		self.assertEqual(Ogloszenie.objects.count(), 9)
+		self.assertTrue(AuditLog.objects.filter(model_name="Dane_Dodatkowe").exists())
+		self.assertEqual(len(mail.outbox), 0)
+
+	def test_dane_dodatkowe_zaszyfrowane_kluczem_rejsu(self):
+		"""Dane dodatkowe są zaszyfrowane kluczem danych rejsu i wyszukiwalne po PESEL."""
+		self._generuj()
+
+		dane = Dane_Dodatkowe.objects.select_related("zgloszenie").first()
+		szyfrogram = Dane_Dodatkowe.objects.filter(pk=dane.pk).values_list(surowe("poz1"), flat=True).get()
+		self.assertTrue(szyfrogram.startswith(("F", "G")))
+		self.assertEqual(len(dane.poz1), 11)
+		self.assertEqual(Dane_Dodatkowe.objects.po_peselu(dane.poz1).get(), dane)
+
+	def test_powtarzalnosc(self):
+		"""To samo ziarno daje ten sam zbiór danych, inne ziarno - inny."""
+		pierwszy = self._generuj()
+		self.assertEqual(self._generuj(), pierwszy)
+		self.assertNotEqual(self._generuj(seed=1), pierwszy)
+
+
+class TestObciazeniaCommandTest(TransactionTestCase):
+	"""Testy komendy test_obciazenia (wątki korzystają z osobnych połączeń - dane muszą być zatwierdzone)."""
+
+	def test_raport_i_sprzatanie(self):
+		"""Raport JSON obejmuje wszystkie endpointy, a dane testowe (także wpisy audytu) są usuwane."""
+
+		def audytuj(sender, instance, created, **kwargs):
+			if created:
+				log_audit(None, "utworzenie", sender.__name__, instance.pk)
+
+		for model in (Zgloszenie, Dane_Dodatkowe):
+			post_save.connect(audytuj, sender=model)
+			self.addCleanup(post_save.disconnect, audytuj, sender=model)
+		wyjscie = StringIO()
+		call_command("test_obciazenia", watki=2, przebiegi=4, stdout=wyjscie, stderr=StringIO())
+
+		wynik = json.loads(wyjscie.getvalue())
+		self.assertEqual(wynik["bledy"], 0)
+		self.assertEqual(wynik["zadania"], 24)
+		for endpoint in wynik["endpointy"].values():
+			self.assertEqual(endpoint["zadania"], 4)
+			self.assertGreater(endpoint["p50_ms"], 0)
+		self.assertFalse(Rejs.objects.exists())
+		self.assertFalse(Zgloszenie.objects.exists())
+		self.assertFalse(Dane_Dodatkowe.objects.exists())
+		self.assertFalse(AuditLog.objects.exists())
+
+	def test_istniejacy_rejs(self):
+		"""Przy podanym rejsie usuwane są tylko zgłoszenia przebiegu."""
+		dzis = datetime.date.today()
+		rejs = Rejs.objects.create(
+			nazwa="Rejs",
+			od=dzis + datetime.timedelta(days=30),
+			do=dzis + datetime.timedelta(days=37),
+			start="A",
+			koniec="B",
+		)
+		wpis = log_audit(None, "modyfikacja", "Rejs", rejs.pk)
+		call_command("test_obciazenia", watki=1, przebiegi=2, rejs=rejs.pk, stdout=StringIO(), stderr=StringIO())
+
+		self.assertTrue(Rejs.objects.filter(pk=rejs.pk).exists())
+		self.assertFalse(Zgloszenie.objects.exists())
+		self.assertEqual(list(AuditLog.objects.all()), [wpis])
+
+
+class ProfileZadanCommandTest(TestCase):
+	"""Testy komendy profile_zadan."""
+
+	def test_podsumowanie(self):
+		"""Wyświetla żądania od najwolniejszego z tabelą najdroższych funkcji."""
+		with tempfile.TemporaryDirectory() as katalog:
+			with override_settings(
+				MIDDLEWARE=[*settings.MIDDLEWARE, "rejs.middleware.ProfilowanieMiddleware"],
+				PROFILOWANIE_KATALOG=katalog,
+				PROFILOWANIE_PROCENT=100,
+			):
+				self.client.get("/")
+				self.client.get("/rodo/")
+			wyjscie = StringIO()
+			call_command("profile_zadan", katalog=katalog, funkcje=5, stdout=wyjscie)
+
+		tekst = wyjscie.getvalue()
+		self.assertIn("Profili: 2", tekst)
+		self.assertIn("GET /rodo/", tekst)
+		self.assertIn("ncalls", tekst)
+
+	def test_filtr_widoku_i_brak_profili(self):
+		"""Filtr widoku bez dopasowań kończy się komunikatem o braku profili."""
+		with tempfile.TemporaryDirectory() as katalog:
+			wyjscie = StringIO()
+			call_command("profile_zadan", katalog=katalog, widok="index", stdout=wyjscie)
+
+		self.assertIn("Brak zapisanych profili", wyjscie.getvalue())
+
+
+class GenerujMigawkiCommandTest(TestCase):
+	"""Testy komendy generuj_migawki."""
+
+	def test_generuje_do_wskazanego_katalogu(self):
+		"""Zapisuje migawki stron do katalogu z opcji --katalog."""
+		with tempfile.TemporaryDirectory() as katalog:
+			wyjscie = StringIO()
+			call_command("generuj_migawki", katalog=Path(katalog), stdout=wyjscie)
+
+			self.assertTrue((Path(katalog) / "domyslny" / "rodo" / "index.html.gz").is_file())
+		self.assertIn("Zapisano", wyjscie.getvalue())
+
+	@override_settings(MIGAWKI_KATALOG="")
+	def test_brak_katalogu(self):
+		"""Bez katalogu w ustawieniach i opcjach komenda kończy się błędem."""
+		with self.assertRaisesMessage(CommandError, "DJANGO_MIGAWKI_KATALOG"):
+			call_command("generuj_migawki", stdout=StringIO())
+
+
+class CzyscKluczeIdempotencjiCommandTest(TestCase):
+	"""Testy komendy czysc_klucze_idempotencji."""
+
+	def setUp(self):
+		self.rejs = Rejs.objects.create(
+			nazwa="Rejs", od=datetime.date(2030, 7, 1), do=datetime.date(2030, 7, 14), start="Gdynia", koniec="Visby"
+		)
+
+	def _zgloszenie(self, nazwisko: str, wiek: datetime.timedelta) -> Zgloszenie:
+		zgl = Zgloszenie.objects.create(
+			imie="Jan",
+			nazwisko=nazwisko,
+			email=f"{nazwisko}@example.com",
+			telefon="123456789",
+			data_urodzenia=datetime.date(1990, 1, 1),
+			rejs=self.rejs,
+			rodo=True,
+			obecnosc="tak",
+			klucz_idempotencji=uuid.uuid4(),
+		)
+		Zgloszenie.objects.filter(pk=zgl.pk).update(data_zgloszenia=timezone.now() - wiek)
+		return zgl
+
+	def test_czysci_przeterminowane_paczkami(self):
+		"""Usuwa klucze starszych zgłoszeń (w kilku paczkach), nowsze zostawia."""
+		stare = [self._zgloszenie(f"stary{i}", datetime.timedelta(hours=30)) for i in range(5)]
+		nowe = self._zgloszenie("nowy", datetime.timedelta(hours=1))
+		wyjscie = StringIO()
+
+		call_command("czysc_klucze_idempotencji", rozmiar_paczki=2, stdout=wyjscie)
+
+		self.assertFalse(Zgloszenie.objects.filter(pk__in=[z.pk for z in stare], klucz_idempotencji__isnull=False))
+		self.assertIsNotNone(Zgloszenie.objects.get(pk=nowe.pk).klucz_idempotencji)
+		self.assertIn("Usunieto 5 kluczy", wyjscie.getvalue())
+		self.assertIsNone(serwis_rejestracji.token_po_kluczu(self.rejs, str(stare[0].klucz_idempotencji)))
+
+	def test_opcja_godziny(self):
+		"""--godziny nadpisuje ważność z ustawień."""
+		zgl = self._zgloszenie("kowalski", datetime.timedelta(hours=3))
+
+		call_command("czysc_klucze_idempotencji", godziny=2, stdout=StringIO())
+
+		self.assertIsNone(Zgloszenie.objects.get(pk=zgl.pk).klucz_idempotencji)
+
+
+class PrzetwarzajZgloszeniaCommandTest(TestCase):
+	"""Testy komendy przetwarzaj_zgloszenia."""
+
+	def test_oproznia_kolejke(self):
+		"""Tworzy zgłoszenia z kolejki trybu szczytowego i podaje ich liczbę."""
+		rejs = Rejs.objects.create(
+			nazwa="Rejs", od=datetime.date(2030, 7, 1), do=datetime.date(2030, 7, 14), start="Gdynia", koniec="Visby"
+		)
+		ZgloszenieOczekujace.objects.create(
+			rejs=rejs,
+			dane={
+				"imie": "Jan",
+				"nazwisko": "Kowalski",
+				"email": "jan@example.com",
+				"telefon": "123456789",
+				"data_urodzenia": "1990-01-01",
+				"obecnosc": "tak",
+				"rodo": True,
+			},
+		)
+		wyjscie = StringIO()
+
+		call_command("przetwarzaj_zgloszenia", stdout=wyjscie)
+
+		self.assertEqual(Zgloszenie.objects.get().nazwisko, "Kowalski")
+		self.assertFalse(ZgloszenieOczekujace.objects.exists())
+		self.assertIn("Utworzono 1 zgloszen", wyjscie.getvalue())
+
+
+class BenchmarkCommandTest(TestCase):
+	"""Testy komendy benchmark i zestawów benchmarków (małe rozmiary danych, bieżąca baza testowa)."""
+
+	def _benchmark(self, *zestawy, **opcje):
+		wyjscie = StringIO()
+		call_command("benchmark", *zestawy, biezaca_baza=True, stdout=wyjscie, **opcje)
+		return wyjscie.getvalue()
+
+	def test_szyfrowanie(self):
+		"""Zestaw szyfrowania raportuje wyniki dla obu algorytmów."""
+		wyjscie = self._benchmark("szyfrowanie", rozmiar=50)
+		self.assertIn("fernet: odszyfrowanie", wyjscie)
+		self.assertIn("aes-gcm: rozmiar na 10 tys. wierszy", wyjscie)
+
+	def test_wachty(self):
+		"""Zestaw wacht raportuje czas i zrównoważenie przydziału oraz aktualizację składu wachty."""
+		wyjscie = self._benchmark("wachty", rozmiar=100)
+		self.assertIn("przydzial: 100 osob", wyjscie)
+		self.assertIn("rozrzut grupy wzroku", wyjscie)
+		self.assertIn("aktualizuj_czlonkow_wachty: wymiana 50 osob", wyjscie)
+
+	def test_dane_benchmarku_z_licznikiem_miejsc(self):
+		"""Rejs benchmarku ma licznik zajętych miejsc zgodny ze zgłoszeniami."""
+		rejs = utworz_rejs(12, z_danymi=False)
+
+		self.assertEqual(Rejs.objects.get(pk=rejs.pk).zajete_miejsca, 12)
+		self.assertEqual(serwis_rejestracji.przelicz_miejsca(rejs.pk), 12)
+
+	def test_zestawy_bazodanowe_nie_zostawiaja_danych(self):
+		"""Zestawy generujące dane w bazie raportują wyniki i wycofują swoje dane."""
+		wynik = json.loads(
+			self._benchmark(
+				"pola",
+				"walidatory",
+				"widoki",
+				"raport",
+				"powiadomienia",
+				"retencja",
+				"szablony",
+				rozmiar=20,
+				json=True,
+			)
+		)
+
+		nazwy = {zestaw: [w["nazwa"] for w in wyniki] for zestaw, wyniki in wynik["wyniki"].items()}
+		self.assertIn("odczyt ORM", nazwy["pola"])
+		self.assertIn("validate_pesel: 50% blednych", nazwy["walidatory"])
+		self.assertIn("zgloszenie_utworz POST: p95", nazwy["widoki"])
+		self.assertIn("20 uczestnikow: excel", nazwy["raport"])
+		self.assertIn("ogloszenie: 20 odbiorcow", nazwy["powiadomienia"])
+		self.assertIn("usun_dane_wrazliwe: 20 wierszy", nazwy["retencja"])
+		self.assertIn("rejs/zgloszenie_details.html: django", nazwy["szablony"])
+		self.assertTrue(all(w["wartosc"] > 0 for wyniki in wynik["wyniki"].values() for w in wyniki))
+		self.assertFalse(Rejs.objects.exists())
+		self.assertFalse(Zgloszenie.objects.exists())
+		self.assertEqual(len(mail.outbox), 0)
+
+	def test_porownanie_z_wynikiem_bazowym(self):
+		"""Pogorszenie ponad próg względem wyniku bazowego kończy komendę błędem."""
+		with tempfile.TemporaryDirectory() as katalog:
+			bazowy = Path(katalog, "baza.json")
+			self._benchmark("walidatory", rozmiar=200, wyjscie=str(bazowy))
+			wyniki = json.loads(bazowy.read_text())
+
+			# Ten sam wynik przy bardzo szerokim progu - bez regresji
+			self._benchmark("walidatory", rozmiar=200, porownaj=str(bazowy), prog=1000)
+
+			# Wynik bazowy 100 razy lepszy - każdy pomiar jest regresją
+			for wynik in wyniki["wyniki"]["walidatory"]:
+				wynik["wartosc"] *= 100
+			bazowy.write_text(json.dumps(wyniki))
+			with self.assertRaisesMessage(CommandError, "validate_pesel: poprawne"):
+				self._benchmark("walidatory", rozmiar=200, porownaj=str(bazowy))
+
+	def test_porownaj_kierunek_zmiany(self):
+		"""Regresja zależy od tego, czy lepsza jest wartość mniejsza, czy większa."""
+		czas = {"wartosc": 130, "lepiej": "mniej"}
+		przepustowosc = {"wartosc": 130, "lepiej": "wiecej"}
+		self.assertEqual(porownaj(czas, {"wartosc": 100}, 20), (30.0, True))
+		self.assertEqual(porownaj(przepustowosc, {"wartosc": 100}, 20), (30.0, False))
+		self.assertEqual(porownaj({"wartosc": 70, "lepiej": "wiecej"}, {"wartosc": 100}, 20), (-30.0, True))
+
+
+class CzasStartuCommandTest(SimpleTestCase):
+	"""Testy komendy czas_startu (budżet zimnego startu procesu)."""
+
+	def test_start_bez_leniwych_modulow(self):
+		"""Zimny start nie ładuje openpyxl ani cryptography (czas zależy od maszyny - bez sprawdzania budżetu)."""
+		wyjscie = StringIO()
+		call_command("czas_startu", powtorzenia=1, json=True, budzet=10**6, stdout=wyjscie)
+
+		wynik = json.loads(wyjscie.getvalue())
+		self.assertEqual(wynik["leniwe_zaladowane"], [])
+		self.assertIn("django.urls", [i["modul"] for i in wynik["importy"]])
+		self.assertTrue(all(i["poziom"] == 0 for i in wynik["importy"]))
+
+	def test_przekroczenie_budzetu(self):
+		"""Start dłuższy niż budżet kończy komendę błędem."""
+		with self.assertRaisesMessage(CommandError, "budzet 1 ms"):
+			call_command("czas_startu", powtorzenia=1, budzet=1, stdout=StringIO())
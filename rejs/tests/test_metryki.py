@@ -0,0 +1,199 @@
+import datetime
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from rejs import metryki
+from rejs.audyt import log_audit
+from rejs.mailers import send_mass_mail_html
+from rejs.metryki import RejestrMetryk
+from rejs.modele.pola import odszyfruj_wiele, surowe
+from rejs.models import Dane_Dodatkowe, Rejs, Zgloszenie
+
+
+class RejestrMetrykTest(SimpleTestCase):
+	"""Testy rejestru metryk i formatu eksportu."""
+
+	def setUp(self):
+		self.rejestr = RejestrMetryk()
+		self.licznik = self.rejestr.licznik("test_zdarzenia_total", "Zdarzenia")
+		self.histogram = self.rejestr.histogram("test_czas_sekundy", "Czas", przedzialy=(0.1, 1.0))
+
+	def test_licznik_z_etykietami(self):
+		"""Licznik sumuje przyrosty osobno dla każdego zestawu etykiet."""
+		self.licznik.inc()
+		self.licznik.inc(2)
+		self.licznik.inc(rodzaj='a"b')
+
+		eksport = self.rejestr.eksport()
+		self.assertIn("# TYPE test_zdarzenia_total counter", eksport)
+		self.assertIn("\ntest_zdarzenia_total 3\n", eksport)
+		self.assertIn('test_zdarzenia_total{rodzaj="a\\"b"} 1', eksport)
+
+	def test_histogram(self):
+		"""Histogram eksportuje narastające przedziały, sumę i liczbę obserwacji."""
+		for wartosc in (0.05, 0.5, 0.7, 3):
+			self.histogram.obserwuj(wartosc, widok="index")
+
+		eksport = self.rejestr.eksport()
+		self.assertIn('test_czas_sekundy_bucket{widok="index",le="0.1"} 1', eksport)
+		self.assertIn('test_czas_sekundy_bucket{widok="index",le="1.0"} 3', eksport)
+		self.assertIn('test_czas_sekundy_bucket{widok="index",le="+Inf"} 4', eksport)
+		self.assertIn('test_czas_sekundy_sum{widok="index"} 4.25', eksport)
+		self.assertIn('test_czas_sekundy_count{widok="index"} 4', eksport)
+
+	def test_sumowanie_procesow(self):
+		"""Eksport sumuje wartości zapisane przez wszystkie procesy w katalogu metryk."""
+		with tempfile.TemporaryDirectory() as katalog, override_settings(METRYKI_KATALOG=katalog):
+			# Plik innego procesu roboczego
+			Path(katalog, "1.json").write_text(
+				json.dumps(
+					{
+						"test_zdarzenia_total": {"": 5},
+						"test_czas_sekundy": {"": [1, 0, 0.05, 1]},
+					}
+				)
+			)
+			self.licznik.inc(2)
+			self.histogram.obserwuj(0.5)
+
+			eksport = self.rejestr.eksport()
+
+			self.assertTrue(any(p.name != "1.json" for p in Path(katalog).glob("*.json")))
+		self.assertIn("\ntest_zdarzenia_total 7\n", eksport)
+		self.assertIn('test_czas_sekundy_bucket{le="1.0"} 2', eksport)
+		self.assertIn("test_czas_sekundy_count 2", eksport)
+
+	def test_plik_procesu_z_czasem_startu(self):
+		"""Proces z ponownie użytym pidem nie nadpisuje pliku zakończonego procesu."""
+		with tempfile.TemporaryDirectory() as katalog, override_settings(METRYKI_KATALOG=katalog):
+			with mock.patch("rejs.metryki.os.getpid", return_value=123):
+				self.licznik.inc(5)
+				self.rejestr.zapisz()
+				nowy = RejestrMetryk()
+				nowy.licznik("test_zdarzenia_total", "Zdarzenia").inc(2)
+				eksport = nowy.eksport()
+
+			pliki = sorted(p.name for p in Path(katalog).glob("*.json"))
+		self.assertEqual(len(pliki), 2)
+		self.assertTrue(all(p.startswith("123-") for p in pliki))
+		self.assertIn("\ntest_zdarzenia_total 7\n", eksport)
+
+	def test_zapis_przy_zakonczeniu_procesu(self):
+		"""Domyślny rejestr zapisuje wartości przy zakończeniu procesu."""
+		with tempfile.TemporaryDirectory() as katalog:
+			subprocess.run(
+				[
+					sys.executable,
+					"-c",
+					"import django; django.setup(); from rejs import metryki; metryki.zgloszenia.inc(3)",
+				],
+				env={
+					**os.environ,
+					"DJANGO_SETTINGS_MODULE": "zm_zgloszenia.settings",
+					"DJANGO_METRYKI_KATALOG": katalog,
+				},
+				check=True,
+			)
+			(plik,) = Path(katalog).glob("*.json")
+			self.assertEqual(json.loads(plik.read_text())["rejs_zgloszenia_total"], {"": 3})
+
+
+class MetrykiAplikacjiTest(TestCase):
+	"""Testy instrumentacji aplikacji i widoku metryk."""
+
+	def setUp(self):
+		metryki.rejestr.wyczysc()
+		dzis = datetime.date.today()
+		self.rejs = Rejs.objects.create(
+			nazwa="Rejs testowy",
+			od=dzis + datetime.timedelta(days=30),
+			do=dzis + datetime.timedelta(days=44),
+			start="Gdynia",
+			koniec="Sztokholm",
+		)
+
+	def test_widok_tylko_dla_personelu(self):
+		"""Niezalogowany użytkownik jest przekierowywany do logowania."""
+		response = self.client.get("/metryki/")
+		self.assertEqual(response.status_code, 302)
+
+	def test_rejestracja_w_metrykach(self):
+		"""Zgłoszenie, email, audyt i odszyfrowanie są widoczne w eksporcie."""
+		self.client.post(
+			f"/rejs/{self.rejs.pk}/zgloszenie/",
+			{
+				"imie": "Jan",
+				"nazwisko": "Kowalski",
+				"email": "jan@example.com",
+				"telefon": "123456789",
+				"data_urodzenia": "1990-01-01",
+				"adres": "ul. Morska 1",
+				"kod_pocztowy": "80-001",
+				"miejscowosc": "Gdynia",
+				"wzrok": "WIDZI",
+				"obecnosc": "tak",
+				"rodo": "on",
+			},
+		)
+		zgloszenie = Zgloszenie.objects.get()
+		Dane_Dodatkowe.objects.create(zgloszenie=zgloszenie, poz1="90010112318", poz2="dowod-osobisty", poz3="ABC1")
+		Dane_Dodatkowe.objects.get()
+		log_audit(None, "odczyt", "Dane_Dodatkowe", zgloszenie.pk)
+		User.objects.create_superuser(username="admin", email="admin@example.com", password="adminpass123")
+		self.client.login(username="admin", password="adminpass123")
+
+		response = self.client.get("/metryki/")
+
+		self.assertEqual(response.status_code, 200)
+		self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+		eksport = response.content.decode()
+		self.assertIn("\nrejs_zgloszenia_total 1\n", eksport)
+		self.assertIn('rejs_powiadomienia_total{rodzaj="utworzenie_zgloszenia"} 1', eksport)
+		self.assertIn("\nrejs_emaile_wyslane_total 1\n", eksport)
+		self.assertIn('rejs_audyt_wpisy_total{akcja="odczyt"} 1', eksport)
+		self.assertIn('rejs_odszyfrowania_total{algorytm="fernet"}', eksport)
+		self.assertIn('rejs_widok_sekundy_count{widok="zgloszenie_utworz"} 1', eksport)
+
+	def test_odszyfrowania_liczone_synchronicznie(self):
+		"""Odszyfrowania są liczone od razu - przez ORM każda wartość, hurtowo jeden przyrost na algorytm."""
+		rejs = Rejs.objects.create(
+			nazwa="Rejs", od=datetime.date(2030, 7, 1), do=datetime.date(2030, 7, 14), start="Gdynia", koniec="Visby"
+		)
+		for i in range(3):
+			zgloszenie = Zgloszenie.objects.create(
+				imie="Jan",
+				nazwisko=f"Nowak{i}",
+				email=f"jan{i}@example.com",
+				telefon="123456789",
+				data_urodzenia=datetime.date(1990, 1, 1),
+				rejs=rejs,
+				rodo=True,
+				obecnosc="tak",
+			)
+			Dane_Dodatkowe.objects.create(zgloszenie=zgloszenie, poz1="90010112318", poz3=f"ABC{i}")
+
+		with mock.patch.object(metryki.odszyfrowania, "inc") as inc:
+			self.assertEqual(len(list(Dane_Dodatkowe.objects.values_list("poz1", "poz3"))), 3)
+			self.assertEqual(inc.call_args_list, [mock.call(algorytm="fernet")] * 6)
+			inc.reset_mock()
+
+			odszyfruj_wiele(Dane_Dodatkowe.objects.values_list(surowe("poz1"), flat=True))
+			inc.assert_called_once_with(3, algorytm="fernet")
+
+	def test_bledy_wysylki_zbiorczej(self):
+		"""Nieudane emaile wysyłki zbiorczej są liczone, a nie tylko logowane."""
+		wiadomosci = [("Temat", "tekst", None, "od@example.com", [f"u{i}@example.com"]) for i in range(3)]
+		with mock.patch("rejs.mailers.EmailMultiAlternatives.send", side_effect=[1, OSError("smtp"), 1]):
+			send_mass_mail_html(wiadomosci)
+
+		eksport = metryki.rejestr.eksport()
+		self.assertIn("\nrejs_emaile_wyslane_total 2\n", eksport)
+		self.assertIn("\nrejs_emaile_bledy_total 1\n", eksport)
@@ -0,0 +1,199 @@
+import datetime
+import json
+import re
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase, override_settings
+
+from rejs.middleware import ProbkowanieStosu, PrzekroczonoBudzetZapytan
+from rejs.models import Dane_Dodatkowe, Rejs, Wachta, Wplata, Zgloszenie
+
+
+@override_settings(
+	MIDDLEWARE=[
+		"rejs.middleware.PomiarZapytanMiddleware",
+		*(m for m in settings.MIDDLEWARE if m != "rejs.middleware.PomiarZapytanMiddleware"),
+	],
+	BUDZET_ZAPYTAN_WYJATEK=True,
+)
+class PomiarZapytanMiddlewareTest(TestCase):
+	"""Testy middleware pomiaru zapytań i budżetów zapytań widoków."""
+
+	def setUp(self):
+		dzis = datetime.date.today()
+		self.rejs = Rejs.objects.create(
+			nazwa="Rejs testowy",
+			od=dzis + datetime.timedelta(days=30),
+			do=dzis + datetime.timedelta(days=44),
+			start="Gdynia",
+			koniec="Sztokholm",
+		)
+
+	def test_naglowek_server_timing(self):
+		"""Odpowiedź zawiera czasy bazy danych (z liczbą zapytań), szablonów i całego żądania."""
+		response = self.client.get("/")
+
+		naglowek = response["Server-Timing"]
+		self.assertRegex(naglowek, r'^db;dur=[\d.]+;desc="\d+ zapytan"')
+		self.assertIn("szablony;dur=", naglowek)
+		self.assertIn("email;dur=", naglowek)
+		self.assertIn("calkowity;dur=", naglowek)
+
+	def test_linia_logu(self):
+		"""Każde żądanie zapisuje linię klucz=wartość z nazwą widoku i liczbą zapytań."""
+		with self.assertLogs("rejs.middleware", level="INFO") as logi:
+			self.client.get("/")
+
+		self.assertRegex(logi.output[0], r"widok=index metoda=GET status=200 zapytania=\d+ db_ms=")
+
+	def test_czas_emaili(self):
+		"""Czas wysyłki emaili po zgłoszeniu jest mierzony osobno."""
+		wyslij = EmailBackend.send_messages
+
+		def wolna_wysylka(backend, wiadomosci):
+			time.sleep(0.005)
+			return wyslij(backend, wiadomosci)
+
+		with mock.patch.object(EmailBackend, "send_messages", wolna_wysylka):
+			response = self.client.post(
+				f"/rejs/{self.rejs.pk}/zgloszenie/",
+				{
+					"imie": "Jan",
+					"nazwisko": "Kowalski",
+					"email": "jan@example.com",
+					"telefon": "123456789",
+					"data_urodzenia": "1990-01-01",
+					"adres": "ul. Morska 1",
+					"kod_pocztowy": "80-001",
+					"miejscowosc": "Gdynia",
+					"wzrok": "WIDZI",
+					"obecnosc": "tak",
+					"rodo": "on",
+				},
+			)
+
+		self.assertEqual(response.status_code, 302)
+		email = float(re.search(r"email;dur=([\d.]+)", response["Server-Timing"]).group(1))
+		self.assertGreaterEqual(email, 5)
+
+	@override_settings(BUDZETY_ZAPYTAN={"index": 0})
+	def test_przekroczenie_budzetu_jako_wyjatek(self):
+		"""Z BUDZET_ZAPYTAN_WYJATEK przekroczenie budżetu zapytań zgłasza wyjątek."""
+		with self.assertRaises(PrzekroczonoBudzetZapytan):
+			self.client.get("/")
+
+	@override_settings(BUDZETY_ZAPYTAN={"index": 0}, BUDZET_ZAPYTAN_WYJATEK=False)
+	def test_przekroczenie_budzetu_na_produkcji(self):
+		"""Bez BUDZET_ZAPYTAN_WYJATEK przekroczenie budżetu tylko ostrzega w logu."""
+		with self.assertLogs("rejs.middleware", level="WARNING") as logi:
+			response = self.client.get("/")
+
+		self.assertEqual(response.status_code, 200)
+		self.assertIn("Widok index (GET) wykonał", logi.output[-1])
+
+	def test_budzety_nie_zaleza_od_liczby_zgloszen(self):
+		"""Szczegóły zgłoszenia, strona rejsu w adminie (z inline) i raport mieszczą się w budżetach."""
+		wachta = Wachta.objects.create(rejs=self.rejs, nazwa="Alfa")
+		for i in range(30):
+			zgloszenie = Zgloszenie.objects.create(
+				imie="Jan",
+				nazwisko=f"Kowalski{i}",
+				email=f"jan{i}@example.com",
+				telefon="123456789",
+				data_urodzenia=datetime.date(1990, 1, 1),
+				rejs=self.rejs,
+				wachta=wachta,
+				status=Zgloszenie.STATUS_ZAKWALIFIKOWANY,
+				rodo=True,
+				obecnosc="tak",
+			)
+			Dane_Dodatkowe.objects.create(
+				zgloszenie=zgloszenie, poz1="90010112318", poz2="dowod-osobisty", poz3=f"ABC{i:06d}"
+			)
+			Wplata.objects.create(zgloszenie=zgloszenie, kwota=100, rodzaj=Wplata.RODZAJ_WPLATA)
+		User.objects.create_superuser(username="admin", email="admin@example.com", password="adminpass123")
+		self.client.login(username="admin", password="adminpass123")
+
+		self.assertEqual(self.client.get(zgloszenie.get_absolute_url()).status_code, 200)
+		self.assertEqual(self.client.get(f"/admin/rejs/rejs/{self.rejs.pk}/change/").status_code, 200)
+		self.assertEqual(self.client.get(f"/admin/rejs/zgloszenie/{zgloszenie.pk}/change/").status_code, 200)
+		response = self.client.post(
+			"/admin/rejs/rejs/", {"action": "generate_report", "_selected_action": [self.rejs.pk]}
+		)
+		self.assertEqual(response.status_code, 200)
+
+
+class ProfilowanieMiddlewareTest(TestCase):
+	"""Testy middleware profilowania żądań."""
+
+	def setUp(self):
+		self.katalog = tempfile.TemporaryDirectory()
+		self.addCleanup(self.katalog.cleanup)
+		ustawienia = override_settings(
+			MIDDLEWARE=[*settings.MIDDLEWARE, "rejs.middleware.ProfilowanieMiddleware"],
+			PROFILOWANIE_KATALOG=self.katalog.name,
+			PROFILOWANIE_UZYTKOWNICY=["admin"],
+			PROFILOWANIE_PROCENT=0,
+		)
+		ustawienia.enable()
+		self.addCleanup(ustawienia.disable)
+
+	def _pliki(self, rozszerzenie):
+		return sorted(Path(self.katalog.name).glob(f"*.{rozszerzenie}"))
+
+	def test_profiluje_wskazanego_uzytkownika(self):
+		"""Żądanie wskazanego użytkownika personelu zapisuje profil, stosy i opis."""
+		User.objects.create_superuser(username="admin", email="admin@example.com", password="adminpass123")
+		self.client.login(username="admin", password="adminpass123")
+
+		self.client.get("/admin/rejs/rejs/")
+
+		self.assertEqual(len(self._pliki("prof")), 1)
+		self.assertEqual(len(self._pliki("collapsed")), 1)
+		opis = json.loads(self._pliki("json")[0].read_text())
+		self.assertEqual(opis["widok"], "admin:rejs_rejs_changelist")
+		self.assertEqual(opis["uzytkownik"], "admin")
+		self.assertEqual(opis["status"], 200)
+
+	def test_pomija_pozostale_zadania(self):
+		"""Bez próbkowania żądania innych użytkowników nie są profilowane."""
+		User.objects.create_superuser(username="inny", email="inny@example.com", password="adminpass123")
+		self.client.login(username="inny", password="adminpass123")
+
+		self.client.get("/admin/rejs/rejs/")
+		self.client.get("/")
+
+		self.assertEqual(self._pliki("json"), [])
+
+	@override_settings(PROFILOWANIE_PROCENT=100)
+	def test_probkowanie_procentowe(self):
+		"""Przy 100% profilowane jest każde żądanie, także anonimowe."""
+		self.client.get("/")
+		self.client.get("/rodo/")
+
+		self.assertEqual(len(self._pliki("prof")), 2)
+
+	def test_stosy_w_formacie_collapsed(self):
+		"""Próbkowanie zapisuje stosy od ramki zewnętrznej, oddzielone średnikami."""
+
+		def wewnetrzna():
+			time.sleep(0.05)
+
+		def zewnetrzna():
+			wewnetrzna()
+
+		probkowanie = ProbkowanieStosu(threading.get_ident())
+		probkowanie.start()
+		zewnetrzna()
+		probkowanie.zatrzymaj()
+
+		stos, liczba = probkowanie.stosy.most_common(1)[0]
+		self.assertRegex(stos, r"zewnetrzna \(test_middleware.py:\d+\);wewnetrzna \(test_middleware.py:\d+\)$")
+		self.assertGreater(liczba, 0)
@@ -1,13 +1,24 @@
 import datetime
 from decimal import Decimal
+from unittest import mock
 
+from cryptography.fernet import Fernet, InvalidToken
+
+from django.core.exceptions import ImproperlyConfigured
 from django.forms import ValidationError
-from django.test import TestCase
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from django.contrib.auth import get_user_model
 
-from rejs.models import AuditLog, Dane_Dodatkowe, Ogloszenie, Rejs, Wachta, Wplata, Zgloszenie
+from rejs.checks import klucz_indeksu_slepego
+from rejs.kryptografia import ALGORYTM_AES_GCM, Szyfr, odszyfruj, rozpakuj
+from rejs.modele import pola
+from rejs.modele.klucze import KluczRejsuQuerySet
+from rejs.modele.pola import odszyfruj_wiele, surowe
+from rejs.models import AuditLog, Dane_Dodatkowe, KluczRejsu, Ogloszenie, Rejs, Wachta, Wplata, Zgloszenie
 
 
 # Helper to get future dates for tests
@@ -188,29 +199,31 @@ class ZgloszenieModelTest(TestCase):
 		self.assertNotIn("(", zgloszenie.wzrok)
 
 	def test_original_status_tracked_on_load(self):
-		"""Test że _original_status jest ustawiany przy ładowaniu z bazy."""
+		"""Status wczytany z bazy jest zapamiętany jako wartość pierwotna."""
 		loaded = Zgloszenie.objects.get(pk=self.zgloszenie.pk)
-		self.assertEqual(loaded._original_status, loaded.status)
-		self.assertEqual(loaded._original_status, Zgloszenie.STATUS_NIEZAKWALIFIKOWANY)
+		self.assertEqual(loaded.wartosc_pierwotna("status"), Zgloszenie.STATUS_NIEZAKWALIFIKOWANY)
+		self.assertFalse(loaded.has_changed("status"))
 
 	def test_original_wachta_id_tracked_on_load(self):
-		"""Test że _original_wachta_id jest ustawiany przy ładowaniu z bazy."""
+		"""Wachta wczytana z bazy jest zapamiętana jako wartość pierwotna."""
 		wachta = Wachta.objects.create(rejs=self.rejs, nazwa="TestWachta")
 		self.zgloszenie.wachta = wachta
 		self.zgloszenie.save()
 
 		loaded = Zgloszenie.objects.get(pk=self.zgloszenie.pk)
-		self.assertEqual(loaded._original_wachta_id, wachta.id)
+		self.assertEqual(loaded.wartosc_pierwotna("wachta"), wachta.id)
 
 	def test_original_values_updated_after_save(self):
-		"""Test że _original_* są aktualizowane po save()."""
+		"""Po save() zapisane wartości stają się wartościami pierwotnymi."""
 		self.zgloszenie.status = Zgloszenie.STATUS_ZAKWALIFIKOWANY
+		self.assertTrue(self.zgloszenie.has_changed("status"))
 		self.zgloszenie.save()
 
-		self.assertEqual(self.zgloszenie._original_status, Zgloszenie.STATUS_ZAKWALIFIKOWANY)
+		self.assertEqual(self.zgloszenie.wartosc_pierwotna("status"), Zgloszenie.STATUS_ZAKWALIFIKOWANY)
+		self.assertFalse(self.zgloszenie.has_changed("status"))
 
 	def test_original_values_none_for_new_instance(self):
-		"""Test że _original_* są None dla nowego obiektu."""
+		"""Nowy obiekt nie ma wartości pierwotnych - każde pole traktowane jest jako zmienione."""
 		new_zgloszenie = Zgloszenie(
 			imie="Test",
 			nazwisko="User",
@@ -221,8 +234,9 @@ class ZgloszenieModelTest(TestCase):
 			rodo=True,
 			obecnosc="tak",
 		)
-		self.assertIsNone(new_zgloszenie._original_status)
-		self.assertIsNone(new_zgloszenie._original_wachta_id)
+		self.assertIsNone(new_zgloszenie.wartosc_pierwotna("status"))
+		self.assertIsNone(new_zgloszenie.wartosc_pierwotna("wachta"))
+		self.assertTrue(new_zgloszenie.has_changed("status"))
 
 
 class WplataModelTest(TestCase):
@@ -394,6 +408,333 @@ class Dane_DodatkoweModelTest(TestCase):
 		self.assertNotIn("(", dane.poz2)
 
 
+class OdszyfrujWieleTest(TestCase):
+	"""Testy hurtowego odszyfrowywania szyfrogramów."""
+
+	def setUp(self):
+		rejs = Rejs.objects.create(
+			nazwa="Rejs testowy",
+			od=future_date(30),
+			do=future_date(44),
+			start="Gdynia",
+			koniec="Sztokholm",
+		)
+		for i in range(3):
+			zgloszenie = Zgloszenie.objects.create(
+				imie=f"Jan{i}",
+				nazwisko="Kowalski",
+				email=f"jan{i}@example.com",
+				telefon="123456789",
+				data_urodzenia=datetime.date(1990, 1, 1),
+				rejs=rejs,
+				rodo=True,
+				obecnosc="tak",
+			)
+			Dane_Dodatkowe.objects.create(zgloszenie=zgloszenie, poz1=f"9002140138{i}", poz3=f"DOK{i}")
+
+	def _tokeny(self):
+		return list(Dane_Dodatkowe.objects.order_by("pk").values_list(surowe("poz1"), flat=True))
+
+	def test_surowe_zwraca_szyfrogram(self):
+		"""surowe() pobiera szyfrogram zamiast wartości jawnej."""
+		tokeny = self._tokeny()
+		self.assertEqual(len(tokeny), 3)
+		self.assertNotIn("90021401380", tokeny)
+
+	def test_odszyfruj_wiele_sekwencyjnie(self):
+		"""Poniżej progu tokeny odszyfrowywane są w bieżącym procesie, z zachowaniem kolejności."""
+		wynik = odszyfruj_wiele(self._tokeny())
+		self.assertEqual(wynik, ["90021401380", "90021401381", "90021401382"])
+
+	def test_odszyfruj_wiele_przepuszcza_none(self):
+		"""Wartości None nie są odszyfrowywane."""
+		tokeny = self._tokeny()
+		self.assertEqual(odszyfruj_wiele([None, tokeny[0]]), [None, "90021401380"])
+
+	def test_odszyfruj_wiele_w_puli_procesow(self):
+		"""Powyżej progu tokeny odszyfrowuje pula procesów, z wynikiem identycznym jak sekwencyjny."""
+		tokeny = self._tokeny() * 4
+		oczekiwane = odszyfruj_wiele(tokeny)
+		with (
+			mock.patch("rejs.modele.pola.odszyfruj_rownolegle", wraps=pola.odszyfruj_rownolegle) as rownolegle,
+			mock.patch("rejs.modele.pola.odszyfruj_paczke", side_effect=AssertionError("tryb sekwencyjny")),
+		):
+			self.assertEqual(odszyfruj_wiele(tokeny, prog=0, procesy=2), oczekiwane)
+		rownolegle.assert_called_once()
+
+	def test_odszyfruj_wiele_zniszczony_klucz(self):
+		"""Szyfrogramy rejsu ze zniszczonym kluczem dają None, dane klucza głównego są odszyfrowywane."""
+		legacy = pola.szyfr_glowny().szyfruj("DOK-LEGACY")
+		tokeny = self._tokeny()
+		KluczRejsu.objects.all().zniszcz()
+		self.assertEqual(odszyfruj_wiele([tokeny[0], legacy]), [None, "DOK-LEGACY"])
+
+
+class SzyfrTest(SimpleTestCase):
+	"""Testy formatu kopert i algorytmów szyfrowania."""
+
+	def setUp(self):
+		self.klucz = Fernet.generate_key().decode()
+
+	def test_aes_gcm_klucz_glowny(self):
+		"""Szyfrogram AES-GCM klucza głównego ma prefiks G: i daje się odczytać."""
+		szyfr = Szyfr([self.klucz], ALGORYTM_AES_GCM)
+		szyfrogram = szyfr.szyfruj("90021401380")
+		self.assertTrue(szyfrogram.startswith("G:"))
+		self.assertEqual(odszyfruj(szyfr, szyfrogram, {}), "90021401380")
+
+	def test_aes_gcm_klucz_danych(self):
+		"""Koperta AES-GCM zawiera identyfikator klucza danych."""
+		szyfr = Szyfr([self.klucz], ALGORYTM_AES_GCM)
+		szyfrogram = szyfr.szyfruj("90021401380", 7)
+		self.assertEqual(rozpakuj(szyfrogram)[:2], (ALGORYTM_AES_GCM, 7))
+		self.assertEqual(odszyfruj(Szyfr([Fernet.generate_key().decode()]), szyfrogram, {7: szyfr}), "90021401380")
+
+	def test_aes_gcm_krotszy_niz_fernet(self):
+		"""AES-GCM daje krótsze szyfrogramy niż Fernet."""
+		fernet = Szyfr([self.klucz]).szyfruj("90021401380")
+		aes = Szyfr([self.klucz], ALGORYTM_AES_GCM).szyfruj("90021401380")
+		self.assertLess(len(aes) * 1.5, len(fernet))
+
+	def test_odczyt_obu_formatow(self):
+		"""Szyfr AES-GCM odczytuje również historyczne tokeny Fernet."""
+		fernet = Szyfr([self.klucz]).szyfruj("DOK1")
+		self.assertEqual(odszyfruj(Szyfr([self.klucz], ALGORYTM_AES_GCM), fernet, {}), "DOK1")
+
+	def test_aes_gcm_rotacja_kluczy(self):
+		"""Dane zaszyfrowane starym kluczem są czytelne po dodaniu nowego."""
+		stary = Szyfr([self.klucz], ALGORYTM_AES_GCM).szyfruj("DOK1")
+		szyfr = Szyfr([Fernet.generate_key().decode(), self.klucz], ALGORYTM_AES_GCM)
+		self.assertEqual(odszyfruj(szyfr, stary, {}), "DOK1")
+
+	def test_aes_gcm_obcy_klucz(self):
+		"""Odczyt nieznanym kluczem zgłasza InvalidToken, jak dla Fernet."""
+		szyfrogram = Szyfr([self.klucz], ALGORYTM_AES_GCM).szyfruj("DOK1")
+		with self.assertRaises(InvalidToken):
+			odszyfruj(Szyfr([Fernet.generate_key().decode()]), szyfrogram, {})
+
+	def test_nieznany_algorytm(self):
+		"""Nieobsługiwany algorytm jest odrzucany przy tworzeniu szyfru."""
+		with self.assertRaises(ValueError):
+			Szyfr([self.klucz], "X")
+
+	@override_settings(FIELD_ENCRYPTION_ALGORITHM="aes")
+	def test_nieznany_algorytm_w_ustawieniach(self):
+		"""Nieznana nazwa algorytmu w ustawieniach to błąd konfiguracji z listą dozwolonych wartości."""
+		with self.assertRaisesMessage(ImproperlyConfigured, "fernet, aes-gcm"):
+			pola.algorytm_szyfrowania()
+
+
+class KluczRejsuTest(TestCase):
+	"""Testy szyfrowania kopertowego kluczami danych rejsów."""
+
+	def setUp(self):
+		self.rejs = Rejs.objects.create(
+			nazwa="Rejs testowy",
+			od=future_date(30),
+			do=future_date(44),
+			start="Gdynia",
+			koniec="Sztokholm",
+		)
+		zgloszenie = Zgloszenie.objects.create(
+			imie="Jan",
+			nazwisko="Kowalski",
+			email="jan@example.com",
+			telefon="123456789",
+			data_urodzenia=datetime.date(1990, 1, 1),
+			rejs=self.rejs,
+			rodo=True,
+			obecnosc="tak",
+		)
+		self.dane = Dane_Dodatkowe.objects.create(zgloszenie=zgloszenie, poz1="90021401380")
+
+	def test_dane_szyfrowane_kluczem_rejsu(self):
+		"""Szyfrogram wskazuje klucz danych rejsu i daje się odczytać."""
+		klucz = KluczRejsu.objects.get(rejs=self.rejs)
+		szyfrogram = Dane_Dodatkowe.objects.values_list(surowe("poz1"), flat=True).get(pk=self.dane.pk)
+		self.assertTrue(szyfrogram.startswith(f"F{klucz.pk}:"))
+		self.assertEqual(Dane_Dodatkowe.objects.get(pk=self.dane.pk).poz1, "90021401380")
+
+	def test_jeden_klucz_na_rejs(self):
+		"""Kolejne zapisy danych rejsu używają tego samego klucza."""
+		self.dane.poz3 = "DOK1"
+		self.dane.save()
+		self.assertEqual(KluczRejsu.objects.filter(rejs=self.rejs).count(), 1)
+
+	def test_klucz_wyznaczany_raz_na_zapis(self):
+		"""Zapis trzech szyfrowanych pól odczytuje klucz rejsu jednym zapytaniem."""
+		dane = Dane_Dodatkowe.objects.select_related("zgloszenie").get(pk=self.dane.pk)
+		dane.poz1, dane.poz2, dane.poz3 = "44051401359", "dowod-osobisty", "DOK2"
+
+		with mock.patch.object(KluczRejsu.objects, "do_szyfrowania", wraps=KluczRejsu.objects.do_szyfrowania) as m:
+			dane.save()
+			dane.poz3 = "DOK3"
+			dane.save()
+
+		self.assertEqual(m.call_count, 2)
+		self.assertEqual(Dane_Dodatkowe.objects.get(pk=self.dane.pk).poz3, "DOK3")
+
+	def test_rownolegle_utworzenie_klucza(self):
+		"""Klucz utworzony przez inny proces między odczytem a INSERT-em jest odczytywany ponownie."""
+		klucz = KluczRejsu.objects.get(rejs=self.rejs)
+		pierwszy_odczyt = mock.Mock(side_effect=[KluczRejsu.DoesNotExist, klucz])
+
+		with mock.patch.object(KluczRejsuQuerySet, "get", pierwszy_odczyt):
+			klucz_id, _ = KluczRejsu.objects.do_szyfrowania(self.rejs.pk)
+
+		self.assertEqual(klucz_id, klucz.pk)
+		self.assertEqual(KluczRejsu.objects.count(), 1)
+
+	def test_zniszczenie_klucza(self):
+		"""Po zniszczeniu klucza dane rejsu są nieczytelne, a maskowanie zwraca pusty tekst."""
+		self.assertEqual(KluczRejsu.objects.filter(rejs=self.rejs).zniszcz(), 1)
+
+		dane = Dane_Dodatkowe.objects.get(pk=self.dane.pk)
+		self.assertIsNone(dane.poz1)
+		self.assertEqual(dane.masked_pesel, "")
+
+	def test_zniszczenie_jest_idempotentne(self):
+		"""Ponowne niszczenie nie zmienia daty zniszczenia."""
+		KluczRejsu.objects.all().zniszcz()
+		self.assertEqual(KluczRejsu.objects.all().zniszcz(), 0)
+
+
+class IndeksPeseluTest(TestCase):
+	"""Testy indeksu wyszukiwania PESEL."""
+
+	def setUp(self):
+		self.rejs = Rejs.objects.create(
+			nazwa="Rejs testowy",
+			od=future_date(30),
+			do=future_date(44),
+			start="Gdynia",
+			koniec="Sztokholm",
+		)
+
+	def _dane(self, imie, pesel):
+		zgloszenie = Zgloszenie.objects.create(
+			imie=imie,
+			nazwisko="Kowalski",
+			email=f"{imie.lower()}@example.com",
+			telefon="123456789",
+			data_urodzenia=datetime.date(1990, 1, 1),
+			rejs=self.rejs,
+			rodo=True,
+			obecnosc="tak",
+		)
+		return Dane_Dodatkowe.objects.create(zgloszenie=zgloszenie, poz1=pesel)
+
+	def test_indeks_nie_zawiera_peselu(self):
+		"""Indeks jest skrótem, nie wartością jawną."""
+		dane = self._dane("Jan", "90021401380")
+		self.assertEqual(len(dane.pesel_indeks), 64)
+		self.assertNotIn("90021401380", dane.pesel_indeks)
+
+	def test_po_peselu(self):
+		"""Wyszukiwanie zwraca tylko dane o podanym numerze, niezależnie od zapisu."""
+		jan = self._dane("Jan", "90021401380")
+		self._dane("Anna", "44051401359")
+		self.assertEqual(list(Dane_Dodatkowe.objects.po_peselu("900214 013-80")), [jan])
+
+	def test_po_peselu_pusty(self):
+		"""Pusty PESEL niczego nie znajduje."""
+		self.assertFalse(Dane_Dodatkowe.objects.po_peselu("").exists())
+
+	def test_indeks_aktualizowany_przy_zmianie(self):
+		"""Zmiana PESEL aktualizuje indeks, również przy zapisie z update_fields."""
+		dane = self._dane("Jan", "90021401380")
+		dane.poz1 = "44051401359"
+		dane.save(update_fields=["poz1"])
+		self.assertTrue(Dane_Dodatkowe.objects.po_peselu("44051401359").exists())
+		self.assertFalse(Dane_Dodatkowe.objects.po_peselu("90021401380").exists())
+
+	def test_zduplikowane_pesele(self):
+		"""Ten sam PESEL na dwóch zgłoszeniach jest wykrywany."""
+		jan = self._dane("Jan", "90021401380")
+		self._dane("Janek", "90021401380")
+		self._dane("Anna", "44051401359")
+		duplikaty = list(Dane_Dodatkowe.objects.zduplikowane_pesele())
+		self.assertEqual(duplikaty, [{"pesel_indeks": jan.pesel_indeks, "liczba": 2}])
+
+	@override_settings(FIELD_BLIND_INDEX_KEY="")
+	def test_brak_klucza_indeksu(self):
+		"""Bez DJANGO_BLIND_INDEX_KEY sprawdzenie konfiguracji zgłasza błąd (bez zapasowego SECRET_KEY)."""
+		self.assertEqual([e.id for e in klucz_indeksu_slepego(None)], ["rejs.E001"])
+
+
+class SledzenieZmianTest(TestCase):
+	"""Testy SledzenieZmianMixin - save() zapisuje tylko zmienione pola."""
+
+	def setUp(self):
+		self.rejs = Rejs.objects.create(
+			nazwa="Rejs", od=datetime.date(2030, 7, 1), do=datetime.date(2030, 7, 14), start="Gdynia", koniec="Visby"
+		)
+		zgloszenie = Zgloszenie.objects.create(
+			imie="Jan",
+			nazwisko="Kowalski",
+			email="jan@example.com",
+			telefon="123456789",
+			data_urodzenia=datetime.date(1990, 1, 1),
+			rejs=self.rejs,
+			rodo=True,
+			obecnosc="tak",
+		)
+		Dane_Dodatkowe.objects.create(zgloszenie=zgloszenie, poz1="90021401380", poz3="ABC123")
+		self.zgloszenie = Zgloszenie.objects.get(pk=zgloszenie.pk)
+
+	def test_update_tylko_zmienionych_kolumn(self):
+		"""UPDATE obejmuje tylko zmienione pole."""
+		self.zgloszenie.telefon = "987654321"
+		self.assertEqual(self.zgloszenie.zmienione_pola(), {"telefon"})
+
+		with CaptureQueriesContext(connection) as zapytania:
+			self.zgloszenie.save()
+
+		update = next(q["sql"] for q in zapytania.captured_queries if q["sql"].startswith("UPDATE"))
+		self.assertIn('"telefon"', update)
+		self.assertNotIn('"imie"', update)
+		self.assertEqual(Zgloszenie.objects.get(pk=self.zgloszenie.pk).telefon, "987654321")
+
+	def test_zapis_bez_zmian(self):
+		"""Zapis niezmienionego obiektu nie wykonuje zapytań."""
+		with self.assertNumQueries(0):
+			self.zgloszenie.save()
+
+	def test_bez_ponownego_szyfrowania(self):
+		"""Zmiana zgody nie szyfruje ponownie niezmienionych pól (szyfrogram w bazie bez zmian)."""
+		dane = Dane_Dodatkowe.objects.get(zgloszenie=self.zgloszenie)
+		szyfrogram = Dane_Dodatkowe.objects.values_list(surowe("poz1"), flat=True).get(pk=dane.pk)
+
+		dane.zgoda_dane_wrazliwe = True
+		dane.save()
+
+		self.assertEqual(Dane_Dodatkowe.objects.values_list(surowe("poz1"), flat=True).get(pk=dane.pk), szyfrogram)
+		self.assertTrue(Dane_Dodatkowe.objects.get(pk=dane.pk).zgoda_dane_wrazliwe)
+
+		dane.poz1 = "44051401359"
+		dane.save()
+		self.assertEqual(Dane_Dodatkowe.objects.get(pk=dane.pk).poz1, "44051401359")
+		self.assertTrue(Dane_Dodatkowe.objects.po_peselu("44051401359").exists())
+
+	def test_nie_nadpisuje_zmian_rownoleglych(self):
+		"""Pole zmienione zapytaniem update() nie jest nadpisywane wartością wczytaną wcześniej."""
+		Zgloszenie.objects.filter(pk=self.zgloszenie.pk).update(email="nowy@example.com")
+
+		self.zgloszenie.telefon = "987654321"
+		self.zgloszenie.save()
+
+		self.assertEqual(Zgloszenie.objects.get(pk=self.zgloszenie.pk).email, "nowy@example.com")
+
+	def test_pola_odroczone(self):
+		"""Pole niewczytane (only) nie jest zmienione, a jego doczytanie go nie zmienia."""
+		zgloszenie = Zgloszenie.objects.only("imie").get(pk=self.zgloszenie.pk)
+		self.assertFalse(zgloszenie.has_changed("telefon"))
+
+		self.assertEqual(zgloszenie.telefon, "123456789")
+		self.assertFalse(zgloszenie.has_changed("telefon"))
+		self.assertEqual(zgloszenie.zmienione_pola(), set())
+
+
 class AuditLogModelTest(TestCase):
 	"""Testy modelu AuditLog."""
 
@@ -0,0 +1,170 @@
+import datetime
+import uuid
+
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rejs.forms import ZgloszenieForm
+from rejs.models import Rejs, Zgloszenie, ZgloszenieOczekujace
+from rejs.serwisy.kolejka import POWOD_BLAD_ZAPISU, POWOD_DUPLIKAT, SerwisKolejkiZgloszen
+
+
+def future_date(days_from_now: int) -> datetime.date:
+	"""Return a date N days from today."""
+	return datetime.date.today() + datetime.timedelta(days=days_from_now)
+
+
+def dane_formularza(nazwisko: str, **zmiany) -> dict:
+	return {
+		"imie": "Jan",
+		"nazwisko": nazwisko,
+		"email": f"{nazwisko.lower()}@example.com",
+		"telefon": "123456789",
+		"data_urodzenia": "1990-01-01",
+		"adres": "ul. Testowa 1",
+		"kod_pocztowy": "00-001",
+		"miejscowosc": "Warszawa",
+		"wzrok": "NIEWIDOMY",
+		"obecnosc": "tak",
+		"rodo": True,
+		"klucz_idempotencji": str(uuid.uuid4()),
+		**zmiany,
+	}
+
+
+@override_settings(TRYB_SZCZYTOWY=True)
+class SerwisKolejkiZgloszenTest(TestCase):
+	"""Testy SerwisKolejkiZgloszen (tryb szczytowy)."""
+
+	def setUp(self):
+		self.serwis = SerwisKolejkiZgloszen()
+		self.rejs = Rejs.objects.create(
+			nazwa="Rejs szczytowy",
+			od=future_date(30),
+			do=future_date(44),
+			start="Gdynia",
+			koniec="Sztokholm",
+			limit_miejsc=2,
+		)
+
+	def _przyjmij(self, nazwisko: str, **zmiany):
+		form = ZgloszenieForm(dane_formularza(nazwisko, **zmiany), initial={"rejs": self.rejs})
+		self.assertTrue(form.is_valid(), form.errors)
+		return self.serwis.przyjmij(self.rejs, form)
+
+	def test_przyjecie_bez_zgloszenia_i_emaila(self):
+		"""Przyjęcie zapisuje tylko wiersz kolejki - bez zgłoszenia, miejsca i emaila."""
+		token = self._przyjmij("Kowalski")
+
+		self.assertEqual(Zgloszenie.objects.count(), 0)
+		self.assertEqual(self.serwis.oczekujace(token).dane["data_urodzenia"], "1990-01-01")
+		self.assertEqual(Rejs.objects.get(pk=self.rejs.pk).zajete_miejsca, 0)
+		self.assertEqual(mail.outbox, [])
+
+	def test_przetworzenie_paczkami(self):
+		"""Zgłoszenia powstają z tymi samymi tokenami, nadmiar trafia na listę rezerwową, emaile po zapisie."""
+		tokeny = [self._przyjmij(nazwisko) for nazwisko in ("Kowalski", "Nowak", "Wisniewski")]
+
+		with self.captureOnCommitCallbacks(execute=True):
+			utworzone = self.serwis.przetworz(rozmiar_paczki=2)
+
+		self.assertEqual(utworzone, 3)
+		self.assertFalse(ZgloszenieOczekujace.objects.exists())
+		zgloszenia = {z.token: z for z in Zgloszenie.objects.all()}
+		self.assertEqual(list(zgloszenia), tokeny)
+		self.assertEqual([zgloszenia[t].lista_rezerwowa for t in tokeny], [False, False, True])
+		self.assertEqual(zgloszenia[tokeny[0]].data_urodzenia, datetime.date(1990, 1, 1))
+		self.assertEqual(Rejs.objects.get(pk=self.rejs.pk).zajete_miejsca, 2)
+		self.assertEqual(len(mail.outbox), 3)
+		self.assertIn("listę rezerwową", mail.outbox[2].subject)
+
+	def test_data_zgloszenia_z_kolejki(self):
+		"""Zgłoszenie zachowuje czas przyjęcia do kolejki, a nie czas przetworzenia paczki."""
+		tokeny = [self._przyjmij(nazwisko) for nazwisko in ("Kowalski", "Nowak")]
+		przyjete = timezone.now() - datetime.timedelta(hours=3)
+		ZgloszenieOczekujace.objects.filter(token=tokeny[0]).update(data_zgloszenia=przyjete)
+
+		self.serwis.przetworz()
+
+		self.assertEqual(Zgloszenie.objects.get(token=tokeny[0]).data_zgloszenia, przyjete)
+		self.assertGreater(Zgloszenie.objects.get(token=tokeny[1]).data_zgloszenia, przyjete)
+
+	def test_duplikaty_odrzucone(self):
+		"""Ponowne zgłoszenie tej samej osoby (inna wielkość liter) jest odrzucane z powodem i emailem."""
+		self._przyjmij("Kowalski")
+		token = self._przyjmij("KOWALSKI", email="KOWALSKI@example.com")
+
+		with self.captureOnCommitCallbacks(execute=True), self.assertLogs("rejs.serwisy.kolejka", "WARNING"):
+			self.assertEqual(self.serwis.przetworz(), 1)
+
+		self.assertEqual(Zgloszenie.objects.count(), 1)
+		self.assertEqual(self.serwis.oczekujace(token).powod_odrzucenia, POWOD_DUPLIKAT)
+		self.assertEqual(self.serwis.przetworz(), 0)
+		self.assertEqual(
+			[m.to for m in mail.outbox if "nie zostało zarejestrowane" in m.subject], [["KOWALSKI@example.com"]]
+		)
+		strona = self.client.get(reverse("zgloszenie_details", args=[token]))
+		self.assertContains(strona, "Zgłoszenie nie zostało zarejestrowane")
+		self.assertContains(strona, POWOD_DUPLIKAT)
+
+	def test_duplikat_istniejacego_zgloszenia(self):
+		"""Zgłoszenie osoby zarejestrowanej przed przetworzeniem kolejki (inna wielkość liter adresu) jest odrzucane."""
+		duplikat = self._przyjmij("Kowalski")
+		self._przyjmij("Nowak")
+		Zgloszenie.objects.create(
+			imie="Jan",
+			nazwisko="Kowalski",
+			email="KOWALSKI@Example.com",
+			telefon="123456789",
+			data_urodzenia=datetime.date(1990, 1, 1),
+			rejs=self.rejs,
+			rodo=True,
+			obecnosc="tak",
+		)
+
+		with self.assertLogs("rejs.serwisy.kolejka", "WARNING"):
+			self.assertEqual(self.serwis.przetworz(), 1)
+
+		self.assertEqual(self.serwis.oczekujace(duplikat).powod_odrzucenia, POWOD_DUPLIKAT)
+
+	def test_bledny_wiersz_nie_blokuje_kolejki(self):
+		"""Wiersz odrzucony przez bazę nie wycofuje paczki - pozostałe zgłoszenia i miejsca są zapisywane."""
+		tokeny = [self._przyjmij(nazwisko) for nazwisko in ("Kowalski", "Nowak", "Wisniewski")]
+		zajety = Zgloszenie.objects.create(
+			imie="Anna",
+			nazwisko="Zajmująca",
+			email="anna@example.com",
+			telefon="123456789",
+			data_urodzenia=datetime.date(1990, 1, 1),
+			rejs=Rejs.objects.create(nazwa="Inny", od=future_date(30), do=future_date(44), start="A", koniec="B"),
+			rodo=True,
+			obecnosc="tak",
+		)
+		Zgloszenie.objects.filter(pk=zajety.pk).update(token=tokeny[1])
+
+		with self.captureOnCommitCallbacks(execute=True), self.assertLogs("rejs.serwisy.kolejka", "ERROR"):
+			self.assertEqual(self.serwis.przetworz(), 2)
+
+		self.assertEqual(
+			set(Zgloszenie.objects.filter(rejs=self.rejs).values_list("token", flat=True)), {tokeny[0], tokeny[2]}
+		)
+		self.assertEqual(Rejs.objects.get(pk=self.rejs.pk).zajete_miejsca, 2)
+		self.assertEqual(self.serwis.oczekujace(tokeny[1]).powod_odrzucenia, POWOD_BLAD_ZAPISU)
+		self.assertEqual(ZgloszenieOczekujace.objects.count(), 1)
+		self.assertEqual(self.serwis.przetworz(), 0)
+
+	def test_widok_zapisuje_do_kolejki(self):
+		"""Formularz w trybie szczytowym przekierowuje na stronę tokenu - przed i po przetworzeniu kolejki."""
+		url = reverse("zgloszenie_utworz", kwargs={"rejs_id": self.rejs.id})
+		dane = dane_formularza("Kowalski")
+
+		response = self.client.post(url, dane)
+		self.assertEqual(self.client.post(url, dane).url, response.url)
+		self.assertEqual(ZgloszenieOczekujace.objects.count(), 1)
+		self.assertContains(self.client.get(response.url), "Zgłoszenie przyjęte")
+
+		self.serwis.przetworz()
+		self.assertContains(self.client.get(response.url), "Szczegóły Twojego zgłoszenia")
+		self.assertEqual(self.client.get(reverse("zgloszenie_details", args=[uuid.uuid4()])).status_code, 404)
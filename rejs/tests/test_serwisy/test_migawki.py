@@ -0,0 +1,85 @@
+import datetime
+import gzip
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from rejs.models import Rejs
+from rejs.serwisy.migawki import MOTYW_DOMYSLNY, SerwisMigawek
+
+
+def future_date(days_from_now: int) -> datetime.date:
+	"""Return a date N days from today."""
+	return datetime.date.today() + datetime.timedelta(days=days_from_now)
+
+
+class SerwisMigawekTest(TestCase):
+	"""Testy SerwisMigawek."""
+
+	def setUp(self):
+		self.katalog = Path(self.enterContext(tempfile.TemporaryDirectory()))
+		self.enterContext(override_settings(MIGAWKI_KATALOG=str(self.katalog)))
+		self.serwis = SerwisMigawek()
+		self.rejs = Rejs.objects.create(
+			nazwa="Rejs migawkowy", od=future_date(30), do=future_date(44), start="Gdynia", koniec="Sztokholm"
+		)
+
+	def test_pliki_dla_kazdego_motywu(self):
+		"""Każda strona ma migawkę HTML i wariant .gz w katalogu każdego motywu."""
+		zapisane = self.serwis.generuj()
+
+		self.assertIn("alt", self.serwis.motywy())
+		self.assertEqual(len(zapisane), 2 * len(self.serwis.motywy()))
+		for motyw in self.serwis.motywy():
+			for sciezka in ("index.html", "rodo/index.html"):
+				plik = self.katalog / motyw / sciezka
+				self.assertTrue(plik.is_file(), plik)
+				self.assertEqual(gzip.decompress(plik.with_name("index.html.gz").read_bytes()), plik.read_bytes())
+
+	def test_tresc_jak_odpowiedz_widoku(self):
+		"""Migawka domyślnego motywu ma tę samą treść co odpowiedź widoku."""
+		self.serwis.generuj()
+
+		for adres, sciezka in (("/", "index.html"), ("/rodo/", "rodo/index.html")):
+			self.assertEqual(
+				(self.katalog / MOTYW_DOMYSLNY / sciezka).read_bytes(), self.client.get(adres).content, adres
+			)
+		self.assertIn(b"Rejs migawkowy", (self.katalog / "alt" / "index.html").read_bytes())
+
+	def test_zapis_rejsu_odswieza_migawki(self):
+		"""Zapis i usunięcie rejsu odświeżają migawki po zatwierdzeniu transakcji."""
+		self.serwis.generuj()
+		strona = self.katalog / MOTYW_DOMYSLNY / "index.html"
+
+		with self.captureOnCommitCallbacks(execute=True):
+			self.rejs.nazwa = "Rejs po zmianie"
+			self.rejs.save()
+		self.assertIn(b"Rejs po zmianie", strona.read_bytes())
+
+		with self.captureOnCommitCallbacks(execute=True):
+			self.rejs.delete()
+		self.assertNotIn(b"Rejs po zmianie", strona.read_bytes())
+
+	def test_blad_zapisu_po_zmianie_rejsu(self):
+		"""Błąd zapisu migawek po zatwierdzeniu zmiany rejsu jest logowany, a żądanie panelu się nie kończy błędem."""
+		with (
+			mock.patch("rejs.serwisy.migawki._zapisz_atomowo", side_effect=OSError("brak miejsca")),
+			self.assertLogs("rejs.serwisy.migawki", "ERROR"),
+			self.captureOnCommitCallbacks(execute=True),
+		):
+			self.rejs.nazwa = "Rejs po zmianie"
+			self.rejs.save()
+
+		self.assertEqual(Rejs.objects.get(pk=self.rejs.pk).nazwa, "Rejs po zmianie")
+
+	@override_settings(MIGAWKI_KATALOG="")
+	def test_wylaczone_bez_katalogu(self):
+		"""Bez MIGAWKI_KATALOG nic nie jest zapisywane, a zapis rejsu nie planuje odświeżenia."""
+		with self.captureOnCommitCallbacks() as callbacks:
+			self.rejs.save()
+
+		self.assertEqual(callbacks, [])
+		self.assertEqual(self.serwis.generuj(), [])
+		self.assertEqual(list(self.katalog.iterdir()), [])
@@ -0,0 +1,128 @@
+import datetime
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from rejs.models import Dane_Dodatkowe, Rejs, Wachta, Wplata, Zgloszenie
+from rejs.serwisy.pulpit import SerwisPulpitu
+from rejs.serwisy.wachty import SerwisWacht
+
+
+def future_date(days_from_now: int) -> datetime.date:
+	"""Return a date N days from today."""
+	return datetime.date.today() + datetime.timedelta(days=days_from_now)
+
+
+class SerwisPulpituTest(TestCase):
+	"""Testy SerwisPulpitu."""
+
+	def setUp(self):
+		cache.clear()
+		self.serwis = SerwisPulpitu()
+		self.rejs = Rejs.objects.create(
+			nazwa="Rejs testowy",
+			od=future_date(30),
+			do=future_date(44),
+			start="Gdynia",
+			koniec="Sztokholm",
+			cena=Decimal("1500.00"),
+		)
+		self.wachta = Wachta.objects.create(rejs=self.rejs, nazwa="Alfa")
+		self.licznik = 0
+
+	def _zgloszenie(self, rejs=None, status=Zgloszenie.STATUS_ZAKWALIFIKOWANY, **kwargs):
+		self.licznik += 1
+		return Zgloszenie.objects.create(
+			imie=f"Test{self.licznik}",
+			nazwisko="Uczestnik",
+			email=f"test{self.licznik}@example.com",
+			telefon="123456789",
+			data_urodzenia=datetime.date(1990, 1, 1),
+			rejs=rejs or self.rejs,
+			rodo=True,
+			obecnosc="tak",
+			status=status,
+			**kwargs,
+		)
+
+	def test_metryki_rejsu(self):
+		"""Test liczników statusów, składu załogi, braków i rozliczeń."""
+		oficer = self._zgloszenie(rola="OFICER-WACHTY", wachta=self.wachta)
+		self._zgloszenie(wzrok="NIEWIDOMY")
+		self._zgloszenie(wzrok="SLABO-WIDZACY", wachta=self.wachta)
+		self._zgloszenie(status=Zgloszenie.STATUS_NIEZAKWALIFIKOWANY, wzrok="NIEWIDOMY")
+		odrzucony = self._zgloszenie(status=Zgloszenie.STATUS_ODRZUCONE)
+		Dane_Dodatkowe.objects.create(zgloszenie=oficer, poz1="90010112345", poz2="paszport", poz3="AB123")
+		Wplata.objects.create(zgloszenie=oficer, kwota=Decimal("1000.00"))
+		Wplata.objects.create(zgloszenie=oficer, kwota=Decimal("200.00"), rodzaj=Wplata.RODZAJ_ZWROT)
+		# Wpłaty niezakwalifikowanych nie pomniejszają należności liczonej dla zakwalifikowanych
+		Wplata.objects.create(zgloszenie=odrzucony, kwota=Decimal("500.00"))
+
+		[metryki] = self.serwis.oblicz_metryki()
+
+		self.assertEqual(metryki["zgloszenia"], 5)
+		self.assertEqual(metryki["zakwalifikowani"], 3)
+		self.assertEqual(metryki["niezakwalifikowani"], 1)
+		self.assertEqual(metryki["odrzucone"], 1)
+		self.assertEqual(metryki["niewidomi"], 1)
+		self.assertEqual(metryki["slabo_widzacy"], 1)
+		self.assertEqual(metryki["widzacy"], 1)
+		self.assertEqual(metryki["oficerowie"], 1)
+		self.assertEqual(metryki["bez_wachty"], 1)
+		self.assertEqual(metryki["bez_danych"], 2)
+		self.assertEqual(metryki["naleznosc"], Decimal("4500.00"))
+		self.assertEqual(metryki["wplacono"], Decimal("800.00"))
+		self.assertEqual(metryki["pozostalo"], Decimal("3700.00"))
+
+	def test_pomija_rejsy_zakonczone(self):
+		"""Test że pulpit obejmuje tylko nadchodzące rejsy."""
+		Rejs.objects.create(
+			nazwa="Stary rejs",
+			od=future_date(-30),
+			do=future_date(-20),
+			start="Gdynia",
+			koniec="Gdańsk",
+		)
+
+		self.assertEqual([m["nazwa"] for m in self.serwis.oblicz_metryki()], ["Rejs testowy"])
+
+	def test_stala_liczba_zapytan(self):
+		"""Test że liczba zapytań nie zależy od liczby rejsów i zgłoszeń."""
+		for i in range(5):
+			rejs = Rejs.objects.create(
+				nazwa=f"Rejs {i}",
+				od=future_date(50 + i),
+				do=future_date(60 + i),
+				start="Gdynia",
+				koniec="Gdańsk",
+			)
+			for _ in range(3):
+				Wplata.objects.create(zgloszenie=self._zgloszenie(rejs=rejs), kwota=Decimal("100.00"))
+
+		with CaptureQueriesContext(connection) as context:
+			self.serwis.oblicz_metryki()
+
+		self.assertEqual(len(context), 3)
+
+	def test_cache(self):
+		"""Test że metryki są liczone raz i unieważniane po zmianie danych."""
+		self.serwis.metryki()
+		with CaptureQueriesContext(connection) as context:
+			self.assertEqual(self.serwis.metryki()["rejsy"][0]["zgloszenia"], 0)
+		self.assertEqual(len(context), 0)
+
+		self._zgloszenie()
+
+		self.assertEqual(self.serwis.metryki()["rejsy"][0]["zgloszenia"], 1)
+
+	def test_cache_uniewazniany_po_zbiorczej_zmianie_wacht(self):
+		"""Test unieważnienia po UPDATE w SerwisWacht (omija sygnały)."""
+		zgloszenie = self._zgloszenie()
+		self.assertEqual(self.serwis.metryki()["rejsy"][0]["bez_wachty"], 1)
+
+		SerwisWacht().aktualizuj_czlonkow_wachty(self.wachta, [zgloszenie])
+
+		self.assertEqual(self.serwis.metryki()["rejsy"][0]["bez_wachty"], 0)
@@ -1,6 +1,11 @@
 import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-from django.test import TestCase
+from django.core import mail
+from django.db import IntegrityError, connection
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 
 from rejs.models import Rejs, Zgloszenie
 from rejs.serwisy.rejestracja import SerwisRejestracji
@@ -171,3 +176,265 @@ class SerwisRejestracjiTest(TestCase):
 		)
 		wynik = self.serwis.czy_wymaga_danych_dodatkowych(zgloszenie)
 		self.assertTrue(wynik)
+
+
+def _zgloszenie(rejs: Rejs, numer: int, **kwargs) -> Zgloszenie:
+	return Zgloszenie(
+		imie="Jan",
+		nazwisko=f"Uczestnik{numer}",
+		email=f"uczestnik{numer}@example.com",
+		telefon="123456789",
+		data_urodzenia=datetime.date(1990, 1, 1),
+		rejs=rejs,
+		rodo=True,
+		obecnosc="tak",
+		**kwargs,
+	)
+
+
+class ListaRezerwowaTest(TestCase):
+	"""Testy limitu miejsc i listy rezerwowej (SerwisRejestracji)."""
+
+	def setUp(self):
+		self.serwis = SerwisRejestracji()
+		self.rejs = Rejs.objects.create(
+			nazwa="Rejs z limitem",
+			od=future_date(30),
+			do=future_date(44),
+			start="Gdynia",
+			koniec="Gdynia",
+			limit_miejsc=2,
+		)
+		self.numer = 0
+
+	def _zarejestruj(self, rejs=None, **kwargs) -> Zgloszenie:
+		self.numer += 1
+		return self.serwis.zarejestruj(_zgloszenie(rejs or self.rejs, self.numer, **kwargs))
+
+	def _zajete(self) -> int:
+		self.rejs.refresh_from_db()
+		return self.rejs.zajete_miejsca
+
+	def test_lista_rezerwowa_po_zajeciu_miejsc(self):
+		"""Zgłoszenia ponad limit trafiają na listę rezerwową i dostają inny email."""
+		zgloszenia = [self._zarejestruj() for _ in range(3)]
+
+		self.assertEqual([z.lista_rezerwowa for z in zgloszenia], [False, False, True])
+		self.assertEqual(self._zajete(), 2)
+		self.assertEqual(self.rejs.wolne_miejsca, 0)
+		self.assertIn("listę rezerwową", mail.outbox[-1].subject)
+
+	def test_bez_limitu(self):
+		"""Rejs bez limitu przyjmuje wszystkie zgłoszenia, ale liczy zajęte miejsca."""
+		rejs = Rejs.objects.create(nazwa="Bez limitu", od=future_date(30), do=future_date(44), start="A", koniec="B")
+		zgloszenia = [self._zarejestruj(rejs) for _ in range(3)]
+
+		self.assertFalse(any(z.lista_rezerwowa for z in zgloszenia))
+		rejs.refresh_from_db()
+		self.assertEqual(rejs.zajete_miejsca, 3)
+		self.assertIsNone(rejs.wolne_miejsca)
+
+	def test_odrzucenie_przyjmuje_pierwszego_z_listy(self):
+		"""Odrzucenie zgłoszenia zwalnia miejsce dla pierwszej osoby z listy rezerwowej."""
+		pierwszy, _, rezerwowy1, rezerwowy2 = [self._zarejestruj() for _ in range(4)]
+		mail.outbox.clear()
+
+		with self.captureOnCommitCallbacks(execute=True):
+			pierwszy.status = Zgloszenie.STATUS_ODRZUCONE
+			pierwszy.save()
+
+		rezerwowy1.refresh_from_db()
+		rezerwowy2.refresh_from_db()
+		self.assertFalse(rezerwowy1.lista_rezerwowa)
+		self.assertTrue(rezerwowy2.lista_rezerwowa)
+		self.assertEqual(self._zajete(), 2)
+		self.assertEqual([m.to for m in mail.outbox if "Zwolniło się miejsce" in m.subject], [[rezerwowy1.email]])
+
+	def test_usuniecie_zwalnia_miejsce(self):
+		"""Usunięcie zgłoszenia zajmującego miejsce przyjmuje osobę z listy, usunięcie rezerwowego - nie."""
+		pierwszy, _, rezerwowy1, rezerwowy2 = [self._zarejestruj() for _ in range(4)]
+
+		rezerwowy2.delete()
+		self.assertEqual(self._zajete(), 2)
+		pierwszy.delete()
+
+		rezerwowy1.refresh_from_db()
+		self.assertFalse(rezerwowy1.lista_rezerwowa)
+		self.assertEqual(self._zajete(), 2)
+
+	def test_usuniecie_rejsow_querysetem(self):
+		"""Usunięcie rejsów querysetem nie zwalnia miejsc kaskadowo usuwanych zgłoszeń."""
+		for _ in range(4):
+			self._zarejestruj()
+
+		with CaptureQueriesContext(connection) as zapytania:
+			Rejs.objects.filter(pk=self.rejs.pk).delete()
+
+		self.assertFalse(Zgloszenie.objects.exists())
+		self.assertFalse([z for z in zapytania.captured_queries if z["sql"].startswith("UPDATE")])
+
+	def test_przywrocenie_odrzuconego_przy_pelnym_rejsie(self):
+		"""Przywrócone zgłoszenie bez wolnego miejsca trafia na listę rezerwową."""
+		odrzucony = self._zarejestruj()
+		odrzucony.status = Zgloszenie.STATUS_ODRZUCONE
+		odrzucony.save()
+		self._zarejestruj()
+		self._zarejestruj()
+
+		odrzucony.status = Zgloszenie.STATUS_NIEZAKWALIFIKOWANY
+		odrzucony.save()
+
+		odrzucony.refresh_from_db()
+		self.assertTrue(odrzucony.lista_rezerwowa)
+		self.assertEqual(self._zajete(), 2)
+
+	def test_przeniesienie_na_inny_rejs(self):
+		"""Przeniesienie zwalnia miejsce na poprzednim rejsie i zajmuje miejsce na nowym."""
+		rejs_b = Rejs.objects.create(
+			nazwa="Rejs B", od=future_date(50), do=future_date(60), start="A", koniec="B", limit_miejsc=1
+		)
+		przenoszony, _, rezerwowy = [self._zarejestruj() for _ in range(3)]
+
+		przenoszony.rejs = rejs_b
+		przenoszony.save()
+		nowy = self._zarejestruj(rejs_b)
+
+		rezerwowy.refresh_from_db()
+		rejs_b.refresh_from_db()
+		self.assertFalse(przenoszony.lista_rezerwowa)
+		self.assertFalse(rezerwowy.lista_rezerwowa)
+		self.assertEqual(self._zajete(), 2)
+		self.assertEqual(rejs_b.zajete_miejsca, 1)
+		self.assertTrue(nowy.lista_rezerwowa)
+
+	def test_przeniesienie_na_pelny_rejs(self):
+		"""Zgłoszenie przeniesione na pełny rejs trafia na jego listę rezerwową."""
+		rejs_b = Rejs.objects.create(
+			nazwa="Rejs B", od=future_date(50), do=future_date(60), start="A", koniec="B", limit_miejsc=1
+		)
+		self._zarejestruj(rejs_b)
+		przenoszony = self._zarejestruj()
+
+		przenoszony.rejs = rejs_b
+		przenoszony.save(update_fields=["rejs"])
+
+		przenoszony.refresh_from_db()
+		rejs_b.refresh_from_db()
+		self.assertTrue(przenoszony.lista_rezerwowa)
+		self.assertEqual(self._zajete(), 0)
+		self.assertEqual(rejs_b.zajete_miejsca, 1)
+
+	def test_zwiekszenie_limitu(self):
+		"""Zwiększenie limitu w zapisie rejsu przyjmuje osoby z listy rezerwowej."""
+		zgloszenia = [self._zarejestruj() for _ in range(4)]
+
+		self.rejs.limit_miejsc = 3
+		self.rejs.save()
+
+		self.assertEqual(Zgloszenie.objects.filter(lista_rezerwowa=True).get(), zgloszenia[3])
+		self.assertEqual(self._zajete(), 3)
+
+	def test_zapis_rejsu_nie_nadpisuje_licznika(self):
+		"""Zapis wczytanego wcześniej rejsu nie cofa licznika zmienionego przez rejestracje."""
+		wczytany = Rejs.objects.get(pk=self.rejs.pk)
+		self._zarejestruj()
+
+		wczytany.nazwa = "Nowa nazwa"
+		wczytany.save()
+
+		self.assertEqual(self._zajete(), 1)
+
+	def test_przelicz_miejsca(self):
+		"""Licznik odtwarzany jest z danych zgłoszeń (np. po bulk_create)."""
+		Zgloszenie.objects.bulk_create([_zgloszenie(self.rejs, n) for n in range(3)])
+
+		self.assertEqual(self.serwis.przelicz_miejsca(self.rejs.pk), 3)
+		self.assertEqual(self._zajete(), 3)
+
+
+class RownolegleRejestracjeTest(TransactionTestCase):
+	"""Równoległe rejestracje i zwalnianie miejsc (wątki z osobnymi połączeniami do bazy)."""
+
+	LIMIT = 5
+	ZGLOSZEN = 30
+
+	def setUp(self):
+		self.rejs = Rejs.objects.create(
+			nazwa="Rejs oblegany",
+			od=future_date(30),
+			do=future_date(44),
+			start="Gdynia",
+			koniec="Gdynia",
+			limit_miejsc=self.LIMIT,
+		)
+
+	def _rownolegle(self, funkcja, argumenty) -> list:
+		start = threading.Barrier(len(argumenty))
+
+		def zadanie(argument):
+			try:
+				start.wait()
+				return funkcja(argument)
+			finally:
+				connection.close()
+
+		with ThreadPoolExecutor(max_workers=len(argumenty)) as pula:
+			return list(pula.map(zadanie, argumenty))
+
+	def _zglos(self, numer: int) -> int:
+		dane = {
+			"imie": "Jan",
+			"nazwisko": f"Rownolegly{numer}",
+			"email": f"rownolegly{numer}@example.com",
+			"telefon": "123456789",
+			"data_urodzenia": "1990-01-01",
+			"adres": "ul. Morska 1",
+			"kod_pocztowy": "81-572",
+			"miejscowosc": "Gdynia",
+			"wzrok": "WIDZI",
+			"obecnosc": "tak",
+			"rodo": "on",
+		}
+		return Client().post(f"/rejs/{self.rejs.pk}/zgloszenie/", dane).status_code
+
+	def _odrzuc(self, pk: int) -> None:
+		zgloszenie = Zgloszenie.objects.get(pk=pk)
+		zgloszenie.status = Zgloszenie.STATUS_ODRZUCONE
+		zgloszenie.save()
+
+	def test_nieudany_zapis_nie_zajmuje_miejsca(self):
+		"""Zgłoszenie odrzucone przez bazę (duplikat osoby) nie zajmuje miejsca także bez transaction.atomic()."""
+		_zgloszenie(self.rejs, 1).save()
+
+		with self.assertRaises(IntegrityError):
+			_zgloszenie(self.rejs, 1).save()
+
+		self.rejs.refresh_from_db()
+		self.assertEqual(self.rejs.zajete_miejsca, 1)
+
+	def test_limit_i_lista_rezerwowa(self):
+		"""Równoległe zgłoszenia nie przekraczają limitu, a zwolnione miejsca obsadza lista rezerwowa."""
+		statusy = self._rownolegle(self._zglos, range(self.ZGLOSZEN))
+
+		self.assertEqual(statusy, [302] * self.ZGLOSZEN)
+		self.rejs.refresh_from_db()
+		self.assertEqual(self.rejs.zajete_miejsca, self.LIMIT)
+		zajmujace = list(Zgloszenie.objects.filter(lista_rezerwowa=False).values_list("pk", flat=True))
+		self.assertEqual(len(zajmujace), self.LIMIT)
+		kolejka = list(
+			Zgloszenie.objects.filter(lista_rezerwowa=True)
+			.order_by("data_zgloszenia", "pk")
+			.values_list("pk", flat=True)
+		)
+		self.assertEqual(len(kolejka), self.ZGLOSZEN - self.LIMIT)
+
+		self._rownolegle(self._odrzuc, zajmujace[:3])
+
+		self.rejs.refresh_from_db()
+		self.assertEqual(self.rejs.zajete_miejsca, self.LIMIT)
+		przyjete = Zgloszenie.objects.filter(pk__in=kolejka, lista_rezerwowa=False).values_list("pk", flat=True)
+		self.assertEqual(sorted(przyjete), sorted(kolejka[:3]))
+		self.assertEqual(
+			Zgloszenie.objects.filter(lista_rezerwowa=False).exclude(status=Zgloszenie.STATUS_ODRZUCONE).count(),
+			self.LIMIT,
+		)
@@ -187,3 +187,251 @@ class SerwisWachtTest(TestCase):
 
 		# Brak emaili - bulk_update omija sygnały
 		self.assertEqual(len(mail.outbox), 0)
+
+	def test_aktualizuj_czlonkow_wachty_zwraca_liczby(self):
+		"""Test że aktualizacja zwraca liczbę dodanych i usuniętych członków."""
+		members = [self._create_zgloszenie(str(i)) for i in range(3)]
+		self.zgloszenie.wachta = self.wachta
+		self.zgloszenie.save()
+
+		wynik = self.serwis.aktualizuj_czlonkow_wachty(self.wachta, members)
+
+		self.assertEqual(wynik, (3, 1))
+		self.assertEqual(self.serwis.aktualizuj_czlonkow_wachty(self.wachta, members), (0, 0))
+
+	def test_aktualizuj_czlonkow_wachty_pusta_lista(self):
+		"""Test że pusta lista na pustej wachcie niczego nie zmienia."""
+		self.assertEqual(self.serwis.aktualizuj_czlonkow_wachty(self.wachta, []), (0, 0))
+
+	def test_aktualizuj_czlonkow_wachty_przeniesienie_z_innej_wachty(self):
+		"""Test przeniesienia członka z innej wachty tego samego rejsu."""
+		beta = Wachta.objects.create(rejs=self.rejs, nazwa="Beta")
+		self.zgloszenie.wachta = beta
+		self.zgloszenie.save()
+
+		self.assertEqual(self.serwis.aktualizuj_czlonkow_wachty(self.wachta, [self.zgloszenie]), (1, 0))
+
+		self.zgloszenie.refresh_from_db()
+		self.assertEqual(self.zgloszenie.wachta, self.wachta)
+
+	def test_aktualizuj_czlonkow_wachty_inny_rejs_blad(self):
+		"""Test że zgłoszenie z innego rejsu nie zostaje przypisane, a skład wachty się nie zmienia."""
+		inny_rejs = Rejs.objects.create(
+			nazwa="Inny rejs",
+			od=future_date(60),
+			do=future_date(74),
+			start="Gdańsk",
+			koniec="Helsinki",
+		)
+		obcy = Zgloszenie.objects.create(
+			imie="Anna",
+			nazwisko="Nowak",
+			email="anna@example.com",
+			telefon="987654321",
+			data_urodzenia=datetime.date(1991, 2, 2),
+			rejs=inny_rejs,
+			rodo=True,
+			obecnosc="tak",
+		)
+		self.zgloszenie.wachta = self.wachta
+		self.zgloszenie.save()
+
+		with self.assertRaises(forms.ValidationError):
+			self.serwis.aktualizuj_czlonkow_wachty(self.wachta, [obcy])
+
+		obcy.refresh_from_db()
+		self.zgloszenie.refresh_from_db()
+		self.assertIsNone(obcy.wachta)
+		self.assertEqual(self.zgloszenie.wachta, self.wachta)
+
+	def test_aktualizuj_czlonkow_wachty_powiadom(self):
+		"""Test zbiorczej wysyłki emaili tylko do nowo przypisanych członków."""
+		members = [self._create_zgloszenie(str(i)) for i in range(3)]
+		members[0].wachta = self.wachta
+		members[0].save()
+		mail.outbox.clear()
+
+		with self.captureOnCommitCallbacks(execute=True):
+			wynik = self.serwis.aktualizuj_czlonkow_wachty(self.wachta, members, powiadom=True)
+
+		self.assertEqual(wynik, (2, 0))
+		self.assertEqual(sorted(m.to[0] for m in mail.outbox), ["test1@example.com", "test2@example.com"])
+		self.assertEqual(mail.outbox[0].subject, "Dodano do wachty Alfa")
+		self.assertIn("Alfa", mail.outbox[0].body)
+
+
+class RozdzielAutomatycznieTest(TestCase):
+	"""Testy automatycznego przydziału do wacht."""
+
+	def setUp(self):
+		self.serwis = SerwisWacht()
+		self.rejs = Rejs.objects.create(
+			nazwa="Rejs testowy",
+			od=future_date(30),
+			do=future_date(44),
+			start="Gdynia",
+			koniec="Sztokholm",
+		)
+		self.alfa = Wachta.objects.create(rejs=self.rejs, nazwa="Alfa")
+		self.beta = Wachta.objects.create(rejs=self.rejs, nazwa="Beta")
+		self.licznik = 0
+
+	def _zgloszenie(self, wzrok="WIDZI", rola="ZALOGANT", status=Zgloszenie.STATUS_ZAKWALIFIKOWANY, wachta=None):
+		self.licznik += 1
+		return Zgloszenie.objects.create(
+			imie=f"Test{self.licznik}",
+			nazwisko="Uczestnik",
+			email=f"test{self.licznik}@example.com",
+			telefon="123456789",
+			data_urodzenia=datetime.date(1990, 1, 1),
+			rejs=self.rejs,
+			rodo=True,
+			obecnosc="tak",
+			wzrok=wzrok,
+			rola=rola,
+			status=status,
+			wachta=wachta,
+		)
+
+	def _sklad(self, wachta):
+		return sorted(wachta.czlonkowie.values_list("wzrok", "rola"))
+
+	def test_rownowazy_oficerow_i_wzrok(self):
+		"""Test że każda wachta dostaje oficera i po równo osób z każdej grupy wzroku."""
+		for _ in range(2):
+			self._zgloszenie(rola="OFICER-WACHTY")
+		for wzrok in ["NIEWIDOMY"] * 2 + ["SLABO-WIDZACY"] * 2 + ["WIDZI"] * 4:
+			self._zgloszenie(wzrok=wzrok)
+
+		self.assertEqual(self.serwis.rozdziel_automatycznie(self.rejs), 10)
+
+		self.assertEqual(self._sklad(self.alfa), self._sklad(self.beta))
+		self.assertEqual(self.alfa.czlonkowie.filter(rola="OFICER-WACHTY").count(), 1)
+
+	def test_uwzglednia_istniejace_przypisania(self):
+		"""Test że obecni członkowie zostają na miejscu i są liczeni przy równoważeniu."""
+		oficer = self._zgloszenie(rola="OFICER-WACHTY", wachta=self.alfa)
+		niewidomy = self._zgloszenie(wzrok="NIEWIDOMY", wachta=self.alfa)
+		nowy_oficer = self._zgloszenie(rola="OFICER-WACHTY")
+		nowy_niewidomy = self._zgloszenie(wzrok="NIEWIDOMY")
+
+		self.assertEqual(self.serwis.rozdziel_automatycznie(self.rejs), 2)
+
+		for zgloszenie in (oficer, niewidomy):
+			zgloszenie.refresh_from_db()
+			self.assertEqual(zgloszenie.wachta, self.alfa)
+		for zgloszenie in (nowy_oficer, nowy_niewidomy):
+			zgloszenie.refresh_from_db()
+			self.assertEqual(zgloszenie.wachta, self.beta)
+
+	def test_pomija_niezakwalifikowanych(self):
+		"""Test że przydzielani są tylko zakwalifikowani uczestnicy."""
+		niezakwalifikowany = self._zgloszenie(status=Zgloszenie.STATUS_NIEZAKWALIFIKOWANY)
+		odrzucony = self._zgloszenie(status=Zgloszenie.STATUS_ODRZUCONE)
+
+		self.assertEqual(self.serwis.rozdziel_automatycznie(self.rejs), 0)
+
+		self.assertIsNone(Zgloszenie.objects.get(pk=niezakwalifikowany.pk).wachta)
+		self.assertIsNone(Zgloszenie.objects.get(pk=odrzucony.pk).wachta)
+
+	def test_rejs_bez_wacht(self):
+		"""Test że rejs bez wacht niczego nie przydziela."""
+		self.rejs.wachty.all().delete()
+		zgloszenie = self._zgloszenie()
+
+		self.assertEqual(self.serwis.rozdziel_automatycznie(self.rejs), 0)
+		zgloszenie.refresh_from_db()
+		self.assertIsNone(zgloszenie.wachta)
+
+	def test_stala_liczba_zapytan(self):
+		"""Test że liczba zapytań nie zależy od liczby uczestników (jeden UPDATE)."""
+		for _ in range(30):
+			self._zgloszenie()
+
+		with CaptureQueriesContext(connection) as context:
+			self.assertEqual(self.serwis.rozdziel_automatycznie(self.rejs), 30)
+
+		updates = [q for q in context.captured_queries if q["sql"].startswith("UPDATE")]
+		self.assertEqual(len(updates), 1)
+		self.assertLessEqual(len(context), 6)
+
+	def test_powiadom(self):
+		"""Test zbiorczej wysyłki emaili do przydzielonych uczestników."""
+		self._zgloszenie()
+		self._zgloszenie(wachta=self.alfa)
+		mail.outbox.clear()
+
+		with self.captureOnCommitCallbacks(execute=True):
+			self.serwis.rozdziel_automatycznie(self.rejs, powiadom=True)
+
+		self.assertEqual(len(mail.outbox), 1)
+		self.assertEqual(mail.outbox[0].subject, "Dodano do wachty Beta")
+
+
+class PrzeniesCzlonkowTest(TestCase):
+	"""Testy przenoszenia uczestników między wachtami."""
+
+	def setUp(self):
+		self.serwis = SerwisWacht()
+		self.rejs = Rejs.objects.create(
+			nazwa="Rejs testowy",
+			od=future_date(30),
+			do=future_date(44),
+			start="Gdynia",
+			koniec="Sztokholm",
+		)
+		self.alfa = Wachta.objects.create(rejs=self.rejs, nazwa="Alfa")
+		self.beta = Wachta.objects.create(rejs=self.rejs, nazwa="Beta")
+		self.inny_rejs = Rejs.objects.create(
+			nazwa="Inny rejs",
+			od=future_date(60),
+			do=future_date(74),
+			start="Gdańsk",
+			koniec="Helsinki",
+		)
+		self.zgloszenia = [self._zgloszenie(i, self.rejs) for i in range(3)]
+
+	def _zgloszenie(self, numer, rejs, wachta=None):
+		return Zgloszenie.objects.create(
+			imie=f"Test{numer}",
+			nazwisko=f"User{numer}",
+			email=f"test{numer}@example.com",
+			telefon="123456789",
+			data_urodzenia=datetime.date(1990, 1, 1),
+			rejs=rejs,
+			rodo=True,
+			obecnosc="tak",
+			wachta=wachta,
+		)
+
+	def test_przenosi_i_usuwa_z_wachty(self):
+		"""Test przeniesień do różnych wacht i usunięcia z wachty w jednym wywołaniu."""
+		a, b, c = self.zgloszenia
+		c.wachta = self.alfa
+		c.save()
+
+		wynik = self.serwis.przenies_czlonkow(self.rejs, {a.pk: self.alfa.pk, b.pk: self.beta.pk, c.pk: None})
+
+		self.assertEqual(wynik, 3)
+		uklad = self.serwis.uklad_wacht(self.rejs)
+		self.assertEqual([[u["id"] for u in w["czlonkowie"]] for w in uklad["wachty"]], [[a.pk], [b.pk]])
+		self.assertEqual([u["id"] for u in uklad["bez_wachty"]], [c.pk])
+
+	def test_zgloszenie_z_innego_rejsu_wycofuje_wszystko(self):
+		"""Test że zgłoszenie spoza rejsu odrzuca całą operację."""
+		obcy = self._zgloszenie(9, self.inny_rejs)
+
+		with self.assertRaises(forms.ValidationError):
+			self.serwis.przenies_czlonkow(self.rejs, {self.zgloszenia[0].pk: self.alfa.pk, obcy.pk: self.alfa.pk})
+
+		self.assertFalse(Zgloszenie.objects.filter(wachta=self.alfa).exists())
+
+	def test_wachta_z_innego_rejsu(self):
+		"""Test że nie można przenieść do wachty innego rejsu."""
+		obca = Wachta.objects.create(rejs=self.inny_rejs, nazwa="Obca")
+
+		with self.assertRaises(forms.ValidationError):
+			self.serwis.przenies_czlonkow(self.rejs, {self.zgloszenia[0].pk: obca.pk})
+
+		self.zgloszenia[0].refresh_from_db()
+		self.assertIsNone(self.zgloszenia[0].wachta)
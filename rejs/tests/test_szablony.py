@@ -0,0 +1,107 @@
+import datetime
+import re
+from decimal import Decimal
+from importlib.util import find_spec
+from unittest import skipUnless
+
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates
+from django.template.loader import get_template, render_to_string
+from django.test import TestCase, override_settings
+
+from rejs.models import Ogloszenie, Rejs, Wachta, Wplata, Zgloszenie
+
+JINJA2 = find_spec("jinja2") is not None
+
+
+def _szablony(*katalogi):
+	"""Ustawienie TEMPLATES z silnikiem Jinja2 dla podanych katalogów (jak przy DJANGO_SZABLONY_JINJA2)."""
+	return [
+		{"BACKEND": "rejs.szablony.Jinja2Katalogi", "APP_DIRS": True, "OPTIONS": {"katalogi": list(katalogi)}},
+		*settings.TEMPLATES,
+	]
+
+
+def _normalizuj(tresc: bytes) -> str:
+	"""Treść strony bez różnic w białych znakach, zapisie apostrofu i bez jednorazowych tokenów (CSRF, idempotencja)."""
+	tekst = re.sub(r'name="(csrfmiddlewaretoken|klucz_idempotencji)" value="[^"]+"', "", tresc.decode())
+	tekst = tekst.replace("&#x27;", "&#39;")
+	return re.sub(r"\s+", " ", tekst).strip()
+
+
+@skipUnless(JINJA2, "wymaga pakietu jinja2")
+class SzablonyJinja2Test(TestCase):
+	"""Testy szablonów Jinja2 stron publicznych i emaili (rejs.szablony)."""
+
+	def setUp(self):
+		dzis = datetime.date.today()
+		self.rejs = Rejs.objects.create(
+			nazwa="Rejs <testowy>",
+			od=dzis + datetime.timedelta(days=30),
+			do=dzis + datetime.timedelta(days=44),
+			start="Gdynia",
+			koniec="Sztokholm",
+			opis="Pierwsza linia\nDruga linia",
+		)
+		wachta = Wachta.objects.create(rejs=self.rejs, nazwa="Alfa")
+		self.zgloszenia = [
+			Zgloszenie.objects.create(
+				imie="Jan",
+				nazwisko=nazwisko,
+				email=f"jan{i}@example.com",
+				telefon="123456789",
+				data_urodzenia=datetime.date(1990, 1, 1),
+				rejs=self.rejs,
+				wachta=wachta,
+				rodo=True,
+				obecnosc="tak",
+			)
+			for i, nazwisko in enumerate(["O'Brien", "Kowalski"])
+		]
+		Ogloszenie.objects.create(rejs=self.rejs, tytul="Zbiórka", text="Port\no 9:00")
+
+	def _strony(self):
+		zgloszenie = self.zgloszenia[0]
+		return [
+			self.client.get("/"),
+			self.client.get(zgloszenie.get_absolute_url()),
+			self.client.get(f"/rejs/{self.rejs.pk}/zgloszenie/"),
+			self.client.post(f"/rejs/{self.rejs.pk}/zgloszenie/", {"imie": "Jan"}),
+			self.client.get(f"/zgloszenie/{zgloszenie.token}/dane_dodatkowe"),
+			self.client.get("/rodo/"),
+		]
+
+	def test_strony_takie_same_jak_w_silniku_django(self):
+		"""Strony publiczne renderowane przez Jinja2 mają tę samą treść co przez silnik Django."""
+		django = self._strony()
+		with override_settings(TEMPLATES=_szablony("rejs", "emails")):
+			jinja2 = self._strony()
+
+		self.assertEqual([o.status_code for o in jinja2], [200] * len(jinja2))
+		for odpowiedz_django, odpowiedz_jinja2 in zip(django, jinja2):
+			self.assertEqual(_normalizuj(odpowiedz_django.content), _normalizuj(odpowiedz_jinja2.content))
+		self.assertContains(jinja2[3], "Formularz zawiera błędy")
+
+	@override_settings(TEMPLATES=_szablony("emails"))
+	def test_wybor_katalogow(self):
+		"""Jinja2 obsługuje tylko wskazane katalogi - pozostałe szablony renderuje silnik Django."""
+		self.assertNotIsInstance(get_template("emails/wplata.html").backend, DjangoTemplates)
+		self.assertIsInstance(get_template("rejs/index.html").backend, DjangoTemplates)
+		self.assertIsInstance(get_template("admin/rejs/pulpit.html").backend, DjangoTemplates)
+
+	@override_settings(TEMPLATES=_szablony("emails"))
+	def test_emaile(self):
+		"""Kwoty i daty są lokalizowane jak w silniku Django, a tylko wersja HTML jest escapowana."""
+		zgloszenie = self.zgloszenia[0]
+		wplata = Wplata.objects.create(zgloszenie=zgloszenie, kwota=Decimal("100.50"), rodzaj=Wplata.RODZAJ_WPLATA)
+		kontekst = {"zgl": zgloszenie, "wplata": wplata}
+
+		txt = render_to_string("emails/wplata.txt", kontekst)
+		html = render_to_string("emails/wplata.html", kontekst)
+
+		self.assertIn("wysokości 100,50 zł", txt)
+		self.assertIn("Uczestnik: Jan O'Brien", txt)
+		self.assertIn("Rejs <testowy>", txt)
+		self.assertIn("Rejs &lt;testowy&gt;", html)
+		self.assertNotIn("O'Brien", html)
+		self.assertIn("Fundacja Zobaczyć Morze", txt)
@@ -1,6 +1,7 @@
 import datetime
 import uuid
 
+from django.core import mail
 from django.test import Client, TestCase
 from django.urls import reverse
 
@@ -163,6 +164,72 @@ class ZgloszenieCreateViewTest(TestCase):
 			reverse("zgloszenie_details", kwargs={"token": zgloszenie.token}),
 		)
 
+	def test_post_pelny_rejs_lista_rezerwowa(self):
+		"""Przy pełnym rejsie formularz uprzedza o liście rezerwowej, a zgłoszenie na nią trafia."""
+		self.rejs.limit_miejsc = 0
+		self.rejs.save()
+		url = reverse("zgloszenie_utworz", kwargs={"rejs_id": self.rejs.id})
+		self.assertContains(self.client.get(url), "Brak wolnych miejsc")
+
+		data = {
+			"imie": "Jan",
+			"nazwisko": "Kowalski",
+			"email": "jan@example.com",
+			"telefon": "123456789",
+			"data_urodzenia": "1990-01-01",
+			"adres": "ul. Testowa 1",
+			"kod_pocztowy": "00-001",
+			"miejscowosc": "Warszawa",
+			"wzrok": "NIEWIDOMY",
+			"obecnosc": "tak",
+			"rodo": True,
+		}
+		response = self.client.post(url, data, follow=True)
+		self.assertTrue(Zgloszenie.objects.get().lista_rezerwowa)
+		self.assertContains(response, "Lista rezerwowa")
+
+	def test_formularz_z_kluczem_idempotencji(self):
+		"""Formularz zawiera ukryty klucz idempotencji, inny przy każdym wyświetleniu."""
+		url = reverse("zgloszenie_utworz", kwargs={"rejs_id": self.rejs.id})
+		klucze = [self.client.get(url).context["form"]["klucz_idempotencji"].value() for _ in range(2)]
+
+		self.assertContains(self.client.get(url), 'type="hidden" name="klucz_idempotencji"')
+		self.assertNotEqual(klucze[0], klucze[1])
+
+	def test_ponowne_wyslanie_tego_samego_formularza(self):
+		"""Ponowne wysłanie z tym samym kluczem przekierowuje do zapisanego zgłoszenia bez zapisu i emaila."""
+		data = {
+			"imie": "Jan",
+			"nazwisko": "Kowalski",
+			"email": "jan@example.com",
+			"telefon": "123456789",
+			"data_urodzenia": "1990-01-01",
+			"adres": "ul. Testowa 1",
+			"kod_pocztowy": "00-001",
+			"miejscowosc": "Warszawa",
+			"wzrok": "NIEWIDOMY",
+			"obecnosc": "tak",
+			"rodo": True,
+			"klucz_idempotencji": str(uuid.uuid4()),
+		}
+		url = reverse("zgloszenie_utworz", kwargs={"rejs_id": self.rejs.id})
+		pierwsza = self.client.post(url, data)
+		# Rejs i token zapisanego zgłoszenia
+		with self.assertNumQueries(2):
+			druga = self.client.post(url, data)
+
+		zgloszenie = Zgloszenie.objects.get()
+		self.assertEqual(zgloszenie.klucz_idempotencji, uuid.UUID(data["klucz_idempotencji"]))
+		self.assertEqual(druga.url, pierwsza.url)
+		self.assertRedirects(druga, reverse("zgloszenie_details", kwargs={"token": zgloszenie.token}))
+		self.assertEqual(len(mail.outbox), 1)
+
+		# Nowy klucz (nowe wyświetlenie formularza) - te same dane to już duplikat
+		data["klucz_idempotencji"] = str(uuid.uuid4())
+		response = self.client.post(url, data)
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(Zgloszenie.objects.count(), 1)
+
 	def test_post_invalid_form_missing_fields(self):
 		"""Test wysłania formularza z brakującymi polami."""
 		data = {
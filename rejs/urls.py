@@ -20,4 +20,5 @@ urlpatterns = [
 		name="dane_dodatkowe_form",
 	),
 	path("rodo/", views.rodo_info, name="rodo_info"),
+	path("metryki/", views.metryki_widok, name="metryki"),
 ]
@@ -4,28 +4,37 @@ Widoki aplikacji rejs.
 Obsługuje żądania HTTP dla rejestracji na rejsy.
 """
 
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db import IntegrityError
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.utils.timezone import localdate
 
+from . import metryki
 from .forms import Dane_DodatkoweForm, ZgloszenieForm
 from .models import Rejs, Zgloszenie
+from .serwisy.kolejka import serwis_kolejki_zgloszen
 from .serwisy.rejestracja import serwis_rejestracji
 
 
+@metryki.mierzony
 def index(request):
 	"""Wyświetla listę dostępnych rejsów."""
-	dzis = localdate()
-	rejsy = Rejs.objects.filter(
-		aktywna_rekrutacja=True,
-		od__gte=dzis,
-	).order_by("od")
-	return render(request, "rejs/index.html", {"rejsy": rejsy})
+	return render(request, "rejs/index.html", {"rejsy": serwis_rejestracji.rejsy_otwarte()})
 
 
+@metryki.mierzony
 def zgloszenie_utworz(request, rejs_id):
 	"""Obsługuje formularz tworzenia zgłoszenia na rejs."""
 	rejs = get_object_or_404(Rejs, id=rejs_id)
 
+	if request.method == "POST":
+		# Ponowne wysłanie tego samego formularza (np. gdy serwer wolno odpowiada) - bez walidacji,
+		# zapisu i emaila, z tym samym przekierowaniem co za pierwszym razem
+		klucz = request.POST.get("klucz_idempotencji")
+		token = serwis_rejestracji.token_po_kluczu(rejs, klucz)
+		if token is not None:
+			return redirect("zgloszenie_details", token=token)
+
 	# Sprawdzenie czy można się zarejestrować
 	mozna, _ = serwis_rejestracji.czy_mozna_rejestrowac(rejs)
 	if not mozna:
@@ -34,16 +43,29 @@ def zgloszenie_utworz(request, rejs_id):
 	if request.method == "POST":
 		form = ZgloszenieForm(request.POST, initial={"rejs": rejs})
 		if form.is_valid():
-			zgl = form.save(commit=False)
-			zgl.rejs = rejs
-			zgl.save()
-			return redirect("zgloszenie_details", token=zgl.token)
+			try:
+				if serwis_kolejki_zgloszen.wlaczona():
+					# Tryb szczytowy - zgłoszenie utworzy komenda przetwarzaj_zgloszenia
+					token = serwis_kolejki_zgloszen.przyjmij(rejs, form)
+				else:
+					zgl = form.save(commit=False)
+					zgl.rejs = rejs
+					serwis_rejestracji.zarejestruj(zgl)
+					metryki.zgloszenia.inc()
+					token = zgl.token
+			except IntegrityError:
+				# Równoległe wysłanie tego samego formularza zapisało zgłoszenie pierwsze
+				token = serwis_rejestracji.token_po_kluczu(rejs, klucz)
+				if token is None:
+					raise
+			return redirect("zgloszenie_details", token=token)
 	else:
 		form = ZgloszenieForm(initial={"rejs": rejs})
 
 	return render(request, "rejs/zgloszenie_form.html", {"form": form, "rejs": rejs})
 
 
+@metryki.mierzony
 def dane_dodatkowe_form(request, token):
 	"""Obsługuje formularz danych dodatkowych (PESEL, dokument)."""
 	zgloszenie = get_object_or_404(Zgloszenie, token=token)
@@ -55,6 +77,7 @@ def dane_dodatkowe_form(request, token):
 			dane = form.save(commit=False)
 			dane.zgloszenie = zgloszenie
 			dane.save()
+			metryki.dane_dodatkowe.inc()
 			return redirect(zgloszenie.get_absolute_url())
 	else:
 		form = Dane_DodatkoweForm()
@@ -66,9 +89,16 @@ def dane_dodatkowe_form(request, token):
 	)
 
 
+@metryki.mierzony
 def zgloszenie_details(request, token):
-	"""Wyświetla szczegóły zgłoszenia."""
-	zgloszenie = get_object_or_404(Zgloszenie, token=token)
+	"""Wyświetla szczegóły zgłoszenia (albo informację o zgłoszeniu czekającym w kolejce trybu szczytowego)."""
+	try:
+		zgloszenie = Zgloszenie.objects.get(token=token)
+	except Zgloszenie.DoesNotExist:
+		oczekujace = serwis_kolejki_zgloszen.oczekujace(token)
+		if oczekujace is None:
+			raise Http404("Nie znaleziono zgłoszenia.") from None
+		return render(request, "rejs/zgloszenie_oczekujace.html", {"oczekujace": oczekujace})
 
 	# Przekierowanie do formularza danych dodatkowych jeśli wymagane
 	if serwis_rejestracji.czy_wymaga_danych_dodatkowych(zgloszenie):
@@ -77,6 +107,13 @@ def zgloszenie_details(request, token):
 	return render(request, "rejs/zgloszenie_details.html", {"zgloszenie": zgloszenie})
 
 
+@metryki.mierzony
 def rodo_info(request):
 	"""Wyświetla informacje o przetwarzaniu danych osobowych (RODO)."""
 	return render(request, "rejs/rodo_info.html")
+
+
+@staff_member_required
+def metryki_widok(request):
+	"""Eksportuje metryki aplikacji w formacie tekstowym Prometheusa (tylko dla personelu)."""
+	return HttpResponse(metryki.rejestr.eksport(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -10,8 +10,10 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import hashlib
 import os
 import sys
+import tempfile
 from pathlib import Path
 
 # Próba załadowania .env dla uruchomień bez UV (fallback)
@@ -43,6 +45,13 @@ if not _env_file.exists() and not _secret_key and not DJANGO_FIELD_ENCRYPTION_KE
 	print("=" * 70)
 	sys.exit("❌ BŁĄD: SECRET_KEY nie jest ustawiony. Aplikacja nie może wystartować.")
 
+# Klucze szyfrowania pól oddzielone przecinkami: pierwszy szyfruje nowe dane,
+# kolejne służą wyłącznie do odczytu danych sprzed rotacji (komenda rotuj_klucze)
+DJANGO_FIELD_ENCRYPTION_KEYS = [k.strip() for k in (DJANGO_FIELD_ENCRYPTION_KEY or "").split(",") if k.strip()]
+# Algorytm szyfrowania nowych danych: "fernet" lub "aes-gcm" (krótsze szyfrogramy).
+# Odczyt obsługuje oba; istniejące dane konwertuje "python manage.py konwertuj_szyfrogramy".
+FIELD_ENCRYPTION_ALGORITHM = os.environ.get("DJANGO_FIELD_ENCRYPTION_ALGORITHM", "fernet")
+
 
 # ==============================================================================
 # Ustawienia bezpieczeństwa
@@ -51,6 +60,11 @@ if not _env_file.exists() and not _secret_key and not DJANGO_FIELD_ENCRYPTION_KE
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = os.environ.get("SECRET_KEY", "dev-only-not-for-production")
 
+# Klucz HMAC indeksów wyszukiwania po zaszyfrowanych polach (np. PESEL), wymagany
+# (sprawdzenie rejs.E001). Osobny od SECRET_KEY, aby jego zmiana nie unieważniała
+# indeksów; po zmianie uruchom "python manage.py indeksuj_pesel --od-nowa".
+FIELD_BLIND_INDEX_KEY = os.environ.get("DJANGO_BLIND_INDEX_KEY", "")
+
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = os.environ.get("DEBUG", "True").lower() in ("true", "1", "yes")
 
@@ -86,6 +100,47 @@ MIDDLEWARE = [
 	"django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Pomiar zapytań SQL i czasów żądań (nagłówek Server-Timing, log "rejs.middleware").
+# Przekroczenie budżetu zapytań widoku (BUDZETY_ZAPYTAN) to ostrzeżenie w logu, a z
+# DJANGO_BUDZET_ZAPYTAN_WYJATEK - wyjątek (środowisko deweloperskie i CI: każdy test
+# widoku pilnuje wtedy budżetów; włącza też pomiar).
+POMIAR_ZAPYTAN = os.environ.get("DJANGO_POMIAR_ZAPYTAN", "False").lower() in ("true", "1", "yes")
+BUDZET_ZAPYTAN_WYJATEK = os.environ.get("DJANGO_BUDZET_ZAPYTAN_WYJATEK", "False").lower() in ("true", "1", "yes")
+if POMIAR_ZAPYTAN or BUDZET_ZAPYTAN_WYJATEK:
+	MIDDLEWARE.insert(0, "rejs.middleware.PomiarZapytanMiddleware")
+
+# Profilowanie żądań (cProfile i próbkowanie stosu) - wyniki w katalogu, podsumowanie:
+# "python manage.py profile_zadan". Profilowani są wskazani użytkownicy personelu
+# (nazwy oddzielone przecinkami) i losowy odsetek pozostałych żądań.
+PROFILOWANIE_KATALOG = os.environ.get("DJANGO_PROFILOWANIE_KATALOG", "")
+PROFILOWANIE_UZYTKOWNICY = [
+	u.strip() for u in os.environ.get("DJANGO_PROFILOWANIE_UZYTKOWNICY", "").split(",") if u.strip()
+]
+PROFILOWANIE_PROCENT = float(os.environ.get("DJANGO_PROFILOWANIE_PROCENT", "0"))
+if PROFILOWANIE_KATALOG:
+	MIDDLEWARE.append("rejs.middleware.ProfilowanieMiddleware")
+
+# Katalog wspólny dla procesów roboczych, w którym każdy proces zapisuje swoje metryki
+# (rejs.metryki); bez niego widok /metryki/ pokazuje tylko proces, który obsłużył żądanie
+METRYKI_KATALOG = os.environ.get("DJANGO_METRYKI_KATALOG", "")
+
+# Maksymalna liczba zapytań SQL na żądanie (klucz: nazwa widoku z resolver_match.view_name)
+BUDZETY_ZAPYTAN = {
+	"index": 3,
+	"zgloszenie_utworz": 7,  # z zajęciem miejsca (warunkowy UPDATE licznika rejsu)
+	"zgloszenie_details": 12,
+	"dane_dodatkowe_form": 14,
+	"admin:rejs_rejs_changelist": 14,  # także akcje (raport Excel)
+	"admin:rejs_rejs_change": 14,
+	"admin:rejs_rejs_pulpit": 6,
+	"admin:rejs_rejs_wachty": 10,
+	"admin:rejs_zgloszenie_change": 10,
+}
+
+# Budżet zimnego startu procesu (django.setup() w świeżym interpreterze) w milisekundach,
+# sprawdzany przez "python manage.py czas_startu" i testy
+BUDZET_STARTU_MS = int(os.environ.get("DJANGO_BUDZET_STARTU_MS", "1500"))
+
 ROOT_URLCONF = "zm_zgloszenia.urls"
 
 # Theme configuration (set DJANGO_THEME=alt for Bootstrap theme)
@@ -106,6 +161,43 @@ TEMPLATES = [
 	},
 ]
 
+# Katalogi szablonów renderowane przez Jinja2 zamiast silnika Django (np. "rejs,emails");
+# wymaga pakietu jinja2. Szablony Jinja2: rejs/jinja2/ i themes/<motyw>/jinja2/
+SZABLONY_JINJA2 = [k.strip() for k in os.environ.get("DJANGO_SZABLONY_JINJA2", "").split(",") if k.strip()]
+if SZABLONY_JINJA2:
+	TEMPLATES.insert(
+		0,
+		{
+			"BACKEND": "rejs.szablony.Jinja2Katalogi",
+			"DIRS": [BASE_DIR / "themes" / DJANGO_THEME / "jinja2"] if DJANGO_THEME else [],
+			"APP_DIRS": True,
+			"OPTIONS": {"katalogi": SZABLONY_JINJA2},
+		},
+	)
+
+# Katalog statycznych migawek strony głównej i informacji RODO (rejs.serwisy.migawki),
+# podawanych bezpośrednio przez serwer WWW; odświeżane po zmianie rejsu i komendą generuj_migawki
+MIGAWKI_KATALOG = os.environ.get("DJANGO_MIGAWKI_KATALOG", "")
+
+# Czas ważności klucza idempotencji formularza zgłoszenia (ponowne wysłanie nie tworzy duplikatu);
+# starsze klucze czyści komenda czysc_klucze_idempotencji
+IDEMPOTENCJA_WAZNOSC_GODZIN = int(os.environ.get("DJANGO_IDEMPOTENCJA_WAZNOSC_GODZIN", "24"))
+
+# Tryb szczytowy rekrutacji: formularz zgłoszenia zapisuje zwalidowane dane do kolejki
+# (ZgloszenieOczekujace), a komenda przetwarzaj_zgloszenia tworzy z nich zgłoszenia paczkami
+TRYB_SZCZYTOWY = os.environ.get("DJANGO_TRYB_SZCZYTOWY", "False").lower() in ("true", "1", "yes")
+
+# Cache współdzielony przez procesy robocze na tym samym serwerze (np. pulpit rekrutacji
+# unieważniany po zmianie danych); bez katalogu każdy proces ma własny cache w pamięci
+CACHE_KATALOG = os.environ.get("DJANGO_CACHE_KATALOG", "")
+if CACHE_KATALOG:
+	CACHES = {
+		"default": {
+			"BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+			"LOCATION": CACHE_KATALOG,
+		}
+	}
+
 WSGI_APPLICATION = "zm_zgloszenia.wsgi.application"
 
 
@@ -118,6 +210,15 @@ DATABASES = {
 	"default": {
 		"ENGINE": "django.db.backends.sqlite3",
 		"NAME": BASE_DIR / "db.sqlite3",
+		# Baza testowa w pliku, nie w pamięci: SQLite w pamięci (współdzielona pamięć podręczna)
+		# przy równoległych zapisach zwraca "database table is locked" zamiast czekać na blokadę,
+		# a testy wielowątkowe (limit miejsc, test_obciazenia) muszą blokować się jak produkcja.
+		# Skrót ścieżki repozytorium w nazwie - inne kopie repozytorium (zadania CI) nie dzielą bazy,
+		# a nazwa jest stała między uruchomieniami, więc "manage.py test --keepdb" używa tej samej bazy
+		"TEST": {
+			"NAME": Path(tempfile.gettempdir())
+			/ f"zm_zgloszenia_test_{hashlib.sha256(str(BASE_DIR).encode()).hexdigest()[:12]}.sqlite3"
+		},
 	}
 }
 